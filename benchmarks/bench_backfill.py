@@ -0,0 +1,90 @@
+"""
+bench_backfill.py
+Benchmark de la importación de volcados CSV/ZIP de Binance a `KlineStore`.
+
+Uso:
+    python -m benchmarks.bench_backfill [--meses 12] [--dir carpeta_con_zips]
+
+Sin `--dir` genera `--meses` volcados mensuales sintéticos de 1m con el
+formato de data.binance.vision (`SYMBOL-1m-YYYY-MM.zip`, 12 columnas) y los
+importa con `importar_directorio`. Reporta velas/s y el pico de memoria
+de `tracemalloc`, que se mantiene en el orden del bloque de lectura, no del
+año completo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+import numpy as np
+
+from bot.data.backfill import importar_directorio
+from bot.data.kline_store import KlineStore
+
+MIN = 60_000
+INICIO = 1_672_531_200_000  # 2023-01-01
+
+
+def generar(directorio: str, meses: int, symbol: str = "BTCUSDT", seed: int = 0) -> int:
+    rng = np.random.default_rng(seed)
+    t = INICIO
+    precio = 20_000.0
+    total = 0
+    for m in range(meses):
+        anio, mes = 2023 + m // 12, m % 12 + 1
+        n = 30 * 1440 + (1440 if mes in (1, 3, 5, 7, 8, 10, 12) else 0)
+        ts = t + MIN * np.arange(n, dtype=np.int64)
+        close = precio * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+        open_ = np.concatenate(([precio], close[:-1]))
+        high = np.maximum(open_, close) * 1.0002
+        low = np.minimum(open_, close) * 0.9998
+        vol = rng.uniform(1, 100, n)
+        filas = "\n".join(
+            f"{a},{o:.2f},{h:.2f},{l:.2f},{c:.2f},{v:.5f},{a + MIN - 1},0,10,0,0,0"
+            for a, o, h, l, c, v in zip(ts.tolist(), open_.tolist(), high.tolist(), low.tolist(), close.tolist(), vol.tolist())
+        )
+        nombre = f"{symbol}-1m-{anio}-{mes:02d}"
+        with zipfile.ZipFile(os.path.join(directorio, nombre + ".zip"), "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(nombre + ".csv", filas + "\n")
+        t += n * MIN
+        precio = float(close[-1])
+        total += n
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--meses", type=int, default=12)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directorio = args.dir
+        if directorio is None:
+            directorio = os.path.join(tmp, "dumps")
+            os.makedirs(directorio)
+            t = time.perf_counter()
+            n = generar(directorio, args.meses)
+            print(f"volcados sintéticos: {args.meses} meses, {n} velas ({time.perf_counter() - t:.1f}s)")
+        store = KlineStore(os.path.join(tmp, "store"))
+        t = time.perf_counter()
+        res = importar_directorio(store, directorio)
+        seg = time.perf_counter() - t
+        # Segunda pasada, sobre un almacén vacío, solo para medir memoria (tracemalloc ralentiza).
+        tracemalloc.start()
+        importar_directorio(KlineStore(os.path.join(tmp, "store_mem")), directorio)
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        velas = sum(res.values())
+        print(f"importadas {velas} velas en {seg:.2f}s -> {velas / seg:,.0f} velas/s, pico {pico / 1e6:.1f} MB")
+        for (symbol, interval), n in res.items():
+            print(f"  {symbol} {interval}: {n} velas, {store.count(symbol, interval)} en el almacén")
+
+
+if __name__ == "__main__":
+    main()
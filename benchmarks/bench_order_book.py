@@ -0,0 +1,90 @@
+"""
+bench_order_book.py
+Benchmark de `OrderBook` reproduciendo diffs de profundidad grabados (sin red).
+
+Uso:
+    python -m benchmarks.bench_order_book [--diffs N] [--file depth.jsonl]
+
+El fichero es JSON lines: primera línea el snapshot REST (`lastUpdateId`,
+`bids`, `asks`), después mensajes `depthUpdate` (`E`, `U`, `u`, `b`, `a`).
+Sin `--file` se genera uno sintético con 1000 niveles por lado y 1-20
+cambios por diff. Objetivo: >= 10k diffs/s por símbolo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from bot.data.order_book import OrderBook
+
+OBJETIVO = 10_000
+
+
+def generar(path: str, n: int, niveles: int = 1000, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    mid = 60_000.0
+    tick = 0.1
+    snapshot = {
+        "lastUpdateId": 1,
+        "bids": [[f"{mid - tick * i:.1f}", f"{rng.uniform(0.01, 5):.4f}"] for i in range(1, niveles + 1)],
+        "asks": [[f"{mid + tick * i:.1f}", f"{rng.uniform(0.01, 5):.4f}"] for i in range(1, niveles + 1)],
+    }
+    with open(path, "w") as fh:
+        fh.write(json.dumps(snapshot) + "\n")
+        u = 1
+        for i in range(n):
+            b, a = [], []
+            for _ in range(rng.randint(1, 20)):
+                lado, signo = (b, -1) if rng.random() < 0.5 else (a, 1)
+                # Cambios concentrados cerca del mid, como en un libro real.
+                p = mid + signo * tick * (1 + int(rng.expovariate(1 / 30)))
+                q = 0.0 if rng.random() < 0.25 else rng.uniform(0.01, 5) * (40 if rng.random() < 0.002 else 1)
+                lado.append([f"{p:.1f}", f"{q:.4f}"])
+            first, u = u + 1, u + rng.randint(1, 5)
+            fh.write(json.dumps({"e": "depthUpdate", "E": i * 10, "U": first, "u": u, "b": b, "a": a}) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--diffs", type=int, default=200_000)
+    parser.add_argument("--file", default=None, help="JSON lines con snapshot + diffs grabados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "depth.jsonl")
+            generar(path, args.diffs)
+        with open(path) as fh:
+            lineas = fh.read().splitlines()
+
+    t0 = time.perf_counter()
+    mensajes = [json.loads(line) for line in lineas if line.strip()]
+    parseo = time.perf_counter() - t0
+    snapshot, diffs = mensajes[0], mensajes[1:]
+    cambios = sum(len(m["b"]) + len(m["a"]) for m in diffs)
+
+    book = OrderBook("BTCUSDT", wall_threshold=500_000.0)
+    book.load_snapshot(snapshot)
+    apply_diff = book.apply_diff
+    t0 = time.perf_counter()
+    for msg in diffs:
+        apply_diff(msg)
+    seg = time.perf_counter() - t0
+
+    n = len(diffs)
+    for nombre, total in (("apply_diff", seg), ("json.loads + apply_diff", seg + parseo)):
+        tasa = n / total
+        estado = "OK" if tasa >= OBJETIVO else "LENTO"
+        print(f"{nombre:<26} {n:>8} diffs ({cambios} niveles) {total:7.3f}s {tasa:>10,.0f} diffs/s  [{estado}]")
+    print(f"niveles: {len(book.bids)} bids / {len(book.asks)} asks, best {book.best_bid} / {book.best_ask}, "
+          f"muros activos {len(book.muros())}, retiros {len(book.retiros)}")
+
+
+if __name__ == "__main__":
+    main()
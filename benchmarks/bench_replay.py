@@ -0,0 +1,177 @@
+"""
+bench_replay.py
+Prueba de carga del pipeline completo con tráfico reproducido (sin red).
+
+Uso:
+    python -m benchmarks.bench_replay [--symbols N] [--minutos M] [--velocidad X] [--file a.bstr.gz ...]
+
+Sin `--file` genera una grabación sintética con el formato de
+`stream_replay` (por símbolo y segundo de mercado: 1 kline en curso,
+3 aggTrade y 1 diff de depth; el cierre de cada minuto). `ServidorReplay`
+la sirve a la velocidad pedida (por defecto máxima) y la consume el
+pipeline en vivo:
+
+    MultiplexorStreams -> BuzonConflacion -> Orquestador (klines)
+                       -> ColaAcotada     -> TradeRadar   (aggTrade)
+                       -> BuzonConflacion -> OrderBook    (depth)
+
+Reporta la tasa de envío del servidor, la tasa sostenida de extremo a
+extremo (mensajes / tiempo hasta consumir el último), la latencia
+cierre -> señal y lo absorbido por conflación. Si la tasa de extremo a
+extremo queda muy por debajo de la de envío, el pipeline no sostiene
+ese ritmo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.bench_sharding import CONFIGS, VENTANA, historico, sembrar
+from bot.core.trade_radar import TradeRadar
+from bot.data.conflation import BuzonConflacion
+from bot.data.order_book import OrderBook
+from bot.data.stream_replay import GrabadorStreams, ServidorReplay, leer_grabacion, nombre_stream
+from bot.data.websocket_stream import ColaAcotada, MultiplexorStreams
+from bot.services.orchestrator import Orquestador
+
+NS = 1_000_000_000
+
+
+def _compacto(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def generar(path: str, historicos: Dict, minutos: int, seed: int = 0) -> int:
+    """Graba `minutos` de mercado sintético de todos los símbolos; devuelve los mensajes."""
+    rng = random.Random(seed)
+    t_ns = time.time_ns()
+    update_id = {s: 0 for s in historicos}
+    n = 0
+    with GrabadorStreams(path) as g:
+        for i in range(VENTANA, VENTANA + minutos):
+            for seg in range(60):
+                for symbol, frame in historicos.items():
+                    s = symbol.lower()
+                    t = int(frame.timestamp[i])
+                    close = float(frame.close[i])
+                    precio = float(frame.open[i]) + (close - float(frame.open[i])) * (seg + 1) / 60
+                    k = {"t": t, "T": t + 59_999, "s": symbol, "i": "1m", "f": 0, "L": 0,
+                         "o": f"{float(frame.open[i]):.4f}", "c": f"{precio:.4f}",
+                         "h": f"{float(frame.high[i]):.4f}", "l": f"{float(frame.low[i]):.4f}",
+                         "v": f"{float(frame.volume[i]) * (seg + 1) / 60:.4f}", "n": seg, "x": False,
+                         "q": "0", "V": "0", "Q": "0", "B": "0"}
+                    mensajes = [{"stream": f"{s}@kline_1m", "data": {"e": "kline", "E": t + seg * 1000, "s": symbol, "k": k}}]
+                    for _ in range(3):
+                        mensajes.append({"stream": f"{s}@aggTrade", "data": {
+                            "e": "aggTrade", "E": t + seg * 1000, "s": symbol, "a": n, "p": f"{precio:.4f}",
+                            "q": f"{rng.expovariate(2):.4f}", "f": n, "l": n, "T": t + seg * 1000,
+                            "m": rng.random() < 0.5, "M": True}})
+                    first = update_id[symbol] + 1
+                    update_id[symbol] += rng.randint(1, 4)
+                    mensajes.append({"stream": f"{s}@depth@100ms", "data": {
+                        "e": "depthUpdate", "E": t + seg * 1000, "s": symbol, "U": first, "u": update_id[symbol],
+                        "b": [[f"{precio - 0.01 * rng.randint(1, 50):.2f}", f"{rng.uniform(0, 5):.3f}"]],
+                        "a": [[f"{precio + 0.01 * rng.randint(1, 50):.2f}", f"{rng.uniform(0, 5):.3f}"]]}})
+                    if seg == 59:
+                        mensajes.append({"stream": f"{s}@kline_1m", "data": {
+                            "e": "kline", "E": t + 60_000, "s": symbol,
+                            "k": {**k, "c": f"{close:.4f}", "v": f"{float(frame.volume[i]):.4f}", "x": True}}})
+                    for m in mensajes:
+                        g.escribir(_compacto(m), ts_ns=t_ns)
+                        n += 1
+                t_ns += NS
+    return n
+
+
+async def cargar(paths: List[str], symbols: List[str], historicos: Dict, velocidad) -> Dict:
+    orq = Orquestador(symbols, CONFIGS, {"balance": 1000.0}, capacity=VENTANA)
+    if historicos:
+        sembrar(orq, historicos)
+    radares = {s: TradeRadar() for s in symbols}
+    libros = {s: OrderBook(s) for s in symbols}
+    for book in libros.values():
+        book.load_snapshot({"lastUpdateId": 0, "bids": [], "asks": []})
+    buzon_klines, buzon_depth = BuzonConflacion(), BuzonConflacion()
+    trades = ColaAcotada(100_000, "block")
+
+    async def consumir_trades():
+        while True:
+            for symbol, msg in await trades.get_batch(4096):
+                radares[symbol].on_agg_trade(msg)
+
+    async def consumir_depth():
+        while True:
+            for symbol, diff in await buzon_depth.get_batch(4096):
+                libros[symbol].apply_diff(diff)
+
+    async with ServidorReplay(paths, velocidad=velocidad) as srv:
+        mux = MultiplexorStreams(symbols, base_url=srv.url, cola_klines=buzon_klines,
+                                 cola_trades=trades, cola_depth=buzon_depth)
+        tareas = [asyncio.ensure_future(c) for c in (orq.consumir(buzon_klines), consumir_trades(), consumir_depth())]
+        t0 = time.perf_counter()
+        async with mux:
+            await srv.esperar_fin()
+            recibidos = lambda: sum(c.mensajes for c in mux.conexiones)
+            while recibidos() < srv.enviados or not (trades.empty() and buzon_klines.empty() and buzon_depth.empty()):
+                await asyncio.sleep(0.001)
+            await orq.drain()
+            segundos = time.perf_counter() - t0
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        orq.close()
+        return {
+            "enviados": srv.enviados,
+            "tasa_envio": srv.tasa(),
+            "segundos": segundos,
+            "tasa_e2e": srv.enviados / segundos,
+            "orquestador": orq.metricas(),
+            "conflacion_depth": buzon_depth.metricas(),
+            "trades_descartados": trades.descartados,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--minutos", type=int, default=5)
+    parser.add_argument("--velocidad", type=float, default=None, help="1 = tiempo real; sin valor = máxima")
+    parser.add_argument("--file", nargs="*", default=None, help="grabaciones .bstr.gz")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.file:
+            paths, historicos = args.file, {}
+            symbols = sorted({nombre_stream(raw).split(b"@")[0].decode().upper()
+                              for p in paths for _, raw in leer_grabacion(p)})
+        else:
+            historicos = {f"S{k}USDT": historico(VENTANA + args.minutos, seed=k) for k in range(args.symbols)}
+            symbols = list(historicos)
+            paths = [os.path.join(tmp, "sintetico.bstr.gz")]
+            t = time.perf_counter()
+            n = generar(paths[0], historicos, args.minutos)
+            print(f"grabación sintética: {n} mensajes, {os.path.getsize(paths[0]) / 1e6:.1f} MB "
+                  f"({time.perf_counter() - t:.1f}s)")
+        r = asyncio.run(cargar(paths, symbols, historicos, args.velocidad))
+
+    m = r["orquestador"]
+    print(f"símbolos={len(symbols)} velocidad={'máxima' if args.velocidad is None else f'{args.velocidad:g}x'}")
+    print(f"envío servidor        {r['tasa_envio']:>12,.0f} msg/s")
+    print(f"extremo a extremo     {r['tasa_e2e']:>12,.0f} msg/s  ({r['enviados']} mensajes en {r['segundos']:.2f}s)")
+    print(f"cierre -> señal       p50={m['p50_ms']:.2f}ms p99={m['p99_ms']:.2f}ms max={m['max_ms']:.2f}ms "
+          f"(evaluaciones={m['evaluaciones']}, descartadas={m['descartadas']})")
+    c = m.get("conflacion", {})
+    print(f"conflación klines     parciales descartadas={c.get('parciales_descartadas', 0)} de {c.get('parciales', 0)}")
+    print(f"conflación depth      diffs fusionados={r['conflacion_depth']['diffs_fusionados']} de {r['conflacion_depth']['diffs']}")
+    print(f"aggTrade descartados  {r['trades_descartados']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+bench_sharding.py
+Benchmark del modo repartido (`OrquestadorSharded`) frente al orquestador de
+un solo proceso (`Orquestador`), con un feed local sintético.
+
+Uso:
+    python -m benchmarks.bench_sharding [--symbols N] [--minutos M] [--workers 1,2,4]
+
+En cada minuto cierran todos los símbolos a la vez; se espera a que se
+evalúe la ráfaga completa antes de enviar la siguiente. Se mide el
+throughput (evaluaciones de `generar_senal_final` por segundo) y la
+latencia cierre -> resultado. Con más núcleos el throughput del modo
+repartido debe crecer con el número de workers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from bot.core.candle_frame import CandleFrame
+from bot.services.orchestrator import Orquestador
+from bot.services.sharding import OrquestadorSharded
+
+CONFIGS = {
+    "risk_per_trade": 0.01,
+    "max_daily_loss": 0.03,
+    "max_trades_per_day": 5,
+    "max_volatility_pct": 0.05,
+}
+VENTANA = 200
+
+
+def historico(n: int, seed: int) -> CandleFrame:
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    close = 100 + np.cumsum(0.05 * np.sign(np.sin(t / 400.0)) + rng.normal(0, 0.05, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.random(n) * 0.1
+    low = np.minimum(open_, close) - rng.random(n) * 0.1
+    vol = rng.uniform(10, 20, n)
+    return CandleFrame(open_, high, low, close, vol, t * 60_000)
+
+
+async def feed(historicos, inicio, fin, entre_velas):
+    for i in range(inicio, fin):
+        for symbol, frame in historicos.items():
+            yield symbol, {"open": float(frame.open[i]), "high": float(frame.high[i]),
+                           "low": float(frame.low[i]), "close": float(frame.close[i]),
+                           "volume": float(frame.volume[i]), "timestamp": int(frame.timestamp[i])}
+        await entre_velas()
+
+
+def sembrar(orq, historicos) -> None:
+    for symbol, frame in historicos.items():
+        orq.seed(symbol, frame.slice(0, VENTANA))
+
+
+def medir(orq, historicos, minutos) -> float:
+    t0 = time.perf_counter()
+    asyncio.run(orq.run(feed(historicos, VENTANA, VENTANA + minutos, orq.drain)))
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--symbols", type=int, default=600)
+    parser.add_argument("--minutos", type=int, default=20)
+    parser.add_argument("--workers", default=None, help="lista separada por comas (por defecto 1,2,4..núcleos)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        niveles = [int(w) for w in args.workers.split(",")]
+    else:
+        niveles = sorted({1, cpus} | {w for w in (2, 4, 8, 16) if w < cpus})
+    historicos = {f"S{k}USDT": historico(VENTANA + args.minutos, k) for k in range(args.symbols)}
+    n = args.symbols * args.minutos
+    print(f"{args.symbols} símbolos x {args.minutos} minutos, {cpus} núcleos")
+
+    orq = Orquestador(historicos, CONFIGS, capacity=VENTANA)
+    sembrar(orq, historicos)
+    seg = medir(orq, historicos, args.minutos)
+    orq.close()
+    base = n / seg
+    m = orq.metricas()
+    print(f"{'1 proceso':<14} {base:>10,.0f} eval/s  x1.00  p99 {m['p99_ms']:7.1f} ms")
+
+    for w in niveles:
+        orq = OrquestadorSharded(historicos, CONFIGS, capacity=VENTANA, workers=w)
+        sembrar(orq, historicos)
+        with orq:
+            seg = medir(orq, historicos, args.minutos)
+            m = orq.metricas()
+        tasa = n / seg
+        print(f"{f'{w} workers':<14} {tasa:>10,.0f} eval/s  x{tasa / base:.2f}  p99 {m['p99_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
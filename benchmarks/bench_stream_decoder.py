@@ -0,0 +1,146 @@
+"""
+bench_stream_decoder.py
+Microbenchmark de decodificación de mensajes crudos de Binance (sin red).
+
+Uso:
+    python -m benchmarks.bench_stream_decoder [--mensajes N]
+
+Para cada tipo de payload (kline, aggTrade, depthUpdate) genera N
+mensajes de stream combinado con el formato compacto de Binance y compara:
+
+- `dict (json)`: `json.loads` + dict de vela/lectura de campos (como
+  `websocket_stream`) y copia a las mismas columnas.
+- `dict (orjson)`: lo mismo con orjson (si está instalado).
+- `columnas`: `DecodificadorStreams.feed` escribiendo en `CandleWindow`,
+  `BufferTrades` y `BufferDiffs`.
+
+Reporta mensajes/s y la memoria asignada por mensaje: pico de
+`tracemalloc` por encima de la línea base mientras se decodifica un
+mensaje (media sobre una muestra). Python no expone un contador de
+asignaciones, así que es la medida más cercana a asignaciones/mensaje.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from bot.core.candle_window import CandleWindow
+from bot.data.stream_decoder import BufferDiffs, BufferTrades, DecodificadorStreams
+from bot.data.websocket_stream import decodificar_kline
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+SYMBOL = "BTCUSDT"
+T0 = 1_700_000_000_000
+MUESTRA_MEMORIA = 2_000
+
+
+def _compacto(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def generar(n: int, seed: int = 0) -> Dict[str, List[bytes]]:
+    rng = random.Random(seed)
+    precio = 60_000.0
+    klines, trades, depth = [], [], []
+    for i in range(n):
+        precio *= 1 + rng.gauss(0, 0.0001)
+        t = T0 + 250 * i
+        klines.append(_compacto({"stream": "btcusdt@kline_1m", "data": {
+            "e": "kline", "E": t, "s": SYMBOL, "k": {
+                "t": t - t % 60_000, "T": t - t % 60_000 + 59_999, "s": SYMBOL, "i": "1m", "f": i, "L": i + 9,
+                "o": f"{precio:.2f}", "c": f"{precio * 1.0001:.2f}", "h": f"{precio * 1.0003:.2f}",
+                "l": f"{precio * 0.9998:.2f}", "v": f"{rng.uniform(1, 90):.5f}", "n": 10,
+                "x": i % 240 == 239, "q": "0", "V": "0", "Q": "0", "B": "0"}}}))
+        trades.append(_compacto({"stream": "btcusdt@aggTrade", "data": {
+            "e": "aggTrade", "E": t, "s": SYMBOL, "a": i, "p": f"{precio:.2f}", "q": f"{rng.expovariate(20):.5f}",
+            "f": i, "l": i, "T": t, "m": rng.random() < 0.5, "M": True}}))
+        niveles = lambda signo: [[f"{precio + signo * 0.01 * rng.randint(1, 500):.2f}", f"{rng.uniform(0, 5):.3f}"]
+                                 for _ in range(rng.randint(1, 20))]
+        depth.append(_compacto({"stream": "btcusdt@depth@100ms", "data": {
+            "e": "depthUpdate", "E": t, "s": SYMBOL, "U": 10 * i + 1, "u": 10 * i + 10,
+            "b": niveles(-1), "a": niveles(1)}}))
+    return {"kline": klines, "aggTrade": trades, "depthUpdate": depth}
+
+
+def _destinos():
+    trades = BufferTrades(4_096, on_lleno=BufferTrades.vaciar)
+    diffs = BufferDiffs(1_024, 65_536, on_lleno=BufferDiffs.vaciar)
+    return CandleWindow(200), trades, diffs
+
+
+def _via_dict(loads: Callable) -> Dict[str, Callable]:
+    """Camino con dicts: parseo completo, dict de vela y copia a las mismas columnas."""
+    ventana, trades, diffs = _destinos()
+
+    def kline(raw):
+        ventana.update_kline(decodificar_kline(loads(raw)["data"]))
+
+    def agg_trade(raw):
+        d = loads(raw)["data"]
+        trades.append(int(d["a"]), float(d["p"]), float(d["q"]), int(d["T"]), bool(d["m"]))
+
+    def depth(raw):
+        d = loads(raw)["data"]
+        diffs.append(int(d["U"]), int(d["u"]), int(d.get("pu", -1)), int(d["E"]), d["b"], d["a"])
+
+    return {"kline": kline, "aggTrade": agg_trade, "depthUpdate": depth}
+
+
+def _via_columnas() -> Dict[str, Callable]:
+    ventana, trades, diffs = _destinos()
+    dec = DecodificadorStreams({SYMBOL: ventana}, {SYMBOL: trades}, {SYMBOL: diffs})
+    return {tipo: dec.feed for tipo in ("kline", "aggTrade", "depthUpdate")}
+
+
+def medir(fn: Callable, mensajes: List[bytes]) -> float:
+    t0 = time.perf_counter()
+    for raw in mensajes:
+        fn(raw)
+    return len(mensajes) / (time.perf_counter() - t0)
+
+
+def memoria_por_mensaje(fn: Callable, mensajes: List[bytes]) -> float:
+    muestra = mensajes[:MUESTRA_MEMORIA]
+    for raw in muestra[:100]:  # calentamiento: cachés de regex, etc.
+        fn(raw)
+    tracemalloc.start()
+    total = 0
+    for raw in muestra:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(raw)
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / len(muestra)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--mensajes", type=int, default=200_000)
+    args = parser.parse_args()
+
+    datos = generar(args.mensajes)
+    caminos = {"dict (json)": _via_dict(json.loads)}
+    if orjson is not None:
+        caminos["dict (orjson)"] = _via_dict(orjson.loads)
+    caminos["columnas"] = _via_columnas()
+
+    print(f"{'payload':<12} {'camino':<14} {'mensajes/s':>12} {'bytes/msg':>10}")
+    for tipo, mensajes in datos.items():
+        for nombre, fns in caminos.items():
+            tasa = medir(fns[tipo], mensajes)
+            mem = memoria_por_mensaje(fns[tipo], mensajes)
+            print(f"{tipo:<12} {nombre:<14} {tasa:>12,.0f} {mem:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+bench_trade_radar.py
+Benchmark de `TradeRadar` con trades aggTrade grabados (sin red).
+
+Uso:
+    python -m benchmarks.bench_trade_radar [--trades N] [--file trades.jsonl]
+
+Sin `--file` genera un fichero JSON lines sintético con mensajes aggTrade
+(`p`, `q`, `m`, `T`) a ~5k trades/s de tiempo de mercado, lo reproduce y
+mide el throughput del hot path (`on_trade`) y de la reproducción completa
+(parseo JSON + `on_agg_trade`). Objetivo: >= 50k trades/s por símbolo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from bot.core.trade_radar import TradeRadar
+
+OBJETIVO = 50_000
+
+
+def generar(path: str, n: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    precio = 60_000.0
+    t = 1_700_000_000_000
+    with open(path, "w") as fh:
+        for i in range(n):
+            precio *= 1 + rng.gauss(0, 0.00001)
+            t += 1 if rng.random() < 0.98 else 5  # ~5 trades por ms de media
+            q = rng.expovariate(20) * (200 if rng.random() < 0.0005 else 1)
+            fh.write(json.dumps({"e": "aggTrade", "s": "BTCUSDT", "a": i, "p": f"{precio:.2f}",
+                                 "q": f"{q:.5f}", "T": t // 5, "m": rng.random() < 0.5}))
+            fh.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--trades", type=int, default=500_000)
+    parser.add_argument("--file", default=None, help="JSON lines aggTrade grabado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "aggtrades.jsonl")
+            generar(path, args.trades)
+        with open(path) as fh:
+            mensajes = [json.loads(line) for line in fh if line.strip()]
+
+    n = len(mensajes)
+    trades = [(float(m["p"]), float(m["q"]), bool(m["m"]), int(m["T"])) for m in mensajes]
+
+    radar = TradeRadar()
+    on_trade = radar.on_trade
+    t0 = time.perf_counter()
+    for p, q, m, ts in trades:
+        on_trade(p, q, m, ts)
+    hot = time.perf_counter() - t0
+
+    radar = TradeRadar()
+    t0 = time.perf_counter()
+    ev = radar.replay(mensajes)
+    completo = time.perf_counter() - t0
+
+    radar = TradeRadar()
+    t0 = time.perf_counter()
+    evaluaciones = 0
+    for i, (p, q, m, ts) in enumerate(trades):
+        radar.on_trade(p, q, m, ts)
+        if i % 100 == 0:  # evaluación periódica, como en vivo
+            radar.eventos()
+            evaluaciones += 1
+    con_eventos = time.perf_counter() - t0
+
+    for nombre, seg in (("on_trade", hot), ("replay (dict -> float)", completo),
+                        (f"on_trade + eventos() cada 100 ({evaluaciones})", con_eventos)):
+        tasa = n / seg
+        estado = "OK" if tasa >= OBJETIVO else "LENTO"
+        print(f"{nombre:<40} {n:>9} trades {seg:8.3f}s {tasa:>12,.0f} trades/s  [{estado}]")
+    print("último evento:", {k: ev[k] for k in ("severity", "volume_factor", "imbalance_corto")})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,24 @@
 """
 Core package del bot.
-Contiene: strategy, indicators, risk_manager, signal_engine, whale_detector, utils
+Contiene: strategy, candle_frame, candle_window, resampler, indicators, incremental, series, risk_manager, signal_engine, reasons, whale_detector, trade_radar, backtest, params, sweep, walk_forward, utils
 """
 
 __all__ = [
     "strategy",
+    "candle_frame",
+    "candle_window",
+    "resampler",
     "indicators",
+    "incremental",
+    "series",
     "risk_manager",
     "signal_engine",
+    "reasons",
     "whale_detector",
+    "trade_radar",
+    "backtest",
+    "params",
+    "sweep",
+    "walk_forward",
     "utils",
 ]
@@ -0,0 +1,238 @@
+"""
+backtest.py
+Motor de backtesting por eventos: reproduce velas históricas una a una a
+través de `signal_engine.generar_senal_final`.
+
+Flujo por vela cerrada:
+1. La vela entra en una `CandleWindow` de `ventana` velas (O(1), sin copias).
+2. Cambio de día (UTC) -> se reinician `perdidas_acumuladas` y `operaciones_hoy`.
+3. Si hay posición abierta, se comprueban SL/TP con el high/low de la vela
+   (si ambos se tocan en la misma vela se asume el SL, criterio conservador).
+4. Sin posición: radar de ballenas (`WhaleRadar`, actualizado en cada vela)
+   + `generar_senal_final` sobre la vista de la ventana; si hay señal se
+   abre la posición al precio de entrada.
+
+Cada evaluación trabaja sobre la misma ventana acotada que usa el bot en
+vivo (`kline_limit`), así que el coste por vela es constante y una
+reproducción de varios años es lineal en el número de velas.
+
+`estado_riesgo` sigue la convención de `risk_manager`: `balance` en USDT,
+`perdidas_acumuladas` como fracción del balance al inicio del día y
+`operaciones_hoy` como contador de entradas.
+
+Referencias: docs/04_Estrategia_Base.md, docs/05_Gestion_de_Riesgo.md,
+docs/08_Fases_de_Desarrollo.md
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, List, Optional
+
+from bot.core import whale_detector
+from bot.core.candle_frame import Candles, as_frame
+from bot.core.candle_window import CandleWindow
+from bot.core.params import ParametrosEstrategia
+from bot.core.signal_engine import generar_senal_final
+
+DAY_MS = 86_400_000
+
+# Velas convertidas a floats nativos por bloque: memoria acotada con históricos largos.
+_CHUNK = 65_536
+
+
+def _column_chunk(column, start: int, stop: int) -> List:
+    part = column[start:stop]
+    return part.tolist() if hasattr(part, "tolist") else list(part)
+
+
+class BacktestEngine:
+    """Reproduce un histórico de velas y simula entradas/salidas con SL/TP."""
+
+    def __init__(
+        self,
+        configs: Dict,
+        estado_inicial: Optional[Dict] = None,
+        ventana: int = 200,
+        usar_ballenas: bool = True,
+        params: Optional[ParametrosEstrategia] = None,
+    ):
+        self.configs = dict(configs)
+        self.params = params
+        estado = dict(estado_inicial or {})
+        estado.setdefault("balance", 1000.0)
+        estado.setdefault("perdidas_acumuladas", 0.0)
+        estado.setdefault("operaciones_hoy", 0)
+        self.estado_riesgo = estado
+        self.balance_inicial = float(estado["balance"])
+        self.fee_rate = float(self.configs.get("fee_rate", 0.0))
+        self.usar_ballenas = usar_ballenas
+        self.window = CandleWindow(ventana)
+        self.radar = whale_detector.WhaleRadar() if usar_ballenas else None
+
+        self.trades: List[Dict] = []
+        self.equity = array("d")
+        self.posicion: Optional[Dict] = None
+        self._dia: Optional[int] = None
+        self._balance_dia = self.balance_inicial
+
+    # ------------------------------------------------------------------ estado diario
+    def _nuevo_dia(self, timestamp: int) -> None:
+        dia = timestamp // DAY_MS
+        if dia != self._dia:
+            self._dia = dia
+            self._balance_dia = float(self.estado_riesgo["balance"])
+            self.estado_riesgo["perdidas_acumuladas"] = 0.0
+            self.estado_riesgo["operaciones_hoy"] = 0
+
+    # ------------------------------------------------------------------ posiciones
+    def _cerrar(self, precio: float, timestamp: int, motivo: str) -> None:
+        pos = self.posicion
+        signo = 1.0 if pos["direction"] == "LONG" else -1.0
+        size = pos["position_size"]
+        pnl = (precio - pos["entry"]) * size * signo
+        pnl -= (pos["entry"] + precio) * size * self.fee_rate
+        estado = self.estado_riesgo
+        estado["balance"] = float(estado["balance"]) + pnl
+        if pnl < 0 and self._balance_dia > 0:
+            estado["perdidas_acumuladas"] = float(estado["perdidas_acumuladas"]) + (-pnl / self._balance_dia)
+        self.trades.append({
+            "symbol": pos["symbol"],
+            "direction": pos["direction"],
+            "entry_time": pos["timestamp"],
+            "entry": pos["entry"],
+            "sl": pos["sl"],
+            "tp": pos["tp"],
+            "position_size": size,
+            "exit_time": timestamp,
+            "exit": precio,
+            "pnl": pnl,
+            "motivo": motivo,
+        })
+        self.posicion = None
+
+    def _comprobar_salida(self, high: float, low: float, timestamp: int) -> None:
+        pos = self.posicion
+        if pos["direction"] == "LONG":
+            if low <= pos["sl"]:
+                self._cerrar(pos["sl"], timestamp, "sl")
+            elif high >= pos["tp"]:
+                self._cerrar(pos["tp"], timestamp, "tp")
+        else:
+            if high >= pos["sl"]:
+                self._cerrar(pos["sl"], timestamp, "sl")
+            elif low <= pos["tp"]:
+                self._cerrar(pos["tp"], timestamp, "tp")
+
+    def _evaluar(self) -> Optional[Dict]:
+        """Señal final para la vela recién cerrada (None si no hay entrada)."""
+        view = self.window.frame()
+        eventos = self.radar.ultimo if self.radar is not None else None
+        return generar_senal_final(view, self.estado_riesgo, self.configs, eventos, self.params)
+
+    # ------------------------------------------------------------------ bucle principal
+    def on_candle(self, o: float, h: float, l: float, c: float, v: float, ts: int) -> Optional[Dict]:
+        """Procesa una vela cerrada; devuelve la señal si se abrió posición."""
+        self.window.append(o, h, l, c, v, ts)
+        if self.radar is not None:
+            self.radar.update(o, h, l, c, v)
+        return self._procesar(h, l, c, ts)
+
+    def _procesar(self, h: float, l: float, c: float, ts: int) -> Optional[Dict]:
+        """Pasos 2-4 del flujo para la vela ya añadida a la ventana."""
+        self._nuevo_dia(ts)
+        if self.posicion is not None:
+            self._comprobar_salida(h, l, ts)
+
+        senal = None
+        if self.posicion is None:
+            senal = self._evaluar()
+            if senal is not None:
+                self.posicion = dict(senal)
+                self.estado_riesgo["operaciones_hoy"] = int(self.estado_riesgo["operaciones_hoy"]) + 1
+
+        balance = float(self.estado_riesgo["balance"])
+        pos = self.posicion
+        if pos is not None:
+            signo = 1.0 if pos["direction"] == "LONG" else -1.0
+            balance += (c - pos["entry"]) * pos["position_size"] * signo
+        self.equity.append(balance)
+        return senal
+
+    def run(self, candles: Candles) -> Dict:
+        """Reproduce todas las velas y devuelve el resultado (ver `resultado`)."""
+        frame = as_frame(candles)
+        n = len(frame)
+        for start in range(0, n, _CHUNK):
+            stop = min(n, start + _CHUNK)
+            cols = [_column_chunk(getattr(frame, name), start, stop)
+                    for name in ("open", "high", "low", "close", "volume", "timestamp")]
+            for o, h, l, c, v, ts in zip(*cols):
+                self.on_candle(o, h, l, c, v, int(ts))
+
+        if n:
+            self._finalizar(float(frame.close[-1]), int(frame.timestamp[-1]))
+        return self.resultado()
+
+    def _finalizar(self, close: float, timestamp: int) -> None:
+        """Cierra la posición abierta al final del histórico (motivo 'fin')."""
+        if self.posicion is not None:
+            self._cerrar(close, timestamp, "fin")
+            if len(self.equity):
+                self.equity[-1] = float(self.estado_riesgo["balance"])
+
+    # ------------------------------------------------------------------ métricas
+    def resultado(self) -> Dict:
+        balance = float(self.estado_riesgo["balance"])
+        return {
+            "trades": self.trades,
+            "equity": self.equity,
+            "estado_riesgo": dict(self.estado_riesgo),
+            "metricas": calcular_metricas(self.trades, self.equity, self.balance_inicial, balance),
+        }
+
+
+def calcular_metricas(trades: List[Dict], equity, balance_inicial: float, balance_final: float) -> Dict:
+    """Métricas de un backtest a partir de sus operaciones y la curva de equity."""
+    pnls = [t["pnl"] for t in trades]
+    ganadoras = sum(1 for p in pnls if p > 0)
+    pico = balance_inicial
+    max_dd = 0.0
+    for eq in equity:
+        if eq > pico:
+            pico = eq
+        elif pico > 0:
+            dd = (pico - eq) / pico
+            if dd > max_dd:
+                max_dd = dd
+    return {
+        "operaciones": len(pnls),
+        "ganadoras": ganadoras,
+        "win_rate": (ganadoras / len(pnls)) if pnls else 0.0,
+        "pnl_total": sum(pnls),
+        "retorno_pct": (balance_final / balance_inicial - 1.0) if balance_inicial else 0.0,
+        "max_drawdown": max_dd,
+        "balance_final": balance_final,
+    }
+
+
+def ejecutar_backtest(
+    candles: Candles,
+    configs: Dict,
+    estado_inicial: Optional[Dict] = None,
+    ventana: int = 200,
+    usar_ballenas: bool = True,
+    params: Optional[ParametrosEstrategia] = None,
+) -> Dict:
+    """Atajo funcional: crea un `BacktestEngine`, reproduce `candles` y devuelve el resultado.
+
+    Returns:
+        {"trades": [...], "equity": array('d') por vela, "estado_riesgo": {...},
+         "metricas": {"operaciones", "ganadoras", "win_rate", "pnl_total",
+                      "retorno_pct", "max_drawdown", "balance_final"}}
+    """
+    engine = BacktestEngine(configs, estado_inicial, ventana=ventana, usar_ballenas=usar_ballenas, params=params)
+    return engine.run(candles)
+
+
+__all__ = ["BacktestEngine", "ejecutar_backtest", "calcular_metricas"]
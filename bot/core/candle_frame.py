@@ -0,0 +1,162 @@
+"""
+candle_frame.py
+Almacenamiento columnar de velas (struct-of-arrays) para el core.
+
+`CandleFrame` guarda cada campo OHLCV en su propia columna tipada
+(`array('d')`, y `array('q')` para el timestamp), de modo que los módulos
+del core leen floats directamente sin buscar claves en dicts ni convertir
+valores en cada llamada. Una vela ocupa 48 bytes frente a ~500 bytes de
+un dict con seis floats.
+
+Las columnas pueden ser cualquier secuencia indexable de números
+(`array`, `memoryview`, `numpy.ndarray`), lo que permite construir vistas
+sin copia sobre buffers externos (ring buffers, ficheros mapeados).
+
+`as_frame` es el adaptador barato para la forma histórica `List[Dict]`.
+
+Referencias: docs/03_Modulos_Core.md, docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+COLUMNS = ("open", "high", "low", "close", "volume", "timestamp")
+
+
+def _to_float(value) -> float:
+    # Un valor presente pero no numérico queda como NaN (no como 0.0): los
+    # detectores lo tratan igual que el `float()` fallido de la forma dict.
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _view(column, start: Optional[int], stop: Optional[int] = None):
+    """Slice sin copia: los `array` se envuelven en memoryview antes de cortar."""
+    if isinstance(column, array):
+        column = memoryview(column)
+    return column[start:stop]
+
+
+class CandleFrame:
+    """Velas en formato columnar: open, high, low, close, volume, timestamp."""
+
+    __slots__ = COLUMNS
+
+    def __init__(
+        self,
+        open: Sequence[float],
+        high: Sequence[float],
+        low: Sequence[float],
+        close: Sequence[float],
+        volume: Sequence[float],
+        timestamp: Optional[Sequence[int]] = None,
+    ):
+        n = len(close)
+        if timestamp is None:
+            timestamp = array("q", bytes(8 * n))
+        if not (len(open) == len(high) == len(low) == n == len(volume) == len(timestamp)):
+            raise ValueError("all candle columns must have the same length")
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.timestamp = timestamp
+
+    @classmethod
+    def empty(cls) -> "CandleFrame":
+        return cls(array("d"), array("d"), array("d"), array("d"), array("d"), array("q"))
+
+    @classmethod
+    def from_dicts(cls, candles: Iterable[Dict]) -> "CandleFrame":
+        """Convierte la forma `List[Dict]`; claves ausentes -> 0, valores no numéricos (o None) -> NaN."""
+        frame = cls.empty()
+        for c in candles:
+            frame.append(
+                _to_float(c.get("open", 0.0)),
+                _to_float(c.get("high", 0.0)),
+                _to_float(c.get("low", 0.0)),
+                _to_float(c.get("close", 0.0)),
+                _to_float(c.get("volume", 0.0)),
+                _to_int(c.get("timestamp", 0)),
+            )
+        return frame
+
+    def append(self, open: float, high: float, low: float, close: float, volume: float, timestamp: int = 0) -> None:
+        """Añade una vela (solo para frames respaldados por `array`)."""
+        self.open.append(open)
+        self.high.append(high)
+        self.low.append(low)
+        self.close.append(close)
+        self.volume.append(volume)
+        self.timestamp.append(timestamp)
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def tail(self, n: int) -> "CandleFrame":
+        """Vista (sin copia) de las últimas `n` velas."""
+        if n <= 0:
+            return self.slice(len(self), None)
+        return self.slice(-n, None)
+
+    def slice(self, start: Optional[int], stop: Optional[int] = None) -> "CandleFrame":
+        """Vista (sin copia) de las velas [start:stop]."""
+        return CandleFrame(
+            _view(self.open, start, stop),
+            _view(self.high, start, stop),
+            _view(self.low, start, stop),
+            _view(self.close, start, stop),
+            _view(self.volume, start, stop),
+            _view(self.timestamp, start, stop),
+        )
+
+    def row(self, i: int) -> Dict:
+        """Vela `i` en la forma dict usada por el resto del bot."""
+        return {
+            "open": float(self.open[i]),
+            "high": float(self.high[i]),
+            "low": float(self.low[i]),
+            "close": float(self.close[i]),
+            "volume": float(self.volume[i]),
+            "timestamp": int(self.timestamp[i]),
+        }
+
+    def to_dicts(self) -> List[Dict]:
+        return [self.row(i) for i in range(len(self))]
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:  # noqa: F821
+        """Columnas como arrays de NumPy (sin copia cuando el buffer lo permite)."""
+        import numpy as np
+
+        return {name: np.asarray(getattr(self, name)) for name in COLUMNS}
+
+
+Candles = Union[CandleFrame, List[Dict]]
+
+
+def as_frame(candles: Candles, tail: Optional[int] = None) -> CandleFrame:
+    """Devuelve `candles` como CandleFrame, opcionalmente solo las últimas `tail` velas.
+
+    Con un CandleFrame no se copia nada; con `List[Dict]` solo se convierten
+    las velas de la cola pedida.
+    """
+    if isinstance(candles, CandleFrame):
+        return candles.tail(tail) if tail is not None else candles
+    if tail is not None:
+        candles = candles[-tail:] if tail > 0 else []
+    return CandleFrame.from_dicts(candles or [])
+
+
+__all__ = ["CandleFrame", "Candles", "as_frame", "COLUMNS"]
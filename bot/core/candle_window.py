@@ -0,0 +1,144 @@
+"""
+candle_window.py
+Ventana circular de velas de capacidad fija (una por símbolo).
+
+`CandleWindow` mantiene las últimas `capacity` velas cerradas (p.ej.
+`kline_limit` de configs/data.json) en columnas preasignadas, más la vela
+en curso que Binance actualiza mientras no cierra:
+
+- `append(...)` / `update(..., closed=True)` añaden una vela cerrada en O(1).
+- `update(..., closed=False)` sobrescribe en sitio la vela en curso.
+- `frame(n)` devuelve un `CandleFrame` con las últimas `n` velas como vistas
+  (memoryview) sobre las columnas, sin copiar datos.
+
+Para que cualquier cola sea contigua, cada columna guarda dos copias del
+anillo (escritura espejo en `pos` y `pos + slots`). La memoria es constante
+durante toda la vida del proceso.
+
+Referencias: docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Optional
+
+from bot.core.candle_frame import CandleFrame
+
+
+class CandleWindow:
+    """Ring buffer columnar de velas con vela en curso y vistas sin copia."""
+
+    __slots__ = ("capacity", "_slots", "_count", "_partial", "open", "high", "low", "close", "volume", "timestamp",
+                 "_vistas")
+
+    def __init__(self, capacity: int = 200):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        # Un hueco extra para la vela en curso: nunca pisa una vela cerrada visible.
+        self._slots = capacity + 1
+        size = 2 * self._slots
+        self.open = array("d", bytes(8 * size))
+        self.high = array("d", bytes(8 * size))
+        self.low = array("d", bytes(8 * size))
+        self.close = array("d", bytes(8 * size))
+        self.volume = array("d", bytes(8 * size))
+        self.timestamp = array("q", bytes(8 * size))
+        self._count = 0
+        self._partial = False
+        # Las columnas nunca cambian de tamaño: `frame()` recorta estas vistas en lugar de crearlas.
+        self._vistas = tuple(memoryview(col) for col in (self.open, self.high, self.low, self.close,
+                                                         self.volume, self.timestamp))
+
+    def __len__(self) -> int:
+        """Número de velas cerradas disponibles (<= capacity)."""
+        return min(self._count, self.capacity)
+
+    @property
+    def total(self) -> int:
+        """Velas cerradas añadidas desde la creación."""
+        return self._count
+
+    @property
+    def has_partial(self) -> bool:
+        return self._partial
+
+    def _write(self, pos: int, o: float, h: float, l: float, c: float, v: float, ts: int) -> None:
+        mirror = pos + self._slots
+        self.open[pos] = self.open[mirror] = o
+        self.high[pos] = self.high[mirror] = h
+        self.low[pos] = self.low[mirror] = l
+        self.close[pos] = self.close[mirror] = c
+        self.volume[pos] = self.volume[mirror] = v
+        self.timestamp[pos] = self.timestamp[mirror] = ts
+
+    def append(self, open: float, high: float, low: float, close: float, volume: float, timestamp: int = 0) -> None:
+        """Añade una vela cerrada (descarta la vela en curso, que ocupa el mismo hueco)."""
+        if self._count and self.timestamp[(self._count - 1) % self._slots] == timestamp and timestamp:
+            # Re-entrega de la última vela cerrada: se corrige en sitio.
+            self._write((self._count - 1) % self._slots, open, high, low, close, volume, timestamp)
+        else:
+            self._write(self._count % self._slots, open, high, low, close, volume, timestamp)
+            self._count += 1
+        self._partial = False
+
+    def update(
+        self,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+        timestamp: int,
+        closed: bool,
+    ) -> None:
+        """Aplica una actualización de kline: cerrada -> append, en curso -> sobrescribe."""
+        if closed:
+            self.append(open, high, low, close, volume, timestamp)
+            return
+        self._write(self._count % self._slots, open, high, low, close, volume, timestamp)
+        self._partial = True
+
+    def update_kline(self, kline: Dict, closed: Optional[bool] = None) -> None:
+        """Atajo para dicts de vela (`open`, `high`, ..., y opcionalmente `closed`)."""
+        if closed is None:
+            closed = bool(kline.get("closed", True))
+        self.update(
+            float(kline.get("open", 0.0)),
+            float(kline.get("high", 0.0)),
+            float(kline.get("low", 0.0)),
+            float(kline.get("close", 0.0)),
+            float(kline.get("volume", 0.0)),
+            int(kline.get("timestamp", 0)),
+            closed,
+        )
+
+    def frame(self, n: Optional[int] = None, include_partial: bool = False) -> CandleFrame:
+        """Vista de las últimas `n` velas (todas las disponibles si `n` es None).
+
+        Con `include_partial=True` la vela en curso (si existe) es la última.
+        Las vistas apuntan al buffer: dejan de ser válidas cuando el anillo
+        da la vuelta sobre ellas, así que no deben guardarse entre velas.
+        """
+        if include_partial and self._partial:
+            end = self._count % self._slots + 1 + self._slots
+            available = min(self._count + 1, self.capacity)
+        elif self._count:
+            end = (self._count - 1) % self._slots + 1 + self._slots
+            available = min(self._count, self.capacity)
+        else:
+            return CandleFrame.empty()
+
+        size = available if n is None else max(0, min(n, available))
+        start = end - size
+        o, h, l, c, v, ts = self._vistas
+        return CandleFrame(o[start:end], h[start:end], l[start:end], c[start:end], v[start:end], ts[start:end])
+
+    def last(self, include_partial: bool = False) -> Optional[Dict]:
+        """Última vela como dict (None si no hay velas)."""
+        frame = self.frame(1, include_partial=include_partial)
+        return frame.row(0) if len(frame) else None
+
+
+__all__ = ["CandleWindow"]
@@ -0,0 +1,234 @@
+"""
+incremental.py
+Indicadores técnicos incrementales (con estado) para el flujo en tiempo real.
+
+Cada clase se siembra una vez con el histórico disponible (`seed`) y luego
+se actualiza vela a vela con `update(...)` en tiempo constante. Los valores
+devueltos coinciden con las funciones puras de `indicators.py` evaluadas
+sobre la serie completa vista hasta ese momento:
+
+- EmaState          -> indicators.ema
+- RsiState          -> indicators.rsi
+- AtrState          -> indicators.atr
+- MacdState         -> indicators.macd
+- RollingVolatility -> indicators.volatility
+
+Mientras no haya datos suficientes, `value` es None (las funciones puras
+lanzan ValueError en ese mismo caso).
+
+Referencias: docs/03_Modulos_Core.md, docs/04_Estrategia_Base.md
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Iterable, Optional, Tuple
+
+
+class EmaState:
+    """EMA incremental: se inicializa con la SMA de los primeros `length` valores."""
+
+    __slots__ = ("length", "alpha", "count", "value", "_seed_sum")
+
+    def __init__(self, length: int):
+        if length <= 0:
+            raise ValueError("length must be > 0")
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.value: Optional[float] = None
+        self._seed_sum = 0.0
+
+    def seed(self, values: Iterable[float]) -> Optional[float]:
+        for v in values:
+            self.update(v)
+        return self.value
+
+    def update(self, price: float) -> Optional[float]:
+        price = float(price)
+        self.count += 1
+        if self.count < self.length:
+            self._seed_sum += price
+            return None
+        if self.count == self.length:
+            self._seed_sum += price
+            self.value = self._seed_sum / self.length
+            return self.value
+        self.value = (price - self.value) * self.alpha + self.value
+        return self.value
+
+
+class RsiState:
+    """RSI incremental con suavizado de Wilder."""
+
+    __slots__ = ("length", "count", "value", "_prev", "_avg_gain", "_avg_loss")
+
+    def __init__(self, length: int = 14):
+        if length <= 0:
+            raise ValueError("length must be > 0")
+        self.length = length
+        self.count = 0  # número de diferencias procesadas
+        self.value: Optional[float] = None
+        self._prev: Optional[float] = None
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def seed(self, values: Iterable[float]) -> Optional[float]:
+        for v in values:
+            self.update(v)
+        return self.value
+
+    def update(self, price: float) -> Optional[float]:
+        price = float(price)
+        prev = self._prev
+        self._prev = price
+        if prev is None:
+            return None
+
+        d = price - prev
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        self.count += 1
+        length = self.length
+
+        if self.count < length:
+            self._avg_gain += gain
+            self._avg_loss += loss
+            return None
+        if self.count == length:
+            self._avg_gain = (self._avg_gain + gain) / length
+            self._avg_loss = (self._avg_loss + loss) / length
+        else:
+            self._avg_gain = (self._avg_gain * (length - 1) + gain) / length
+            self._avg_loss = (self._avg_loss * (length - 1) + loss) / length
+
+        if self._avg_loss == 0.0:
+            self.value = 100.0 if self._avg_gain > 0 else 50.0
+        else:
+            rs = self._avg_gain / self._avg_loss
+            self.value = 100.0 - (100.0 / (1.0 + rs))
+        return self.value
+
+
+class AtrState:
+    """ATR incremental: media simple de los últimos `length` True Range."""
+
+    __slots__ = ("length", "value", "_prev_close", "_trs", "_sum")
+
+    def __init__(self, length: int = 14):
+        if length <= 0:
+            raise ValueError("length must be > 0")
+        self.length = length
+        self.value: Optional[float] = None
+        self._prev_close: Optional[float] = None
+        self._trs: Deque[float] = deque(maxlen=length)
+        self._sum = 0.0
+
+    def seed(self, highs: Iterable[float], lows: Iterable[float], closes: Iterable[float]) -> Optional[float]:
+        for h, l, c in zip(highs, lows, closes):
+            self.update(h, l, c)
+        return self.value
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        high = float(high)
+        low = float(low)
+        prev_close = self._prev_close
+        self._prev_close = float(close)
+        if prev_close is None:
+            return None
+
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        trs = self._trs
+        if len(trs) == self.length:
+            self._sum -= trs[0]
+        trs.append(tr)
+        self._sum += tr
+        if len(trs) < self.length:
+            return None
+        self.value = self._sum / self.length
+        return self.value
+
+
+class MacdState:
+    """MACD incremental: (macd_line, signal_line, histogram)."""
+
+    __slots__ = ("fast", "slow", "signal", "count", "value", "_ema_fast", "_ema_slow", "_ema_signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if not (0 < fast < slow):
+            raise ValueError("Require 0 < fast < slow for MACD")
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.count = 0
+        self.value: Optional[Tuple[float, float, float]] = None
+        self._ema_fast = EmaState(fast)
+        self._ema_slow = EmaState(slow)
+        self._ema_signal = EmaState(signal)
+
+    def seed(self, values: Iterable[float]) -> Optional[Tuple[float, float, float]]:
+        for v in values:
+            self.update(v)
+        return self.value
+
+    def update(self, price: float) -> Optional[Tuple[float, float, float]]:
+        self.count += 1
+        fast_val = self._ema_fast.update(price)
+        slow_val = self._ema_slow.update(price)
+        if slow_val is None:
+            return None
+        macd_line = fast_val - slow_val
+        signal_val = self._ema_signal.update(macd_line)
+        # Misma exigencia de datos que indicators.macd (n >= slow + signal)
+        if signal_val is None or self.count < self.slow + self.signal:
+            return None
+        self.value = (macd_line, signal_val, macd_line - signal_val)
+        return self.value
+
+
+class RollingVolatility:
+    """Desviación estándar incremental de los últimos `length` retornos simples."""
+
+    __slots__ = ("length", "value", "_prev", "_rets", "_sum", "_sum_sq")
+
+    def __init__(self, length: int = 20):
+        if length <= 0:
+            raise ValueError("length must be > 0")
+        self.length = length
+        self.value: Optional[float] = None
+        self._prev: Optional[float] = None
+        self._rets: Deque[float] = deque(maxlen=length)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def seed(self, values: Iterable[float]) -> Optional[float]:
+        for v in values:
+            self.update(v)
+        return self.value
+
+    def update(self, price: float) -> Optional[float]:
+        price = float(price)
+        prev = self._prev
+        self._prev = price
+        if prev is None:
+            return None
+
+        r = 0.0 if prev == 0 else (price - prev) / prev
+        rets = self._rets
+        if len(rets) == self.length:
+            old = rets[0]
+            self._sum -= old
+            self._sum_sq -= old * old
+        rets.append(r)
+        self._sum += r
+        self._sum_sq += r * r
+        if len(rets) < self.length:
+            return None
+        mean_r = self._sum / self.length
+        var = self._sum_sq / self.length - mean_r * mean_r
+        self.value = math.sqrt(var) if var > 0.0 else 0.0
+        return self.value
+
+
+__all__ = ["EmaState", "RsiState", "AtrState", "MacdState", "RollingVolatility"]
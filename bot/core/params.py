@@ -0,0 +1,56 @@
+"""
+params.py
+Parámetros ajustables de la estrategia y del cálculo de SL/TP.
+
+Los valores por defecto reproducen exactamente las constantes históricas
+de `strategy.py` y `risk_manager.aplicar_filtros_riesgo` (EMA 20/50, banda
+neutral 0.15%, volumen x1.5 sobre 20 velas, ATR 14, SL = 1.5 ATR, TP = 2R).
+
+Referencias: docs/04_Estrategia_Base.md, docs/05_Gestion_de_Riesgo.md
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class ParametrosEstrategia:
+    """Parámetros de la estrategia base (inmutables y serializables para un sweep)."""
+
+    ema_rapida: int = 20
+    ema_lenta: int = 50
+    banda_neutral: float = 0.0015
+    factor_volumen: float = 1.5
+    ventana_volumen: int = 20
+    atr_length: int = 14
+    sl_atr_mult: float = 1.5
+    rr_objetivo: float = 2.0
+
+    def __post_init__(self):
+        if not (0 < self.ema_rapida < self.ema_lenta):
+            raise ValueError("Require 0 < ema_rapida < ema_lenta")
+        if self.ventana_volumen <= 0 or self.atr_length <= 0:
+            raise ValueError("ventana_volumen and atr_length must be > 0")
+        if self.sl_atr_mult <= 0 or self.rr_objetivo <= 0:
+            raise ValueError("sl_atr_mult and rr_objetivo must be > 0")
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ParametrosEstrategia":
+        """Crea parámetros a partir de un dict ignorando claves desconocidas."""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    def con(self, **cambios) -> "ParametrosEstrategia":
+        """Copia con algunos campos modificados."""
+        return replace(self, **cambios)
+
+
+PARAMETROS_DEFAULT = ParametrosEstrategia()
+
+
+__all__ = ["ParametrosEstrategia", "PARAMETROS_DEFAULT"]
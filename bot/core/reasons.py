@@ -0,0 +1,58 @@
+"""
+reasons.py
+Códigos de razón de las señales.
+
+Las pre-señales (`strategy`), los resultados de riesgo (`risk_manager`) y
+las señales finales (`signal_engine`) llevan sus razones como un `Razon`
+(IntFlag) más los valores numéricos que las acompañan (`volume_factor`).
+El texto legible solo se genera en los bordes (panel y alertas) con
+`texto_razones`.
+
+Referencias: docs/03_Modulos_Core.md, docs/04_Estrategia_Base.md
+"""
+
+from __future__ import annotations
+
+from enum import IntFlag
+from typing import Dict, List, Optional
+
+
+class Razon(IntFlag):
+    """Razones de una señal (combinables con `|`)."""
+
+    NINGUNA = 0
+    TENDENCIA_ALCISTA = 1 << 0
+    TENDENCIA_BAJISTA = 1 << 1
+    VOLUMEN_FUERTE = 1 << 2
+    EMAS_ALINEADAS = 1 << 3
+    EMAS_SEPARADAS = 1 << 4
+    RIESGO_OK = 1 << 5
+    RR_BUENO = 1 << 6
+
+
+_TEXTOS = (
+    (Razon.TENDENCIA_ALCISTA, "tendencia alcista"),
+    (Razon.TENDENCIA_BAJISTA, "tendencia bajista"),
+    (Razon.VOLUMEN_FUERTE, None),  # depende de volume_factor
+    (Razon.EMAS_ALINEADAS, "EMA20/EMA50 alineadas"),
+    (Razon.EMAS_SEPARADAS, "EMA20/EMA50 separadas"),
+    (Razon.RIESGO_OK, "ok"),
+    (Razon.RR_BUENO, "rr_good"),
+)
+
+
+def texto_razones(razones: Razon, volume_factor: Optional[float] = None) -> List[str]:
+    """Lista de textos legibles de `razones`, en el orden del flujo de la señal."""
+    out: List[str] = []
+    for flag, texto in _TEXTOS:
+        if flag & razones:
+            out.append(f"volumen x{volume_factor or 0.0:.2f}" if texto is None else texto)
+    return out
+
+
+def describir(senal: Dict) -> List[str]:
+    """Textos de las razones de una pre-señal, resultado de riesgo o señal final."""
+    return texto_razones(Razon(senal.get("razones", 0)), senal.get("volume_factor"))
+
+
+__all__ = ["Razon", "texto_razones", "describir"]
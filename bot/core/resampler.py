@@ -0,0 +1,208 @@
+"""
+resampler.py
+Construcción incremental de velas de temporalidad superior (5m, 15m, 1h...)
+a partir del flujo de klines de 1m.
+
+`data.json` fija un único `kline_interval` (1m); la confirmación en 5m/15m/1h
+de la estrategia se obtiene agregando ese mismo flujo en lugar de abrir más
+streams o pedir klines REST por temporalidad:
+
+- Cada temporalidad tiene su propia `CandleWindow` (velas cerradas + vela
+  en curso) y sus indicadores incrementales (EMA rápida/lenta, ATR, RSI).
+- Cada kline de 1m cuesta O(1) por temporalidad: se actualiza el acumulador
+  del bucket (open del primer minuto, max/min, último close, suma de
+  volumen) y, con el último minuto del bucket, se cierra la vela.
+- Si falta el último minuto de un bucket, la vela se cierra al llegar el
+  primer minuto del bucket siguiente.
+
+Las velas se alinean a múltiplos del intervalo en epoch (como Binance), así
+que `detectar_tendencia(resampler.frame("15m"))` ve las mismas velas que
+devolvería la API para 15m. Las semanas son la excepción: Binance las abre
+el lunes 00:00 UTC y el epoch (1970-01-01) cayó en jueves, así que los
+buckets semanales se desplazan 4 días.
+
+Referencias: docs/04_Estrategia_Base.md, docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+from bot.core.candle_frame import CandleFrame
+from bot.core.candle_window import CandleWindow
+from bot.core.incremental import AtrState, EmaState, RsiState
+from bot.core.params import PARAMETROS_DEFAULT, ParametrosEstrategia
+from bot.core.strategy import detectar_tendencia
+
+_UNIDADES_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+# Desfase del inicio de bucket respecto al epoch: las semanas abren en lunes.
+_DESFASE_MS = {"w": 4 * 86_400_000}
+
+
+def interval_ms(interval: str) -> int:
+    """Duración en ms de un intervalo estilo Binance ('1m', '15m', '1h', '1d'...)."""
+    try:
+        n = int(interval[:-1])
+        unidad = _UNIDADES_MS[interval[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"unsupported interval: {interval!r}") from None
+    if n <= 0:
+        raise ValueError(f"unsupported interval: {interval!r}")
+    return n * unidad
+
+
+class Timeframe:
+    """Estado de una temporalidad: acumulador del bucket, ventana e indicadores."""
+
+    __slots__ = (
+        "interval", "ms", "window", "ema_fast", "ema_slow", "atr", "rsi",
+        "_desfase", "_bucket", "_ultimo", "_open", "_high", "_low", "_close", "_volume",
+    )
+
+    def __init__(self, interval: str, capacity: int, params: ParametrosEstrategia):
+        self.interval = interval
+        self.ms = interval_ms(interval)
+        self._desfase = _DESFASE_MS.get(interval[-1], 0)
+        self.window = CandleWindow(capacity)
+        self.ema_fast = EmaState(params.ema_rapida)
+        self.ema_slow = EmaState(params.ema_lenta)
+        self.atr = AtrState(params.atr_length)
+        self.rsi = RsiState()
+        self._bucket: Optional[int] = None
+        self._ultimo: Optional[int] = None
+        self._open = self._high = self._low = self._close = self._volume = 0.0
+
+    def _cerrar(self) -> None:
+        self.window.append(self._open, self._high, self._low, self._close, self._volume, self._bucket)
+        self.ema_fast.update(self._close)
+        self.ema_slow.update(self._close)
+        self.atr.update(self._high, self._low, self._close)
+        self.rsi.update(self._close)
+        self._ultimo = self._bucket
+        self._bucket = None
+
+    def add(self, o: float, h: float, l: float, c: float, v: float, ts: int, base_ms: int) -> bool:
+        """Integra una vela base cerrada; devuelve True si cerró una vela de esta temporalidad.
+
+        También devuelve True cuando la vela base abre un bucket nuevo y
+        cierra el anterior, al que le faltaba su último minuto.
+        """
+        bucket = ts - (ts - self._desfase) % self.ms
+        if self._ultimo is not None and bucket <= self._ultimo:
+            return False  # re-entrega o vela atrasada de un bucket ya cerrado
+        cerro = False
+        if self._bucket is not None and bucket != self._bucket:
+            if bucket < self._bucket:
+                return False
+            self._cerrar()
+            cerro = True
+        if self._bucket is None:
+            self._bucket = bucket
+            self._open, self._high, self._low, self._volume = o, h, l, 0.0
+        else:
+            if h > self._high:
+                self._high = h
+            if l < self._low:
+                self._low = l
+        self._close = c
+        self._volume += v
+
+        if ts + base_ms >= bucket + self.ms:
+            self._cerrar()
+            return True
+        self.window.update(self._open, self._high, self._low, self._close, self._volume, bucket, closed=False)
+        return cerro
+
+    def parcial(self, o: float, h: float, l: float, c: float, v: float, ts: int) -> None:
+        """Vela base en curso: refleja el bucket en curso sin alterar el acumulador."""
+        bucket = ts - (ts - self._desfase) % self.ms
+        if self._bucket is not None and bucket == self._bucket:
+            o = self._open
+            h = h if h > self._high else self._high
+            l = l if l < self._low else self._low
+            v = self._volume + v
+        elif self._bucket is not None or (self._ultimo is not None and bucket <= self._ultimo):
+            return
+        self.window.update(o, h, l, c, v, bucket, closed=False)
+
+    def indicadores(self) -> Dict[str, Optional[float]]:
+        return {
+            "ema_fast": self.ema_fast.value,
+            "ema_slow": self.ema_slow.value,
+            "atr": self.atr.value,
+            "rsi": self.rsi.value,
+        }
+
+
+class Resampler:
+    """Agrega klines base (1m) en varias temporalidades superiores a la vez."""
+
+    def __init__(
+        self,
+        timeframes: Iterable[str] = ("5m", "15m", "1h"),
+        capacity: int = 200,
+        base: str = "1m",
+        params: Optional[ParametrosEstrategia] = None,
+    ):
+        self.base = base
+        self.base_ms = interval_ms(base)
+        self.params = params or PARAMETROS_DEFAULT
+        self.timeframes: Dict[str, Timeframe] = {}
+        for tf in timeframes:
+            t = Timeframe(tf, capacity, self.params)
+            if t.ms % self.base_ms:
+                raise ValueError(f"{tf} is not a multiple of {base}")
+            self.timeframes[tf] = t
+
+    def update(self, o: float, h: float, l: float, c: float, v: float, ts: int, closed: bool = True) -> List[str]:
+        """Aplica una kline base; devuelve las temporalidades que cerraron vela."""
+        if not closed:
+            for t in self.timeframes.values():
+                t.parcial(o, h, l, c, v, ts)
+            return []
+        base_ms = self.base_ms
+        return [tf for tf, t in self.timeframes.items() if t.add(o, h, l, c, v, ts, base_ms)]
+
+    def update_kline(self, kline: Dict, closed: Optional[bool] = None) -> List[str]:
+        """Atajo para dicts de vela (`open`, `high`, ..., y opcionalmente `closed`)."""
+        if closed is None:
+            closed = bool(kline.get("closed", True))
+        return self.update(
+            float(kline.get("open", 0.0)),
+            float(kline.get("high", 0.0)),
+            float(kline.get("low", 0.0)),
+            float(kline.get("close", 0.0)),
+            float(kline.get("volume", 0.0)),
+            int(kline.get("timestamp", 0)),
+            closed,
+        )
+
+    def seed(self, candles: CandleFrame) -> None:
+        """Reproduce un histórico de velas base cerradas (p.ej. el REST inicial)."""
+        for i in range(len(candles)):
+            self.update(
+                float(candles.open[i]),
+                float(candles.high[i]),
+                float(candles.low[i]),
+                float(candles.close[i]),
+                float(candles.volume[i]),
+                int(candles.timestamp[i]),
+            )
+
+    def window(self, tf: str) -> CandleWindow:
+        return self.timeframes[tf].window
+
+    def frame(self, tf: str, n: Optional[int] = None, include_partial: bool = False) -> CandleFrame:
+        """Vista sin copia de las velas de `tf` (ver `CandleWindow.frame`)."""
+        return self.timeframes[tf].window.frame(n, include_partial=include_partial)
+
+    def indicadores(self, tf: str) -> Dict[str, Optional[float]]:
+        """EMA rápida/lenta, ATR y RSI incrementales sobre todas las velas cerradas de `tf`."""
+        return self.timeframes[tf].indicadores()
+
+    def tendencia(self, tf: str, params: Optional[ParametrosEstrategia] = None) -> str:
+        """`detectar_tendencia` sobre la ventana de velas cerradas de `tf`."""
+        return detectar_tendencia(self.frame(tf), params or self.params)
+
+
+__all__ = ["Resampler", "Timeframe", "interval_ms"]
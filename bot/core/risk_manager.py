@@ -8,6 +8,9 @@ from __future__ import annotations
 import math
 from typing import Dict, Optional
 
+from bot.core.params import PARAMETROS_DEFAULT, ParametrosEstrategia
+from bot.core.reasons import Razon
+
 
 def calcular_tamano_posicion(balance: float, riesgo_por_trade: float, sl_distancia: float) -> float:
     """Calcula el tamaño de la posición en unidades de moneda.
@@ -113,7 +116,26 @@ def validar_volatilidad(atr: float, max_volatilidad_pct: float, entry_price: flo
         return False
 
 
-def aplicar_filtros_riesgo(pre_senal: Dict, estado_riesgo: Dict, configs: Dict) -> Optional[Dict]:
+def limites_diarios_excedidos(estado_riesgo: Dict, configs: Dict) -> bool:
+    """True si el día ya alcanzó la pérdida máxima o el número máximo de operaciones.
+
+    Solo mira el estado y los configs (sin datos de mercado), así que puede
+    comprobarse antes de calcular indicadores.
+    """
+    # Las reglas de `excede_perdida_diaria` / `excede_max_operaciones` en línea:
+    # se comprueba en cada evaluación de cada símbolo.
+    return (
+        float(estado_riesgo.get("perdidas_acumuladas", 0.0)) >= float(configs.get("max_daily_loss", 0.03))
+        or int(estado_riesgo.get("operaciones_hoy", 0)) >= int(configs.get("max_trades_per_day", 5))
+    )
+
+
+def aplicar_filtros_riesgo(
+    pre_senal: Dict,
+    estado_riesgo: Dict,
+    configs: Dict,
+    params: Optional[ParametrosEstrategia] = None,
+) -> Optional[Dict]:
     """Aplica las reglas de riesgo a una pre-señal y devuelve una señal validada o None.
 
     Args:
@@ -127,8 +149,12 @@ def aplicar_filtros_riesgo(pre_senal: Dict, estado_riesgo: Dict, configs: Dict)
             "risk_per_trade": 0.01,
             "max_daily_loss": 0.03,
             "max_trades_per_day": 5,
-            "max_volatility_pct": 0.025
+            "max_volatility_pct": 0.025,
+            "min_rr": 2.0
         }
+        params: parámetros de SL/TP (`sl_atr_mult`, `rr_objetivo`); por defecto
+            SL = 1.5 ATR y TP = 2R. Sin `min_rr` en configs se exige
+            min(2.0, rr_objetivo).
 
     Returns:
         Diccionario con la señal final y tamaño de posición, o None si se rechaza.
@@ -148,55 +174,41 @@ def aplicar_filtros_riesgo(pre_senal: Dict, estado_riesgo: Dict, configs: Dict)
 
     # Configs y estado con valores por defecto seguros
     riesgo_por_trade = float(configs.get("risk_per_trade", 0.01))
-    max_daily_loss = float(configs.get("max_daily_loss", 0.03))
-    max_trades = int(configs.get("max_trades_per_day", 5))
     max_vol_pct = float(configs.get("max_volatility_pct", 0.025))
+    p = params or PARAMETROS_DEFAULT
+    min_rr = float(configs.get("min_rr", min(2.0, p.rr_objetivo)))
 
     balance = float(estado_riesgo.get("balance", 0.0))
-    perdidas_acumuladas = float(estado_riesgo.get("perdidas_acumuladas", 0.0))
-    operaciones_hoy = int(estado_riesgo.get("operaciones_hoy", 0))
-
-    reasons = []
-
-    # 1) Verificar pérdida diaria
-    if excede_perdida_diaria(perdidas_acumuladas, max_daily_loss):
-        reasons.append("excede perdida diaria")
-        return None
 
-    # 2) Verificar número de operaciones hoy
-    if excede_max_operaciones(operaciones_hoy, max_trades):
-        reasons.append("excede max operaciones diarias")
+    # 1-2) Pérdida diaria y número de operaciones hoy
+    if limites_diarios_excedidos(estado_riesgo, configs):
         return None
 
     # 3) Calcular distancia SL y SL/TP
-    sl_distancia = 1.5 * float(atr)
+    sl_distancia = p.sl_atr_mult * float(atr)
     if sl_distancia <= 0:
-        reasons.append("sl_distancia invalida")
         return None
 
     entry_price = float(entry)
     if direction == "LONG":
         sl = entry_price - sl_distancia
-        tp = entry_price + (sl_distancia * 2.0)
+        tp = entry_price + (sl_distancia * p.rr_objetivo)
     else:
         sl = entry_price + sl_distancia
-        tp = entry_price - (sl_distancia * 2.0)
+        tp = entry_price - (sl_distancia * p.rr_objetivo)
 
     # 4) Validar SL/TP
-    if not validar_sl_tp(entry_price, sl, tp, direction):
-        reasons.append("sl/tp invalidos")
+    if not validar_sl_tp(entry_price, sl, tp, direction, min_rr):
         return None
 
     # 5) Validar volatilidad relativa
     if not validar_volatilidad(float(atr), max_vol_pct, entry_price):
-        reasons.append("volatilidad excesiva")
         return None
 
     # 6) Calcular tamaño de posición
     try:
         posicion = calcular_tamano_posicion(balance, riesgo_por_trade, sl_distancia)
     except ValueError:
-        reasons.append("parametros de riesgo invalidos")
         return None
 
     # Construir resultado sin modificar objetos originales
@@ -207,7 +219,7 @@ def aplicar_filtros_riesgo(pre_senal: Dict, estado_riesgo: Dict, configs: Dict)
         "tp": float(tp),
         "atr": float(atr),
         "position_size": float(posicion),
-        "reason": reasons or ["ok"],
+        "razones": Razon.RIESGO_OK,
     }
     return result
 
@@ -0,0 +1,295 @@
+"""
+series.py
+Indicadores técnicos sobre la serie completa, vectorizados con NumPy.
+
+Pensado para backtesting e investigación: cada función recibe arrays
+(cronológicos, más antiguo -> más reciente) y devuelve un array alineado
+de la misma longitud, con NaN donde el indicador todavía no es calculable.
+
+Para todo índice `i` con valor definido se cumple, salvo redondeo:
+
+    sma_series(x, n)[i]        == indicators.sma(x[:i+1], n)
+    ema_series(x, n)[i]        == indicators.ema(x[:i+1], n)
+    rsi_series(x, n)[i]        == indicators.rsi(x[:i+1], n)
+    atr_series(h, l, c, n)[i]  == indicators.atr(h[:i+1], l[:i+1], c[:i+1], n)
+    macd_series(x, f, s, g)    -> tres arrays alineados con indicators.macd
+    volatility_series(x, n)[i] == indicators.volatility(x[:i+1], n)
+
+Todas las funciones aceptan también matrices 2D (símbolos x tiempo): cada
+fila se trata como una serie independiente y el cálculo se hace para todas
+las filas en una sola pasada. `indicadores_batch` agrupa los indicadores
+que usa la estrategia para un universo completo de símbolos.
+
+Las recursiones (EMA, Wilder) se resuelven con un scan por bloques
+(`_ewm_scan`); el resto (SMA por cumsum, TR, desviación móvil) son
+operaciones de array (cumsum).
+
+Referencias: docs/03_Modulos_Core.md, docs/04_Estrategia_Base.md
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+
+def _as_array(values: Sequence[float]) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _check_length(length: int) -> None:
+    if length <= 0:
+        raise ValueError("length must be > 0")
+
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan, dtype=np.float64)
+
+
+def _rolling_mean(x: np.ndarray, length: int) -> np.ndarray:
+    """Media móvil basada en cumsum; out[i] usa x[i-length+1 .. i]."""
+    out = _nan_like(x)
+    n = x.shape[-1]
+    if n < length:
+        return out
+    csum = np.cumsum(x, axis=-1)
+    window_sums = csum[..., length - 1:].copy()
+    window_sums[..., 1:] -= csum[..., :-length]
+    out[..., length - 1:] = window_sums / length
+    return out
+
+
+# Los bloques del scan se dimensionan para que decay**-k no supere ~1e8:
+# el error de redondeo se mantiene en el orden de eps * |x|.
+_SCAN_LOG_SCALE = math.log(1e8)
+
+
+def _ewm_scan(x: np.ndarray, alpha: float, seed) -> np.ndarray:
+    """Resuelve y_t = (1 - alpha) * y_{t-1} + alpha * x_t con y_0 = seed.
+
+    Se trocea la serie en bloques: dentro de cada bloque la recursión tiene
+    forma cerrada (cumsum ponderado) y solo el arrastre entre bloques se
+    propaga en un bucle, de modo que el coste en Python es O(n / bloque)
+    en lugar de O(n). Acepta `x` 1D o 2D (filas independientes, `seed`
+    escalar o un valor por fila).
+    """
+    m = x.shape[-1]
+    lead = x.shape[:-1]
+    decay = 1.0 - alpha
+    if m == 0:
+        return np.empty(x.shape, dtype=np.float64)
+    if decay <= 0.0:
+        return x.astype(np.float64, copy=True)
+
+    block = max(1, min(m, int(_SCAN_LOG_SCALE / -math.log(decay))))
+    n_blocks = -(-m // block)
+    padded = np.zeros(lead + (n_blocks * block,), dtype=np.float64)
+    padded[..., :m] = x
+    X = padded.reshape(lead + (n_blocks, block))
+
+    k = np.arange(1, block + 1, dtype=np.float64)
+    pw = decay ** k
+    local = np.cumsum(X * (alpha / pw), axis=-1) * pw
+
+    carries = np.empty(lead + (n_blocks,), dtype=np.float64)
+    ends = local[..., -1]
+    decay_block = float(pw[-1])
+    if lead:
+        carry = np.broadcast_to(np.asarray(seed, dtype=np.float64), lead)
+        for b in range(n_blocks):
+            carries[..., b] = carry
+            carry = decay_block * carry + ends[..., b]
+    else:
+        carry = float(seed)
+        for b, end in enumerate(ends.tolist()):
+            carries[b] = carry
+            carry = decay_block * carry + end
+
+    y = local + carries[..., None] * pw
+    return y.reshape(lead + (n_blocks * block,))[..., :m]
+
+
+def _ema_recursive(x: np.ndarray, length: int, start: int) -> np.ndarray:
+    """EMA con semilla SMA sobre x[..., start:start+length]; NaN antes de la semilla."""
+    out = _nan_like(x)
+    n = x.shape[-1]
+    if n - start < length:
+        return out
+    seed = np.mean(x[..., start:start + length], axis=-1)
+    out[..., start + length - 1] = seed
+    out[..., start + length:] = _ewm_scan(x[..., start + length:], 2.0 / (length + 1), seed)
+    return out
+
+
+def sma_series(values: Sequence[float], length: int) -> np.ndarray:
+    """Serie completa de la SMA (cumsum)."""
+    _check_length(length)
+    return _rolling_mean(_as_array(values), length)
+
+
+def ema_series(values: Sequence[float], length: int) -> np.ndarray:
+    """Serie completa de la EMA, inicializada con la SMA de la primera ventana."""
+    _check_length(length)
+    return _ema_recursive(_as_array(values), length, 0)
+
+
+def rsi_series(values: Sequence[float], length: int = 14) -> np.ndarray:
+    """Serie completa del RSI con suavizado de Wilder."""
+    _check_length(length)
+    x = _as_array(values)
+    out = _nan_like(x)
+    n = x.shape[-1]
+    if n < length + 1:
+        return out
+
+    deltas = np.diff(x, axis=-1)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+
+    avg_gain = gains[..., :length].sum(axis=-1) / length
+    avg_loss = losses[..., :length].sum(axis=-1) / length
+    # Wilder: avg = (avg * (length - 1) + x) / length  ==  EWM con alpha = 1/length
+    ag_arr = np.concatenate(
+        (avg_gain[..., None], _ewm_scan(gains[..., length:], 1.0 / length, avg_gain)), axis=-1
+    )
+    al_arr = np.concatenate(
+        (avg_loss[..., None], _ewm_scan(losses[..., length:], 1.0 / length, avg_loss)), axis=-1
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = ag_arr / al_arr
+        rsi_vals = 100.0 - (100.0 / (1.0 + rs))
+    flat = al_arr == 0.0
+    rsi_vals[flat] = np.where(ag_arr[flat] > 0, 100.0, 50.0)
+    out[..., length:] = rsi_vals
+    return out
+
+
+def true_range_series(high: Sequence[float], low: Sequence[float], close: Sequence[float]) -> np.ndarray:
+    """True Range por vela (NaN en la primera vela, que no tiene cierre previo)."""
+    h = _as_array(high)
+    l = _as_array(low)
+    c = _as_array(close)
+    if not (h.shape == l.shape == c.shape):
+        raise ValueError("high, low and close must have the same length")
+    tr = _nan_like(c)
+    if c.shape[-1] < 2:
+        return tr
+    prev_close = c[..., :-1]
+    h1 = h[..., 1:]
+    l1 = l[..., 1:]
+    tr[..., 1:] = np.maximum(h1 - l1, np.maximum(np.abs(h1 - prev_close), np.abs(l1 - prev_close)))
+    return tr
+
+
+def atr_series(high: Sequence[float], low: Sequence[float], close: Sequence[float], length: int) -> np.ndarray:
+    """Serie completa del ATR (media simple de los últimos `length` TR)."""
+    _check_length(length)
+    tr = true_range_series(high, low, close)
+    out = _nan_like(tr)
+    if tr.shape[-1] < 2:
+        return out
+    out[..., 1:] = _rolling_mean(tr[..., 1:], length)
+    return out
+
+
+def macd_series(
+    values: Sequence[float], fast: int = 12, slow: int = 26, signal: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Series completas (macd_line, signal_line, histogram).
+
+    Los valores quedan definidos a partir del índice `slow + signal - 1`,
+    igual que `indicators.macd`, que exige `slow + signal` datos.
+    """
+    if not (0 < fast < slow):
+        raise ValueError("Require 0 < fast < slow for MACD")
+    _check_length(signal)
+    x = _as_array(values)
+    macd_line = ema_series(x, fast) - ema_series(x, slow)
+    signal_line = _ema_recursive(macd_line, signal, slow - 1)
+    first = slow + signal - 1
+    macd_line[..., :first] = np.nan
+    signal_line[..., :first] = np.nan
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def volatility_series(values: Sequence[float], length: int = 20) -> np.ndarray:
+    """Serie completa de la desviación estándar de retornos simples (ventana móvil).
+
+    Se calcula como sqrt(E[r^2] - E[r]^2) con medias móviles por cumsum.
+    """
+    _check_length(length)
+    x = _as_array(values)
+    out = _nan_like(x)
+    n = x.shape[-1]
+    if n < length + 1:
+        return out
+    prev = x[..., :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(prev == 0, 0.0, (x[..., 1:] - prev) / prev)
+    mean_r = _rolling_mean(returns, length)[..., length - 1:]
+    mean_sq = _rolling_mean(returns * returns, length)[..., length - 1:]
+    out[..., length:] = np.sqrt(np.maximum(mean_sq - mean_r * mean_r, 0.0))
+    return out
+
+
+def indicadores_batch(
+    closes: Sequence[Sequence[float]],
+    highs: Sequence[Sequence[float]],
+    lows: Sequence[Sequence[float]],
+    volumes: Sequence[Sequence[float]],
+    ema_fast: int = 20,
+    ema_slow: int = 50,
+    atr_length: int = 14,
+    rsi_length: int = 14,
+    volume_window: int = 20,
+) -> Dict[str, np.ndarray]:
+    """Indicadores de la estrategia para todos los símbolos en una pasada.
+
+    Por defecto: EMA20/EMA50, ATR14, RSI14 y volumen medio de 20 velas.
+
+    Args:
+        closes, highs, lows, volumes: matrices (símbolos x tiempo) de igual forma.
+
+    Returns:
+        Dict de arrays con un valor por símbolo (NaN si faltan datos):
+        `ema_fast`, `ema_slow`, `ema_fast_prev`, `ema_slow_prev` (valores en
+        la vela anterior), `atr`, `rsi`, `vol_mean` (media de las últimas
+        `volume_window` velas, incluida la actual), `close` y `volume`.
+    """
+    c = np.atleast_2d(_as_array(closes))
+    h = np.atleast_2d(_as_array(highs))
+    l = np.atleast_2d(_as_array(lows))
+    v = np.atleast_2d(_as_array(volumes))
+    if not (c.shape == h.shape == l.shape == v.shape):
+        raise ValueError("closes, highs, lows and volumes must have the same shape")
+
+    n_rows, n = c.shape
+    nan_col = np.full(n_rows, np.nan)
+    fast = ema_series(c, ema_fast)
+    slow = ema_series(c, ema_slow)
+    w = min(volume_window, n)
+    return {
+        "ema_fast": fast[:, -1] if n else nan_col,
+        "ema_slow": slow[:, -1] if n else nan_col,
+        "ema_fast_prev": fast[:, -2] if n > 1 else nan_col,
+        "ema_slow_prev": slow[:, -2] if n > 1 else nan_col,
+        "atr": atr_series(h, l, c, atr_length)[:, -1] if n else nan_col,
+        "rsi": rsi_series(c, rsi_length)[:, -1] if n else nan_col,
+        "vol_mean": v[:, -w:].mean(axis=1) if w else nan_col,
+        "close": c[:, -1] if n else nan_col,
+        "volume": v[:, -1] if n else nan_col,
+    }
+
+
+__all__ = [
+    "sma_series",
+    "ema_series",
+    "rsi_series",
+    "true_range_series",
+    "atr_series",
+    "macd_series",
+    "volatility_series",
+    "indicadores_batch",
+]
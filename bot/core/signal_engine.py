@@ -6,6 +6,10 @@ para producir la señal final lista para el panel/alertas.
 Funciones principales:
 - analizar_ballenas(eventos: dict) -> dict
 - generar_senal_final(candles, estado_riesgo, configs, eventos_ballenas) -> dict | None
+- EvaluadorSenal: el mismo flujo por etapas con contadores por etapa
+
+Las razones viajan como `reasons.Razon` + `volume_factor`; el texto para el
+panel y las alertas se obtiene con `reasons.describir(senal)`.
 
 Referencias: docs/03_Modulos_Core.md, docs/04_Estrategia_Base.md,
 docs/05_Gestion_de_Riesgo.md, docs/06_Radar_de_Ballenas.md
@@ -14,10 +18,14 @@ docs/05_Gestion_de_Riesgo.md, docs/06_Radar_de_Ballenas.md
 from __future__ import annotations
 
 import math
-from typing import Dict, List, Optional
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from bot.core.strategy import generar_pre_senal
-from bot.core.risk_manager import aplicar_filtros_riesgo
+from bot.core.candle_frame import Candles
+from bot.core.params import ParametrosEstrategia
+from bot.core.reasons import Razon
+from bot.core.strategy import generar_pre_senal, generar_pre_senal_ventanas
+from bot.core.risk_manager import aplicar_filtros_riesgo, limites_diarios_excedidos
 
 
 def analizar_ballenas(eventos: Dict) -> Dict:
@@ -48,6 +56,7 @@ def analizar_ballenas(eventos: Dict) -> Dict:
         "fast_move",
         "stop_hunt",
         "squeeze",
+        "spoofing",
     ]
     true_flags = [f for f in flags if bool(eventos.get(f))]
     for f in true_flags:
@@ -64,81 +73,103 @@ def analizar_ballenas(eventos: Dict) -> Dict:
     return {"alerta_ballenas": alert, "razon_ballenas": reasons}
 
 
-def _confidence_from_reasons(pre_reasons: List[str], risk_reasons: List[str], ballenas: Dict, configs: Dict) -> float:
+# Bits de `Razon` como int: los operadores de IntFlag son código Python
+# (~1 µs cada uno) y se aplican en cada señal; la Razon se construye una vez.
+_EMAS_SEPARADAS = int(Razon.EMAS_SEPARADAS)
+_RR_BUENO = int(Razon.RR_BUENO)
+
+
+def _confianza(razones: Razon, volume_factor: float, atr: float, entry: float, ballenas: Dict, configs: Dict) -> float:
     """Heurística simple para asignar un score de confianza entre 0.0 y 1.0.
 
     Suma ponderada de características discretas (cada +0.2), luego recortar.
     """
     score = 0.0
 
-    # volumen fuerte en pre_reasons (busca 'volumen x{factor}')
-    vol_factor = 0.0
-    for r in pre_reasons:
-        if r.startswith("volumen x"):
-            try:
-                vol_factor = float(r.split("x")[1])
-            except Exception:
-                vol_factor = 0.0
-    if vol_factor >= float(configs.get("volume_factor_confirm", 1.5)):
+    # volumen fuerte
+    if volume_factor >= float(configs.get("volume_factor_confirm", 1.5)):
+        score += 0.2
+
+    # tendencia fuerte
+    if int(razones) & _EMAS_SEPARADAS:
         score += 0.2
 
-    # tendencia fuerte: buscar 'EMA20/EMA50 separadas' en pre_reasons
-    combined_reasons = pre_reasons + (risk_reasons or [])
-    if any("EMA20/EMA50 separadas" in r for r in combined_reasons):
+    # volatilidad baja-normal
+    max_vol_pct = float(configs.get("max_volatility_pct", 0.025))
+    if atr > 0 and (atr / entry) <= max_vol_pct:
         score += 0.2
 
-    # volatilidad baja-normal: comparar atr/entry vs max_volatility_pct
-    atr = None
-    entry = None
-    for r in (risk_reasons or []):
-        pass
-    # attempt to read from configs if provided
-    max_vol_pct = float(configs.get("max_volatility_pct", configs.get("max_volatility_pct", 0.025)))
-    # we expect caller to pass atr and entry separately; fallback to 0
-    # this function is called with available context by generar_senal_final
-
-    # ballenas absent -> +0.2
-    if not ballenas or not ballenas.get("alerta_ballenas"):
+    # sin señales de ballenas
+    if not ballenas.get("alerta_ballenas"):
         score += 0.2
 
-    # SL/TP RR check will be computed in caller and passed via risk_reasons
-    if any("rr_good" in r for r in (risk_reasons or [])):
+    # SL/TP con buen RR
+    if int(razones) & _RR_BUENO:
         score += 0.2
 
-    # Clamp
-    if score < 0.0:
-        score = 0.0
-    if score > 1.0:
-        score = 1.0
-    return round(score, 2)
+    return max(0.0, min(1.0, round(score, 2)))
 
 
-def generar_senal_final(candles: List[Dict], estado_riesgo: Dict, configs: Dict, eventos_ballenas: Optional[Dict] = None) -> Optional[Dict]:
+def generar_senal_final(
+    candles: Candles,
+    estado_riesgo: Dict,
+    configs: Dict,
+    eventos_ballenas: Optional[Dict] = None,
+    params: Optional[ParametrosEstrategia] = None,
+) -> Optional[Dict]:
     """Función principal que genera la señal final combinando strategy, risk y ballenas.
 
     Args:
-        candles: lista de velas (estructura definida en strategy.py).
+        candles: velas como `CandleFrame` o lista de dicts (estructura definida en strategy.py).
         estado_riesgo: estado con balance, perdidas_acumuladas, operaciones_hoy.
         configs: configuraciones (contiene 'symbol' y parámetros de risk).
         eventos_ballenas: dict opcional con eventos detectados por whale_detector.
+        params: parámetros de estrategia y SL/TP (por defecto `PARAMETROS_DEFAULT`).
 
     Returns:
         Señal final (dict) o None si se descarta.
     """
-    # PASO 1 — Obtener pre-señal
-    pre = generar_pre_senal(candles)
-    if not pre:
+    # Las comprobaciones van de la más barata a la más cara (ver `EvaluadorSenal`).
+    # PASO 0 — Límites diarios: solo estado, sin datos de mercado
+    if limites_diarios_excedidos(estado_riesgo, configs):
         return None
 
-    # PASO 2 — Analizar ballenas
+    # PASO 1 — Analizar ballenas
     ballenas = analizar_ballenas(eventos_ballenas or {})
+    if ballenas["alerta_ballenas"]:
+        return None
+
+    # PASO 2 — Obtener pre-señal
+    pre = generar_pre_senal(candles, params)
+    if not pre:
+        return None
+
+    return generar_senal_desde_pre(pre, estado_riesgo, configs, ballenas, params)
+
+
+def generar_senal_desde_pre(
+    pre: Dict,
+    estado_riesgo: Dict,
+    configs: Dict,
+    ballenas: Dict,
+    params: Optional[ParametrosEstrategia] = None,
+) -> Optional[Dict]:
+    """Pasos 2-5 de `generar_senal_final` con la pre-señal y las ballenas ya evaluadas.
+
+    Args:
+        pre: pre-señal de `strategy.generar_pre_senal`.
+        ballenas: resultado de `analizar_ballenas`.
+
+    Returns:
+        Señal final (dict) o None si se descarta.
+    """
     # Si hay alerta fuerte, rechazar
     if ballenas.get("alerta_ballenas"):
         # attach reason to pre reason copy and return None
         return None
 
     # PASO 3 — Validar riesgo
-    senal_riesgo = aplicar_filtros_riesgo(pre, estado_riesgo, configs)
+    senal_riesgo = aplicar_filtros_riesgo(pre, estado_riesgo, configs, params)
     if not senal_riesgo:
         return None
 
@@ -151,66 +182,22 @@ def generar_senal_final(candles: List[Dict], estado_riesgo: Dict, configs: Dict,
     atr = float(senal_riesgo.get("atr") or 0.0)
     timestamp = int(pre.get("timestamp", 0))
 
-    # reasons: combine pre and risk reasons into a new list
-    reasons: List[str] = []
-    reasons.extend(list(pre.get("reason") or []))
-    reasons.extend(list(senal_riesgo.get("reason") or []))
+    razones = int(pre.get("razones", 0)) | int(senal_riesgo.get("razones", 0))
+    volume_factor = float(pre.get("volume_factor") or 0.0)
 
     # PASO 5 — Calcular confianza
-    # Determine rr goodness
-    rr_good = False
-    try:
-        if senal_riesgo["direction"] == "LONG":
-            sl_dist = entry - sl
-            tp_dist = tp - entry
-        else:
-            sl_dist = sl - entry
-            tp_dist = entry - tp
-        rr = (tp_dist / sl_dist) if sl_dist > 0 else 0.0
-        if rr >= 2.0:
-            rr_good = True
-            reasons.append("rr_good")
-    except Exception:
-        rr = 0.0
-
-    # Build risk_reasons shorthand
-    risk_reasons = list(senal_riesgo.get("reason") or [])
-
-    # Augment reasons with ballena info
-    ballena_flags = ballenas
-
-    # Compute score components
-    score = 0.0
-    # volumen fuerte
-    vol_factor = 0.0
-    for r in pre.get("reason") or []:
-        if isinstance(r, str) and r.startswith("volumen x"):
-            try:
-                vol_factor = float(r.split("x")[1])
-            except Exception:
-                vol_factor = 0.0
-    if vol_factor >= float(configs.get("volume_factor_confirm", 1.5)):
-        score += 0.2
-
-    # tendencia fuerte
-    if any("EMA20/EMA50 separadas" in str(r) for r in pre.get("reason") or []):
-        score += 0.2
-
-    # volatilidad baja-normal
-    max_vol_pct = float(configs.get("max_volatility_pct", 0.025))
-    if atr > 0 and (atr / entry) <= max_vol_pct:
-        score += 0.2
-
-    # sin señales de ballenas
-    if not ballena_flags.get("alerta_ballenas"):
-        score += 0.2
-
-    # SL/TP con buen RR
-    if rr_good:
-        score += 0.2
-
-    # Clamp score
-    confidence = max(0.0, min(1.0, round(score, 2)))
+    if senal_riesgo["direction"] == "LONG":
+        sl_dist = entry - sl
+        tp_dist = tp - entry
+    else:
+        sl_dist = sl - entry
+        tp_dist = entry - tp
+    rr = (tp_dist / sl_dist) if sl_dist > 0 else 0.0
+    if rr >= 2.0:
+        razones |= _RR_BUENO
+    razones = Razon(razones)
+
+    confidence = _confianza(razones, volume_factor, atr, entry, ballenas, configs)
 
     final = {
         "symbol": symbol,
@@ -221,15 +208,167 @@ def generar_senal_final(candles: List[Dict], estado_riesgo: Dict, configs: Dict,
         "position_size": position_size,
         "atr": atr,
         "timestamp": timestamp,
-        "reasons": reasons,
-        "ballena_flags": ballena_flags,
+        "razones": razones,
+        "volume_factor": volume_factor,
+        "ballena_flags": ballenas,
         "confidence": confidence,
     }
 
     return final
 
 
-__all__ = ["analizar_ballenas", "generar_senal_final"]
+ETAPAS = ("limites_diarios", "ballenas", "pre_senal", "riesgo")
+
+
+class _Etapa:
+    __slots__ = ("nombre", "evaluaciones", "rechazos", "tiempo")
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.evaluaciones = 0
+        self.rechazos = 0
+        self.tiempo = 0.0
+
+
+class EvaluadorSenal:
+    """`generar_senal_final` por etapas ordenadas de menor a mayor coste, con contadores.
+
+    Etapas (cada una puede cortar la evaluación):
+
+    1. `limites_diarios`: pérdida diaria y operaciones del día (solo estado).
+    2. `ballenas`: `analizar_ballenas` sobre los eventos ya detectados.
+    3. `pre_senal`: indicadores + reglas de `strategy.generar_pre_senal`.
+    4. `riesgo`: SL/TP, volatilidad, tamaño de posición y ensamblado.
+
+    El resultado es el mismo que el de `generar_senal_final`; además, por
+    etapa se acumulan evaluaciones, rechazos y tiempo (`estadisticas()`).
+    Con el límite diario alcanzado, cada evaluación cuesta una comparación.
+    `evaluar_simbolos` evalúa muchos símbolos a la vez con la etapa
+    `pre_senal` agrupada (`strategy.generar_pre_senal_ventanas`).
+    """
+
+    def __init__(self, params: Optional[ParametrosEstrategia] = None):
+        self.params = params
+        self.etapas = tuple(_Etapa(nombre) for nombre in ETAPAS)
+        self.senales = 0
+
+    def evaluar(
+        self,
+        candles: Candles,
+        estado_riesgo: Dict,
+        configs: Dict,
+        eventos_ballenas: Optional[Dict] = None,
+    ) -> Optional[Dict]:
+        limites, etapa_ballenas, etapa_pre, etapa_riesgo = self.etapas
+        reloj = time.perf_counter
+
+        t0 = reloj()
+        limites.evaluaciones += 1
+        rechazo = limites_diarios_excedidos(estado_riesgo, configs)
+        t1 = reloj()
+        limites.tiempo += t1 - t0
+        if rechazo:
+            limites.rechazos += 1
+            return None
+
+        etapa_ballenas.evaluaciones += 1
+        ballenas = analizar_ballenas(eventos_ballenas or {})
+        t0 = reloj()
+        etapa_ballenas.tiempo += t0 - t1
+        if ballenas["alerta_ballenas"]:
+            etapa_ballenas.rechazos += 1
+            return None
+
+        etapa_pre.evaluaciones += 1
+        pre = generar_pre_senal(candles, self.params)
+        t1 = reloj()
+        etapa_pre.tiempo += t1 - t0
+        if not pre:
+            etapa_pre.rechazos += 1
+            return None
+
+        etapa_riesgo.evaluaciones += 1
+        senal = generar_senal_desde_pre(pre, estado_riesgo, configs, ballenas, self.params)
+        etapa_riesgo.tiempo += reloj() - t1
+        if senal is None:
+            etapa_riesgo.rechazos += 1
+            return None
+        self.senales += 1
+        return senal
+
+    def evaluar_simbolos(
+        self, items: Sequence[Tuple[Candles, Dict, Dict, Optional[Dict]]]
+    ) -> List[Optional[Dict]]:
+        """`evaluar` de cada (candles, estado_riesgo, configs, eventos_ballenas), mismo resultado.
+
+        Las dos primeras etapas corren por símbolo; las ventanas que las
+        superan pasan juntas por `pre_senal`, que es la etapa cara.
+        """
+        limites, etapa_ballenas, etapa_pre, etapa_riesgo = self.etapas
+        reloj = time.perf_counter
+        out: List[Optional[Dict]] = [None] * len(items)
+
+        vivos = []
+        t1 = reloj()
+        for i, (candles, estado_riesgo, configs, eventos) in enumerate(items):
+            t0 = t1
+            limites.evaluaciones += 1
+            rechazo = limites_diarios_excedidos(estado_riesgo, configs)
+            t1 = reloj()
+            limites.tiempo += t1 - t0
+            if rechazo:
+                limites.rechazos += 1
+                continue
+            etapa_ballenas.evaluaciones += 1
+            ballenas = analizar_ballenas(eventos or {})
+            t0 = reloj()
+            etapa_ballenas.tiempo += t0 - t1
+            t1 = t0
+            if ballenas["alerta_ballenas"]:
+                etapa_ballenas.rechazos += 1
+                continue
+            vivos.append((i, ballenas))
+
+        etapa_pre.evaluaciones += len(vivos)
+        pres = generar_pre_senal_ventanas([items[i][0] for i, _ in vivos], self.params)
+        t0 = reloj()
+        etapa_pre.tiempo += t0 - t1
+
+        for (i, ballenas), pre in zip(vivos, pres):
+            if not pre:
+                etapa_pre.rechazos += 1
+                continue
+            etapa_riesgo.evaluaciones += 1
+            _, estado_riesgo, configs, _ = items[i]
+            senal = generar_senal_desde_pre(pre, estado_riesgo, configs, ballenas, self.params)
+            if senal is None:
+                etapa_riesgo.rechazos += 1
+                continue
+            self.senales += 1
+            out[i] = senal
+        etapa_riesgo.tiempo += reloj() - t0
+        return out
+
+    def estadisticas(self) -> Dict[str, Dict]:
+        """{etapa: {"evaluaciones", "rechazos", "tiempo_ms", "medio_us"}} en orden de ejecución."""
+        return {
+            e.nombre: {
+                "evaluaciones": e.evaluaciones,
+                "rechazos": e.rechazos,
+                "tiempo_ms": e.tiempo * 1000.0,
+                "medio_us": e.tiempo * 1e6 / e.evaluaciones if e.evaluaciones else 0.0,
+            }
+            for e in self.etapas
+        }
+
+    def reset(self) -> None:
+        for e in self.etapas:
+            e.evaluaciones = e.rechazos = 0
+            e.tiempo = 0.0
+        self.senales = 0
+
+
+__all__ = ["analizar_ballenas", "generar_senal_final", "generar_senal_desde_pre", "EvaluadorSenal", "ETAPAS"]
 """
 signal_engine.py
 Motor que combina estrategia, riesgo y detección de ballenas para emitir señales finales.
@@ -7,16 +7,124 @@ Referencias: docs/03_Modulos_Core.md y docs/04_Estrategia_Base.md
 from __future__ import annotations
 
 import math
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 
-from bot.core import indicators
+import numpy as np
 
+from bot.core import indicators, series
+from bot.core.candle_frame import CandleFrame, Candles, as_frame
+from bot.core.params import PARAMETROS_DEFAULT, ParametrosEstrategia
+from bot.core.reasons import Razon
 
-def _extract_series(candles: List[Dict], key: str) -> List[float]:
+
+def _extract_series(candles: Candles, key: str) -> Sequence[float]:
+    if isinstance(candles, CandleFrame):
+        return getattr(candles, key)
     return [float(c.get(key, 0.0)) for c in candles]
 
 
-def detectar_tendencia(candles: List[Dict]) -> str:
+def calcular_features(candles: Candles, params: Optional[ParametrosEstrategia] = None) -> Optional[Dict]:
+    """Calcula en una sola pasada los indicadores que usa la estrategia.
+
+    Recorre los cierres una vez para la EMA rápida y la lenta (y sus valores
+    en la vela anterior) y solo la cola necesaria para el ATR y la media de
+    volumen. Los resultados son idénticos a los de `indicators.ema`,
+    `indicators.atr` y `validar_volumen` (mismo orden de operaciones).
+
+    Returns:
+        Dict con `ema_fast`, `ema_slow`, `ema_fast_prev`, `ema_slow_prev`
+        (None si no hay datos para la vela anterior), `atr` (NaN si no
+        calculable), `vol_mean`, `last_volume`, `last_close` y `timestamp`;
+        o None si hay menos velas que el periodo de la EMA lenta.
+    """
+    p = params or PARAMETROS_DEFAULT
+    fast = p.ema_rapida
+    slow = p.ema_lenta
+    atr_tail = p.atr_length + 1
+
+    n = len(candles)
+    if n < slow:
+        return None
+
+    if isinstance(candles, CandleFrame):
+        closes = candles.close
+        highs = candles.high[-atr_tail:]
+        lows = candles.low[-atr_tail:]
+        vols = candles.volume[-p.ventana_volumen:]
+        timestamp = int(candles.timestamp[-1])
+    else:
+        closes = [float(c.get("close", 0.0)) for c in candles]
+        tail = candles[-atr_tail:]
+        highs = [float(c.get("high", 0.0)) for c in tail]
+        lows = [float(c.get("low", 0.0)) for c in tail]
+        vols = [float(c.get("volume", 0.0)) for c in candles[-p.ventana_volumen:]]
+        timestamp = int(candles[-1].get("timestamp", 0))
+
+    # Cada EMA se siembra con la SMA de sus primeros `length` cierres.
+    alpha_fast = 2.0 / (fast + 1)
+    alpha_slow = 2.0 / (slow + 1)
+    ema_fast = sum(closes[:fast]) / fast
+    for price in closes[fast:slow]:
+        ema_fast = (price - ema_fast) * alpha_fast + ema_fast
+    ema_slow = sum(closes[:slow]) / slow
+
+    if n == slow:
+        # Con exactamente `slow` velas la EMA lenta previa no es calculable.
+        ema_fast_prev = ema_slow_prev = None
+    else:
+        for price in closes[slow:-1]:
+            ema_fast = (price - ema_fast) * alpha_fast + ema_fast
+            ema_slow = (price - ema_slow) * alpha_slow + ema_slow
+        ema_fast_prev = ema_fast
+        ema_slow_prev = ema_slow
+        price = closes[-1]
+        ema_fast = (price - ema_fast) * alpha_fast + ema_fast
+        ema_slow = (price - ema_slow) * alpha_slow + ema_slow
+
+    # ATR: solo las últimas `atr_length + 1` velas aportan TR a la ventana.
+    tail_closes = closes[-atr_tail:]
+    tr_values = [
+        max(highs[i] - lows[i], abs(highs[i] - tail_closes[i - 1]), abs(lows[i] - tail_closes[i - 1]))
+        for i in range(1, len(highs))
+    ]
+    atr_len = p.atr_length
+    atr_val = sum(tr_values[-atr_len:]) / atr_len if len(tr_values) >= atr_len else math.nan
+
+    return {
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "ema_fast_prev": ema_fast_prev,
+        "ema_slow_prev": ema_slow_prev,
+        "atr": atr_val,
+        "vol_mean": sum(vols) / len(vols),
+        "last_volume": vols[-1],
+        "last_close": closes[-1],
+        "timestamp": timestamp,
+    }
+
+
+def _tendencia_desde_features(features: Dict, banda_neutral: float = 0.0015) -> str:
+    """Reglas de `detectar_tendencia` aplicadas sobre `calcular_features`."""
+    ema_fast = features["ema_fast"]
+    ema_slow = features["ema_slow"]
+
+    # Si están muy próximas (ej. diferencia relativa < 0.15%), consideramos neutral
+    if ema_slow == 0:
+        return "neutral"
+    rel_diff = abs(ema_fast - ema_slow) / ema_slow
+    if not rel_diff >= banda_neutral:  # también NaN (cierre no numérico), como `_tendencias_batch`
+        return "neutral"
+
+    # Detectar cruces recientes: comparar EMA rápida respecto a la lenta en el punto anterior
+    ema_fast_prev = features["ema_fast_prev"]
+    ema_slow_prev = features["ema_slow_prev"]
+    if ema_fast_prev is not None and (ema_fast_prev - ema_slow_prev) * (ema_fast - ema_slow) < 0:
+        return "neutral"
+
+    return "alcista" if ema_fast > ema_slow else "bajista"
+
+
+def detectar_tendencia(candles: Candles, params: Optional[ParametrosEstrategia] = None) -> str:
     """Detecta la tendencia del mercado usando EMA20 y EMA50.
 
     Reglas:
@@ -28,44 +136,16 @@ def detectar_tendencia(candles: List[Dict]) -> str:
     Retorna: 'alcista' | 'bajista' | 'neutral'
 
     No lanza excepciones en condiciones normales; si hay pocos datos
-    devuelve 'neutral'.
+    devuelve 'neutral'. `params` permite cambiar periodos y banda neutral.
     """
-    closes = _extract_series(candles, "close")
-    if len(closes) < 50:
-        return "neutral"
-
-    try:
-        ema20 = indicators.ema(closes, 20)
-        ema50 = indicators.ema(closes, 50)
-    except Exception:
-        # En caso de error numérico, devolver neutral y dejar que
-        # el risk manager o caller decida.
-        return "neutral"
-
-    # Si están muy próximas (ej. diferencia relativa < 0.15%), consideramos neutral
-    if ema50 == 0:
-        return "neutral"
-
-    rel_diff = abs(ema20 - ema50) / ema50
-    if rel_diff < 0.0015:
+    p = params or PARAMETROS_DEFAULT
+    features = calcular_features(candles, p)
+    if features is None:
         return "neutral"
-
-    # Detectar cruces recientes: comparar EMA20 respecto a EMA50 en el punto anterior
-    # para evitar señales cuando están cruzándose.
-    try:
-        ema20_prev = indicators.ema(closes[:-1], 20)
-        ema50_prev = indicators.ema(closes[:-1], 50)
-        crossing = (ema20_prev - ema50_prev) * (ema20 - ema50) < 0
-        if crossing:
-            return "neutral"
-    except Exception:
-        # Ignorar y continuar si no puede calcular previas
-        pass
-
-    return "alcista" if ema20 > ema50 else "bajista"
+    return _tendencia_desde_features(features, p.banda_neutral)
 
 
-def validar_volumen(candles: List[Dict], factor: float = 1.5, window: int = 20) -> bool:
+def validar_volumen(candles: Candles, factor: float = 1.5, window: int = 20) -> bool:
     """Valida si el volumen de la última vela supera el promedio de la ventana por un factor.
 
     Args:
@@ -90,7 +170,7 @@ def validar_volumen(candles: List[Dict], factor: float = 1.5, window: int = 20)
     return last_vol > avg_vol * float(factor)
 
 
-def validar_volatilidad(candles: List[Dict], length: int = 14) -> float:
+def validar_volatilidad(candles: Candles, length: int = 14) -> float:
     """Calcula el ATR para la serie de velas proporcionada.
 
     Devuelve un float con el ATR calculado usando `indicators.atr`.
@@ -106,7 +186,7 @@ def validar_volatilidad(candles: List[Dict], length: int = 14) -> float:
         return math.nan
 
 
-def generar_pre_senal(candles: List[Dict]) -> Optional[Dict]:
+def generar_pre_senal(candles: Candles, params: Optional[ParametrosEstrategia] = None) -> Optional[Dict]:
     """Genera una pre-señal basada en Tendencia + Volumen + ATR + condiciones sencillas.
 
     Reglas principales:
@@ -116,67 +196,328 @@ def generar_pre_senal(candles: List[Dict]) -> Optional[Dict]:
     - Para LONG: tendencia 'alcista' y cierre último > EMA20 y volumen válido
     - Para SHORT: tendencia 'bajista' y cierre último < EMA20 y volumen válido
 
-    Retorna un dict con keys: direction, entry_price, atr, timestamp, reason
-    o None si no hay setup válido.
+    Los periodos, la banda neutral y el factor de volumen salen de `params`
+    (por defecto `PARAMETROS_DEFAULT`, equivalente a las reglas anteriores).
+
+    Retorna un dict con keys: direction, entry_price, atr, timestamp,
+    razones (`reasons.Razon`) y volume_factor, o None si no hay setup válido.
     """
-    if not candles or len(candles) < 50:
+    features = calcular_features(candles, params) if candles else None
+    if features is None:
         return None
+    return generar_pre_senal_desde_features(features, params)
 
-    closes = _extract_series(candles, "close")
-    last = candles[-1]
-    last_close = float(last.get("close", 0.0))
-    timestamp = int(last.get("timestamp", 0))
 
-    tendencia = detectar_tendencia(candles)
+def generar_pre_senal_desde_features(features: Dict, params: Optional[ParametrosEstrategia] = None) -> Optional[Dict]:
+    """Mismas reglas que `generar_pre_senal` a partir de `calcular_features`."""
+    p = params or PARAMETROS_DEFAULT
+    tendencia = _tendencia_desde_features(features, p.banda_neutral)
     if tendencia == "neutral":
         return None
 
-    # calcular EMAs para decisiones
-    try:
-        ema20 = indicators.ema(closes, 20)
-        ema50 = indicators.ema(closes, 50)
-    except Exception:
+    avg_vol = features["vol_mean"]
+    last_vol = features["last_volume"]
+    volumen_ok = avg_vol > 0 and last_vol > avg_vol * float(p.factor_volumen)
+    factor = last_vol / avg_vol if volumen_ok else None
+
+    return _construir_pre_senal(
+        tendencia,
+        features["last_close"],
+        features["ema_fast"],
+        features["ema_slow"],
+        volumen_ok,
+        factor,
+        features["atr"],
+        features["timestamp"],
+    )
+
+
+_TENDENCIA_ALCISTA = int(Razon.TENDENCIA_ALCISTA)
+_TENDENCIA_BAJISTA = int(Razon.TENDENCIA_BAJISTA)
+_VOLUMEN_FUERTE = int(Razon.VOLUMEN_FUERTE)
+_EMAS_ALINEADAS = int(Razon.EMAS_ALINEADAS)
+_EMAS_SEPARADAS = int(Razon.EMAS_SEPARADAS)
+
+
+def _construir_pre_senal(
+    tendencia: str,
+    last_close: float,
+    ema_fast: float,
+    ema_slow: float,
+    volumen_ok: bool,
+    factor: Optional[float],
+    atr_val: float,
+    timestamp: int,
+) -> Optional[Dict]:
+    """Aplica las reglas LONG/SHORT sobre indicadores ya calculados."""
+    if not volumen_ok:
+        return None
+    if tendencia == "alcista" and last_close > ema_fast:
+        direction, razones = "LONG", _TENDENCIA_ALCISTA
+    elif tendencia == "bajista" and last_close < ema_fast:
+        direction, razones = "SHORT", _TENDENCIA_BAJISTA
+    else:
         return None
 
-    volumen_ok = validar_volumen(candles)
-    atr_val = validar_volatilidad(candles)
+    # Bits como int y una sola construcción de `Razon` (sus operadores son código Python).
+    razones |= _VOLUMEN_FUERTE
+    razones |= _EMAS_ALINEADAS if abs(ema_fast - ema_slow) / (abs(ema_slow) + 1e-9) < 0.01 else _EMAS_SEPARADAS
+    return {
+        "direction": direction,
+        "entry_price": float(last_close),
+        "atr": float(atr_val) if not math.isnan(atr_val) else None,
+        "timestamp": timestamp,
+        "razones": Razon(razones),
+        "volume_factor": float(factor),
+    }
+
+
+def _tendencias_batch(ind: Dict[str, np.ndarray], banda_neutral: float = 0.0015) -> np.ndarray:
+    """Versión vectorizada de las reglas de `detectar_tendencia` (array de str)."""
+    ema_fast = ind["ema_fast"]
+    ema_slow = ind["ema_slow"]
+    diff = ema_fast - ema_slow
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_diff = np.abs(diff) / ema_slow
+        crossing = (ind["ema_fast_prev"] - ind["ema_slow_prev"]) * diff < 0
+
+    neutral = np.isnan(ema_slow) | (ema_slow == 0) | ~(rel_diff >= banda_neutral) | crossing
+    out = np.where(diff > 0, "alcista", "bajista").astype(object)
+    out[neutral] = "neutral"
+    return out
+
+
+def detectar_tendencia_batch(
+    closes: Sequence[Sequence[float]], params: Optional[ParametrosEstrategia] = None
+) -> List[str]:
+    """Equivalente de `detectar_tendencia` para una matriz (símbolos x tiempo) de cierres.
+
+    Devuelve una tendencia por fila ('alcista' | 'bajista' | 'neutral').
+    """
+    p = params or PARAMETROS_DEFAULT
+    c = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_rows, n = c.shape
+    if n < p.ema_lenta:
+        return ["neutral"] * n_rows
+    fast = series.ema_series(c, p.ema_rapida)
+    slow = series.ema_series(c, p.ema_lenta)
+    ind = {
+        "ema_fast": fast[:, -1],
+        "ema_slow": slow[:, -1],
+        "ema_fast_prev": fast[:, -2],
+        "ema_slow_prev": slow[:, -2],
+    }
+    return _tendencias_batch(ind, p.banda_neutral).tolist()
+
+
+def generar_pre_senal_batch(
+    highs: Sequence[Sequence[float]],
+    lows: Sequence[Sequence[float]],
+    closes: Sequence[Sequence[float]],
+    volumes: Sequence[Sequence[float]],
+    timestamps: Optional[Sequence[int]] = None,
+    params: Optional[ParametrosEstrategia] = None,
+) -> List[Optional[Dict]]:
+    """Equivalente de `generar_pre_senal` para un universo de símbolos.
 
-    reasons: List[str] = []
-    reasons.append(f"tendencia {tendencia}")
+    Args:
+        highs, lows, closes, volumes: matrices (símbolos x tiempo) con la misma
+            ventana de velas para cada símbolo.
+        timestamps: timestamp de la última vela de cada símbolo (opcional).
+        params: parámetros de la estrategia (por defecto `PARAMETROS_DEFAULT`).
 
-    if volumen_ok:
-        # incluir factor aproximado de volumen
-        vols = _extract_series(candles, "volume")
-        avg_vol = sum(vols[-20:]) / min(20, len(vols))
-        factor = vols[-1] / avg_vol if avg_vol > 0 else 0.0
-        reasons.append(f"volumen x{factor:.2f}")
-    else:
-        reasons.append("volumen insuficiente")
+    Returns:
+        Lista con una pre-señal (dict) o None por símbolo, en el orden de las filas.
+    """
+    p = params or PARAMETROS_DEFAULT
+    c = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_rows, n = c.shape
+    if n < p.ema_lenta:
+        return [None] * n_rows
+
+    ind = series.indicadores_batch(
+        c, highs, lows, volumes,
+        ema_fast=p.ema_rapida,
+        ema_slow=p.ema_lenta,
+        atr_length=p.atr_length,
+        volume_window=p.ventana_volumen,
+    )
+    pres = pre_senales_desde_indicadores(ind, p, timestamps)
+    out: List[Optional[Dict]] = [None] * n_rows
+    for i, pre in pres.items():
+        out[i] = pre
+    return out
+
+
+def pre_senales_desde_indicadores(
+    ind: Dict[str, np.ndarray],
+    params: Optional[ParametrosEstrategia] = None,
+    timestamps: Optional[Sequence[int]] = None,
+) -> Dict[int, Dict]:
+    """Reglas de `generar_pre_senal` sobre arrays de indicadores (una posición por fila).
+
+    `ind` usa las claves de `series.indicadores_batch` (`ema_fast`, `ema_slow`,
+    `ema_fast_prev`, `ema_slow_prev`, `atr`, `vol_mean`, `close`, `volume`);
+    NaN en `ema_slow` marca filas sin datos suficientes.
 
-    reasons.append("EMA20/EMA50 alineadas" if abs(ema20 - ema50) / (abs(ema50) + 1e-9) < 0.01 else "EMA20/EMA50 separadas")
+    Returns:
+        Dict {fila: pre-señal} solo con las filas que generan setup.
+    """
+    p = params or PARAMETROS_DEFAULT
+    tendencias = _tendencias_batch(ind, p.banda_neutral)
+    last_close = ind["close"]
+    last_vol = ind["volume"]
+    avg_vol = ind["vol_mean"]
+    volumen_ok = (avg_vol > 0) & (last_vol > avg_vol * float(p.factor_volumen))
+
+    # Solo se construyen dicts para filas candidatas; el resto se descarta aquí.
+    candidatas = (volumen_ok & (
+        ((tendencias == "alcista") & (last_close > ind["ema_fast"]))
+        | ((tendencias == "bajista") & (last_close < ind["ema_fast"]))
+    )).nonzero()[0]
+
+    out: Dict[int, Dict] = {}
+    if not len(candidatas):
+        return out
+    # Columnas como listas de float: indexar arrays fila a fila crea escalares numpy.
+    closes, ema_fast, ema_slow, vols, medias, atrs = (
+        x.tolist() for x in (last_close, ind["ema_fast"], ind["ema_slow"], last_vol, avg_vol, ind["atr"])
+    )
+    for i in candidatas.tolist():
+        ts = int(timestamps[i]) if timestamps is not None else 0
+        out[i] = _construir_pre_senal(
+            tendencias[i],
+            closes[i],
+            ema_fast[i],
+            ema_slow[i],
+            True,
+            vols[i] / medias[i],
+            atrs[i],
+            ts,
+        )
+    return out
+
+
+def _matriz(columnas: Sequence) -> np.ndarray:
+    """Columnas de igual longitud como matriz (velas x filas), contigua por vela."""
+    if all(type(c) is memoryview and c.format == "d" for c in columnas):
+        # Vistas de `CandleWindow`: una sola copia en C en lugar de un array por fila.
+        m = np.frombuffer(b"".join(columnas), dtype=np.float64).reshape(len(columnas), -1)
+    else:
+        m = np.stack([np.asarray(c, dtype=np.float64) for c in columnas])
+    return np.ascontiguousarray(m.T)
 
-    # Setup LONG
-    if tendencia == "alcista" and last_close > ema20 and volumen_ok:
-        return {
-            "direction": "LONG",
-            "entry_price": float(last_close),
-            "atr": float(atr_val) if not math.isnan(atr_val) else None,
-            "timestamp": timestamp,
-            "reason": reasons,
-        }
 
-    # Setup SHORT
-    if tendencia == "bajista" and last_close < ema20 and volumen_ok:
-        return {
-            "direction": "SHORT",
-            "entry_price": float(last_close),
-            "atr": float(atr_val) if not math.isnan(atr_val) else None,
-            "timestamp": timestamp,
-            "reason": reasons,
-        }
+def _suma_filas(x: np.ndarray, inicio: int, fin: int) -> np.ndarray:
+    """`sum(serie[inicio:fin])` de cada serie (columna de `x`), en el mismo orden que `sum`."""
+    acc = x[inicio].copy()
+    for j in range(inicio + 1, fin):
+        acc += x[j]
+    return acc
 
-    return None
 
+def _features_filas(frames: Sequence[CandleFrame], p: ParametrosEstrategia) -> Dict[str, np.ndarray]:
+    """`calcular_features` de ventanas de igual longitud (>= EMA lenta), todas a la vez.
 
-__all__ = ["detectar_tendencia", "validar_volumen", "validar_volatilidad", "generar_pre_senal"]
+    Las recursiones avanzan una vela por paso sobre todas las ventanas con
+    las mismas operaciones que `calcular_features`, así que cada valor es
+    idéntico al escalar (no una aproximación como `series.indicadores_batch`).
+    """
+    fast, slow = p.ema_rapida, p.ema_lenta
+    atr_tail = p.atr_length + 1
+    c = _matriz([f.close for f in frames])
+    n = c.shape[0]
+
+    alpha_fast = 2.0 / (fast + 1)
+    alpha_slow = 2.0 / (slow + 1)
+    ema_fast = _suma_filas(c, 0, fast) / fast
+    for j in range(fast, slow):
+        ema_fast = (c[j] - ema_fast) * alpha_fast + ema_fast
+    ema_slow = _suma_filas(c, 0, slow) / slow
+    if n == slow:
+        ema_fast_prev = ema_slow_prev = np.full(len(frames), np.nan)
+    else:
+        # Las dos EMAs avanzan juntas (una fila cada una) y en sitio: tres
+        # operaciones por vela. `ema += d` es exacto igual que `d + ema`.
+        emas = np.stack([ema_fast, ema_slow])
+        alphas = np.array([[alpha_fast], [alpha_slow]])
+        d = np.empty_like(emas)
+        for j in range(slow, n):
+            if j == n - 1:
+                ema_fast_prev, ema_slow_prev = emas.copy()
+            np.subtract(c[j], emas, out=d)
+            d *= alphas
+            emas += d
+        ema_fast, ema_slow = emas
+
+    k = min(n, atr_tail)
+    h = _matriz([f.high[-k:] for f in frames])
+    l = _matriz([f.low[-k:] for f in frames])
+    prev = c[n - k:-1]
+    tr = np.maximum(np.maximum(h[1:] - l[1:], np.abs(h[1:] - prev)), np.abs(l[1:] - prev))
+    atr_len = p.atr_length
+    if len(tr) >= atr_len:
+        atr = _suma_filas(tr, len(tr) - atr_len, len(tr)) / atr_len
+    else:
+        atr = np.full(len(frames), np.nan)
+    # `max()` de Python y `np.maximum` difieren con NaN: esas ventanas van por el camino escalar.
+    finitas = np.isfinite(h).all(axis=0) & np.isfinite(l).all(axis=0) & np.isfinite(c[n - k:]).all(axis=0)
+
+    k = min(n, p.ventana_volumen)
+    v = _matriz([f.volume[-k:] for f in frames])
+    return {
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "ema_fast_prev": ema_fast_prev,
+        "ema_slow_prev": ema_slow_prev,
+        "atr": atr,
+        "vol_mean": _suma_filas(v, 0, k) / k,
+        "close": c[-1],
+        "volume": v[-1],
+        "finitas": finitas,
+    }
+
+
+def generar_pre_senal_ventanas(
+    frames: Sequence[Candles], params: Optional[ParametrosEstrategia] = None
+) -> List[Optional[Dict]]:
+    """`generar_pre_senal` de una ventana por símbolo, con el mismo resultado exacto.
+
+    Las ventanas de igual longitud se evalúan juntas (`_features_filas`):
+    el coste en Python es una pasada por vela de la ventana para todo el
+    grupo en lugar de una por símbolo. Las ventanas más cortas que la EMA
+    lenta dan None, como `generar_pre_senal`.
 
+    Returns:
+        Lista con una pre-señal (dict) o None por ventana, en el orden de `frames`.
+    """
+    p = params or PARAMETROS_DEFAULT
+    frames = [as_frame(f) for f in frames]
+    out: List[Optional[Dict]] = [None] * len(frames)
+    grupos: Dict[int, List[int]] = {}
+    for i, frame in enumerate(frames):
+        if len(frame) >= p.ema_lenta:
+            grupos.setdefault(len(frame), []).append(i)
+    for filas in grupos.values():
+        grupo = [frames[i] for i in filas]
+        ind = _features_filas(grupo, p)
+        timestamps = [int(f.timestamp[-1]) for f in grupo]
+        for j, pre in pre_senales_desde_indicadores(ind, p, timestamps).items():
+            out[filas[j]] = pre
+        for j in (~ind["finitas"]).nonzero()[0].tolist():
+            out[filas[j]] = generar_pre_senal(grupo[j], p)
+    return out
+
+
+__all__ = [
+    "calcular_features",
+    "detectar_tendencia",
+    "validar_volumen",
+    "validar_volatilidad",
+    "generar_pre_senal",
+    "generar_pre_senal_desde_features",
+    "detectar_tendencia_batch",
+    "generar_pre_senal_batch",
+    "pre_senales_desde_indicadores",
+    "generar_pre_senal_ventanas",
+]
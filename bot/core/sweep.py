@@ -0,0 +1,216 @@
+"""
+sweep.py
+Barrido de parámetros de la estrategia (grid o búsqueda aleatoria) sobre un
+`ProcessPoolExecutor`.
+
+Cada candidato (`ParametrosEstrategia`) se evalúa con un `BacktestEngine`
+completo sobre el mismo histórico. Las velas no viajan con cada tarea:
+
+- `FuenteKlines` apunta a un `KlineStore`; cada worker mapea los segmentos
+  en solo lectura y el sistema operativo comparte las páginas entre procesos.
+- Cualquier otra fuente (CandleFrame, registros `RECORD_DTYPE`, List[Dict])
+  se copia una vez a un bloque de `multiprocessing.shared_memory` al que
+  los workers se adjuntan en su inicializador.
+
+Por tarea solo se envían los parámetros y se devuelven las métricas, así
+que el coste de comunicación es despreciable frente al backtest y el
+barrido escala con el número de núcleos.
+
+Referencias: docs/04_Estrategia_Base.md, docs/08_Fases_de_Desarrollo.md
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from bot.core.backtest import BacktestEngine
+from bot.core.candle_frame import CandleFrame, as_frame
+from bot.core.params import ParametrosEstrategia
+from bot.data.kline_store import RECORD_DTYPE, KlineStore, records_to_frame, to_records
+
+
+@dataclass(frozen=True)
+class FuenteKlines:
+    """Histórico guardado en un `KlineStore` (rango [start, end) de open_time)."""
+
+    root: str
+    symbol: str
+    interval: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+    def cargar(self) -> CandleFrame:
+        return KlineStore(self.root).load(self.symbol, self.interval, self.start, self.end)
+
+
+Fuente = Union[FuenteKlines, CandleFrame, np.ndarray, List[Dict]]
+
+_CAMPOS = tuple(f.name for f in fields(ParametrosEstrategia))
+
+
+# ---------------------------------------------------------------------- candidatos
+def grid(**espacio: Sequence) -> List[ParametrosEstrategia]:
+    """Producto cartesiano de los valores dados; descarta combinaciones inválidas.
+
+    Ejemplo: grid(ema_rapida=[10, 20], ema_lenta=[50, 100], sl_atr_mult=[1.0, 1.5])
+    """
+    _check_campos(espacio)
+    nombres = list(espacio)
+    out = []
+    for valores in itertools.product(*(espacio[k] for k in nombres)):
+        try:
+            out.append(ParametrosEstrategia(**dict(zip(nombres, valores))))
+        except ValueError:
+            continue
+    return out
+
+
+def busqueda_aleatoria(espacio: Dict, n: int, seed: Optional[int] = None) -> List[ParametrosEstrategia]:
+    """`n` candidatos válidos y distintos muestreados de `espacio`.
+
+    Cada valor de `espacio` es una lista (se elige un elemento) o una tupla
+    `(min, max)`: entera si ambos extremos son int, uniforme float si no.
+    """
+    _check_campos(espacio)
+    rng = random.Random(seed)
+    vistos = set()
+    out: List[ParametrosEstrategia] = []
+    intentos = 0
+    while len(out) < n and intentos < 50 * n:
+        intentos += 1
+        valores = {}
+        for nombre, dominio in espacio.items():
+            if isinstance(dominio, tuple):
+                lo, hi = dominio
+                if isinstance(lo, int) and isinstance(hi, int):
+                    valores[nombre] = rng.randint(lo, hi)
+                else:
+                    valores[nombre] = rng.uniform(float(lo), float(hi))
+            else:
+                valores[nombre] = rng.choice(list(dominio))
+        try:
+            candidato = ParametrosEstrategia(**valores)
+        except ValueError:
+            continue
+        if candidato not in vistos:
+            vistos.add(candidato)
+            out.append(candidato)
+    return out
+
+
+def _check_campos(espacio: Dict) -> None:
+    desconocidos = set(espacio) - set(_CAMPOS)
+    if desconocidos:
+        raise ValueError(f"unknown parameters: {sorted(desconocidos)}")
+
+
+# ---------------------------------------------------------------------- workers
+# Estado por proceso: lo fija el inicializador y lo leen las tareas.
+_VELAS: Optional[CandleFrame] = None
+_SHM: Optional[shared_memory.SharedMemory] = None
+_AJUSTES: Dict = {}
+
+
+def _init_worker(fuente, n_registros: int, ajustes: Dict) -> None:
+    global _VELAS, _SHM, _AJUSTES
+    _AJUSTES = ajustes
+    if isinstance(fuente, FuenteKlines):
+        _VELAS = fuente.cargar()
+        return
+    # `fuente` es el nombre del bloque de memoria compartida.
+    _SHM = shared_memory.SharedMemory(name=fuente)
+    records = np.ndarray((n_registros,), dtype=RECORD_DTYPE, buffer=_SHM.buf)
+    _VELAS = records_to_frame(records)
+
+
+def _evaluar(params: ParametrosEstrategia, velas: CandleFrame, ajustes: Dict) -> Dict:
+    engine = BacktestEngine(
+        ajustes["configs"],
+        ajustes["estado_inicial"],
+        ventana=ajustes["ventana"],
+        usar_ballenas=ajustes["usar_ballenas"],
+        params=params,
+    )
+    res = engine.run(velas)
+    return {"params": params, "metricas": res["metricas"]}
+
+
+def _tarea(params: ParametrosEstrategia) -> Dict:
+    return _evaluar(params, _VELAS, _AJUSTES)
+
+
+# ---------------------------------------------------------------------- API
+def _registros(fuente) -> np.ndarray:
+    return to_records(fuente if isinstance(fuente, np.ndarray) else as_frame(fuente))
+
+
+def ejecutar_sweep(
+    fuente: Fuente,
+    candidatos: Iterable[ParametrosEstrategia],
+    configs: Dict,
+    estado_inicial: Optional[Dict] = None,
+    ventana: int = 200,
+    usar_ballenas: bool = True,
+    max_workers: Optional[int] = None,
+    metrica: str = "retorno_pct",
+    chunksize: Optional[int] = None,
+) -> List[Dict]:
+    """Backtest de cada candidato en paralelo; resultados ordenados por `metrica` (desc).
+
+    Args:
+        fuente: histórico (`FuenteKlines`, CandleFrame, registros o List[Dict]).
+        candidatos: parámetros a evaluar (ver `grid` y `busqueda_aleatoria`).
+        configs, estado_inicial, ventana, usar_ballenas: como en `BacktestEngine`.
+        max_workers: procesos (por defecto `os.cpu_count()`); 0 o 1 evalúa en
+            el proceso actual sin pool.
+        metrica: clave de `metricas` usada para ordenar.
+        chunksize: candidatos por envío al pool (por defecto ~4 lotes por worker).
+
+    Returns:
+        Lista de {"params": ParametrosEstrategia, "metricas": {...}}.
+    """
+    candidatos = list(candidatos)
+    ajustes = {
+        "configs": dict(configs),
+        "estado_inicial": dict(estado_inicial or {}),
+        "ventana": ventana,
+        "usar_ballenas": usar_ballenas,
+    }
+    workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    workers = min(workers, len(candidatos))
+
+    if workers <= 1:
+        velas = fuente.cargar() if isinstance(fuente, FuenteKlines) else records_to_frame(_registros(fuente))
+        resultados = [_evaluar(p, velas, ajustes) for p in candidatos]
+    else:
+        if chunksize is None:
+            chunksize = max(1, len(candidatos) // (workers * 4))
+        shm = None
+        try:
+            if isinstance(fuente, FuenteKlines):
+                initargs = (fuente, 0, ajustes)
+            else:
+                records = _registros(fuente)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, records.nbytes))
+                np.ndarray(records.shape, dtype=RECORD_DTYPE, buffer=shm.buf)[:] = records
+                initargs = (shm.name, len(records), ajustes)
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+                resultados = list(pool.map(_tarea, candidatos, chunksize=chunksize))
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    resultados.sort(key=lambda r: r["metricas"].get(metrica, 0.0), reverse=True)
+    return resultados
+
+
+__all__ = ["FuenteKlines", "grid", "busqueda_aleatoria", "ejecutar_sweep"]
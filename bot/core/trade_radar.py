@@ -0,0 +1,275 @@
+"""
+trade_radar.py
+Radar de ballenas a nivel de trade (stream aggTrade de Binance).
+
+Complementa a `whale_detector` (que trabaja con velas) con los umbrales de
+`configs/whales.json`:
+
+- `whale_trade_min_usdt`: trade individual con nocional >= umbral.
+- `fast_move_threshold_pct`: variación del precio en la ventana corta (5s).
+- `stop_hunt_wick_ratio`: mecha en la ventana corta >= ratio x cuerpo.
+- `volume_factor_threshold`: nocional de la ventana corta frente a su media
+  en la ventana larga (60s).
+- `squeeze_min_factor`: movimiento rápido con volumen >= factor y el flujo
+  agresor empujando en la dirección del movimiento.
+
+El tiempo se divide en buckets de `bucket_ms` guardados en arrays
+circulares preasignados (nocional comprador/vendedor, high/low/close por
+bucket). `on_trade` solo suma a los acumuladores del bucket actual y a las
+sumas móviles de ambas ventanas: O(1) y sin crear objetos por trade. Los
+flags se evalúan bajo demanda en `eventos()`, que devuelve el mismo dict
+que consume `signal_engine.analizar_ballenas`.
+
+Referencias: docs/06_Radar_de_Ballenas.md, docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from bot.core.whale_detector import clasificar_severidad
+
+_FLAGS = ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze")
+
+# Imbalance mínimo del flujo agresor para considerar un squeeze.
+_SQUEEZE_IMBALANCE = 0.5
+
+
+class TradeRadar:
+    """Detector de ballenas por trade para un símbolo (nocional en USDT)."""
+
+    __slots__ = (
+        "whale_min_usdt", "fast_move_pct", "stop_hunt_wick_ratio", "volume_factor", "squeeze_min_factor",
+        "bucket_ms", "_n", "_n_corto", "_buy", "_sell", "_high", "_low", "_close",
+        "_cur", "_slot", "_inicio", "_last", "trades",
+        "corto_buy", "corto_sell", "largo_buy", "largo_sell",
+        "_whale_ts", "_whale_value", "_whale_side",
+    )
+
+    def __init__(
+        self,
+        whale_min_usdt: float = 200_000.0,
+        fast_move_pct: float = 0.004,
+        stop_hunt_wick_ratio: float = 2.0,
+        volume_factor: float = 3.0,
+        squeeze_min_factor: float = 1.8,
+        ventana_corta_ms: int = 5_000,
+        ventana_larga_ms: int = 60_000,
+        bucket_ms: int = 100,
+    ):
+        if bucket_ms <= 0 or ventana_corta_ms < bucket_ms or ventana_larga_ms <= ventana_corta_ms:
+            raise ValueError("Require 0 < bucket_ms <= ventana_corta_ms < ventana_larga_ms")
+        self.whale_min_usdt = float(whale_min_usdt)
+        self.fast_move_pct = float(fast_move_pct)
+        self.stop_hunt_wick_ratio = float(stop_hunt_wick_ratio)
+        self.volume_factor = float(volume_factor)
+        self.squeeze_min_factor = float(squeeze_min_factor)
+        self.bucket_ms = bucket_ms
+        self._n_corto = ventana_corta_ms // bucket_ms
+        self._n = ventana_larga_ms // bucket_ms
+        zeros = bytes(8 * self._n)
+        self._buy = array("d", zeros)
+        self._sell = array("d", zeros)
+        self._high = array("d", zeros)
+        self._low = array("d", zeros)
+        self._close = array("d", zeros)
+        self._cur: Optional[int] = None
+        self._slot = 0
+        self._inicio = 0
+        self._last = math.nan
+        self.trades = 0
+        self.corto_buy = self.corto_sell = self.largo_buy = self.largo_sell = 0.0
+        self._whale_ts: Optional[int] = None
+        self._whale_value = 0.0
+        self._whale_side = ""
+
+    @classmethod
+    def desde_config(cls, whales: Dict, **kwargs) -> "TradeRadar":
+        """Crea el radar con las claves de `configs/whales.json`."""
+        return cls(
+            whale_min_usdt=whales.get("whale_trade_min_usdt", 200_000.0),
+            fast_move_pct=whales.get("fast_move_threshold_pct", 0.004),
+            stop_hunt_wick_ratio=whales.get("stop_hunt_wick_ratio", 2.0),
+            volume_factor=whales.get("volume_factor_threshold", 3.0),
+            squeeze_min_factor=whales.get("squeeze_min_factor", 1.8),
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------ buckets
+    def _avanzar(self, bucket: int) -> None:
+        """Abre los buckets hasta `bucket` retirando los que salen de cada ventana."""
+        n, n_corto = self._n, self._n_corto
+        if self._cur is None:
+            self._cur = bucket - 1
+            self._inicio = bucket
+        pasos = bucket - self._cur
+        if pasos >= n:
+            self._reset(bucket)
+            return
+        buy, sell, high, low, close = self._buy, self._sell, self._high, self._low, self._close
+        last = self._last
+        vuelta = False
+        for b in range(self._cur + 1, bucket + 1):
+            slot = b % n
+            # El hueco reciclado sale de la ventana larga; b - n_corto sale de la corta.
+            self.largo_buy -= buy[slot]
+            self.largo_sell -= sell[slot]
+            sale = (b - n_corto) % n
+            self.corto_buy -= buy[sale]
+            self.corto_sell -= sell[sale]
+            buy[slot] = sell[slot] = 0.0
+            high[slot] = low[slot] = close[slot] = last
+            vuelta = vuelta or slot == 0
+        self._cur = bucket
+        self._slot = bucket % n
+        if vuelta:
+            self._resincronizar()
+
+    def _reset(self, bucket: int) -> None:
+        last = self._last
+        for i in range(self._n):
+            self._buy[i] = self._sell[i] = 0.0
+            self._high[i] = self._low[i] = self._close[i] = last
+        self.corto_buy = self.corto_sell = self.largo_buy = self.largo_sell = 0.0
+        self._cur = bucket
+        self._slot = bucket % self._n
+        self._inicio = bucket
+
+    def _resincronizar(self) -> None:
+        """Recalcula las sumas móviles desde los buckets (acota el error de redondeo)."""
+        self.largo_buy = sum(self._buy)
+        self.largo_sell = sum(self._sell)
+        self.corto_buy = sum(self._ventana_corta(self._buy))
+        self.corto_sell = sum(self._ventana_corta(self._sell))
+
+    def _ventana_corta(self, columna: array) -> Iterable[float]:
+        n = self._n
+        return (columna[b % n] for b in range(self._cur - self._n_corto + 1, self._cur + 1))
+
+    # ------------------------------------------------------------------ hot path
+    def on_trade(self, price: float, qty: float, buyer_maker: bool, timestamp: int) -> None:
+        """Registra un trade. `buyer_maker=True` -> el agresor es vendedor (campo `m`)."""
+        bucket = timestamp // self.bucket_ms
+        if self._cur is None or bucket > self._cur:
+            self._avanzar(bucket)
+        slot = self._slot
+        notional = price * qty
+        if buyer_maker:
+            self._sell[slot] += notional
+            self.corto_sell += notional
+            self.largo_sell += notional
+        else:
+            self._buy[slot] += notional
+            self.corto_buy += notional
+            self.largo_buy += notional
+        if not (price <= self._high[slot]):
+            self._high[slot] = price
+        if not (price >= self._low[slot]):
+            self._low[slot] = price
+        self._close[slot] = price
+        self._last = price
+        self.trades += 1
+        if notional >= self.whale_min_usdt:
+            self._whale_ts = timestamp
+            self._whale_value = notional
+            self._whale_side = "SELL" if buyer_maker else "BUY"
+
+    def on_agg_trade(self, msg: Dict) -> None:
+        """Mensaje aggTrade de Binance (`p`, `q`, `m`, `T`; precios como str)."""
+        self.on_trade(float(msg["p"]), float(msg["q"]), bool(msg["m"]), int(msg["T"]))
+
+    def replay(self, trades: Iterable[Dict]) -> Dict:
+        """Reproduce mensajes aggTrade grabados y devuelve `eventos()` al final."""
+        on_trade = self.on_trade
+        for msg in trades:
+            on_trade(float(msg["p"]), float(msg["q"]), bool(msg["m"]), int(msg["T"]))
+        return self.eventos()
+
+    # ------------------------------------------------------------------ evaluación
+    @staticmethod
+    def _imbalance(buy: float, sell: float) -> float:
+        total = buy + sell
+        return (buy - sell) / total if total > 0 else 0.0
+
+    def eventos(self, timestamp: Optional[int] = None) -> Dict:
+        """Flags en el instante `timestamp` (por defecto, el último trade).
+
+        Returns:
+            Dict con `volume_spike`, `whale_trade`, `fast_move`, `stop_hunt`,
+            `squeeze`, `severity` y `razones` (formato de
+            `whale_detector.analizar_ballenas`) más métricas: `volume_factor`,
+            `imbalance_corto`, `imbalance_largo`, `large_trade_value`, `side`.
+        """
+        if timestamp is not None and self._cur is not None and timestamp // self.bucket_ms > self._cur:
+            self._avanzar(timestamp // self.bucket_ms)
+        n, n_corto = self._n, self._n_corto
+        cur = self._cur
+        eventos: Dict = {k: False for k in _FLAGS}
+        razones: List[str] = []
+        volume_factor = 0.0
+        if cur is None:
+            eventos.update(severity="low", razones=razones, volume_factor=0.0, imbalance_corto=0.0,
+                           imbalance_largo=0.0, large_trade_value=0.0, side="")
+            return eventos
+
+        # Volumen: nocional de la ventana corta frente a su media en la larga (ya completa).
+        corto = self.corto_buy + self.corto_sell
+        largo = self.largo_buy + self.largo_sell
+        if cur - self._inicio + 1 >= n and largo > 0:
+            volume_factor = corto / (largo * n_corto / n)
+            eventos["volume_spike"] = volume_factor >= self.volume_factor
+
+        whale = self._whale_ts is not None and self._whale_ts // self.bucket_ms > cur - n_corto
+        eventos["whale_trade"] = whale
+
+        # Precio en la ventana corta: referencia = cierre del bucket previo a la ventana.
+        ref = self._close[(cur - n_corto) % n]
+        last = self._last
+        hi = lo = last
+        for b in range(cur - n_corto + 1, cur + 1):
+            slot = b % n
+            if self._high[slot] > hi:
+                hi = self._high[slot]
+            if self._low[slot] < lo:
+                lo = self._low[slot]
+        move = (last - ref) / ref if ref > 0 and cur - self._inicio >= n_corto else 0.0
+        eventos["fast_move"] = abs(move) > self.fast_move_pct
+
+        if ref > 0 and cur - self._inicio >= n_corto:
+            cuerpo = abs(last - ref)
+            mecha = max(hi - max(ref, last), min(ref, last) - lo)
+            eventos["stop_hunt"] = (mecha > ref * self.fast_move_pct
+                                    and mecha >= self.stop_hunt_wick_ratio * cuerpo)
+
+        imb_corto = self._imbalance(self.corto_buy, self.corto_sell)
+        eventos["squeeze"] = (
+            eventos["fast_move"]
+            and volume_factor >= self.squeeze_min_factor
+            and imb_corto * move > 0
+            and abs(imb_corto) >= _SQUEEZE_IMBALANCE
+        )
+
+        if eventos["volume_spike"]:
+            razones.append(f"Volumen x{volume_factor:.1f} en {n_corto * self.bucket_ms // 1000}s")
+        if whale:
+            razones.append(f"Trade {self._whale_value / 1000:.0f}k {self._whale_side}")
+        if eventos["fast_move"]:
+            razones.append(f"Movimiento rápido {move * 100:+.2f}%")
+        if eventos["stop_hunt"]:
+            razones.append("Barrido de liquidez (mecha larga)")
+        if eventos["squeeze"]:
+            razones.append("Squeeze: flujo agresor + volumen")
+
+        eventos["severity"] = clasificar_severidad({k: eventos[k] for k in _FLAGS})
+        eventos["razones"] = razones
+        eventos["volume_factor"] = volume_factor
+        eventos["imbalance_corto"] = imb_corto
+        eventos["imbalance_largo"] = self._imbalance(self.largo_buy, self.largo_sell)
+        eventos["large_trade_value"] = self._whale_value if whale else 0.0
+        eventos["side"] = self._whale_side if whale else ""
+        return eventos
+
+
+__all__ = ["TradeRadar"]
@@ -0,0 +1,269 @@
+"""
+walk_forward.py
+Optimización walk-forward sobre la reproducción histórica de `backtest.py`.
+
+Para cada fold se eligen los mejores parámetros en una ventana in-sample
+(IS) y se evalúan sobre la ventana out-of-sample (OOS) siguiente; los folds
+avanzan `paso` velas hasta cubrir todo el histórico. Con OOS contiguos
+(`paso == out_of_sample`, por defecto) un único motor recorre todos los
+OOS cambiando solo los parámetros en cada fold: el estado de riesgo del
+día, el contador de operaciones y la posición abierta atraviesan los
+límites de fold, y la curva OOS encadenada es la de una reproducción
+continua. Con folds solapados o con huecos cada OOS es un backtest aparte
+(se cierra la posición al final) y solo el balance pasa al siguiente.
+
+Los indicadores de cada vela dependen solo de su ventana de `ventana`
+velas, no del fold, así que `FeatureCache` los calcula una única vez por
+combinación de periodos (EMA rápida/lenta, ATR, ventana de volumen) sobre
+todo el histórico y los folds los reutilizan:
+
+- indicadores por vela: una pasada de `strategy.calcular_features`;
+- pre-señales: reglas vectorizadas sobre esos arrays (por banda/factor);
+- ballenas: `whale_detector.analizar_ballenas` solo en las velas con
+  pre-señal, memorizado por vela.
+
+Con la caché, cada backtest IS/OOS se reduce a la simulación de
+posiciones, de modo que un walk-forward de 24 folds cuesta poco más que
+una pasada completa de indicadores.
+
+Referencias: docs/04_Estrategia_Base.md, docs/08_Fases_de_Desarrollo.md
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from bot.core import whale_detector
+from bot.core.backtest import BacktestEngine, calcular_metricas
+from bot.core.candle_frame import CandleFrame, Candles, as_frame
+from bot.core.params import PARAMETROS_DEFAULT, ParametrosEstrategia
+from bot.core.signal_engine import analizar_ballenas, generar_senal_desde_pre
+from bot.core.strategy import calcular_features, pre_senales_desde_indicadores
+
+_FEATURES = ("ema_fast", "ema_slow", "ema_fast_prev", "ema_slow_prev", "atr", "vol_mean")
+
+
+def _clave_indicadores(p: ParametrosEstrategia) -> Tuple:
+    return (p.ema_rapida, p.ema_lenta, p.atr_length, p.ventana_volumen)
+
+
+def _clave_pre(p: ParametrosEstrategia) -> Tuple:
+    return _clave_indicadores(p) + (p.banda_neutral, p.factor_volumen)
+
+
+class FeatureCache:
+    """Indicadores, pre-señales y ballenas por vela, calculados una vez por histórico."""
+
+    def __init__(self, candles: Candles, ventana: int = 200, usar_ballenas: bool = True):
+        frame = as_frame(candles)
+        # Columnas `array` nativas: las ventanas son memoryview de floats, como en vivo.
+        self.frame = CandleFrame(
+            *(array("d", np.asarray(getattr(frame, k), dtype=np.float64).tobytes())
+              for k in ("open", "high", "low", "close", "volume")),
+            array("q", np.asarray(frame.timestamp, dtype=np.int64).tobytes()),
+        )
+        self.ventana = ventana
+        self.usar_ballenas = usar_ballenas
+        self.pasadas = 0
+        self._indicadores: Dict[Tuple, Dict[str, np.ndarray]] = {}
+        self._pres: Dict[Tuple, Dict[int, Dict]] = {}
+        self._ballenas: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _vista(self, i: int) -> CandleFrame:
+        """La misma ventana que vería `BacktestEngine` al cerrar la vela `i`."""
+        return self.frame.slice(max(0, i + 1 - self.ventana), i + 1)
+
+    def indicadores(self, params: Optional[ParametrosEstrategia] = None) -> Dict[str, np.ndarray]:
+        """Arrays por vela con las claves de `series.indicadores_batch` (NaN sin datos)."""
+        p = params or PARAMETROS_DEFAULT
+        key = _clave_indicadores(p)
+        ind = self._indicadores.get(key)
+        if ind is None:
+            n = len(self.frame)
+            ind = {k: np.full(n, np.nan) for k in _FEATURES}
+            for i in range(p.ema_lenta - 1, n):
+                f = calcular_features(self._vista(i), p)
+                if f is None:
+                    continue
+                for k in _FEATURES:
+                    v = f[k]
+                    if v is not None:
+                        ind[k][i] = v
+            ind["close"] = np.asarray(self.frame.close)
+            ind["volume"] = np.asarray(self.frame.volume)
+            self._indicadores[key] = ind
+            self.pasadas += 1
+        return ind
+
+    def pre_senales(self, params: Optional[ParametrosEstrategia] = None) -> Dict[int, Dict]:
+        """Pre-señales {vela: dict} de `generar_pre_senal` para todo el histórico."""
+        p = params or PARAMETROS_DEFAULT
+        key = _clave_pre(p)
+        pres = self._pres.get(key)
+        if pres is None:
+            pres = pre_senales_desde_indicadores(self.indicadores(p), p, self.frame.timestamp)
+            self._pres[key] = pres
+        return pres
+
+    def ballenas(self, i: int) -> Dict:
+        """`analizar_ballenas` de la vela `i` (memorizado)."""
+        res = self._ballenas.get(i)
+        if res is None:
+            eventos = whale_detector.analizar_ballenas(self._vista(i)) if self.usar_ballenas else None
+            res = analizar_ballenas(eventos or {})
+            self._ballenas[i] = res
+        return res
+
+
+class _BacktestCacheado(BacktestEngine):
+    """`BacktestEngine` que toma pre-señales y ballenas de un `FeatureCache`."""
+
+    def __init__(self, cache: FeatureCache, configs: Dict, estado_inicial: Optional[Dict], params: ParametrosEstrategia):
+        super().__init__(configs, estado_inicial, ventana=1, usar_ballenas=cache.usar_ballenas, params=params)
+        self._cache = cache
+        self._pres = cache.pre_senales(params)
+        self._i = 0
+
+    def usar_params(self, params: ParametrosEstrategia) -> None:
+        """Cambia los parámetros de las próximas entradas (la posición abierta sigue con los suyos)."""
+        self.params = params
+        self._pres = self._cache.pre_senales(params)
+
+    def _evaluar(self) -> Optional[Dict]:
+        pre = self._pres.get(self._i)
+        if pre is None:
+            return None
+        return generar_senal_desde_pre(pre, self.estado_riesgo, self.configs, self._cache.ballenas(self._i), self.params)
+
+    def run_rango(self, inicio: int, fin: int, finalizar: bool = True) -> Dict:
+        """Simula las velas [inicio, fin) con el historial previo como contexto.
+
+        Con `finalizar=False` la posición abierta queda abierta para continuar
+        con otra llamada desde `fin`.
+        """
+        frame = self._cache.frame
+        high, low, close, ts = frame.high, frame.low, frame.close, frame.timestamp
+        for i in range(inicio, fin):
+            self._i = i
+            self._procesar(high[i], low[i], close[i], ts[i])
+        if finalizar and fin > inicio:
+            self._finalizar(close[fin - 1], ts[fin - 1])
+        return self.resultado()
+
+
+def backtest_rango(
+    cache: FeatureCache,
+    params: ParametrosEstrategia,
+    configs: Dict,
+    estado_inicial: Optional[Dict] = None,
+    inicio: int = 0,
+    fin: Optional[int] = None,
+) -> Dict:
+    """Backtest de las velas [inicio, fin) reutilizando la caché (mismo formato que `ejecutar_backtest`)."""
+    fin = len(cache) if fin is None else fin
+    return _BacktestCacheado(cache, configs, estado_inicial, params).run_rango(inicio, fin)
+
+
+def walk_forward(
+    candles: Candles,
+    candidatos: Iterable[ParametrosEstrategia],
+    configs: Dict,
+    in_sample: int,
+    out_of_sample: int,
+    estado_inicial: Optional[Dict] = None,
+    paso: Optional[int] = None,
+    ventana: int = 200,
+    usar_ballenas: bool = True,
+    metrica: str = "retorno_pct",
+    cache: Optional[FeatureCache] = None,
+) -> Dict:
+    """Walk-forward: optimiza en IS, evalúa en el OOS siguiente y avanza `paso` velas.
+
+    Args:
+        candles: histórico completo del símbolo.
+        candidatos: parámetros a comparar en cada ventana IS.
+        in_sample, out_of_sample: tamaño de las ventanas en velas.
+        paso: avance entre folds (por defecto `out_of_sample`, OOS contiguos).
+        metrica: clave de `metricas` maximizada en IS (empate -> primer candidato).
+        cache: `FeatureCache` existente para reutilizar entre llamadas.
+
+    Returns:
+        {"folds": [{"inicio", "fin_is", "fin_oos", "params", "metricas_is",
+                    "metricas_oos"}, ...],
+         "trades": [...OOS...], "equity": array('d') OOS encadenada,
+         "metricas": métricas OOS agregadas}
+    """
+    if in_sample <= 0 or out_of_sample <= 0:
+        raise ValueError("in_sample and out_of_sample must be > 0")
+    candidatos = list(candidatos)
+    if not candidatos:
+        raise ValueError("candidatos must not be empty")
+    cache = cache or FeatureCache(candles, ventana, usar_ballenas)
+    paso = paso or out_of_sample
+    n = len(cache)
+
+    estado_is = dict(estado_inicial or {})
+    estado_oos = dict(estado_is)
+    estado_oos.setdefault("balance", 1000.0)
+    balance_inicial = float(estado_oos["balance"])
+    continuo = paso == out_of_sample
+
+    folds: List[Dict] = []
+    trades: List[Dict] = []
+    equity = array("d")
+    oos: Optional[_BacktestCacheado] = None
+    for inicio in range(0, n - in_sample, paso):
+        fin_is = inicio + in_sample
+        fin_oos = min(n, fin_is + out_of_sample)
+        mejor = None
+        for params in candidatos:
+            m = backtest_rango(cache, params, configs, estado_is, inicio, fin_is)["metricas"]
+            if mejor is None or m.get(metrica, 0.0) > mejor[1].get(metrica, 0.0):
+                mejor = (params, m)
+
+        if oos is None or not continuo:
+            oos = _BacktestCacheado(cache, configs, estado_oos, mejor[0])
+        else:
+            oos.usar_params(mejor[0])
+        n_trades, n_equity = len(oos.trades), len(oos.equity)
+        balance_fold = float(oos.estado_riesgo["balance"])
+        # El último OOS contiguo termina en `n`; solo entonces (o sin continuidad) se cierra la posición.
+        oos.run_rango(fin_is, fin_oos, finalizar=not continuo or fin_oos >= n)
+        estado_oos = dict(oos.estado_riesgo)
+        res = {"trades": oos.trades[n_trades:], "equity": oos.equity[n_equity:]}
+        res["metricas"] = calcular_metricas(res["trades"], res["equity"], balance_fold, float(estado_oos["balance"]))
+        trades.extend(res["trades"])
+        equity.extend(res["equity"])
+        folds.append({
+            "inicio": inicio,
+            "fin_is": fin_is,
+            "fin_oos": fin_oos,
+            "params": mejor[0],
+            "metricas_is": mejor[1],
+            "metricas_oos": res["metricas"],
+        })
+
+    return {
+        "folds": folds,
+        "trades": trades,
+        "equity": equity,
+        "metricas": calcular_metricas(trades, equity, balance_inicial, float(estado_oos["balance"])),
+    }
+
+
+def walk_forward_simbolos(historicos: Dict[str, Candles], candidatos: Iterable[ParametrosEstrategia], configs: Dict, **kwargs) -> Dict[str, Dict]:
+    """`walk_forward` por símbolo; `configs["symbol"]` se fija a cada clave de `historicos`."""
+    candidatos = list(candidatos)
+    return {
+        symbol: walk_forward(candles, candidatos, {**configs, "symbol": symbol}, **kwargs)
+        for symbol, candles in historicos.items()
+    }
+
+
+__all__ = ["FeatureCache", "backtest_rango", "walk_forward", "walk_forward_simbolos"]
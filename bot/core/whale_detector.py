@@ -3,7 +3,11 @@ whale_detector.py
 
 Detección de actividad de ballenas y manipulación de mercado a partir
 de velas recientes. Funciones puras, sin dependencias externas, diseñadas
-para integrarse con `signal_engine.py`.
+para integrarse con `signal_engine.py`. Aceptan `CandleFrame` o la forma
+`List[Dict]` (convertida vía `as_frame`, solo la cola necesaria). Un valor no
+numérico llega como NaN: dentro de una media cuenta como 0.0 y en la vela
+evaluada hace que el detector devuelva False, como el `float()` fallido de
+la versión original sobre dicts.
 
 Salida estructurada esperada por `signal_engine`: dict con flags booleanos,
 `severity` y `razones` (lista de strings legibles).
@@ -11,82 +15,77 @@ Salida estructurada esperada por `signal_engine`: dict con flags booleanos,
 
 from __future__ import annotations
 
-from typing import Dict, List
+from collections import deque
+from typing import Deque, Dict, List
 
+from bot.core.candle_frame import Candles, as_frame
 
-def _safe_last(candles: List[Dict], idx: int = -1) -> Dict:
-    if not candles:
-        return {}
-    try:
-        return dict(candles[idx])
-    except Exception:
-        return dict(candles[-1])
+# Velas que necesita `analizar_ballenas` con las ventanas por defecto (squeeze: 30 + 1).
+_LOOKBACK = 31
 
+_FLAGS = ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze")
+_RAZONES = {
+    "volume_spike": "Volumen extremo detectado",
+    "whale_trade": "Cuerpo de vela anómalo / orden grande",
+    "fast_move": "Movimiento rápido de precio",
+    "stop_hunt": "Mecha larga detectada (stop hunt)",
+    "squeeze": "Compresión + expansión detectada (squeeze)",
+    "spoofing": "Muro retirado del orderbook (spoofing)",
+}
+_TEXTOS_FLAGS = tuple(_RAZONES[k] for k in _FLAGS)
 
-def detectar_volumen_extremo(candles: List[Dict], factor: float = 2.0, window: int = 20) -> bool:
+
+def _media(valores) -> float:
+    """`sum / len` de una ventana; los NaN (valores no numéricos) cuentan como 0.0."""
+    media = sum(valores) / len(valores)
+    if media != media:
+        media = sum(x for x in valores if x == x) / len(valores)
+    return media
+
+
+def detectar_volumen_extremo(candles: Candles, factor: float = 2.0, window: int = 20) -> bool:
     """Detecta un spike de volumen contra el promedio de las últimas N velas.
 
     - Si hay menos de `window` velas devuelve False.
     - No modifica `candles`.
     """
-    if not candles or len(candles) < window:
+    frame = as_frame(candles, tail=window)
+    if len(frame) < window or window <= 0:
         return False
-    vols = []
-    # use last `window` volumes
-    for c in candles[-window:]:
-        v = c.get("volume")
-        try:
-            vols.append(float(v))
-        except Exception:
-            vols.append(0.0)
-    if not vols:
-        return False
-    avg = sum(vols) / len(vols)
+    vols = frame.volume
+    avg = _media(vols)
     # current volume = last candle volume
-    last_v = candles[-1].get("volume")
-    try:
-        last_v = float(last_v)
-    except Exception:
-        return False
-    return last_v > (avg * factor)
+    return vols[-1] > (avg * factor)
 
 
-def detectar_fast_move(candles: List[Dict], threshold_pct: float = 0.01) -> bool:
+def detectar_fast_move(candles: Candles, threshold_pct: float = 0.01) -> bool:
     """Detecta movimientos rápidos comparando el último cierre con el anterior.
 
     - threshold_pct: por ejemplo 0.01 = 1%
     - Devuelve False si no hay suficientes velas.
     """
-    if not candles or len(candles) < 2:
-        return False
-    last = candles[-1]
-    prev = candles[-2]
-    try:
-        close_last = float(last.get("close", 0.0))
-        close_prev = float(prev.get("close", 0.0))
-    except Exception:
+    frame = as_frame(candles, tail=2)
+    if len(frame) < 2:
         return False
+    close_prev, close_last = frame.close[0], frame.close[1]
     if close_prev == 0:
         return False
     delta = close_last - close_prev
     return abs(delta / close_prev) > abs(threshold_pct)
 
 
-def detectar_stop_hunt(candles: List[Dict], factor: float = 1.5) -> bool:
+def detectar_stop_hunt(candles: Candles, factor: float = 1.5) -> bool:
     """Detecta mechas largas (colas) en la última vela que sugieran stop-hunt.
 
     - Calcula wick superior/inferior usando `close` como referencia según la especificación.
     - Devuelve False si no hay velas.
     """
-    if not candles:
-        return False
-    last = _safe_last(candles)
-    try:
-        high = float(last.get("high", 0.0))
-        low = float(last.get("low", 0.0))
-        close = float(last.get("close", 0.0))
-    except Exception:
+    frame = as_frame(candles, tail=1)
+    if len(frame) < 1:
         return False
+    high = frame.high[-1]
+    low = frame.low[-1]
+    close = frame.close[-1]
     candle_range = high - low
     if candle_range <= 0:
         return False
@@ -97,7 +96,7 @@ def detectar_stop_hunt(candles: List[Dict], factor: float = 1.5) -> bool:
     return (upper_wick > threshold) or (lower_wick > threshold)
 
 
-def detectar_squeeze(candles: List[Dict], window: int = 30) -> bool:
+def detectar_squeeze(candles: Candles, window: int = 30) -> bool:
     """Detecta compresión de volatilidad seguida de expansión (squeeze).
 
     Implementación pragmática:
@@ -107,26 +106,15 @@ def detectar_squeeze(candles: List[Dict], window: int = 30) -> bool:
     - Expande si el último rango supera `1.5 * avg_hist`.
     - Devuelve True si hay compresión + expansión.
     """
-    if not candles or len(candles) < (window + 1):
+    frame = as_frame(candles, tail=window + 1)
+    if len(frame) < (window + 1) or window <= 0:
         return False
+    highs = frame.high
+    lows = frame.low
     # compute hist ranges using the `window` candles immediately before the last candle
-    start = - (window + 1)
-    hist_slice = candles[start:-1]
-    ranges_hist = []
-    for c in hist_slice:
-        try:
-            ranges_hist.append(float(c.get("high", 0.0)) - float(c.get("low", 0.0)))
-        except Exception:
-            ranges_hist.append(0.0)
-    if not ranges_hist:
-        return False
-    avg_hist = sum(ranges_hist) / len(ranges_hist)
-    # last range
-    last = _safe_last(candles)
-    try:
-        last_range = float(last.get("high", 0.0)) - float(last.get("low", 0.0))
-    except Exception:
-        return False
+    ranges_hist = [highs[i] - lows[i] for i in range(window)]
+    avg_hist = _media(ranges_hist)
+    last_range = highs[window] - lows[window]
 
     # Compressed: average historic range is relatively small in absolute terms
     compressed = avg_hist < 1.0
@@ -135,24 +123,20 @@ def detectar_squeeze(candles: List[Dict], window: int = 30) -> bool:
     return compressed and expanded
 
 
-def detectar_whale_trade(candles: List[Dict], trade_factor: float = 3.0, window: int = 20) -> bool:
+def detectar_whale_trade(candles: Candles, trade_factor: float = 3.0, window: int = 20) -> bool:
     """Detecta posibles órdenes grandes usando el cuerpo de la vela como proxy.
 
     - body = abs(close - open)
     - compara el cuerpo de la última vela contra el promedio de cuerpos en la ventana
     - requiere al menos `window` velas
     """
-    if not candles or len(candles) < window:
+    frame = as_frame(candles, tail=window)
+    if len(frame) < window or window <= 0:
         return False
-    bodies = []
-    for c in candles[-window:]:
-        try:
-            bodies.append(abs(float(c.get("close", 0.0)) - float(c.get("open", 0.0))))
-        except Exception:
-            bodies.append(0.0)
-    if not bodies:
-        return False
-    avg = sum(bodies) / len(bodies)
+    closes = frame.close
+    opens = frame.open
+    bodies = [abs(closes[i] - opens[i]) for i in range(window)]
+    avg = _media(bodies)
     last_body = bodies[-1]
     return last_body > (avg * trade_factor)
 
@@ -175,9 +159,13 @@ def clasificar_severidad(eventos: Dict[str, bool]) -> str:
     return "low"
 
 
-def analizar_ballenas(candles: List[Dict]) -> Dict:
+def analizar_ballenas(candles: Candles, orderbook=None) -> Dict:
     """Analiza velas y devuelve dict estructurado con flags, severity y razones.
 
+    Con `orderbook` (un `bot.data.order_book.OrderBook` sincronizado) se
+    añaden `orderbook_wall` (informativo) y `spoofing`, que cuenta para la
+    severidad.
+
     Output example:
     {
         "volume_spike": True/False,
@@ -189,36 +177,314 @@ def analizar_ballenas(candles: List[Dict]) -> Dict:
         "razones": [ ... ]
     }
     """
-    # Non-destructive: do not mutate `candles`
+    # Non-destructive: do not mutate `candles`. La forma dict se convierte
+    # una sola vez (solo la cola que usan los detectores).
+    frame = as_frame(candles, tail=_LOOKBACK)
     eventos: Dict[str, bool] = {}
-    eventos["volume_spike"] = detectar_volumen_extremo(candles)
-    eventos["whale_trade"] = detectar_whale_trade(candles)
-    eventos["fast_move"] = detectar_fast_move(candles)
-    eventos["stop_hunt"] = detectar_stop_hunt(candles)
-    eventos["squeeze"] = detectar_squeeze(candles)
-
-    severity = clasificar_severidad({
-        k: eventos[k] for k in ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze")
-    })
-
-    razones: List[str] = []
-    if eventos.get("volume_spike"):
-        razones.append("Volumen extremo detectado")
-    if eventos.get("whale_trade"):
-        razones.append("Cuerpo de vela anómalo / orden grande")
-    if eventos.get("fast_move"):
-        razones.append("Movimiento rápido de precio")
-    if eventos.get("stop_hunt"):
-        razones.append("Mecha larga detectada (stop hunt)")
-    if eventos.get("squeeze"):
-        razones.append("Compresión + expansión detectada (squeeze)")
+    eventos["volume_spike"] = detectar_volumen_extremo(frame)
+    eventos["whale_trade"] = detectar_whale_trade(frame)
+    eventos["fast_move"] = detectar_fast_move(frame)
+    eventos["stop_hunt"] = detectar_stop_hunt(frame)
+    eventos["squeeze"] = detectar_squeeze(frame)
+    if orderbook is None:
+        return _resultado(eventos)
+
+    libro = orderbook.eventos()
+    eventos["spoofing"] = libro["spoofing"]
+    out = _resultado(eventos, _FLAGS + ("spoofing",))
+    out["orderbook_wall"] = libro["orderbook_wall"]
+    out["muros"] = libro["muros"]
+    return out
 
+
+def _resultado(eventos: Dict[str, bool], flags=_FLAGS) -> Dict:
+    """Salida de `analizar_ballenas`: flags + `severity` + `razones`."""
     out = dict(eventos)
-    out["severity"] = severity
+    razones = [_RAZONES[k] for k in flags if eventos.get(k)]
+    # Misma regla que `clasificar_severidad` sobre `flags`, sin el dict intermedio.
+    n = len(razones)
+    out["severity"] = "high" if n >= 3 else ("medium" if n == 2 else "low")
     out["razones"] = razones
     return out
 
 
+def _suma_movil_exacta(x, window: int):
+    """Suma de cada ventana de `window` valores en el orden de `sum()` (izquierda a derecha).
+
+    Se acumula desplazamiento a desplazamiento para que cada resultado sea
+    idéntico al `sum(...)` que usan los detectores, no solo aproximado.
+    """
+    import numpy as np
+
+    m = len(x) - window + 1
+    acc = np.zeros(m)
+    for j in range(window):
+        acc += x[j:j + m]
+    return acc
+
+
+def _sin_nan(x):
+    """`x` con los NaN a 0.0 (como `_media`); sin copia si no hay ninguno."""
+    import numpy as np
+
+    nan = np.isnan(x)
+    return np.where(nan, 0.0, x) if nan.any() else x
+
+
+def analizar_ballenas_batch(
+    candles: Candles,
+    volume_factor: float = 2.0,
+    volume_window: int = 20,
+    trade_factor: float = 3.0,
+    body_window: int = 20,
+    fast_move_pct: float = 0.01,
+    stop_hunt_factor: float = 1.5,
+    squeeze_window: int = 30,
+) -> Dict:
+    """`analizar_ballenas` para todas las velas del histórico en una pasada vectorizada.
+
+    El elemento `i` de cada columna es lo que devolvería
+    `analizar_ballenas(candles[: i + 1])` con los umbrales por defecto de
+    cada detector (mismas operaciones, mismo orden de suma).
+
+    Returns:
+        Dict de arrays NumPy alineados con las velas: `volume_spike`,
+        `whale_trade`, `fast_move`, `stop_hunt`, `squeeze` (bool),
+        `n_flags` (int8) y `severity` ('low' | 'medium' | 'high').
+    """
+    import numpy as np
+
+    cols = as_frame(candles).to_numpy()
+    o = cols["open"].astype(np.float64, copy=False)
+    h = cols["high"].astype(np.float64, copy=False)
+    l = cols["low"].astype(np.float64, copy=False)
+    c = cols["close"].astype(np.float64, copy=False)
+    v = cols["volume"].astype(np.float64, copy=False)
+    n = len(c)
+
+    volume_spike = np.zeros(n, dtype=bool)
+    if 0 < volume_window <= n:
+        avg = _suma_movil_exacta(_sin_nan(v), volume_window) / volume_window
+        volume_spike[volume_window - 1:] = v[volume_window - 1:] > avg * volume_factor
+
+    whale_trade = np.zeros(n, dtype=bool)
+    if 0 < body_window <= n:
+        bodies = np.abs(c - o)
+        avg = _suma_movil_exacta(_sin_nan(bodies), body_window) / body_window
+        whale_trade[body_window - 1:] = bodies[body_window - 1:] > avg * trade_factor
+
+    fast_move = np.zeros(n, dtype=bool)
+    if n >= 2:
+        prev = c[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cambio = np.abs((c[1:] - prev) / prev)
+        fast_move[1:] = (prev != 0) & (cambio > abs(fast_move_pct))
+
+    rango = h - l
+    threshold = rango * stop_hunt_factor * 0.5
+    stop_hunt = (rango > 0) & (((h - c) > threshold) | ((c - l) > threshold))
+
+    squeeze = np.zeros(n, dtype=bool)
+    if 0 < squeeze_window < n:
+        # Media de las `squeeze_window` velas previas a cada vela.
+        avg_hist = _suma_movil_exacta(_sin_nan(rango[:-1]), squeeze_window) / squeeze_window
+        last = rango[squeeze_window:]
+        squeeze[squeeze_window:] = (avg_hist < 1.0) & (avg_hist > 0) & (last > avg_hist * 1.5)
+
+    n_flags = (volume_spike.astype(np.int8) + whale_trade + fast_move + stop_hunt + squeeze).astype(np.int8)
+    severity = np.where(n_flags >= 3, "high", np.where(n_flags == 2, "medium", "low"))
+    return {
+        "volume_spike": volume_spike,
+        "whale_trade": whale_trade,
+        "fast_move": fast_move,
+        "stop_hunt": stop_hunt,
+        "squeeze": squeeze,
+        "n_flags": n_flags,
+        "severity": severity,
+    }
+
+
+# Cada cuántas velas se recalculan las sumas móviles desde cero (acota el error acumulado).
+_REFRESCO = 1024
+# Margen relativo bajo el cual una comparación se repite con la media exacta.
+_MARGEN = 1e-9
+
+
+class _SumaMovil:
+    """Suma de los últimos `length` valores en O(1), con la media exacta bajo demanda."""
+
+    __slots__ = ("values", "total", "_cota", "_ops")
+
+    def __init__(self, length: int):
+        self.values: Deque[float] = deque(maxlen=length)
+        self.total = 0.0
+        self._cota = 0.0
+        self._ops = 0
+
+    def push(self, x: float) -> None:
+        if x != x:
+            x = 0.0  # NaN cuenta como 0.0, igual que en `_media`
+        values = self.values
+        if len(values) == values.maxlen:
+            self.total -= values[0]
+        values.append(x)
+        self.total += x
+        self._ops += 1
+        if self._ops >= _REFRESCO:
+            self.total = sum(values)
+            self._ops = 0
+            self._cota = abs(self.total)
+        elif abs(self.total) > self._cota:
+            self._cota = abs(self.total)
+
+    def llena(self) -> bool:
+        return len(self.values) == self.values.maxlen
+
+    def media(self) -> float:
+        return self.total / len(self.values)
+
+    def media_exacta(self) -> float:
+        """Misma expresión que los detectores (`sum(...) / len(...)`)."""
+        return sum(self.values) / len(self.values)
+
+    def margen(self) -> float:
+        """Cota (holgada) del error de `media()` respecto a `media_exacta()`."""
+        return _MARGEN * self._cota / len(self.values) + 1e-300
+
+
+def _supera(valor: float, suma: _SumaMovil, factor: float) -> bool:
+    """`valor > media * factor` con el mismo resultado que sobre la media exacta."""
+    # `media()` y `margen()` en línea: se llama dos veces por vela y símbolo.
+    n = len(suma.values)
+    umbral = suma.total / n * factor
+    if abs(valor - umbral) <= (_MARGEN * suma._cota / n + 1e-300) * abs(factor):
+        umbral = suma.media_exacta() * factor
+    return valor > umbral
+
+
+class WhaleRadar:
+    """Radar de ballenas con estado para un símbolo: los cinco detectores en O(1) por vela.
+
+    Mantiene sumas móviles de volumen, cuerpo y rango compartidas por los
+    detectores, de modo que `update` devuelve lo mismo que
+    `analizar_ballenas` sobre las velas recibidas hasta ese momento sin
+    recorrer ninguna ventana. Las comparaciones que caen a menos del error
+    acumulado de las sumas se repiten con la media exacta.
+    """
+
+    __slots__ = (
+        "volume_factor", "trade_factor", "fast_move_pct", "stop_hunt_factor",
+        "_volumenes", "_cuerpos", "_rangos", "_ultimo_rango", "_prev_close", "ultimo",
+    )
+
+    def __init__(
+        self,
+        volume_window: int = 20,
+        volume_factor: float = 2.0,
+        body_window: int = 20,
+        trade_factor: float = 3.0,
+        squeeze_window: int = 30,
+        fast_move_pct: float = 0.01,
+        stop_hunt_factor: float = 1.5,
+    ):
+        if volume_window <= 0 or body_window <= 0 or squeeze_window <= 0:
+            raise ValueError("windows must be > 0")
+        self.volume_factor = volume_factor
+        self.trade_factor = trade_factor
+        self.fast_move_pct = fast_move_pct
+        self.stop_hunt_factor = stop_hunt_factor
+        self._volumenes = _SumaMovil(volume_window)
+        self._cuerpos = _SumaMovil(body_window)
+        # Rangos de las velas previas a la última (la ventana histórica del squeeze).
+        self._rangos = _SumaMovil(squeeze_window)
+        self._ultimo_rango = None
+        self._prev_close = None
+        self.ultimo: Dict = _resultado({k: False for k in _FLAGS})
+
+    def update(self, open: float, high: float, low: float, close: float, volume: float) -> Dict:
+        """Añade una vela cerrada y devuelve el análisis (formato de `analizar_ballenas`)."""
+        rango = high - low
+        if self._ultimo_rango is not None:
+            self._rangos.push(self._ultimo_rango)
+        self._ultimo_rango = rango
+        self._volumenes.push(volume)
+        body = abs(close - open)
+        self._cuerpos.push(body)
+
+        volumenes, cuerpos = self._volumenes, self._cuerpos
+        volume_spike = (len(volumenes.values) == volumenes.values.maxlen
+                        and _supera(volume, volumenes, self.volume_factor))
+        whale_trade = (len(cuerpos.values) == cuerpos.values.maxlen
+                       and _supera(body, cuerpos, self.trade_factor))
+
+        prev = self._prev_close
+        fast_move = prev is not None and prev != 0 and abs((close - prev) / prev) > abs(self.fast_move_pct)
+        self._prev_close = close
+
+        if rango <= 0:
+            stop_hunt = False
+        else:
+            threshold = rango * self.stop_hunt_factor * 0.5
+            stop_hunt = (high - close) > threshold or (close - low) > threshold
+
+        rangos = self._rangos
+        squeeze = len(rangos.values) == rangos.values.maxlen and self._squeeze(rango)
+
+        # `_resultado` en línea: se llama por cada vela cerrada de cada símbolo.
+        razones = [texto for texto, activo in zip(_TEXTOS_FLAGS, (volume_spike, whale_trade, fast_move,
+                                                                   stop_hunt, squeeze)) if activo]
+        n = len(razones)
+        self.ultimo = {
+            "volume_spike": volume_spike,
+            "whale_trade": whale_trade,
+            "fast_move": fast_move,
+            "stop_hunt": stop_hunt,
+            "squeeze": squeeze,
+            "severity": "high" if n >= 3 else ("medium" if n == 2 else "low"),
+            "razones": razones,
+        }
+        return self.ultimo
+
+    def _squeeze(self, last_range: float) -> bool:
+        rangos = self._rangos
+        avg_hist = rangos.media()
+        margen = rangos.margen()
+        if (abs(avg_hist - 1.0) <= margen or abs(avg_hist) <= margen
+                or abs(last_range - avg_hist * 1.5) <= margen * 1.5):
+            avg_hist = rangos.media_exacta()
+        compressed = avg_hist < 1.0
+        expanded = avg_hist > 0 and last_range > (avg_hist * 1.5)
+        return compressed and expanded
+
+    def update_kline(self, kline: Dict) -> Dict:
+        """Atajo para dicts de vela (`open`, `high`, `low`, `close`, `volume`)."""
+        return self.update(
+            float(kline.get("open", 0.0)),
+            float(kline.get("high", 0.0)),
+            float(kline.get("low", 0.0)),
+            float(kline.get("close", 0.0)),
+            float(kline.get("volume", 0.0)),
+        )
+
+    def seed(self, candles: Candles) -> Dict:
+        """Reproduce velas cerradas (solo la cola que cubre las ventanas); devuelve el último análisis."""
+        cola = max(self._volumenes.values.maxlen, self._cuerpos.values.maxlen, self._rangos.values.maxlen + 1)
+        frame = as_frame(candles, tail=cola)
+        for i in range(len(frame)):
+            self.update(frame.open[i], frame.high[i], frame.low[i], frame.close[i], frame.volume[i])
+        return self.ultimo
+
+    def resincronizar(self, candles: Candles) -> Dict:
+        """Descarta el estado y lo reconstruye desde `candles` (p.ej. tras corregir la última vela)."""
+        self._volumenes = _SumaMovil(self._volumenes.values.maxlen)
+        self._cuerpos = _SumaMovil(self._cuerpos.values.maxlen)
+        self._rangos = _SumaMovil(self._rangos.values.maxlen)
+        self._ultimo_rango = None
+        self._prev_close = None
+        self.ultimo = _resultado({k: False for k in _FLAGS})
+        return self.seed(candles)
+
+
 __all__ = [
     "detectar_volumen_extremo",
     "detectar_fast_move",
@@ -227,6 +493,8 @@ __all__ = [
     "detectar_whale_trade",
     "clasificar_severidad",
     "analizar_ballenas",
+    "analizar_ballenas_batch",
+    "WhaleRadar",
 ]
 """
 whale_detector.py
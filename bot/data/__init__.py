@@ -1,5 +1,5 @@
 """
-Data package: binance_api and websocket_stream.
+Data package: binance_api, websocket_stream, stream_decoder, stream_replay, conflation, kline_store, backfill and order_book.
 """
 
-__all__ = ["binance_api", "websocket_stream"]
+__all__ = ["binance_api", "websocket_stream", "stream_decoder", "stream_replay", "conflation", "kline_store", "backfill", "order_book"]
@@ -0,0 +1,308 @@
+"""
+backfill.py
+Ingesta histórica de klines en `KlineStore`: descarga REST de los huecos
+(reanudable) e importación de los volcados mensuales/diarios públicos de
+Binance (CSV/ZIP).
+
+Descarga (`BackfillHistorico`):
+
+1. Por (símbolo, intervalo) se piden al almacén los rangos sin velas
+   (`KlineStore.gaps`) y se les restan los tramos ya completados según el
+   checkpoint (tramos donde Binance no tiene velas: mantenimiento, antes
+   del listado). Lo que queda se parte en tramos de `limit` velas: una
+   petición REST cada uno.
+2. Los tramos se descargan en paralelo (`max_en_vuelo` peticiones a la
+   vez); el ritmo lo marca el presupuesto de peso de `BinanceREST`.
+3. Se escriben en orden, con appends por lotes de `lote_escritura` velas.
+   Tras cada append se guarda el checkpoint (JSON, escritura atómica) con
+   los tramos escritos. Si el proceso se interrumpe, lo descargado ya
+   escrito no se vuelve a pedir; al cancelarse, se escribe antes lo que
+   estaba descargado.
+
+Importación (`importar_csv`, `importar_zip`, `importar_directorio`):
+los ficheros `SYMBOL-INTERVAL-YYYY-MM[-DD].zip|.csv` de data.binance.vision
+se leen por bloques de bytes y cada bloque se parsea con el lector C de
+NumPy (`np.loadtxt`) directamente a columnas: no hay objetos Python por
+fila. Se acepta la cabecera opcional y los open_time en microsegundos de
+los volcados spot recientes.
+
+Referencias: docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import os
+import re
+import zipfile
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot.core.resampler import interval_ms
+from bot.data.binance_api import MAX_LIMIT_KLINES, BinanceAPIError
+from bot.data.kline_store import RECORD_DTYPE, KlineStore
+
+BLOQUE_CSV = 4 << 20
+_NOMBRE_VOLCADO = re.compile(r"^([A-Z0-9]+)-(\d+[smhdwM])-\d{4}-\d{2}(?:-\d{2})?\.(?:zip|csv)$")
+# open_time por encima de esto está en microsegundos (volcados spot desde 2025).
+_LIMITE_MS = 10 ** 14
+
+
+# ---------------------------------------------------------------------- rangos
+def _restar(rangos: List[Tuple[int, int]], quitar: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """`rangos` [a, b) menos los de `quitar` (ambos ordenados)."""
+    out = []
+    for a, b in rangos:
+        for qa, qb in quitar:
+            if qb <= a or qa >= b:
+                continue
+            if qa > a:
+                out.append((a, qa))
+            a = max(a, qb)
+            if a >= b:
+                break
+        if a < b:
+            out.append((a, b))
+    return out
+
+
+def _unir(rangos: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    out: List[List[int]] = []
+    for a, b in sorted(rangos):
+        if out and a <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return [(a, b) for a, b in out]
+
+
+class Checkpoint:
+    """Tramos completados por (símbolo, intervalo), persistidos en JSON."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.hechos: Dict[str, List[Tuple[int, int]]] = {}
+        if path and os.path.exists(path):
+            with open(path) as fh:
+                data = json.load(fh)
+            self.hechos = {k: [tuple(r) for r in v] for k, v in data.get("hechos", {}).items()}
+
+    @staticmethod
+    def clave(symbol: str, interval: str) -> str:
+        return f"{symbol.upper()}/{interval}"
+
+    def rangos(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        return self.hechos.get(self.clave(symbol, interval), [])
+
+    def marcar(self, symbol: str, interval: str, rangos: Iterable[Tuple[int, int]]) -> None:
+        k = self.clave(symbol, interval)
+        self.hechos[k] = _unir(list(self.hechos.get(k, [])) + list(rangos))
+
+    def guardar(self) -> None:
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"hechos": {k: [list(r) for r in v] for k, v in self.hechos.items()}}, fh)
+        os.replace(tmp, self.path)
+
+
+# ---------------------------------------------------------------------- descarga REST
+class BackfillHistorico:
+    """Descarga reanudable de los huecos del almacén."""
+
+    def __init__(
+        self,
+        store: KlineStore,
+        rest,
+        checkpoint_path: Optional[str] = None,
+        limit: int = MAX_LIMIT_KLINES,
+        max_en_vuelo: int = 8,
+        lote_escritura: int = 50_000,
+    ):
+        self.store = store
+        self.rest = rest
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.limit = limit
+        self.max_en_vuelo = max_en_vuelo
+        self.lote_escritura = lote_escritura
+        self.tramos_descargados = 0
+        self.velas_escritas = 0
+        self.appends = 0
+        self.errores: List[Tuple[str, str, Tuple[int, int], Exception]] = []
+
+    def planificar(self, symbol: str, interval: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Tramos [a, b) de hasta `limit` velas que faltan en el almacén y en el checkpoint."""
+        paso = interval_ms(interval)
+        huecos = _restar(self.store.gaps(symbol, interval, start, end), self.checkpoint.rangos(symbol, interval))
+        tamano = paso * self.limit
+        tramos = []
+        for a, b in huecos:
+            a += (-a) % paso
+            tramos.extend((t, min(t + tamano, b)) for t in range(a, b, tamano))
+        return tramos
+
+    async def ejecutar(self, symbols: Iterable[str], intervals: Iterable[str], start: int, end: int) -> Dict:
+        """Rellena [start, end) de cada (símbolo, intervalo). Devuelve contadores.
+
+        `end` no debe pasar del open_time de la vela en curso: Binance la
+        devuelve sin cerrar y su tramo quedaría marcado como completado.
+        Los tramos que fallan (tras los reintentos del cliente) quedan como
+        hueco para la siguiente ejecución y se listan en `errores`.
+        """
+        sem = asyncio.Semaphore(self.max_en_vuelo)
+        trabajos = [
+            self._rellenar(symbol.upper(), interval, self.planificar(symbol, interval, start, end), sem)
+            for symbol in symbols
+            for interval in intervals
+        ]
+        await asyncio.gather(*trabajos)
+        return {
+            "tramos_descargados": self.tramos_descargados,
+            "velas_escritas": self.velas_escritas,
+            "appends": self.appends,
+            "errores": len(self.errores),
+        }
+
+    async def _rellenar(self, symbol: str, interval: str, tramos: List[Tuple[int, int]], sem: asyncio.Semaphore) -> None:
+        listos: Dict[int, Optional[np.ndarray]] = {}
+        pendientes: List[np.ndarray] = []
+        hechos: List[Tuple[int, int]] = []
+        siguiente = 0
+
+        def escribir() -> None:
+            if hechos:
+                recs = np.concatenate(pendientes) if pendientes else np.empty(0, dtype=RECORD_DTYPE)
+                if len(recs):
+                    self.velas_escritas += self.store.append(symbol, interval, recs)
+                    self.appends += 1
+                self.checkpoint.marcar(symbol, interval, hechos)
+                self.checkpoint.guardar()
+            pendientes.clear()
+            hechos.clear()
+
+        async def descargar(i: int, a: int, b: int) -> None:
+            nonlocal siguiente
+            async with sem:
+                try:
+                    recs = await self.rest.klines(symbol, interval, a, b - 1, self.limit)
+                except (BinanceAPIError, OSError, asyncio.TimeoutError) as exc:
+                    self.errores.append((symbol, interval, (a, b), exc))
+                    listos[i] = None
+                    return
+            self.tramos_descargados += 1
+            listos[i] = recs[(recs["timestamp"] >= a) & (recs["timestamp"] < b)]
+            # Se escribe en orden: solo el prefijo contiguo de tramos descargados.
+            while listos.get(siguiente) is not None:
+                recs = listos.pop(siguiente)
+                pendientes.append(recs)
+                hechos.append(tramos[siguiente])
+                siguiente += 1
+                if sum(len(p) for p in pendientes) >= self.lote_escritura:
+                    escribir()
+
+        tareas = [asyncio.ensure_future(descargar(i, a, b)) for i, (a, b) in enumerate(tramos)]
+        try:
+            await asyncio.gather(*tareas)
+        finally:
+            for t in tareas:
+                t.cancel()
+            # Lo descargado fuera de orden (tras un fallo o una cancelación) también se guarda.
+            for i in sorted(k for k, v in listos.items() if v is not None):
+                pendientes.append(listos[i])
+                hechos.append(tramos[i])
+            escribir()
+
+
+# ---------------------------------------------------------------------- volcados CSV/ZIP
+def _bloques(fh: IO[bytes], tamano: int = BLOQUE_CSV) -> Iterator[bytes]:
+    """Bloques de líneas completas de un fichero binario."""
+    resto = b""
+    while True:
+        datos = fh.read(tamano)
+        if not datos:
+            break
+        datos = resto + datos
+        corte = datos.rfind(b"\n") + 1
+        if corte == 0:
+            resto = datos
+            continue
+        resto = datos[corte:]
+        yield datos[:corte]
+    if resto.strip():
+        yield resto
+
+
+def parsear_csv_klines(fh: IO[bytes], tamano_bloque: int = BLOQUE_CSV) -> Iterator[np.ndarray]:
+    """Registros `RECORD_DTYPE` de un CSV de klines de Binance, un array por bloque."""
+    primero = True
+    for bloque in _bloques(fh, tamano_bloque):
+        if primero:
+            primero = False
+            if bloque[:1] not in b"0123456789":
+                # Cabecera (open_time,open,...): se salta la primera línea.
+                bloque = bloque[bloque.find(b"\n") + 1:]
+                if not bloque.strip():
+                    continue
+        cols = np.loadtxt(io.BytesIO(bloque), delimiter=",", usecols=range(6), dtype=np.float64, ndmin=2)
+        out = np.empty(len(cols), dtype=RECORD_DTYPE)
+        ts = cols[:, 0].astype(np.int64)
+        if len(ts) and ts[0] >= _LIMITE_MS:
+            ts //= 1000
+        out["timestamp"] = ts
+        for j, name in enumerate(("open", "high", "low", "close", "volume"), start=1):
+            out[name] = cols[:, j]
+        yield out
+
+
+def _destino(path: str, symbol: Optional[str], interval: Optional[str]) -> Tuple[str, str]:
+    if symbol and interval:
+        return symbol, interval
+    m = _NOMBRE_VOLCADO.match(os.path.basename(path))
+    if m is None:
+        raise ValueError(f"{path}: cannot infer symbol/interval from file name")
+    return symbol or m.group(1), interval or m.group(2)
+
+
+def importar_csv(store: KlineStore, path: str, symbol: Optional[str] = None, interval: Optional[str] = None) -> int:
+    """Importa un CSV de klines; devuelve las velas nuevas escritas."""
+    symbol, interval = _destino(path, symbol, interval)
+    with open(path, "rb") as fh:
+        return sum(store.append(symbol, interval, recs) for recs in parsear_csv_klines(fh))
+
+
+def importar_zip(store: KlineStore, path: str, symbol: Optional[str] = None, interval: Optional[str] = None) -> int:
+    """Importa un ZIP de data.binance.vision (uno o varios CSV dentro), sin descomprimir a disco."""
+    symbol, interval = _destino(path, symbol, interval)
+    escritas = 0
+    with zipfile.ZipFile(path) as zf:
+        for nombre in sorted(n for n in zf.namelist() if n.endswith(".csv")):
+            with zf.open(nombre) as fh:
+                escritas += sum(store.append(symbol, interval, recs) for recs in parsear_csv_klines(fh))
+    return escritas
+
+
+def importar_directorio(store: KlineStore, directorio: str) -> Dict[Tuple[str, str], int]:
+    """Importa todos los volcados `SYMBOL-INTERVAL-YYYY-MM[-DD].zip|.csv` de un directorio, en orden."""
+    out: Dict[Tuple[str, str], int] = {}
+    for nombre in sorted(os.listdir(directorio)):
+        if not _NOMBRE_VOLCADO.match(nombre):
+            continue
+        path = os.path.join(directorio, nombre)
+        clave = _destino(path, None, None)
+        importar = importar_zip if nombre.endswith(".zip") else importar_csv
+        out[clave] = out.get(clave, 0) + importar(store, path)
+    return out
+
+
+__all__ = [
+    "BackfillHistorico",
+    "Checkpoint",
+    "importar_csv",
+    "importar_directorio",
+    "importar_zip",
+    "parsear_csv_klines",
+]
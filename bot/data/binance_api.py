@@ -1,9 +1,431 @@
 """
 binance_api.py
-Funciones para consumir endpoints REST de Binance (klines, ticker, depth).
+Cliente REST asíncrono de Binance (klines, ticker, depth).
+
+- Conexiones HTTP/1.1 persistentes (keep-alive) en un pool acotado sobre
+  `asyncio` (stdlib, sin dependencias): cada petición reutiliza una
+  conexión libre en lugar de abrir TCP + TLS.
+- `TokenBucket` de peso de peticiones: cada endpoint consume su peso
+  (`peso_klines`, `peso_ticker`, `peso_depth`) antes de enviarse, y el bucket se sincroniza con la cabecera
+  `X-MBX-USED-WEIGHT-1M` de cada respuesta. Un 429 respeta `Retry-After`;
+  un 418 (IP bloqueada) se propaga como `BinanceAPIError`.
+- `backfill` divide [start, end) en páginas de `limit` velas según
+  `startTime`/`endTime` y las pide en paralelo (concurrencia acotada por
+  el pool); el bucket es quien marca el ritmo, así que un backfill largo
+  consume el presupuesto de peso en lugar de ir petición a petición. Si
+  una página falla, las demás se cancelan: no siguen gastando peso.
+- Los errores de red transitorios (conexión caída, timeout) se reintentan
+  con backoff, como los 5xx; abrir una conexión también tiene `timeout`.
+- Las klines se decodifican directamente a registros columnares
+  `RECORD_DTYPE` (los mismos que `KlineStore.append`).
+
 Referencias: docs/07_Datos_y_APIs.md
 """
 
-def placeholder():
-    """Placeholder para funciones REST de Binance."""
-    return None
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import ssl
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from bot.core.resampler import interval_ms
+from bot.data.kline_store import RECORD_DTYPE
+
+BASE_URL = "https://api.binance.com"
+
+# Límite REQUEST_WEIGHT de spot por minuto y fracción que se usa como presupuesto.
+PESO_POR_MINUTO = 6000
+MARGEN_PESO = 0.9
+MAX_LIMIT_KLINES = 1000
+
+
+def peso_klines(limit: int) -> int:
+    return 2
+
+
+def peso_ticker(symbol: Optional[str]) -> int:
+    return 2 if symbol else 4
+
+
+def peso_depth(limit: int) -> int:
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+class BinanceAPIError(Exception):
+    """Respuesta de error de Binance (`status` HTTP y `code` de la API si viene)."""
+
+    def __init__(self, status: int, code: Optional[int] = None, msg: str = ""):
+        super().__init__(f"HTTP {status} code={code}: {msg}")
+        self.status = status
+        self.code = code
+        self.msg = msg
+
+
+class TokenBucket:
+    """Presupuesto de peso: `capacidad` tokens que se recargan a `por_segundo`."""
+
+    def __init__(self, capacidad: float, por_segundo: float, reloj: Callable[[], float] = time.monotonic):
+        if capacidad <= 0 or por_segundo <= 0:
+            raise ValueError("capacidad and por_segundo must be > 0")
+        self.capacidad = float(capacidad)
+        self.por_segundo = float(por_segundo)
+        self.tokens = float(capacidad)
+        self._reloj = reloj
+        self._t = reloj()
+        self._turno = asyncio.Lock()
+
+    @classmethod
+    def por_minuto(cls, peso: float, margen: float = MARGEN_PESO, **kwargs) -> "TokenBucket":
+        limite = peso * margen
+        return cls(limite, limite / 60.0, **kwargs)
+
+    def _recargar(self) -> None:
+        ahora = self._reloj()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._t) * self.por_segundo)
+        self._t = ahora
+
+    def disponible(self) -> float:
+        self._recargar()
+        return self.tokens
+
+    def try_acquire(self, peso: float) -> bool:
+        self._recargar()
+        if self.tokens >= peso:
+            self.tokens -= peso
+            return True
+        return False
+
+    async def acquire(self, peso: float) -> None:
+        """Espera hasta poder consumir `peso` (en orden de llegada)."""
+        async with self._turno:
+            while not self.try_acquire(peso):
+                await asyncio.sleep((peso - self.tokens) / self.por_segundo)
+
+    def sincronizar(self, usado: float, limite: float) -> None:
+        """Ajusta los tokens al peso usado que informa el servidor en su ventana."""
+        self._recargar()
+        self.tokens = min(self.tokens, self.capacidad - usado * self.capacidad / limite)
+
+
+# ---------------------------------------------------------------------- HTTP
+class _Conexion:
+    __slots__ = ("reader", "writer", "usos")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.usos = 0
+
+    def cerrar(self) -> None:
+        self.writer.close()
+
+
+class _Respuesta:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class _PoolHTTP:
+    """Pool de conexiones HTTP/1.1 keep-alive a un único host."""
+
+    def __init__(self, base_url: str, max_conexiones: int, timeout: float):
+        url = urlsplit(base_url)
+        self.host = url.hostname or ""
+        self.tls = url.scheme == "https"
+        self.port = url.port or (443 if self.tls else 80)
+        self.timeout = timeout
+        self.max_conexiones = max_conexiones
+        self._libres: List[_Conexion] = []
+        self._cupos = asyncio.Semaphore(max_conexiones)
+        self._ssl = ssl.create_default_context() if self.tls else None
+        self.abiertas = 0
+
+    async def _abrir(self) -> _Conexion:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self._ssl, server_hostname=self.host if self.tls else None),
+            self.timeout,
+        )
+        self.abiertas += 1
+        return _Conexion(reader, writer)
+
+    async def get(self, path: str, params: Dict) -> _Respuesta:
+        async with self._cupos:
+            conn = self._libres.pop() if self._libres else None
+            reutilizada = conn is not None
+            if conn is None:
+                conn = await self._abrir()
+            try:
+                resp, reusable = await asyncio.wait_for(self._enviar(conn, path, params), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                conn.cerrar()
+                if not reutilizada:
+                    raise ConnectionError(str(exc)) from exc
+                # El servidor cerró una conexión inactiva: se reintenta con una nueva.
+                conn = await self._abrir()
+                try:
+                    resp, reusable = await asyncio.wait_for(self._enviar(conn, path, params), self.timeout)
+                except BaseException:
+                    conn.cerrar()
+                    raise
+            except BaseException:
+                conn.cerrar()
+                raise
+            if reusable:
+                self._libres.append(conn)
+            else:
+                conn.cerrar()
+            return resp
+
+    async def _enviar(self, conn: _Conexion, path: str, params: Dict) -> Tuple[_Respuesta, bool]:
+        target = f"{path}?{urlencode(params)}" if params else path
+        conn.writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {self.host}\r\nAccept-Encoding: gzip\r\n"
+            f"Connection: keep-alive\r\nUser-Agent: bot-trading-cuantitativo\r\n\r\n".encode("latin-1")
+        )
+        await conn.writer.drain()
+        conn.usos += 1
+
+        reader = conn.reader
+        linea = await reader.readline()
+        if not linea:
+            raise ConnectionError("connection closed by server")
+        partes = linea.split(None, 2)
+        status = int(partes[1])
+        headers: Dict[str, str] = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = linea.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+
+        reusable = headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            trozos = []
+            while True:
+                tam = int((await reader.readline()).split(b";")[0], 16)
+                if tam == 0:
+                    await reader.readline()
+                    break
+                trozos.append(await reader.readexactly(tam))
+                await reader.readexactly(2)
+            body = b"".join(trozos)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            reusable = False
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        return _Respuesta(status, headers, body), reusable
+
+    async def close(self) -> None:
+        libres, self._libres = self._libres, []
+        for conn in libres:
+            conn.cerrar()
+        for conn in libres:
+            try:
+                await conn.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+# ---------------------------------------------------------------------- decodificación
+def klines_a_registros(filas: Sequence[Sequence]) -> np.ndarray:
+    """Filas de `/api/v3/klines` ([open_time, "open", "high", "low", "close", "volume", ...])
+    a registros `RECORD_DTYPE`."""
+    n = len(filas)
+    out = np.empty(n, dtype=RECORD_DTYPE)
+    if not n:
+        return out
+    out["timestamp"] = np.fromiter((f[0] for f in filas), dtype=np.int64, count=n)
+    # numpy convierte las cadenas decimales a float64 en C, columna a columna.
+    ohlcv = np.array([f[1:6] for f in filas], dtype=np.float64)
+    for j, name in enumerate(("open", "high", "low", "close", "volume")):
+        out[name] = ohlcv[:, j]
+    return out
+
+
+def _niveles(filas: Iterable[Sequence[str]]) -> List[Tuple[float, float]]:
+    return [(float(p), float(q)) for p, q in filas]
+
+
+async def _reunir(corutinas: Iterable) -> List:
+    """`asyncio.gather` que, si una falla, cancela las demás y espera a que terminen."""
+    tareas = [asyncio.ensure_future(c) for c in corutinas]
+    try:
+        return await asyncio.gather(*tareas)
+    except BaseException:
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        raise
+
+
+# ---------------------------------------------------------------------- cliente
+class BinanceREST:
+    """Cliente REST asíncrono con pool de conexiones y presupuesto de peso."""
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        max_conexiones: int = 8,
+        peso_por_minuto: int = PESO_POR_MINUTO,
+        margen: float = MARGEN_PESO,
+        timeout: float = 10.0,
+        reintentos: int = 3,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self._pool = _PoolHTTP(base_url, max_conexiones, timeout)
+        self.peso_por_minuto = peso_por_minuto
+        self.bucket = bucket or TokenBucket.por_minuto(peso_por_minuto, margen)
+        self.reintentos = reintentos
+        self.peticiones = 0
+        self.peso_usado: Optional[int] = None
+
+    async def __aenter__(self) -> "BinanceREST":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    @property
+    def conexiones_abiertas(self) -> int:
+        return self._pool.abiertas
+
+    async def _get(self, path: str, params: Dict, peso: int):
+        for intento in range(self.reintentos + 1):
+            await self.bucket.acquire(peso)
+            try:
+                resp = await self._pool.get(path, params)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                if intento < self.reintentos:
+                    await asyncio.sleep(0.5 * 2 ** intento)
+                    continue
+                raise
+            self.peticiones += 1
+            usado = resp.headers.get("x-mbx-used-weight-1m")
+            if usado is not None:
+                self.peso_usado = int(usado)
+                self.bucket.sincronizar(self.peso_usado, self.peso_por_minuto)
+            if resp.status == 200:
+                return resp.json()
+            if resp.status == 429 and intento < self.reintentos:
+                await asyncio.sleep(float(resp.headers.get("retry-after", 1)))
+                continue
+            if resp.status >= 500 and intento < self.reintentos:
+                await asyncio.sleep(0.5 * 2 ** intento)
+                continue
+            try:
+                err = json.loads(resp.body)
+            except ValueError:
+                err = {}
+            raise BinanceAPIError(resp.status, err.get("code"), err.get("msg", resp.body[:200].decode("utf-8", "replace")))
+        raise AssertionError("unreachable")
+
+    # ------------------------------------------------------------------ endpoints
+    async def klines(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: int = 500,
+    ) -> np.ndarray:
+        """`GET /api/v3/klines` como registros `RECORD_DTYPE` (`end` inclusivo, como la API)."""
+        params: Dict = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start is not None:
+            params["startTime"] = int(start)
+        if end is not None:
+            params["endTime"] = int(end)
+        return klines_a_registros(await self._get("/api/v3/klines", params, peso_klines(limit)))
+
+    async def ticker_price(self, symbol: Optional[str] = None):
+        """`GET /api/v3/ticker/price`: float para un símbolo, {symbol: float} para todos."""
+        params = {"symbol": symbol} if symbol else {}
+        data = await self._get("/api/v3/ticker/price", params, peso_ticker(symbol))
+        if symbol:
+            return float(data["price"])
+        return {d["symbol"]: float(d["price"]) for d in data}
+
+    async def depth(self, symbol: str, limit: int = 100) -> Dict:
+        """`GET /api/v3/depth` en el formato de `OrderBook.load_snapshot`."""
+        data = await self._get("/api/v3/depth", {"symbol": symbol, "limit": limit}, peso_depth(limit))
+        return {
+            "lastUpdateId": int(data["lastUpdateId"]),
+            "bids": _niveles(data["bids"]),
+            "asks": _niveles(data["asks"]),
+        }
+
+    # ------------------------------------------------------------------ backfill
+    def paginas(self, interval: str, start: int, end: int, limit: int = MAX_LIMIT_KLINES) -> List[Tuple[int, int]]:
+        """Rangos [startTime, endTime] de `limit` velas que cubren [start, end)."""
+        paso = interval_ms(interval) * limit
+        inicio = start - start % interval_ms(interval)
+        return [(t, min(t + paso, end) - 1) for t in range(inicio, end, paso)]
+
+    async def backfill(
+        self,
+        symbol: str,
+        interval: str,
+        start: int,
+        end: int,
+        limit: int = MAX_LIMIT_KLINES,
+    ) -> np.ndarray:
+        """Velas con open_time en [start, end), pedidas por páginas en paralelo.
+
+        Todas las páginas se lanzan a la vez: el pool limita las peticiones
+        en vuelo y el bucket de peso marca el ritmo.
+        """
+        paginas = self.paginas(interval, start, end, limit)
+        partes = await _reunir(self.klines(symbol, interval, a, b, limit) for a, b in paginas)
+        if not partes:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        out = np.concatenate(partes)
+        return out[(out["timestamp"] >= start) & (out["timestamp"] < end)]
+
+    async def backfill_simbolos(
+        self,
+        symbols: Iterable[str],
+        interval: str,
+        start: int,
+        end: int,
+        limit: int = MAX_LIMIT_KLINES,
+    ) -> Dict[str, np.ndarray]:
+        """`backfill` de varios símbolos compartiendo pool y presupuesto de peso."""
+        symbols = list(symbols)
+        res = await _reunir(self.backfill(s, interval, start, end, limit) for s in symbols)
+        return dict(zip(symbols, res))
+
+
+__all__ = [
+    "BinanceREST",
+    "BinanceAPIError",
+    "TokenBucket",
+    "klines_a_registros",
+    "peso_klines",
+    "peso_ticker",
+    "peso_depth",
+]
@@ -0,0 +1,242 @@
+"""
+conflation.py
+Buzón por símbolo con conflación: el consumidor nunca se queda atrás del
+feed.
+
+Si `generar_senal_final` o el detector de ballenas van más lentos que las
+actualizaciones de la vela en curso, una cola FIFO acumula actualizaciones
+viejas y la latencia crece sin límite. `BuzonConflacion` guarda por
+símbolo solo lo necesario:
+
+- klines cerradas: todas, en orden (nunca se descartan);
+- kline en curso: solo la última (las anteriores se cuentan en
+  `parciales_descartadas`); si llega el cierre de esa vela, la parcial
+  sobra y también se descarta;
+- diffs de depth: se fusionan en un único diff pendiente (`U` del primero,
+  `u`/`E` del último, niveles con el último valor por precio). Aplicar el
+  diff fusionado deja el `OrderBook` igual que aplicar todos; solo se
+  pierde la resolución temporal de los muros intermedios. Los diffs
+  fusionados se cuentan en `diffs_fusionados`. Solo se fusionan diffs
+  contiguos (`U == u_pendiente + 1`, o `pu == u_pendiente` en futuros): si
+  la secuencia se rompe (p.ej. tras una reconexión), el diff pendiente se
+  cierra tal cual y el nuevo empieza otro, para que `OrderBook.apply_diff`
+  siga detectando el hueco (`SequenceGapError`).
+
+Se puede usar en lugar de `ColaAcotada` en `MultiplexorStreams`
+(`cola_klines` / `cola_depth`): recibe `(symbol, payload)` con `put` /
+`put_nowait` (nunca bloquea: la memoria queda acotada por la conflación) y
+entrega `(symbol, payload)` con `get` / `get_batch`, por símbolo en orden
+de llegada: cerradas, luego la parcial y luego los diffs fusionados.
+`get_lote` añade el instante de llegada (`time.perf_counter`) de cada
+elemento, para medir la latencia desde la recepción
+(`Orquestador.consumir`).
+
+Referencias: docs/02_Arquitectura_Sistema.md, docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class _Buzon:
+    """Pendientes de un símbolo."""
+
+    __slots__ = (
+        "cerradas", "parcial", "t_parcial", "diffs", "diff", "t_diff", "en_cola",
+        "parciales_descartadas", "diffs_fusionados",
+    )
+
+    def __init__(self):
+        self.cerradas: Deque[Tuple[Dict, float]] = deque()
+        self.parcial: Optional[Dict] = None
+        self.t_parcial = 0.0
+        self.diffs: Deque[Tuple[Dict, float]] = deque()  # diffs cerrados por un hueco de secuencia
+        self.diff: Optional[Dict] = None
+        self.t_diff = 0.0
+        self.en_cola = False
+        self.parciales_descartadas = 0
+        self.diffs_fusionados = 0
+
+    def pendientes(self) -> int:
+        return len(self.cerradas) + (self.parcial is not None) + len(self.diffs) + (self.diff is not None)
+
+
+def _contiguo(pendiente: Dict, msg: Dict) -> bool:
+    """True si `msg` continúa la secuencia del diff `pendiente`."""
+    if "pu" in msg:
+        return int(msg["pu"]) == int(pendiente["u"])
+    return int(msg["U"]) == int(pendiente["u"]) + 1
+
+
+def _listo(diff: Dict) -> Dict:
+    """Diff pendiente -> diff entregable (niveles otra vez como listas)."""
+    diff["b"] = list(diff["b"].items())
+    diff["a"] = list(diff["a"].items())
+    return diff
+
+
+def _fusionar(pendiente: Dict, msg: Dict) -> None:
+    """Fusiona el diff `msg` en `pendiente` (niveles como dict precio -> cantidad)."""
+    pendiente["u"] = msg["u"]
+    if "E" in msg:
+        pendiente["E"] = msg["E"]
+    bids, asks = pendiente["b"], pendiente["a"]
+    for price, qty in msg.get("b", ()):
+        bids[price] = qty
+    for price, qty in msg.get("a", ()):
+        asks[price] = qty
+
+
+class BuzonConflacion:
+    """Buzones por símbolo con conflación de klines en curso y diffs de depth."""
+
+    def __init__(self):
+        self._buzones: Dict[str, _Buzon] = {}
+        self._listos: Deque[str] = deque()
+        self._hay_datos = asyncio.Event()
+        self._salida: Deque[Tuple[str, Dict, float]] = deque()
+        self.cerradas = 0
+        self.parciales = 0
+        self.diffs = 0
+        self.parciales_descartadas = 0
+        self.diffs_fusionados = 0
+        self.max_simbolos_pendientes = 0
+
+    # ------------------------------------------------------------------ entrada
+    def _buzon(self, symbol: str) -> _Buzon:
+        b = self._buzones.get(symbol)
+        if b is None:
+            b = self._buzones[symbol] = _Buzon()
+        return b
+
+    def put_nowait(self, item: Tuple[str, Dict]) -> bool:
+        """Deja `(symbol, kline)` o `(symbol, diff)` en el buzón del símbolo. Nunca rechaza."""
+        symbol, payload = item
+        b = self._buzon(symbol)
+        ahora = time.perf_counter()
+        if "U" in payload:
+            self.diffs += 1
+            if b.diff is not None and not _contiguo(b.diff, payload):
+                b.diffs.append((_listo(b.diff), b.t_diff))
+                b.diff = None
+            if b.diff is None:
+                b.diff = {**payload, "b": dict(payload.get("b", ())), "a": dict(payload.get("a", ()))}
+                b.t_diff = ahora
+            else:
+                _fusionar(b.diff, payload)
+                b.diffs_fusionados += 1
+                self.diffs_fusionados += 1
+        elif payload.get("closed", True):
+            self.cerradas += 1
+            parcial = b.parcial
+            if parcial is not None and parcial.get("timestamp") == payload.get("timestamp"):
+                # El cierre sustituye a la parcial de la misma vela.
+                b.parcial = None
+                b.parciales_descartadas += 1
+                self.parciales_descartadas += 1
+            b.cerradas.append((payload, ahora))
+        else:
+            self.parciales += 1
+            if b.parcial is not None:
+                b.parciales_descartadas += 1
+                self.parciales_descartadas += 1
+            else:
+                b.t_parcial = ahora
+            b.parcial = payload
+        if not b.en_cola:
+            b.en_cola = True
+            self._listos.append(symbol)
+            if len(self._listos) > self.max_simbolos_pendientes:
+                self.max_simbolos_pendientes = len(self._listos)
+            self._hay_datos.set()
+        return True
+
+    async def put(self, item: Tuple[str, Dict]) -> None:
+        self.put_nowait(item)
+
+    # ------------------------------------------------------------------ salida
+    def _vaciar_simbolo(self, symbol: str, out: List[Tuple[str, Dict, float]]) -> None:
+        b = self._buzones[symbol]
+        b.en_cola = False
+        while b.cerradas:
+            kline, t = b.cerradas.popleft()
+            out.append((symbol, kline, t))
+        if b.parcial is not None:
+            out.append((symbol, b.parcial, b.t_parcial))
+            b.parcial = None
+        while b.diffs:
+            diff, t = b.diffs.popleft()
+            out.append((symbol, diff, t))
+        if b.diff is not None:
+            out.append((symbol, _listo(b.diff), b.t_diff))
+            b.diff = None
+
+    def _tomar(self, max_items: int) -> List[Tuple[str, Dict, float]]:
+        out: List[Tuple[str, Dict, float]] = []
+        while self._salida and len(out) < max_items:
+            out.append(self._salida.popleft())
+        listos = self._listos
+        while listos and len(out) < max_items:
+            self._vaciar_simbolo(listos.popleft(), out)
+        if len(out) > max_items:
+            # Lo que sobra de un símbolo se entrega primero en la siguiente lectura.
+            self._salida.extendleft(reversed(out[max_items:]))
+            del out[max_items:]
+        if not listos and not self._salida:
+            self._hay_datos.clear()
+        return out
+
+    async def get_lote(self, max_items: int = 1024) -> List[Tuple[str, Dict, float]]:
+        """Espera datos y devuelve hasta `max_items` `(symbol, payload, t_llegada)`."""
+        while not self._listos and not self._salida:
+            await self._hay_datos.wait()
+        return self._tomar(max_items)
+
+    async def get_batch(self, max_items: int = 1024) -> List[Tuple[str, Dict]]:
+        return [(s, p) for s, p, _ in await self.get_lote(max_items)]
+
+    async def get(self) -> Tuple[str, Dict]:
+        symbol, payload, _ = (await self.get_lote(1))[0]
+        return symbol, payload
+
+    def get_nowait(self) -> Tuple[str, Dict]:
+        if not self._listos and not self._salida:
+            raise asyncio.QueueEmpty
+        symbol, payload, _ = self._tomar(1)[0]
+        return symbol, payload
+
+    def qsize(self) -> int:
+        return len(self._salida) + sum(self._buzones[s].pendientes() for s in self._listos)
+
+    def empty(self) -> bool:
+        return not self._listos and not self._salida
+
+    # ------------------------------------------------------------------ métricas
+    @property
+    def descartados(self) -> int:
+        """Actualizaciones absorbidas por la conflación (mismo nombre que en `ColaAcotada`)."""
+        return self.parciales_descartadas + self.diffs_fusionados
+
+    def descartes(self, symbol: str) -> Dict[str, int]:
+        b = self._buzones.get(symbol)
+        if b is None:
+            return {"parciales_descartadas": 0, "diffs_fusionados": 0}
+        return {"parciales_descartadas": b.parciales_descartadas, "diffs_fusionados": b.diffs_fusionados}
+
+    def metricas(self) -> Dict:
+        return {
+            "cerradas": self.cerradas,
+            "parciales": self.parciales,
+            "diffs": self.diffs,
+            "parciales_descartadas": self.parciales_descartadas,
+            "diffs_fusionados": self.diffs_fusionados,
+            "pendientes": self.qsize(),
+            "max_simbolos_pendientes": self.max_simbolos_pendientes,
+        }
+
+
+__all__ = ["BuzonConflacion"]
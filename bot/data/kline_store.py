@@ -0,0 +1,313 @@
+"""
+kline_store.py
+Almacén binario en disco de velas históricas (klines), mapeado en memoria.
+
+Organización:
+
+    <root>/<SYMBOL>/<interval>/<open_time_inicial>.kln
+
+Cada fichero (segmento) es una secuencia de registros de ancho fijo
+(`RECORD_DTYPE`, 48 bytes: open_time int64 + OHLCV float64, little endian),
+sin cabecera y ordenados por `open_time` estrictamente creciente. Los
+segmentos de un mismo (símbolo, intervalo) no se solapan en tiempo.
+
+- Escritura: solo se añade al final del último segmento (descartando antes
+  un registro a medias de una escritura interrumpida). Los datos más
+  antiguos que caen en un hueco entre segmentos se añaden al segmento
+  anterior si empiezan justo donde termina, y si no crean un segmento
+  nuevo; los que caen dentro del rango de un segmento existente lo
+  reescriben fusionado (caso raro: huecos internos).
+- Huecos: `gaps(symbol, interval, start, end)` devuelve los rangos sin
+  velas (lo que usa `backfill` para descargar solo lo que falta).
+- Lectura: `np.memmap` en solo lectura; la columna `open_time` ordenada es
+  el índice, de modo que `load(symbol, interval, start, end)` localiza el
+  rango con búsqueda binaria (O(log n)) y devuelve vistas sin copia.
+
+Referencias: docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot.core.candle_frame import CandleFrame
+from bot.core.resampler import interval_ms
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+_SUFFIX = ".kln"
+
+
+def to_records(data) -> np.ndarray:
+    """Convierte un CandleFrame (o array estructurado) en registros RECORD_DTYPE."""
+    if isinstance(data, np.ndarray) and data.dtype == RECORD_DTYPE:
+        return data
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        out = np.empty(len(data), dtype=RECORD_DTYPE)
+        for name in RECORD_DTYPE.names:
+            out[name] = data[name]
+        return out
+    if isinstance(data, CandleFrame):
+        out = np.empty(len(data), dtype=RECORD_DTYPE)
+        for name in RECORD_DTYPE.names:
+            out[name] = np.asarray(getattr(data, name))
+        return out
+    raise TypeError("data must be a CandleFrame or a structured array")
+
+
+def records_to_frame(records: np.ndarray) -> CandleFrame:
+    """Vista CandleFrame (sin copia) sobre un array de registros."""
+    return CandleFrame(
+        records["open"],
+        records["high"],
+        records["low"],
+        records["close"],
+        records["volume"],
+        records["timestamp"],
+    )
+
+
+def _normalize(records: np.ndarray) -> np.ndarray:
+    """Ordena por open_time y elimina duplicados (se queda con la última aparición)."""
+    if len(records) < 2:
+        return records
+    ts = records["timestamp"]
+    if np.all(ts[1:] > ts[:-1]):
+        return records
+    order = np.argsort(ts, kind="stable")
+    records = records[order]
+    ts = records["timestamp"]
+    keep = np.ones(len(records), dtype=bool)
+    keep[:-1] = ts[1:] != ts[:-1]
+    return records[keep]
+
+
+class _Segment:
+    __slots__ = ("path", "start", "_map", "_size")
+
+    def __init__(self, path: str, start: int):
+        self.path = path
+        self.start = start
+        self._map: Optional[np.ndarray] = None
+        self._size = -1
+
+    def records(self) -> np.ndarray:
+        """Registros mapeados; se vuelve a mapear solo si el fichero creció."""
+        size = os.path.getsize(self.path)
+        if size != self._size or self._map is None:
+            n = size // RECORD_DTYPE.itemsize
+            if n == 0:
+                self._map = np.empty(0, dtype=RECORD_DTYPE)
+            else:
+                self._map = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", shape=(n,))
+            self._size = size
+        return self._map
+
+    @property
+    def end(self) -> int:
+        recs = self.records()
+        return int(recs["timestamp"][-1]) if len(recs) else self.start
+
+
+class KlineStore:
+    """Almacén append-only de klines por (símbolo, intervalo)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._segments: Dict[Tuple[str, str], List[_Segment]] = {}
+
+    # ------------------------------------------------------------------ paths
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _segments_for(self, symbol: str, interval: str) -> List[_Segment]:
+        key = (symbol.upper(), interval)
+        segs = self._segments.get(key)
+        if segs is None:
+            d = self._dir(symbol, interval)
+            segs = []
+            if os.path.isdir(d):
+                for name in os.listdir(d):
+                    if name.endswith(_SUFFIX):
+                        segs.append(_Segment(os.path.join(d, name), int(name[: -len(_SUFFIX)])))
+            segs.sort(key=lambda s: s.start)
+            self._segments[key] = segs
+        return segs
+
+    # ------------------------------------------------------------------ escritura
+    def append(self, symbol: str, interval: str, data) -> int:
+        """Guarda velas; devuelve cuántos registros nuevos se escribieron.
+
+        `data` es un CandleFrame o un array estructurado con los campos de
+        RECORD_DTYPE. Las velas ya presentes se ignoran (idempotente).
+        """
+        records = _normalize(to_records(data))
+        if len(records) == 0:
+            return 0
+        segs = self._segments_for(symbol, interval)
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+
+        written = 0
+        if segs:
+            last_end = segs[-1].end
+            ts = records["timestamp"]
+            split = int(np.searchsorted(ts, last_end, side="right"))
+            older, newer = records[:split], records[split:]
+        else:
+            older, newer = records[:0], records
+
+        if len(older):
+            written += self._merge_older(symbol, interval, older)
+        if len(newer):
+            if segs:
+                self._append_segment(segs[-1], newer)
+            else:
+                self._write_segment(symbol, interval, newer)
+            written += len(newer)
+        return written
+
+    @staticmethod
+    def _append_segment(seg: _Segment, records: np.ndarray) -> None:
+        """Añade registros al final del segmento, tras el último registro completo.
+
+        Si una escritura anterior se interrumpió, queda un registro a medias
+        al final del fichero (`records()` no lo ve); se trunca antes de
+        escribir para que los registros nuevos no queden desalineados.
+        """
+        with open(seg.path, "r+b") as fh:
+            fd = fh.fileno()
+            size = os.fstat(fd).st_size
+            whole = size - size % RECORD_DTYPE.itemsize
+            if whole != size:
+                os.ftruncate(fd, whole)
+            fh.seek(whole)
+            fh.write(records.tobytes())
+
+    def _write_segment(self, symbol: str, interval: str, records: np.ndarray) -> None:
+        start = int(records["timestamp"][0])
+        path = os.path.join(self._dir(symbol, interval), f"{start}{_SUFFIX}")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(records.tobytes())
+        os.replace(tmp, path)
+        segs = self._segments_for(symbol, interval)
+        segs[:] = [s for s in segs if s.path != path]
+        segs.append(_Segment(path, start))
+        segs.sort(key=lambda s: s.start)
+
+    def _merge_older(self, symbol: str, interval: str, records: np.ndarray) -> int:
+        """Integra velas anteriores al final del almacén (huecos entre o dentro de segmentos)."""
+        segs = self._segments_for(symbol, interval)
+        paso = interval_ms(interval)
+        written = 0
+        pending = records
+        prev: Optional[_Segment] = None
+        for seg in list(segs):
+            if not len(pending):
+                break
+            seg_recs = seg.records()
+            if not len(seg_recs):
+                continue
+            seg_start = int(seg_recs["timestamp"][0])
+            seg_end = int(seg_recs["timestamp"][-1])
+            ts = pending["timestamp"]
+            # Velas anteriores a este segmento, en el hueco: se añaden al
+            # segmento previo si lo continúan (un backfill por lotes hacia
+            # delante queda en un solo segmento); si no, segmento propio.
+            before = int(np.searchsorted(ts, seg_start, side="left"))
+            if before:
+                if prev is not None and int(ts[0]) == prev.end + paso:
+                    self._append_segment(prev, pending[:before])
+                else:
+                    self._write_segment(symbol, interval, pending[:before])
+                written += before
+                pending = pending[before:]
+                ts = pending["timestamp"]
+            # Velas dentro del rango del segmento: solo las que faltan.
+            inside = int(np.searchsorted(ts, seg_end, side="right"))
+            if inside:
+                chunk = pending[:inside]
+                missing = ~np.isin(chunk["timestamp"], seg_recs["timestamp"])
+                if missing.any():
+                    merged = _normalize(np.concatenate([np.asarray(seg_recs), chunk[missing]]))
+                    seg._map = None
+                    self._write_segment(symbol, interval, merged)
+                    written += int(missing.sum())
+                pending = pending[inside:]
+            prev = seg
+        return written
+
+    # ------------------------------------------------------------------ lectura
+    def load_records(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Registros con start <= open_time < end (vista mapeada si cae en un segmento)."""
+        parts = []
+        for seg in self._segments_for(symbol, interval):
+            recs = seg.records()
+            if not len(recs):
+                continue
+            ts = recs["timestamp"]
+            if end is not None and ts[0] >= end:
+                break
+            if start is not None and ts[-1] < start:
+                continue
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = len(recs) if end is None else int(np.searchsorted(ts, end, side="left"))
+            if hi > lo:
+                parts.append(recs[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def load(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> CandleFrame:
+        """Velas con start <= open_time < end como CandleFrame (columnas NumPy)."""
+        return records_to_frame(self.load_records(symbol, interval, start, end))
+
+    def coverage(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """Rangos (primer, último open_time) de cada segmento, en orden."""
+        out = []
+        for seg in self._segments_for(symbol, interval):
+            recs = seg.records()
+            if len(recs):
+                out.append((int(recs["timestamp"][0]), int(recs["timestamp"][-1])))
+        return out
+
+    def gaps(self, symbol: str, interval: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Rangos [a, b) de open_time sin velas dentro de [start, end) (alineados a `interval`)."""
+        paso = interval_ms(interval)
+        start += (-start) % paso
+        if end <= start:
+            return []
+        ts = np.asarray(self.load_records(symbol, interval, start, end)["timestamp"])
+        if not len(ts):
+            return [(start, end)]
+        out = []
+        if ts[0] > start:
+            out.append((start, int(ts[0])))
+        saltos = np.flatnonzero(np.diff(ts) > paso)
+        for i in saltos:
+            out.append((int(ts[i]) + paso, int(ts[i + 1])))
+        if int(ts[-1]) + paso < end:
+            out.append((int(ts[-1]) + paso, end))
+        return out
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        segs = self._segments_for(symbol, interval)
+        return segs[-1].end if segs else None
+
+    def count(self, symbol: str, interval: str) -> int:
+        return sum(len(seg.records()) for seg in self._segments_for(symbol, interval))
+
+
+__all__ = ["KlineStore", "RECORD_DTYPE", "to_records", "records_to_frame"]
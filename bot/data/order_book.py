@@ -0,0 +1,254 @@
+"""
+order_book.py
+Libro de órdenes L2 local por símbolo (snapshot REST + diffs del stream
+`<symbol>@depth` de Binance), con detección incremental de muros y de
+retiradas de liquidez (spoofing).
+
+Sincronización (procedimiento de Binance):
+
+1. Los diffs recibidos antes del snapshot se guardan en un buffer acotado
+   (`max_buffer`; si se llena se descartan los más antiguos y, si hacían
+   falta, el primer diff no encaja y salta `SequenceGapError`).
+2. `load_snapshot` carga `lastUpdateId` y aplica del buffer los diffs con
+   `u > lastUpdateId`; el primero debe cumplir `U <= lastUpdateId + 1 <= u`.
+3. Cada diff siguiente debe continuar la secuencia (`U == u_anterior + 1`,
+   o `pu == u_anterior` en futuros). Si no, `SequenceGapError`: el libro
+   queda desincronizado hasta el próximo snapshot.
+
+Cada lado es un `SortedDict` (actualizaciones O(log n)); el mejor bid/ask
+se cachea tras cada diff, así que su lectura es O(1).
+
+Muros: niveles cuyo nocional (precio x cantidad) supera
+`orderbook_wall_threshold` (configs/whales.json). Se mantienen al aplicar
+cada nivel, sin recorrer el libro. Si un muro desaparece y, tras aplicar
+el diff completo, sigue habiendo niveles mejores delante (no pudo ser
+ejecutado) se registra una retirada; si además vivió menos de
+`spoof_max_ms`, se marca como spoof. Se compara con la cabeza del libro
+posterior al diff: un muro barrido por trades en el mismo diff se lleva
+los niveles de delante y no cuenta como retirada.
+
+Referencias: docs/06_Radar_de_Ballenas.md, docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from operator import neg
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedDict
+
+
+class SequenceGapError(Exception):
+    """Se perdió al menos un diff: hay que volver a pedir el snapshot."""
+
+
+class OrderBook:
+    """Libro L2 de un símbolo con muros y retiradas de liquidez."""
+
+    def __init__(
+        self,
+        symbol: str = "",
+        wall_threshold: float = 500_000.0,
+        spoof_max_ms: int = 10_000,
+        max_eventos: int = 256,
+        max_buffer: int = 10_000,
+    ):
+        self.symbol = symbol
+        self.wall_threshold = float(wall_threshold)
+        self.spoof_max_ms = spoof_max_ms
+        self.bids: SortedDict = SortedDict(neg)  # iterar -> de mejor a peor bid
+        self.asks: SortedDict = SortedDict()
+        self.last_update_id: Optional[int] = None
+        self.synced = False
+        self.best_bid: Optional[Tuple[float, float]] = None
+        self.best_ask: Optional[Tuple[float, float]] = None
+        self.timestamp = 0
+        # Muros activos por lado: precio -> [nocional, timestamp de aparición].
+        self.walls: Dict[str, Dict[float, List]] = {"BUY": {}, "SELL": {}}
+        self.retiros: Deque[Dict] = deque(maxlen=max_eventos)
+        self._buffer: Deque[Dict] = deque(maxlen=max_buffer)
+        self.buffer_descartados = 0
+        self._quitados: List[Tuple[str, float, List]] = []
+        self._primero = True
+
+    @classmethod
+    def desde_config(cls, symbol: str, whales: Dict, **kwargs) -> "OrderBook":
+        return cls(symbol, wall_threshold=whales.get("orderbook_wall_threshold", 500_000.0), **kwargs)
+
+    # ------------------------------------------------------------------ sincronización
+    def load_snapshot(self, snapshot: Dict, timestamp: int = 0) -> None:
+        """Carga un snapshot REST (`lastUpdateId`, `bids`, `asks`) y aplica el buffer."""
+        self.bids.clear()
+        self.asks.clear()
+        self.walls = {"BUY": {}, "SELL": {}}
+        self._quitados = []
+        self.timestamp = timestamp
+        for price, qty in snapshot.get("bids", ()):
+            self._set("BUY", float(price), float(qty))
+        for price, qty in snapshot.get("asks", ()):
+            self._set("SELL", float(price), float(qty))
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self.synced = True
+        self._primero = True
+        self._actualizar_mejores()
+
+        pendientes, self._buffer = self._buffer, deque(maxlen=self._buffer.maxlen)
+        for msg in pendientes:
+            self.apply_diff(msg)
+
+    def apply_diff(self, msg: Dict) -> bool:
+        """Aplica un diff (`U`, `u`, `b`, `a`, `E`). Devuelve False si se bufferizó o descartó.
+
+        Raises:
+            SequenceGapError: si el diff no continúa la secuencia.
+        """
+        if not self.synced:
+            self._bufferizar(msg)
+            return False
+        return self.apply_levels(
+            int(msg["U"]),
+            int(msg["u"]),
+            msg.get("b", ()),
+            msg.get("a", ()),
+            int(msg.get("E", self.timestamp)),
+            int(msg["pu"]) if "pu" in msg else None,
+        )
+
+    def apply_levels(
+        self,
+        first_id: int,
+        last_id: int,
+        bids: Iterable,
+        asks: Iterable,
+        timestamp: Optional[int] = None,
+        prev_id: Optional[int] = None,
+    ) -> bool:
+        """Como `apply_diff`, con los campos ya separados (p.ej. desde `BufferDiffs`).
+
+        Raises:
+            SequenceGapError: si el diff no continúa la secuencia.
+        """
+        if not self.synced:
+            msg = {"U": first_id, "u": last_id, "b": list(bids), "a": list(asks),
+                   "E": self.timestamp if timestamp is None else timestamp}
+            if prev_id is not None:
+                msg["pu"] = prev_id
+            self._bufferizar(msg)
+            return False
+        last = self.last_update_id
+        if last_id <= last:
+            return False
+        if self._primero:
+            ok = first_id <= last + 1
+        elif prev_id is not None:
+            ok = prev_id == last
+        else:
+            ok = first_id == last + 1
+        if not ok:
+            self.synced = False
+            raise SequenceGapError(f"{self.symbol}: expected update {last + 1}, got {first_id}..{last_id}")
+
+        self._primero = False
+        if timestamp is not None:
+            self.timestamp = timestamp
+        set_level = self._set
+        for price, qty in bids:
+            set_level("BUY", float(price), float(qty))
+        for price, qty in asks:
+            set_level("SELL", float(price), float(qty))
+        self.last_update_id = last_id
+        self._actualizar_mejores()
+        if self._quitados:
+            quitados, self._quitados = self._quitados, []
+            for side, price, wall in quitados:
+                self._retiro(side, price, wall)
+        return True
+
+    def _bufferizar(self, msg: Dict) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.buffer_descartados += 1
+        self._buffer.append(msg)
+
+    # ------------------------------------------------------------------ niveles
+    def _set(self, side: str, price: float, qty: float) -> None:
+        book = self.bids if side == "BUY" else self.asks
+        if qty > 0:
+            book[price] = qty
+        else:
+            book.pop(price, None)
+
+        walls = self.walls[side]
+        notional = price * qty
+        if notional >= self.wall_threshold:
+            wall = walls.get(price)
+            if wall is None:
+                walls[price] = [notional, self.timestamp]
+            else:
+                wall[0] = notional
+        elif price in walls:
+            # Se clasifica al terminar el diff, con la cabeza del libro ya actualizada.
+            self._quitados.append((side, price, walls.pop(price)))
+
+    def _retiro(self, side: str, price: float, wall: List) -> None:
+        """Un muro dejó de serlo: retirada si sigue habiendo niveles mejores delante."""
+        best = self.best_bid if side == "BUY" else self.best_ask
+        if best is None:
+            return
+        # Con niveles mejores delante, el muro no pudo ejecutarse: se retiró.
+        if (side == "BUY" and price < best[0]) or (side == "SELL" and price > best[0]):
+            duracion = self.timestamp - wall[1]
+            self.retiros.append({
+                "tipo": "spoof" if duracion <= self.spoof_max_ms else "retiro",
+                "side": side,
+                "price": price,
+                "notional": wall[0],
+                "timestamp": self.timestamp,
+                "duracion_ms": duracion,
+            })
+
+    def _actualizar_mejores(self) -> None:
+        self.best_bid = self.bids.peekitem(0) if self.bids else None
+        self.best_ask = self.asks.peekitem(0) if self.asks else None
+
+    # ------------------------------------------------------------------ consultas
+    @property
+    def spread(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask[0] - self.best_bid[0]
+
+    def depth(self, side: str, n: int = 10) -> List[Tuple[float, float]]:
+        """Los `n` mejores niveles de un lado ('BUY' o 'SELL')."""
+        book = self.bids if side == "BUY" else self.asks
+        return [book.peekitem(i) for i in range(min(n, len(book)))]
+
+    def muros(self) -> List[Dict]:
+        """Muros activos (nocional >= umbral), del mayor al menor."""
+        out = [
+            {"side": side, "price": price, "notional": w[0], "desde": w[1]}
+            for side, walls in self.walls.items()
+            for price, w in walls.items()
+        ]
+        out.sort(key=lambda w: w["notional"], reverse=True)
+        return out
+
+    def eventos(self, ventana_ms: Optional[int] = None) -> Dict:
+        """Estado de manipulación para `whale_detector` en los últimos `ventana_ms`.
+
+        Returns:
+            {"orderbook_wall": bool, "spoofing": bool, "muros": [...],
+             "retiros": [...]} con las retiradas recientes.
+        """
+        ventana_ms = self.spoof_max_ms if ventana_ms is None else ventana_ms
+        desde = self.timestamp - ventana_ms
+        retiros = [r for r in self.retiros if r["timestamp"] >= desde]
+        return {
+            "orderbook_wall": bool(self.walls["BUY"] or self.walls["SELL"]),
+            "spoofing": any(r["tipo"] == "spoof" for r in retiros),
+            "muros": self.muros(),
+            "retiros": retiros,
+        }
+
+
+__all__ = ["OrderBook", "SequenceGapError"]
@@ -0,0 +1,445 @@
+"""
+stream_decoder.py
+Decodificación rápida de mensajes crudos de Binance (kline, aggTrade,
+depthUpdate) a columnas tipadas preasignadas.
+
+En vivo, parsear cada mensaje a dicts anidados y luego copiar sus campos
+domina el CPU. `DecodificadorStreams.feed(raw)` reconoce el tipo por el
+campo `"e"` del mensaje crudo (stream combinado `{"stream":..,"data":{..}}`
+o mensaje directo) y escribe sus campos directamente en:
+
+- `CandleWindow` (anillo de velas por símbolo, `update(...)` en sitio),
+- `BufferTrades` (columnas id/precio/cantidad/timestamp/lado por símbolo),
+- `BufferDiffs` (diffs de depth: ids y niveles en columnas planas).
+
+Cada tipo va por el camino que mide mejor en
+`benchmarks/bench_stream_decoder.py` (orjson 3.8, CPython 3.11):
+
+- kline: expresión regular exacta anclada en `"e"`, en el orden de campos
+  que publica Binance, sin dict por mensaje. El mensaje tiene ~20 campos y
+  solo se leen 7: ~190k msgs/s y ~1.5 KB/msg, frente a ~125k msgs/s y
+  ~1.6 KB/msg con orjson.
+- aggTrade: con orjson, `orjson.loads` y copia directa a las columnas
+  (~200k msgs/s, ~1.0 KB/msg); los grupos `bytes` y el objeto match de la
+  expresión regular asignaban más (~1.7 KB/msg) que el dict que
+  sustituían. Sin orjson, la expresión regular (el dict de `json` cuesta
+  ~2.4 KB/msg y va a la mitad de velocidad).
+- depthUpdate: siempre el backend JSON (sus listas de niveles se parsean
+  más rápido así); los niveles se copian a las columnas.
+
+Si una kline (o un aggTrade sin orjson) no encaja en el patrón (otro orden
+de campos, espacios), se decodifica con el backend JSON y se escribe en
+las mismas columnas; se cuenta en `lentos`. Los mensajes que no son JSON o
+de otro tipo (`avgPrice`, respuestas a suscripciones...) se cuentan en
+`desconocidos`, y los de un tipo conocido a los que les falta un campo o
+lo traen mal formado, en `invalidos`: ninguno escribe en las columnas.
+
+Backend JSON: `orjson` si está instalado, si no `json` de la librería
+estándar (`cargar_json` / `BACKEND_JSON`). `websocket_stream` usa el mismo.
+
+Referencias: docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from array import array
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from bot.core.candle_window import CandleWindow
+from bot.data.order_book import SequenceGapError
+
+try:
+    import orjson
+
+    cargar_json = orjson.loads
+    BACKEND_JSON = "orjson"
+except ImportError:  # pragma: no cover - depende del entorno
+    cargar_json = json.loads
+    BACKEND_JSON = "json"
+
+
+# Patrones exactos (sin `.*?`) anclados en el campo "e", con el orden de
+# campos de Binance spot/futuros.
+_KLINE = re.compile(
+    rb'"e":"kline","E":\d+,"s":"([A-Z0-9]+)","k":\{"t":(\d+),"T":\d+,"s":"[^"]*","i":"[^"]*",'
+    rb'"f":-?\d+,"L":-?\d+,"o":"([^"]*)","c":"([^"]*)","h":"([^"]*)","l":"([^"]*)","v":"([^"]*)",'
+    rb'"n":\d+,"x":(true|false)'
+)
+_AGG_TRADE = re.compile(
+    rb'"e":"aggTrade","E":\d+,"s":"([A-Z0-9]+)","a":(\d+),"p":"([^"]*)","q":"([^"]*)","f":-?\d+,"l":-?\d+,'
+    rb'"T":(\d+),"m":(true|false)'
+)
+_CAMPO_E = b'"e":"'
+_K, _A = ord("k"), ord("a")
+_ETIQUETA_AGG_TRADE = b'aggTrade"'
+# aggTrade por orjson si está: ver la docstring del módulo.
+_TRADES_VIA_JSON = BACKEND_JSON == "orjson"
+
+
+class BufferTrades:
+    """Lote de trades aggTrade de un símbolo en columnas preasignadas.
+
+    Se llena con `append` y se consume entero (`columnas()` + `vaciar()`, o
+    `aplicar(radar)`). Con el buffer lleno se llama a `on_lleno(buffer)`
+    para que el consumidor lo vacíe; si sigue lleno, el trade nuevo se
+    descarta y se cuenta en `descartados`.
+    """
+
+    __slots__ = ("capacity", "n", "descartados", "on_lleno", "id", "price", "qty", "timestamp", "buyer_maker")
+
+    def __init__(self, capacity: int = 65_536, on_lleno: Optional[Callable[["BufferTrades"], None]] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self.n = 0
+        self.descartados = 0
+        self.on_lleno = on_lleno
+        self.id = array("q", bytes(8 * capacity))
+        self.price = array("d", bytes(8 * capacity))
+        self.qty = array("d", bytes(8 * capacity))
+        self.timestamp = array("q", bytes(8 * capacity))
+        self.buyer_maker = array("b", bytes(capacity))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def append(self, agg_id: int, price: float, qty: float, timestamp: int, buyer_maker: bool) -> bool:
+        n = self.n
+        if n >= self.capacity:
+            if self.on_lleno is not None:
+                self.on_lleno(self)
+                n = self.n
+            if n >= self.capacity:
+                self.descartados += 1
+                return False
+        self.id[n] = agg_id
+        self.price[n] = price
+        self.qty[n] = qty
+        self.timestamp[n] = timestamp
+        self.buyer_maker[n] = buyer_maker
+        self.n = n + 1
+        return True
+
+    def columnas(self) -> Tuple[memoryview, ...]:
+        """Vistas (id, price, qty, timestamp, buyer_maker) de los trades pendientes."""
+        n = self.n
+        return tuple(memoryview(c)[:n] for c in (self.id, self.price, self.qty, self.timestamp, self.buyer_maker))
+
+    def vaciar(self) -> None:
+        self.n = 0
+
+    def aplicar(self, radar) -> int:
+        """Pasa los trades pendientes a `TradeRadar.on_trade` y vacía el buffer."""
+        on_trade = radar.on_trade
+        price, qty, bm, ts = self.price, self.qty, self.buyer_maker, self.timestamp
+        n = self.n
+        for i in range(n):
+            on_trade(price[i], qty[i], bool(bm[i]), ts[i])
+        self.n = 0
+        return n
+
+
+class BufferDiffs:
+    """Lote de diffs de depth de un símbolo en columnas preasignadas.
+
+    Por diff: `first_id` (U), `last_id` (u), `prev_id` (pu, -1 en spot),
+    `timestamp` (E), número de bids y fin de sus niveles; los niveles (bids
+    y luego asks de cada diff) van seguidos en `price`/`qty`. Mismo
+    tratamiento del desbordamiento que `BufferTrades`.
+    """
+
+    __slots__ = (
+        "max_diffs", "max_niveles", "n", "n_niveles", "descartados", "on_lleno",
+        "first_id", "last_id", "prev_id", "timestamp", "n_bids", "fin", "price", "qty",
+    )
+
+    def __init__(
+        self,
+        max_diffs: int = 4_096,
+        max_niveles: int = 131_072,
+        on_lleno: Optional[Callable[["BufferDiffs"], None]] = None,
+    ):
+        if max_diffs <= 0 or max_niveles <= 0:
+            raise ValueError("max_diffs and max_niveles must be > 0")
+        self.max_diffs = max_diffs
+        self.max_niveles = max_niveles
+        self.n = 0
+        self.n_niveles = 0
+        self.descartados = 0
+        self.on_lleno = on_lleno
+        self.first_id = array("q", bytes(8 * max_diffs))
+        self.last_id = array("q", bytes(8 * max_diffs))
+        self.prev_id = array("q", bytes(8 * max_diffs))
+        self.timestamp = array("q", bytes(8 * max_diffs))
+        self.n_bids = array("q", bytes(8 * max_diffs))
+        self.fin = array("q", bytes(8 * max_diffs))
+        self.price = array("d", bytes(8 * max_niveles))
+        self.qty = array("d", bytes(8 * max_niveles))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _escribir_niveles(self, niveles: Iterable) -> int:
+        price, qty, k, tope = self.price, self.qty, self.n_niveles, self.max_niveles
+        for p, q in niveles:
+            if k >= tope:
+                return -1
+            price[k] = float(p)
+            qty[k] = float(q)
+            k += 1
+        return k
+
+    def append(self, first_id: int, last_id: int, prev_id: int, timestamp: int, bids: Iterable, asks: Iterable) -> bool:
+        """Añade un diff; `bids`/`asks` son pares (precio, cantidad) en texto, bytes o float."""
+        if self.n >= self.max_diffs and self.on_lleno is not None:
+            self.on_lleno(self)
+        if self.n >= self.max_diffs:
+            self.descartados += 1
+            return False
+        inicio = self.n_niveles
+        try:
+            medio = self._escribir_niveles(bids)
+            if medio >= 0:
+                self.n_niveles = medio
+                fin = self._escribir_niveles(asks)
+            else:
+                fin = -1
+        except (TypeError, ValueError):
+            # Nivel mal formado: el diff no se añade y sus niveles ya copiados se descartan.
+            self.n_niveles = inicio
+            raise
+        if fin < 0:
+            self.n_niveles = inicio
+            if self.on_lleno is None or inicio == 0:
+                self.descartados += 1
+                return False
+            # Sin sitio para los niveles: se vacía el lote y se reintenta una vez.
+            self.on_lleno(self)
+            if self.n_niveles:
+                self.descartados += 1
+                return False
+            return self.append(first_id, last_id, prev_id, timestamp, bids, asks)
+        i = self.n
+        self.first_id[i] = first_id
+        self.last_id[i] = last_id
+        self.prev_id[i] = prev_id
+        self.timestamp[i] = timestamp
+        self.n_bids[i] = medio - inicio
+        self.fin[i] = fin
+        self.n_niveles = fin
+        self.n = i + 1
+        return True
+
+    def vaciar(self) -> None:
+        self.n = 0
+        self.n_niveles = 0
+
+    def aplicar(self, book) -> int:
+        """Aplica los diffs pendientes a un `OrderBook` (`apply_levels`) y vacía el buffer.
+
+        Raises:
+            SequenceGapError: si algún diff no continúa la secuencia. Los
+                diffs siguientes quedan en el buffer del libro para después
+                del snapshot, como con `apply_diff`.
+        """
+        price, qty = self.price, self.qty
+        error: Optional[SequenceGapError] = None
+        inicio = 0
+        n = self.n
+        for i in range(n):
+            medio = inicio + self.n_bids[i]
+            fin = self.fin[i]
+            pu = self.prev_id[i]
+            try:
+                book.apply_levels(
+                    self.first_id[i],
+                    self.last_id[i],
+                    zip(price[inicio:medio], qty[inicio:medio]),
+                    zip(price[medio:fin], qty[medio:fin]),
+                    self.timestamp[i],
+                    None if pu < 0 else pu,
+                )
+            except SequenceGapError as exc:
+                error = error or exc
+            inicio = fin
+        self.vaciar()
+        if error is not None:
+            raise error
+        return n
+
+
+class DecodificadorStreams:
+    """Decodifica mensajes crudos y los escribe en las columnas de cada símbolo.
+
+    Args:
+        ventanas: symbol -> CandleWindow para las klines.
+        trades: symbol -> BufferTrades para los aggTrade.
+        diffs: symbol -> BufferDiffs para los depthUpdate.
+        on_cierre: se llama con el symbol tras escribir una kline cerrada.
+
+    Los mensajes de símbolos sin destino se cuentan en `ignorados`; los
+    no reconocidos, en `desconocidos`, y los de un tipo conocido con campos
+    ausentes o mal formados, en `invalidos`.
+    """
+
+    def __init__(
+        self,
+        ventanas: Optional[Dict[str, CandleWindow]] = None,
+        trades: Optional[Dict[str, BufferTrades]] = None,
+        diffs: Optional[Dict[str, BufferDiffs]] = None,
+        on_cierre: Optional[Callable[[str], None]] = None,
+    ):
+        self.ventanas = ventanas or {}
+        self.trades = trades or {}
+        self.diffs = diffs or {}
+        self.on_cierre = on_cierre
+        # Claves en bytes: el símbolo extraído del mensaje no se decodifica.
+        self._ventanas = {s.encode(): (s, w) for s, w in self.ventanas.items()}
+        self._trades = {s.encode(): b for s, b in self.trades.items()}
+        self._diffs = {s.encode(): b for s, b in self.diffs.items()}
+        self.klines = 0
+        self.agg_trades = 0
+        self.depth_updates = 0
+        self.lentos = 0
+        self.ignorados = 0
+        self.desconocidos = 0
+        self.invalidos = 0
+
+    def feed(self, raw) -> Optional[str]:
+        """Decodifica un mensaje (str o bytes). Devuelve su tipo (`e`) o None si no se reconoce."""
+        if isinstance(raw, str):
+            raw = raw.encode()
+        # El campo "e" va al principio de "data": se lee su primera letra sin
+        # recorrer el mensaje entero.
+        i = raw.find(_CAMPO_E, 0, 96)
+        if i < 0 or i + 5 >= len(raw):
+            return self._json(raw)  # otro formato (espacios, campos en otro orden...)
+        tipo = raw[i + 5]
+        if tipo == _K:
+            g = _KLINE.match(raw, i)
+            if g is not None:
+                try:
+                    vela = (int(g[2]), float(g[3]), float(g[5]), float(g[6]), float(g[4]), float(g[7]))
+                except ValueError:  # el patrón acepta cualquier texto entre comillas
+                    self.invalidos += 1
+                    return None
+                self._kline(g[1], *vela, g[8] == b"true")
+                return "kline"
+        elif tipo == _A and raw.startswith(_ETIQUETA_AGG_TRADE, i + 5):
+            if _TRADES_VIA_JSON:
+                return self._agg_trade_json(raw)
+            g = _AGG_TRADE.match(raw, i)
+            if g is not None:
+                try:
+                    precio, cantidad = float(g[3]), float(g[4])
+                except ValueError:
+                    self.invalidos += 1
+                    return None
+                self.agg_trades += 1
+                buf = self._trades.get(g[1])
+                if buf is None:
+                    self.ignorados += 1
+                else:
+                    buf.append(int(g[2]), precio, cantidad, int(g[5]), g[6] == b"true")
+                return "aggTrade"
+        else:
+            return self._json(raw, lento=False)
+        return self._json(raw)
+
+    def _kline(self, symbol: bytes, ts: int, o: float, h: float, l: float, c: float, v: float, closed: bool) -> None:
+        self.klines += 1
+        destino = self._ventanas.get(symbol)
+        if destino is None:
+            self.ignorados += 1
+            return
+        nombre, window = destino
+        window.update(o, h, l, c, v, ts, closed)
+        if closed and self.on_cierre is not None:
+            self.on_cierre(nombre)
+
+    def _agg_trade_json(self, raw: bytes) -> Optional[str]:
+        """aggTrade con orjson: el dict transitorio directo a las columnas."""
+        try:
+            msg = cargar_json(raw)
+        except ValueError:
+            self.desconocidos += 1
+            return None
+        try:
+            data = msg.get("data", msg)
+            buf = self.trades.get(data["s"])
+            trade = (int(data["a"]), float(data["p"]), float(data["q"]), int(data["T"]), bool(data["m"]))
+        except (KeyError, TypeError, AttributeError, ValueError):
+            self.invalidos += 1
+            return None
+        self.agg_trades += 1
+        if buf is None:
+            self.ignorados += 1
+        else:
+            buf.append(*trade)
+        return "aggTrade"
+
+    def _json(self, raw: bytes, lento: bool = True) -> Optional[str]:
+        """Backend JSON y mismas columnas: depth, aggTrade con orjson y lo que no encaja en los patrones.
+
+        `lento` cuenta las klines y aggTrades que debían ir por su patrón.
+        """
+        try:
+            msg = cargar_json(raw)
+        except ValueError:
+            self.desconocidos += 1
+            return None
+        data = msg.get("data", msg) if isinstance(msg, dict) else None
+        tipo = data.get("e") if isinstance(data, dict) else None
+        if tipo not in ("kline", "aggTrade", "depthUpdate"):
+            self.desconocidos += 1
+            return None
+        # Todos los campos se leen antes de escribir: un mensaje incompleto no deja nada a medias.
+        try:
+            symbol = str(data["s"]).encode()
+            if tipo == "kline":
+                k = data["k"]
+                campos = (int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]),
+                          float(k["v"]), bool(k["x"]))
+            elif tipo == "aggTrade":
+                campos = (int(data["a"]), float(data["p"]), float(data["q"]), int(data["T"]), bool(data["m"]))
+            else:
+                campos = (int(data["U"]), int(data["u"]), int(data.get("pu", -1)), int(data.get("E", 0)))
+        except (KeyError, TypeError, AttributeError, ValueError):
+            self.invalidos += 1
+            return None
+        if lento and tipo != "depthUpdate":
+            self.lentos += 1
+        if tipo == "kline":
+            self._kline(symbol, *campos)
+        elif tipo == "aggTrade":
+            self.agg_trades += 1
+            buf = self._trades.get(symbol)
+            if buf is None:
+                self.ignorados += 1
+            else:
+                buf.append(*campos)
+        else:
+            self.depth_updates += 1
+            buf = self._diffs.get(symbol)
+            if buf is None:
+                self.ignorados += 1
+            else:
+                try:
+                    buf.append(*campos, data.get("b", ()), data.get("a", ()))
+                except (TypeError, ValueError):
+                    # Nivel mal formado: `BufferDiffs.append` no añade el diff.
+                    self.depth_updates -= 1
+                    self.invalidos += 1
+                    return None
+        return tipo
+
+
+__all__ = [
+    "BACKEND_JSON",
+    "BufferDiffs",
+    "BufferTrades",
+    "DecodificadorStreams",
+    "cargar_json",
+]
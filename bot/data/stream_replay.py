@@ -0,0 +1,223 @@
+"""
+stream_replay.py
+Grabación de tráfico WebSocket crudo y servidor local de reproducción
+para pruebas de carga sin red.
+
+Formato de grabación (`.bstr.gz`): un stream gzip que empieza con
+`MAGIC` y sigue con registros `<q I` (instante de recepción en ns desde
+epoch, longitud) + el mensaje crudo tal cual llegó (stream combinado
+`{"stream":..,"data":{..}}`). Un registro final incompleto (proceso
+interrumpido) se ignora al leer.
+
+- `GrabadorStreams`: escribe registros con un buffer grande (la compresión
+  trabaja por bloques, no por mensaje). `MultiplexorStreams(grabador=...)`
+  graba cada mensaje antes de decodificarlo.
+- `leer_grabacion(path)`: iterador de `(ts_ns, raw)`.
+- `ServidorReplay`: servidor WebSocket local que sirve una o varias
+  grabaciones en `/stream?streams=a/b` (el protocolo que usa
+  `websocket_stream`), solo con los streams pedidos, a velocidad 1x, Nx
+  (`velocidad=N`) o máxima (`velocidad=None`), respetando los intervalos
+  de recepción grabados. Mide mensajes enviados y la tasa de envío.
+
+Referencias: docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import heapq
+import io
+import struct
+import time
+from typing import Iterator, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+MAGIC = b"BSTR\x01"
+_REGISTRO = struct.Struct("<qI")
+_PREFIJO_STREAM = b'{"stream"'
+
+
+class GrabadorStreams:
+    """Escribe mensajes crudos con su instante de recepción en una grabación comprimida."""
+
+    def __init__(self, path: str, nivel: int = 6, buffer_bytes: int = 1 << 20):
+        self.path = path
+        self._gz = gzip.open(path, "wb", compresslevel=nivel)
+        self._fh = io.BufferedWriter(self._gz, buffer_size=buffer_bytes)
+        self._fh.write(MAGIC)
+        self.mensajes = 0
+        self.bytes = 0
+
+    def escribir(self, raw, ts_ns: Optional[int] = None) -> None:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        self._fh.write(_REGISTRO.pack(time.time_ns() if ts_ns is None else ts_ns, len(raw)))
+        self._fh.write(raw)
+        self.mensajes += 1
+        self.bytes += len(raw)
+
+    def flush(self) -> None:
+        self._fh.flush()
+        self._gz.flush()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()  # cierra también el GzipFile
+            self._gz.close()
+
+    def __enter__(self) -> "GrabadorStreams":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def leer_grabacion(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Registros `(ts_ns, raw)` de una grabación, en orden."""
+    with gzip.open(path, "rb") as gz:
+        fh = io.BufferedReader(gz, buffer_size=1 << 20)
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a stream recording")
+        cabecera = _REGISTRO.size
+        while True:
+            h = fh.read(cabecera)
+            if len(h) < cabecera:
+                return
+            ts, n = _REGISTRO.unpack(h)
+            raw = fh.read(n)
+            if len(raw) < n:
+                return
+            yield ts, raw
+
+
+def nombre_stream(raw: bytes) -> Optional[bytes]:
+    """Nombre del stream de un mensaje combinado (`btcusdt@kline_1m`) sin parsear el JSON."""
+    if not raw.startswith(_PREFIJO_STREAM):
+        return None
+    inicio = raw.find(b'"', len(_PREFIJO_STREAM)) + 1
+    fin = raw.find(b'"', inicio)
+    return raw[inicio:fin] if inicio and fin > 0 else None
+
+
+def _fusionar(paths: Sequence[str]) -> Iterator[Tuple[int, bytes]]:
+    """Registros de varias grabaciones en orden de recepción."""
+    return heapq.merge(*(leer_grabacion(p) for p in paths), key=lambda r: r[0])
+
+
+class ServidorReplay:
+    """Servidor WebSocket local que reproduce grabaciones por stream combinado.
+
+    Args:
+        paths: grabaciones a servir (se mezclan por instante de recepción).
+        velocidad: 1.0 = tiempo real, N = N veces más rápido, None = máxima.
+        cerrar_al_final: cierra la conexión al acabar (por defecto queda
+            abierta, para que el cliente no reconecte y reciba todo otra vez).
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        velocidad: Optional[float] = 1.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        cerrar_al_final: bool = False,
+    ):
+        if velocidad is not None and velocidad <= 0:
+            raise ValueError("velocidad must be > 0 or None")
+        self.paths = list(paths)
+        self.velocidad = velocidad
+        self.host = host
+        self.port = port
+        self.cerrar_al_final = cerrar_al_final
+        self._server = None
+        self.conexiones = 0
+        self.enviados = 0
+        self.segundos = 0.0
+        self.ultimos_enviados = 0
+        self.terminadas = 0
+        self._terminado = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = list(self._server.sockets)[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def start(self) -> None:
+        self._server = await websockets.serve(self._servir, self.host, self.port, max_queue=None)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "ServidorReplay":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def esperar_fin(self, timeout: Optional[float] = None) -> None:
+        """Espera a que alguna conexión haya recibido la grabación completa."""
+        await asyncio.wait_for(self._terminado.wait(), timeout)
+
+    def tasa(self) -> float:
+        """Mensajes/s de envío de la última reproducción completa."""
+        return self.ultimos_enviados / self.segundos if self.segundos else 0.0
+
+    @staticmethod
+    def _streams_pedidos(path: str) -> Optional[Set[bytes]]:
+        pedidos = parse_qs(urlsplit(path).query).get("streams")
+        if not pedidos:
+            return None
+        return {s.encode() for s in pedidos[0].split("/") if s}
+
+    async def _servir(self, ws) -> None:
+        self.conexiones += 1
+        streams = self._streams_pedidos(ws.request.path)
+        loop = asyncio.get_running_loop()
+        velocidad = self.velocidad
+        inicio = loop.time()
+        primero: Optional[int] = None
+        enviados = 0
+        send = ws.send
+        try:
+            for ts, raw in _fusionar(self.paths):
+                if streams is not None:
+                    nombre = nombre_stream(raw)
+                    if nombre is not None and nombre not in streams:
+                        continue
+                if velocidad is not None:
+                    if primero is None:
+                        primero = ts
+                    espera = inicio + (ts - primero) / 1e9 / velocidad - loop.time()
+                    if espera > 0:
+                        await asyncio.sleep(espera)
+                # Texto: el cliente recibe str, como desde Binance.
+                await send(raw.decode())
+                enviados += 1
+        except websockets.ConnectionClosed:
+            return
+        finally:
+            self.enviados += enviados
+        self.segundos = loop.time() - inicio
+        self.ultimos_enviados = enviados
+        self.terminadas += 1
+        self._terminado.set()
+        if self.cerrar_al_final:
+            await ws.close()
+        else:
+            await ws.wait_closed()
+
+
+__all__ = [
+    "GrabadorStreams",
+    "ServidorReplay",
+    "leer_grabacion",
+    "nombre_stream",
+    "MAGIC",
+]
@@ -1,9 +1,369 @@
 """
 websocket_stream.py
-Receptor de streams WebSocket de Binance (trades, kline, depth).
+Receptor de streams WebSocket de Binance (kline, aggTrade, depth) sobre
+conexiones de stream combinado.
+
+- `MultiplexorStreams` reparte los streams de todos los símbolos en lotes
+  de hasta `MAX_STREAMS_POR_CONEXION` y abre una conexión combinada
+  (`/stream?streams=a/b/c`) por lote. Los streams de un símbolo van
+  siempre en la misma conexión.
+- Cada conexión se reconecta con backoff exponencial con jitter a partir de
+  `websocket_reconnect_delay` (configs/data.json); la URL lleva los
+  streams, así que reconectar es volver a suscribirse.
+- Tras una reconexión, antes de volver a leer del socket, las klines
+  cerradas que se perdieron se piden por REST (`BinanceREST.backfill`) y
+  se entregan en orden; las klines cerradas repetidas se descartan. Si el
+  relleno falla, se vuelve a reconectar (y a rellenar) con el mismo backoff.
+- Los mensajes que no se pueden decodificar (JSON inválido, campos que
+  faltan) se cuentan en `invalidos` y se saltan sin cerrar la conexión.
+- Los mensajes decodificados se entregan en colas acotadas (`ColaAcotada`)
+  por tipo, cada una con su política de desbordamiento: `block` (la
+  lectura del socket espera al consumidor: contrapresión TCP),
+  `drop_oldest` o `drop_newest`. Los consumidores pueden leer por lotes
+  (`get_batch`).
+
+Formato entregado (`(symbol, payload)`):
+- klines: dict de vela (`timestamp`, `open`, `high`, `low`, `close`,
+  `volume`, `closed`, `interval`), el que aceptan `CandleWindow.update_kline`
+  y `Orquestador.on_kline`.
+- trades: el mensaje aggTrade tal cual (`TradeRadar.on_agg_trade`).
+- depth: el diff tal cual (`OrderBook.apply_diff`).
+
+Con `grabador` (`stream_replay.GrabadorStreams`) cada mensaje crudo se
+graba antes de decodificarlo; `stream_replay.ServidorReplay` lo sirve
+después con este mismo protocolo (`base_url=servidor.url`).
+
+El JSON se parsea con `stream_decoder.cargar_json` (orjson si está
+instalado). Para decodificar directamente a columnas sin dicts por mensaje,
+ver `stream_decoder.DecodificadorStreams`.
+
 Referencias: docs/07_Datos_y_APIs.md
 """
 
-def placeholder():
-    """Placeholder para implementación de WebSocket y reconexión."""
-    return None
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence
+
+import websockets
+
+from bot.core.resampler import interval_ms
+from bot.data.binance_api import BinanceAPIError
+from bot.data.stream_decoder import cargar_json
+
+WS_URL = "wss://stream.binance.com:9443"
+MAX_STREAMS_POR_CONEXION = 1024
+
+POLITICAS = ("block", "drop_oldest", "drop_newest")
+
+
+class ColaAcotada:
+    """Cola asyncio acotada con política explícita de desbordamiento."""
+
+    def __init__(self, maxsize: int = 10_000, politica: str = "block"):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be > 0")
+        if politica not in POLITICAS:
+            raise ValueError(f"politica must be one of {POLITICAS}")
+        self.maxsize = maxsize
+        self.politica = politica
+        self.descartados = 0
+        self._items: Deque = deque()
+        self._hay_datos = asyncio.Event()
+        self._hay_espacio = asyncio.Event()
+        self._hay_espacio.set()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return len(self._items) >= self.maxsize
+
+    def put_nowait(self, item) -> bool:
+        """Encola sin esperar; con cola llena aplica la política (`block` -> False)."""
+        items = self._items
+        if len(items) >= self.maxsize:
+            if self.politica == "drop_oldest":
+                items.popleft()
+                self.descartados += 1
+            else:
+                if self.politica == "drop_newest":
+                    self.descartados += 1
+                return False
+        items.append(item)
+        self._hay_datos.set()
+        if len(items) >= self.maxsize:
+            self._hay_espacio.clear()
+        return True
+
+    async def put(self, item) -> None:
+        """Encola; con política `block` espera a que haya hueco."""
+        while self.politica == "block" and len(self._items) >= self.maxsize:
+            self._hay_espacio.clear()
+            await self._hay_espacio.wait()
+        self.put_nowait(item)
+
+    def _tras_sacar(self) -> None:
+        if not self._items:
+            self._hay_datos.clear()
+        self._hay_espacio.set()
+
+    def get_nowait(self):
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        self._tras_sacar()
+        return item
+
+    async def get(self):
+        while not self._items:
+            await self._hay_datos.wait()
+        return self.get_nowait()
+
+    async def get_batch(self, max_items: int = 1024) -> List:
+        """Espera al menos un elemento y devuelve hasta `max_items` de golpe."""
+        while not self._items:
+            await self._hay_datos.wait()
+        items = self._items
+        n = min(max_items, len(items))
+        lote = [items.popleft() for _ in range(n)]
+        self._tras_sacar()
+        return lote
+
+
+def streams_simbolo(symbol: str, interval: str = "1m", kline: bool = True, agg_trade: bool = True, depth: bool = True) -> List[str]:
+    s = symbol.lower()
+    out = []
+    if kline:
+        out.append(f"{s}@kline_{interval}")
+    if agg_trade:
+        out.append(f"{s}@aggTrade")
+    if depth:
+        out.append(f"{s}@depth@100ms")
+    return out
+
+
+def agrupar(por_simbolo: Sequence[List[str]], max_streams: int = MAX_STREAMS_POR_CONEXION) -> List[List[str]]:
+    """Lotes de streams de hasta `max_streams`, sin partir los de un símbolo."""
+    lotes: List[List[str]] = []
+    actual: List[str] = []
+    for streams in por_simbolo:
+        if len(streams) > max_streams:
+            raise ValueError("a single symbol exceeds max_streams")
+        if len(actual) + len(streams) > max_streams:
+            lotes.append(actual)
+            actual = []
+        actual.extend(streams)
+    if actual:
+        lotes.append(actual)
+    return lotes
+
+
+def decodificar_kline(data: Dict) -> Dict:
+    """Evento `kline` de Binance -> dict de vela normalizado."""
+    k = data["k"]
+    return {
+        "timestamp": int(k["t"]),
+        "open": float(k["o"]),
+        "high": float(k["h"]),
+        "low": float(k["l"]),
+        "close": float(k["c"]),
+        "volume": float(k["v"]),
+        "closed": bool(k["x"]),
+        "interval": k["i"],
+    }
+
+
+class _Conexion:
+    """Una conexión de stream combinado con reconexión y relleno de huecos."""
+
+    def __init__(self, mux: "MultiplexorStreams", streams: List[str]):
+        self.mux = mux
+        self.streams = streams
+        self.symbols = sorted({s.split("@", 1)[0].upper() for s in streams})
+        self.url = f"{mux.base_url}/stream?streams={'/'.join(streams)}"
+        self.reconexiones = 0
+        self.mensajes = 0
+
+    async def run(self) -> None:
+        mux = self.mux
+        intentos = 0
+        conectada_antes = False
+        while not mux._parar.is_set():
+            try:
+                async with websockets.connect(self.url, max_size=2 ** 22, max_queue=mux.max_queue_ws) as ws:
+                    if conectada_antes:
+                        self.reconexiones += 1
+                        await mux._rellenar(self.symbols)
+                    conectada_antes = True
+                    despachar = mux._despachar
+                    async for raw in ws:
+                        intentos = 0
+                        self.mensajes += 1
+                        await despachar(raw)
+                        if mux._parar.is_set():
+                            break
+            except asyncio.CancelledError:
+                raise
+            except (OSError, websockets.ConnectionClosed, websockets.InvalidHandshake, asyncio.TimeoutError):
+                pass
+            if mux._parar.is_set():
+                return
+            await asyncio.sleep(mux.backoff(intentos))
+            intentos += 1
+
+
+class MultiplexorStreams:
+    """Streams kline/aggTrade/depth de muchos símbolos sobre conexiones combinadas."""
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        interval: str = "1m",
+        base_url: str = WS_URL,
+        kline: bool = True,
+        agg_trade: bool = True,
+        depth: bool = True,
+        max_streams: int = MAX_STREAMS_POR_CONEXION,
+        reconnect_delay: float = 3.0,
+        max_reconnect_delay: float = 60.0,
+        rest=None,
+        cola_klines: Optional[ColaAcotada] = None,
+        cola_trades: Optional[ColaAcotada] = None,
+        cola_depth: Optional[ColaAcotada] = None,
+        max_queue_ws: int = 4096,
+        reloj: Callable[[], float] = time.time,
+        grabador=None,
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.base_url = base_url.rstrip("/")
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.rest = rest
+        self.max_queue_ws = max_queue_ws
+        self._reloj = reloj
+        self.grabador = grabador
+        # Las velas cerradas no se pierden por defecto; trades y depth priorizan lo
+        # reciente (un diff de depth descartado lo detecta OrderBook como hueco).
+        self.klines = cola_klines or ColaAcotada(10_000, "block")
+        self.trades = cola_trades or ColaAcotada(100_000, "drop_oldest")
+        self.depth = cola_depth or ColaAcotada(100_000, "drop_oldest")
+        self._colas = {"kline": self.klines, "aggTrade": self.trades, "depthUpdate": self.depth}
+        self._ultima_cerrada: Dict[str, int] = {}
+        lotes = agrupar([streams_simbolo(s, interval, kline, agg_trade, depth) for s in self.symbols], max_streams)
+        self.conexiones = [_Conexion(self, lote) for lote in lotes]
+        self._tareas: List[asyncio.Task] = []
+        self._parar = asyncio.Event()
+        self.desconocidos = 0
+        self.invalidos = 0
+        self.duplicadas = 0
+        self.rellenadas = 0
+
+    @classmethod
+    def desde_config(cls, data: Dict, **kwargs) -> "MultiplexorStreams":
+        """Crea el multiplexor con `symbols`, `kline_interval` y `websocket_reconnect_delay` de data.json."""
+        return cls(
+            data["symbols"],
+            interval=data.get("kline_interval", "1m"),
+            reconnect_delay=float(data.get("websocket_reconnect_delay", 3)),
+            **kwargs,
+        )
+
+    def backoff(self, intentos: int) -> float:
+        """Espera antes del reintento `intentos` (exponencial con jitter 50-100%)."""
+        base = min(self.max_reconnect_delay, self.reconnect_delay * (2 ** intentos))
+        return base * (0.5 + random.random() / 2)
+
+    # ------------------------------------------------------------------ ciclo de vida
+    def start(self) -> None:
+        self._parar.clear()
+        self._tareas = [asyncio.ensure_future(c.run()) for c in self.conexiones]
+
+    async def stop(self) -> None:
+        self._parar.set()
+        for t in self._tareas:
+            t.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+
+    async def __aenter__(self) -> "MultiplexorStreams":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    # ------------------------------------------------------------------ mensajes
+    async def _despachar(self, raw) -> None:
+        if self.grabador is not None:
+            self.grabador.escribir(raw)
+        try:
+            msg = cargar_json(raw)
+            data = msg.get("data", msg)
+            tipo = data.get("e")
+            cola = self._colas.get(tipo)
+            if cola is None:
+                self.desconocidos += 1
+                return
+            symbol = data["s"]
+            if tipo == "kline":
+                data = decodificar_kline(data)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Un mensaje malformado se cuenta y se salta: no tira la conexión.
+            self.invalidos += 1
+            return
+        if tipo == "kline" and data["closed"]:
+            ultima = self._ultima_cerrada.get(symbol)
+            if ultima is not None and data["timestamp"] <= ultima:
+                self.duplicadas += 1
+                return
+            self._ultima_cerrada[symbol] = data["timestamp"]
+        await cola.put((symbol, data))
+
+    async def _rellenar(self, symbols: Sequence[str]) -> None:
+        """Pide por REST las klines cerradas perdidas durante la desconexión."""
+        if self.rest is None:
+            return
+        paso = interval_ms(self.interval)
+        ahora = int(self._reloj() * 1000)
+        fin = ahora - ahora % paso  # open_time de la vela en curso (excluida)
+        for symbol in symbols:
+            ultima = self._ultima_cerrada.get(symbol)
+            if ultima is None or ultima + paso >= fin:
+                continue
+            try:
+                rec = await self.rest.backfill(symbol, self.interval, ultima + paso, fin)
+            except BinanceAPIError as exc:
+                # Sin relleno no se sigue leyendo: se reconecta y se vuelve a intentar.
+                raise ConnectionError(f"kline backfill failed for {symbol}: {exc}") from exc
+            for r in rec:
+                vela = {
+                    "timestamp": int(r["timestamp"]),
+                    "open": float(r["open"]),
+                    "high": float(r["high"]),
+                    "low": float(r["low"]),
+                    "close": float(r["close"]),
+                    "volume": float(r["volume"]),
+                    "closed": True,
+                    "interval": self.interval,
+                }
+                self._ultima_cerrada[symbol] = vela["timestamp"]
+                self.rellenadas += 1
+                await self.klines.put((symbol, vela))
+
+
+__all__ = [
+    "ColaAcotada",
+    "MultiplexorStreams",
+    "agrupar",
+    "decodificar_kline",
+    "streams_simbolo",
+    "POLITICAS",
+]
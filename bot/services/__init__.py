@@ -1,5 +1,5 @@
 """
-Services package: logger and alert integrations.
+Services package: logger, alert integrations and the live signal orchestrator.
 """
 
-__all__ = ["logger", "alert_telegram"]
+__all__ = ["logger", "alert_telegram", "orchestrator", "sharding"]
@@ -0,0 +1,323 @@
+"""
+orchestrator.py
+Orquestador asyncio multi-símbolo: conecta el flujo de klines con
+`signal_engine.generar_senal_final`.
+
+Por símbolo mantiene:
+- `CandleWindow` con las últimas `kline_limit` velas (+ vela en curso),
+- `WhaleRadar` (mismo resultado que `whale_detector.analizar_ballenas`
+  sobre la ventana, en O(1) por vela),
+- su propio `estado_riesgo` (balance, pérdidas y operaciones del día).
+
+Flujo al cerrar una kline:
+1. En el event loop (O(1)): se añade la vela a la ventana y al radar.
+2. Los cierres que llegan en la misma iteración del loop (todos los
+   símbolos cierran a la vez en 1m) se agrupan en una ráfaga y se evalúan
+   fuera del loop en un executor, para no bloquear la recepción de
+   mensajes. La ráfaga es una sola tarea del executor: con el GIL, partirla
+   en lotes no añade paralelismo y cada lote extra es un salto de hilo más
+   que pagan los últimos símbolos.
+   Cada evaluación pasa por `signal_engine.EvaluadorSenal` (límites
+   diarios -> ballenas -> indicadores -> riesgo), que corta en la primera
+   etapa que rechaza y cuenta rechazos y tiempo por etapa. Los indicadores
+   de toda la ráfaga se calculan juntos (una pasada por vela de la ventana
+   para los 300 símbolos, no una por símbolo), con el mismo resultado
+   exacto que `generar_senal_final` sobre cada ventana.
+3. Cada señal se emite en el loop (`on_signal` y la cola `senales`) con su
+   `latencia_ms`: tiempo desde la recepción del cierre hasta la emisión.
+
+Con `consumir(buzon)` las klines llegan desde un `BuzonConflacion`: las
+actualizaciones de la vela en curso que el orquestador no llegó a leer se
+descartan y la latencia se mide desde la llegada al buzón.
+
+Al empezar a consumir (`run`/`consumir`) los objetos ya creados (módulos,
+histórico sembrado) pasan a la generación permanente del GC
+(`gc.freeze`): las colecciones completas que disparan las ráfagas solo
+recorren los objetos creados en vivo y no añaden decenas de ms a una
+ráfaga. Se desactiva con `congelar_gc=False`.
+
+Si un símbolo vuelve a cerrar antes de que se evalúe su cierre anterior,
+la evaluación atrasada se descarta (la ventana ya avanzó) y se cuenta en
+`metricas()["descartadas"]`. La re-entrega de la última vela cerrada
+(mismo `timestamp`) la corrige en sitio en la ventana y rehace el radar,
+pero no se vuelve a evaluar: cada vela cerrada se evalúa una vez.
+
+Referencias: docs/02_Arquitectura_Sistema.md, docs/03_Modulos_Core.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import inspect
+import time
+from array import array
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bot.core.candle_frame import Candles, as_frame
+from bot.core.candle_window import CandleWindow
+from bot.core.params import ParametrosEstrategia
+from bot.core.signal_engine import EvaluadorSenal, generar_senal_final
+from bot.core.whale_detector import WhaleRadar
+from bot.data.conflation import BuzonConflacion
+
+DAY_MS = 86_400_000
+
+
+class EstadoSimbolo:
+    """Estado en vivo de un símbolo."""
+
+    __slots__ = ("symbol", "window", "radar", "estado_riesgo", "configs", "_dia", "_ultimo_cierre")
+
+    def __init__(self, symbol: str, configs: Dict, estado_inicial: Dict, capacity: int, window=None):
+        self.symbol = symbol
+        # Cualquier objeto con `total` y `frame()`: CandleWindow o un buffer compartido.
+        self.window = CandleWindow(capacity) if window is None else window
+        self.radar = WhaleRadar()
+        estado = dict(estado_inicial)
+        estado.setdefault("balance", 1000.0)
+        estado.setdefault("perdidas_acumuladas", 0.0)
+        estado.setdefault("operaciones_hoy", 0)
+        self.estado_riesgo = estado
+        self.configs = {**configs, "symbol": symbol}
+        self._dia: Optional[int] = None
+        self._ultimo_cierre = 0
+
+    def nuevo_dia(self, timestamp: int) -> None:
+        dia = timestamp // DAY_MS
+        if dia != self._dia:
+            self._dia = dia
+            self.estado_riesgo["perdidas_acumuladas"] = 0.0
+            self.estado_riesgo["operaciones_hoy"] = 0
+
+    def registrar_cierre(self, timestamp: int) -> bool:
+        """Anota la vela cerrada `timestamp`; False si es la re-entrega de la última.
+
+        La ventana corrige una re-entrega en sitio sin avanzar, así que no
+        debe volver a evaluarse ni contarse en el radar como vela nueva.
+        """
+        if timestamp and timestamp == self._ultimo_cierre:
+            return False
+        self._ultimo_cierre = timestamp
+        return True
+
+
+def evaluar_simbolo(
+    st: EstadoSimbolo,
+    params: Optional[ParametrosEstrategia] = None,
+    evaluador: Optional[EvaluadorSenal] = None,
+) -> Optional[Dict]:
+    """`generar_senal_final` sobre la ventana de velas cerradas y el radar del símbolo.
+
+    Con `evaluador`, la evaluación pasa por sus etapas y contadores.
+    """
+    if evaluador is not None:
+        return evaluador.evaluar(st.window.frame(), st.estado_riesgo, st.configs, st.radar.ultimo)
+    return generar_senal_final(st.window.frame(), st.estado_riesgo, st.configs, st.radar.ultimo, params)
+
+
+class Orquestador:
+    """Pipeline de señales por cierre de kline para muchos símbolos."""
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        configs: Dict,
+        estado_inicial: Optional[Dict] = None,
+        capacity: int = 200,
+        params: Optional[ParametrosEstrategia] = None,
+        executor: Optional[Executor] = None,
+        on_signal: Optional[Callable] = None,
+        max_latencias: int = 8192,
+        congelar_gc: bool = True,
+    ):
+        self.simbolos: Dict[str, EstadoSimbolo] = {
+            s: EstadoSimbolo(s, configs, estado_inicial or {}, capacity) for s in symbols
+        }
+        self.params = params
+        self.evaluador = EvaluadorSenal(params)
+        self._executor = executor
+        self._propio = executor is None
+        self.on_signal = on_signal
+        self.senales: "asyncio.Queue[Dict]" = asyncio.Queue()
+        self._pendientes: List[Tuple[EstadoSimbolo, int, float]] = []
+        self._despacho_programado = False
+        self._en_curso: set = set()
+        self._latencias = array("d", bytes(8 * max_latencias))
+        self._n_latencias = 0
+        self.evaluaciones = 0
+        self.descartadas = 0
+        self.emitidas = 0
+        self.reentregas = 0
+        self.buzon: Optional[BuzonConflacion] = None
+        self.congelar_gc = congelar_gc
+
+    # ------------------------------------------------------------------ entrada
+    def seed(self, symbol: str, candles: Candles) -> None:
+        """Carga el histórico inicial (p.ej. klines REST) sin evaluar señales."""
+        st = self.simbolos[symbol]
+        frame = as_frame(candles)
+        for i in range(len(frame)):
+            o, h, l, c, v = (float(frame.open[i]), float(frame.high[i]), float(frame.low[i]),
+                             float(frame.close[i]), float(frame.volume[i]))
+            ts = int(frame.timestamp[i])
+            st.window.append(o, h, l, c, v, ts)
+            if st.registrar_cierre(ts):
+                st.radar.update(o, h, l, c, v)
+            else:
+                st.radar.resincronizar(st.window.frame())
+
+    def on_kline(self, symbol: str, kline: Dict, t0: Optional[float] = None) -> None:
+        """Aplica una kline del stream; si cerró, programa la evaluación del símbolo.
+
+        `t0` (`time.perf_counter`) es el instante de recepción si la kline
+        esperó en un buzón; por defecto, ahora.
+        """
+        if t0 is None:
+            t0 = time.perf_counter()
+        st = self.simbolos.get(symbol)
+        if st is None:
+            return
+        closed = bool(kline.get("closed", True))
+        get = kline.get
+        # Se convierte una vez para la ventana y el radar.
+        o, h, l, c, v = (float(get("open", 0.0)), float(get("high", 0.0)), float(get("low", 0.0)),
+                         float(get("close", 0.0)), float(get("volume", 0.0)))
+        ts = int(get("timestamp", 0))
+        st.window.update(o, h, l, c, v, ts, closed)
+        if not closed:
+            return
+        if not st.registrar_cierre(ts):
+            # Re-entrega: la vela se corrigió en sitio y la evaluación ya está
+            # hecha o encolada. El radar se rehace con la vela corregida.
+            st.radar.resincronizar(st.window.frame())
+            self.reentregas += 1
+            return
+        st.radar.update(o, h, l, c, v)
+        st.nuevo_dia(ts)
+        self._pendientes.append((st, st.window.total, t0))
+        if not self._despacho_programado:
+            # Se despacha en la siguiente iteración: agrupa todos los cierres de la ráfaga.
+            self._despacho_programado = True
+            asyncio.get_running_loop().call_soon(self._despachar)
+
+    async def run(self, feed: AsyncIterable[Tuple[str, Dict]]) -> None:
+        """Consume un feed asíncrono de (symbol, kline) hasta que se agote."""
+        self._congelar_gc()
+        async for symbol, kline in feed:
+            self.on_kline(symbol, kline)
+        await self.drain()
+
+    async def consumir(self, buzon: BuzonConflacion, max_items: int = 1024) -> None:
+        """Consume klines de un `BuzonConflacion` hasta que se cancele la tarea.
+
+        La latencia de cada señal se mide desde la llegada al buzón y las
+        métricas de conflación se publican en `metricas()["conflacion"]`.
+        """
+        self.buzon = buzon
+        self._congelar_gc()
+        on_kline = self.on_kline
+        while True:
+            for symbol, payload, t0 in await buzon.get_lote(max_items):
+                if "U" not in payload:  # los diffs de depth no son para el orquestador
+                    on_kline(symbol, payload, t0)
+            # Cede el loop para que se despachen y emitan las evaluaciones del lote.
+            await asyncio.sleep(0)
+
+    async def drain(self) -> None:
+        """Espera a que terminen las evaluaciones en curso."""
+        while self._en_curso or self._pendientes:
+            if self._en_curso:
+                await asyncio.gather(*list(self._en_curso))
+            else:
+                await asyncio.sleep(0)
+
+    def _congelar_gc(self) -> None:
+        if self.congelar_gc:
+            gc.collect()
+            gc.freeze()
+
+    def close(self) -> None:
+        if self._propio and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # ------------------------------------------------------------------ evaluación
+    def _despachar(self) -> None:
+        self._despacho_programado = False
+        pendientes, self._pendientes = self._pendientes, []
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="signal-eval")
+        fut = asyncio.get_running_loop().run_in_executor(self._executor, self._evaluar_rafaga, pendientes)
+        task = asyncio.ensure_future(self._emitir(fut))
+        self._en_curso.add(task)
+        task.add_done_callback(self._en_curso.discard)
+
+    def _evaluar_rafaga(self, rafaga: List[Tuple[EstadoSimbolo, int, float]]) -> List[Tuple[EstadoSimbolo, Optional[Dict], float]]:
+        """Corre en el executor: `generar_senal_final` de los símbolos de la ráfaga.
+
+        Las ventanas se evalúan juntas (`EvaluadorSenal.evaluar_simbolos`):
+        los indicadores avanzan vela a vela para toda la ráfaga a la vez.
+        """
+        vigentes = [(st, t0) for st, total, t0 in rafaga if st.window.total == total]
+        senales = self.evaluador.evaluar_simbolos([
+            (st.window.frame(), st.estado_riesgo, st.configs, st.radar.ultimo) for st, _ in vigentes
+        ])
+        out = [(st, None, -1.0) for st, total, _ in rafaga if st.window.total != total]
+        out.extend((st, senal, t0) for (st, t0), senal in zip(vigentes, senales))
+        return out
+
+    async def _emitir(self, fut: "asyncio.Future") -> None:
+        for st, senal, t0 in await fut:
+            if t0 < 0:
+                self.descartadas += 1
+                continue
+            self.evaluaciones += 1
+            latencia = (time.perf_counter() - t0) * 1000.0
+            self._registrar_latencia(latencia)
+            if senal is None:
+                continue
+            st.estado_riesgo["operaciones_hoy"] = int(st.estado_riesgo["operaciones_hoy"]) + 1
+            senal["latencia_ms"] = latencia
+            self.emitidas += 1
+            self.senales.put_nowait(senal)
+            if self.on_signal is not None:
+                res = self.on_signal(senal)
+                if inspect.isawaitable(res):
+                    await res
+
+    # ------------------------------------------------------------------ métricas
+    def _registrar_latencia(self, ms: float) -> None:
+        self._latencias[self._n_latencias % len(self._latencias)] = ms
+        self._n_latencias += 1
+
+    def metricas(self) -> Dict:
+        """Latencia cierre -> decisión (ms) de las últimas evaluaciones, contadores y etapas.
+
+        `etapas` es `EvaluadorSenal.estadisticas()`: dónde se rechazan las
+        evaluaciones y cuánto tiempo consume cada etapa. Con `consumir`,
+        `conflacion` son las métricas del buzón (actualizaciones descartadas).
+        """
+        n = min(self._n_latencias, len(self._latencias))
+        lat = sorted(self._latencias[:n])
+
+        def pct(q: float) -> float:
+            return lat[min(n - 1, int(q * n))] if n else 0.0
+
+        out = {
+            "evaluaciones": self.evaluaciones,
+            "emitidas": self.emitidas,
+            "descartadas": self.descartadas,
+            "reentregas": self.reentregas,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": lat[-1] if n else 0.0,
+            "etapas": self.evaluador.estadisticas(),
+        }
+        if self.buzon is not None:
+            out["conflacion"] = self.buzon.metricas()
+        return out
+
+
+__all__ = ["Orquestador", "EstadoSimbolo", "evaluar_simbolo"]
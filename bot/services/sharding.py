@@ -0,0 +1,486 @@
+"""
+sharding.py
+Modo de ejecución repartido: los símbolos de `configs/data.json` se
+distribuyen entre N procesos worker para no competir por el GIL.
+
+- `BufferVelas`: ventanas de velas cerradas de todos los símbolos en un
+  bloque de `multiprocessing.shared_memory`, con el mismo anillo espejado
+  que `CandleWindow` (`capacity + 1` huecos duplicados: las vistas de la
+  ventana son contiguas y la siguiente vela nunca pisa una vela visible).
+  El proceso de ingesta escribe cada vela una sola vez (salvo re-entregas
+  de la última vela, que se corrigen en sitio); los workers leen vistas
+  `memoryview` sin copia. Cada símbolo lleva un contador de versión
+  (seqlock): impar mientras se escribe, +2 por escritura. El worker lo lee
+  antes y después de evaluar y descarta la evaluación si cambió (lectura a
+  medias). La re-entrega de la última vela cerrada llega al worker marcada:
+  rehace el radar y solo se evalúa si la evaluación original se descartó,
+  así que cada vela se evalúa una vez, como en `Orquestador`.
+- `OrquestadorSharded`: proceso central. Escribe las klines cerradas en el
+  buffer y, por cada ráfaga de cierres, envía a cada worker solo los
+  índices de sus símbolos que cerraron. Cada worker mantiene para su shard
+  el `WhaleRadar` y el estado de riesgo (`orchestrator.EstadoSimbolo`) y
+  evalúa `generar_senal_final` por etapas (`signal_engine.EvaluadorSenal`).
+  Los resultados vuelven por una única cola, que un hilo colector del
+  proceso central consume para emitir señales y medir la latencia
+  cierre -> señal.
+
+Las velas en curso (`closed=False`) no se escriben: los workers solo
+evalúan velas cerradas.
+
+Referencias: docs/02_Arquitectura_Sistema.md, docs/07_Datos_y_APIs.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+from typing import AsyncIterable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bot.core.candle_frame import CandleFrame, Candles, as_frame
+from bot.core.params import ParametrosEstrategia
+from bot.core.signal_engine import ETAPAS, EvaluadorSenal
+from bot.services.orchestrator import EstadoSimbolo, evaluar_simbolo
+
+_COLUMNAS = ("open", "high", "low", "close", "volume")
+# Resultado de un worker para una re-entrega que no se evalúa.
+_REENTREGA = -2.0
+
+
+def particionar(n: int, workers: int) -> List[List[int]]:
+    """Reparte los índices 0..n-1 entre `workers` shards (round-robin)."""
+    workers = max(1, min(workers, n)) if n else 1
+    return [list(range(w, n, workers)) for w in range(workers)]
+
+
+class BufferVelas:
+    """Ventanas de velas cerradas de `n` símbolos en memoria compartida.
+
+    Layout (8 bytes por campo): `total[n]`, `version[n]`,
+    `timestamp[n][2*slots]` y `open/high/low/close/volume[n][2*slots]`, con
+    `slots = capacity + 1`. Un solo escritor (`append`); cualquier número de
+    lectores.
+    """
+
+    def __init__(self, n: int, capacity: int = 200, name: Optional[str] = None):
+        if n <= 0 or capacity <= 0:
+            raise ValueError("n and capacity must be > 0")
+        self.n = n
+        self.capacity = capacity
+        self._slots = capacity + 1
+        self._fila = 2 * self._slots
+        enteros = 2 * n + n * self._fila
+        self._ts0 = 2 * n
+        size = 8 * (enteros + len(_COLUMNAS) * n * self._fila)
+        self._propietario = name is None
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        self._q = buf[: 8 * enteros].cast("q")
+        self._d = buf[8 * enteros: size].cast("d")
+        self.totales = self._q[:n]
+        self.versiones = self._q[n: 2 * n]
+        if self._propietario:
+            self._q[:] = array("q", bytes(8 * enteros))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def adjuntar(cls, name: str, n: int, capacity: int) -> "BufferVelas":
+        """Se adjunta a un buffer creado por otro proceso."""
+        return cls(n, capacity, name=name)
+
+    def _base(self, col: int, i: int) -> int:
+        return (col * self.n + i) * self._fila
+
+    def total(self, i: int) -> int:
+        """Velas cerradas escritas para el símbolo `i` desde la creación."""
+        return self.totales[i]
+
+    def version(self, i: int) -> int:
+        """Versión del símbolo `i`: impar durante una escritura; cambia con cada `append`."""
+        return self.versiones[i]
+
+    def append(self, i: int, o: float, h: float, l: float, c: float, v: float, ts: int) -> int:
+        """Escribe una vela cerrada del símbolo `i`; devuelve el nuevo total."""
+        count = self.totales[i]
+        slots = self._slots
+        ts_base = self._ts0 + i * self._fila
+        if count and ts and self._q[ts_base + (count - 1) % slots] == ts:
+            pos, nuevo = (count - 1) % slots, count  # re-entrega: se corrige en sitio
+        else:
+            pos, nuevo = count % slots, count + 1
+        version = self.versiones[i]
+        self.versiones[i] = version + 1
+        d = self._d
+        fila = self._fila * self.n
+        base = i * self._fila + pos
+        for col, valor in enumerate((o, h, l, c, v)):
+            off = col * fila + base
+            d[off] = d[off + slots] = valor
+        self._q[ts_base + pos] = self._q[ts_base + pos + slots] = ts
+        # El total se publica al final: los lectores nunca ven una vela a medias.
+        self.totales[i] = nuevo
+        self.versiones[i] = version + 2
+        return nuevo
+
+    def frame(self, i: int, n: Optional[int] = None) -> CandleFrame:
+        """Vista sin copia de las últimas `n` velas cerradas del símbolo `i`."""
+        count = self.totales[i]
+        if not count:
+            return CandleFrame.empty()
+        slots = self._slots
+        end = (count - 1) % slots + 1 + slots
+        available = min(count, self.capacity)
+        size = available if n is None else max(0, min(n, available))
+        start = end - size
+        cols = [self._d[self._base(col, i) + start: self._base(col, i) + end] for col in range(len(_COLUMNAS))]
+        ts_base = self._ts0 + i * self._fila
+        return CandleFrame(*cols, self._q[ts_base + start: ts_base + end])
+
+    def vela(self, i: int, k: int) -> Tuple[float, float, float, float, float, int]:
+        """Vela cerrada número `k` (0-based) del símbolo `i`, si sigue en el anillo."""
+        count = self.totales[i]
+        if not (count - self.capacity <= k < count):
+            raise IndexError(k)
+        pos = k % self._slots
+        d = self._d
+        return tuple(d[self._base(col, i) + pos] for col in range(len(_COLUMNAS))) + (
+            self._q[self._ts0 + i * self._fila + pos],)
+
+    def ventana(self, i: int) -> "_VentanaCompartida":
+        return _VentanaCompartida(self, i)
+
+    def close(self) -> None:
+        for mv in (self.totales, self.versiones, self._q, self._d):
+            mv.release()
+        self.shm.close()
+        if self._propietario:
+            self.shm.unlink()
+
+
+class _VentanaCompartida:
+    """Adaptador de un símbolo de `BufferVelas` con la interfaz de `CandleWindow`."""
+
+    __slots__ = ("_buf", "_i")
+
+    def __init__(self, buf: BufferVelas, i: int):
+        self._buf = buf
+        self._i = i
+
+    @property
+    def total(self) -> int:
+        return self._buf.total(self._i)
+
+    def __len__(self) -> int:
+        return min(self.total, self._buf.capacity)
+
+    def frame(self, n: Optional[int] = None) -> CandleFrame:
+        return self._buf.frame(self._i, n)
+
+
+# ---------------------------------------------------------------------- worker
+def _worker(
+    nombre: str,
+    symbols: Sequence[str],
+    capacity: int,
+    indices: Sequence[int],
+    configs: Dict,
+    estado_inicial: Dict,
+    params: Optional[ParametrosEstrategia],
+    entrada: "mp.Queue",
+    salida: "mp.Queue",
+) -> None:
+    buf = BufferVelas.adjuntar(nombre, len(symbols), capacity)
+    evaluador = EvaluadorSenal(params)
+    estados: Dict[int, EstadoSimbolo] = {}
+    vistos: Dict[int, int] = {}
+    # Símbolos cuya última vela vista por el radar se corrigió en sitio.
+    resincronizar = set()
+    # Símbolo -> total de su última evaluación descartada.
+    descartada: Dict[int, int] = {}
+    for i in indices:
+        st = EstadoSimbolo(symbols[i], configs, estado_inicial, capacity, window=buf.ventana(i))
+        st.radar.seed(st.window.frame())
+        estados[i] = st
+        vistos[i] = buf.total(i)
+    salida.put(None)  # listo
+    try:
+        while True:
+            lote = entrada.get()
+            if lote is None:
+                break
+            out = []
+            for i, total, t0, reentrega in lote:
+                st = estados[i]
+                if reentrega:
+                    # Re-entrega de la última vela cerrada: el radar se rehace con la
+                    # vela corregida. Solo se evalúa si su evaluación se descartó.
+                    resincronizar.add(i)
+                    if descartada.get(i) != total:
+                        out.append((st.symbol, None, _REENTREGA))
+                        continue
+                version = buf.version(i)
+                rehecho = False
+                if i in resincronizar:
+                    if not version & 1 and buf.total(i) == total:
+                        st.radar.resincronizar(st.window.frame())
+                        st.nuevo_dia(buf.vela(i, total - 1)[5])
+                        vistos[i] = total
+                        resincronizar.discard(i)
+                        rehecho = True
+                else:
+                    # El radar avanza por cada vela cerrada desde la última vista.
+                    for k in range(max(vistos[i], total - capacity), total):
+                        o, h, l, c, v, ts = buf.vela(i, k)
+                        st.radar.update(o, h, l, c, v)
+                        st.nuevo_dia(ts)
+                    vistos[i] = max(vistos[i], total)
+                if version & 1 or buf.total(i) != total:
+                    descartada[i] = total
+                    out.append((st.symbol, None, -1.0))
+                    continue
+                senal = evaluar_simbolo(st, evaluador=evaluador)
+                if buf.version(i) != version:
+                    # La vela se reescribió mientras se evaluaba (lectura a medias):
+                    # se evalúa con la re-entrega, que llega detrás.
+                    if rehecho:
+                        resincronizar.add(i)
+                    descartada[i] = total
+                    out.append((st.symbol, None, -1.0))
+                    continue
+                descartada.pop(i, None)
+                if senal is not None:
+                    st.estado_riesgo["operaciones_hoy"] = int(st.estado_riesgo["operaciones_hoy"]) + 1
+                out.append((st.symbol, senal, t0))
+            salida.put(out)
+        salida.put(evaluador.estadisticas())
+    finally:
+        estados.clear()
+        buf.close()
+
+
+# ---------------------------------------------------------------------- ingesta
+class OrquestadorSharded:
+    """Ingesta central + N workers que evalúan señales sobre un buffer compartido."""
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        configs: Dict,
+        estado_inicial: Optional[Dict] = None,
+        capacity: int = 200,
+        params: Optional[ParametrosEstrategia] = None,
+        workers: Optional[int] = None,
+        on_signal: Optional[Callable] = None,
+        max_latencias: int = 8192,
+    ):
+        self.symbols = list(symbols)
+        self._indice = {s: i for i, s in enumerate(self.symbols)}
+        self.configs = configs
+        self.estado_inicial = dict(estado_inicial or {})
+        self.capacity = capacity
+        self.params = params
+        self.on_signal = on_signal
+        self.buffer = BufferVelas(len(self.symbols), capacity)
+        self.shards = particionar(len(self.symbols), workers or os.cpu_count() or 1)
+        self._shard_de = array("i", bytes(4 * len(self.symbols)))
+        for w, indices in enumerate(self.shards):
+            for i in indices:
+                self._shard_de[i] = w
+        self._ctx = mp.get_context()
+        self._entradas: List = []
+        self._salida = None
+        self._procesos: List = []
+        self._colector: Optional[threading.Thread] = None
+        self._pendientes: List[List[Tuple[int, int, float, bool]]] = [[] for _ in self.shards]
+        self._despacho_programado = False
+        self.senales: "queue.Queue[Dict]" = queue.Queue()
+        self._latencias = array("d", bytes(8 * max_latencias))
+        self._n_latencias = 0
+        self.enviadas = 0
+        self.evaluaciones = 0
+        self.descartadas = 0
+        self.emitidas = 0
+        self.reentregas = 0
+        self.etapas: Dict[str, Dict] = {
+            nombre: {"evaluaciones": 0, "rechazos": 0, "tiempo_ms": 0.0, "medio_us": 0.0} for nombre in ETAPAS
+        }
+
+    @classmethod
+    def desde_config(cls, data: Dict, configs: Dict, **kwargs) -> "OrquestadorSharded":
+        """Crea el orquestador con `symbols` y `kline_limit` de `configs/data.json`."""
+        return cls(data["symbols"], configs, capacity=data.get("kline_limit", 200), **kwargs)
+
+    # ------------------------------------------------------------------ ciclo de vida
+    def seed(self, symbol: str, candles: Candles) -> None:
+        """Carga el histórico inicial; debe llamarse antes de `start`."""
+        i = self._indice[symbol]
+        frame = as_frame(candles)
+        append = self.buffer.append
+        for k in range(len(frame)):
+            append(i, float(frame.open[k]), float(frame.high[k]), float(frame.low[k]),
+                   float(frame.close[k]), float(frame.volume[k]), int(frame.timestamp[k]))
+
+    def start(self) -> None:
+        """Arranca los workers y el hilo colector; espera a que estén listos."""
+        self._salida = self._ctx.Queue()
+        for indices in self.shards:
+            entrada = self._ctx.Queue()
+            p = self._ctx.Process(
+                target=_worker,
+                args=(self.buffer.name, self.symbols, self.capacity, indices, self.configs,
+                      self.estado_inicial, self.params, entrada, self._salida),
+                daemon=True,
+            )
+            p.start()
+            self._entradas.append(entrada)
+            self._procesos.append(p)
+        for _ in self._procesos:
+            self._salida.get()
+        self._colector = threading.Thread(target=self._recoger, name="shard-collector", daemon=True)
+        self._colector.start()
+
+    def stop(self) -> None:
+        """Detiene workers y colector y libera la memoria compartida."""
+        for entrada in self._entradas:
+            entrada.put(None)
+        for p in self._procesos:
+            p.join()
+        if self._colector is not None:
+            self._salida.put(None)
+            self._colector.join()
+        self._entradas, self._procesos, self._colector = [], [], None
+        self.buffer.close()
+
+    def __enter__(self) -> "OrquestadorSharded":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------ entrada
+    def on_kline(self, symbol: str, kline: Dict) -> None:
+        """Escribe una kline cerrada en el buffer y la encola para el worker de su shard.
+
+        La re-entrega de la última vela cerrada (mismo `timestamp`) se
+        corrige en sitio y no se vuelve a evaluar, como en `Orquestador`:
+        el worker la recibe marcada para rehacer su radar (y evaluarla solo
+        si la evaluación original se descartó por lectura a medias).
+        """
+        if not kline.get("closed", True):
+            return
+        t0 = time.monotonic()
+        i = self._indice.get(symbol)
+        if i is None:
+            return
+        antes = self.buffer.total(i)
+        total = self.buffer.append(
+            i,
+            float(kline.get("open", 0.0)),
+            float(kline.get("high", 0.0)),
+            float(kline.get("low", 0.0)),
+            float(kline.get("close", 0.0)),
+            float(kline.get("volume", 0.0)),
+            int(kline.get("timestamp", 0)),
+        )
+        self._pendientes[self._shard_de[i]].append((i, total, t0, total == antes))
+        if not self._despacho_programado:
+            self._despacho_programado = True
+            try:
+                asyncio.get_running_loop().call_soon(self.flush)
+            except RuntimeError:
+                self._despacho_programado = False  # sin loop: el llamador invoca flush()
+
+    def flush(self) -> None:
+        """Envía a cada worker los cierres acumulados de su shard (un mensaje por worker)."""
+        self._despacho_programado = False
+        for w, lote in enumerate(self._pendientes):
+            if lote:
+                self._entradas[w].put(lote)
+                self.enviadas += len(lote)
+                self._pendientes[w] = []
+
+    async def run(self, feed: AsyncIterable[Tuple[str, Dict]]) -> None:
+        """Consume un feed asíncrono de (symbol, kline) hasta que se agote."""
+        async for symbol, kline in feed:
+            self.on_kline(symbol, kline)
+        await self.drain()
+
+    async def drain(self) -> None:
+        """Espera a que vuelvan todos los resultados enviados."""
+        self.flush()
+        while self.evaluaciones + self.descartadas + self.reentregas < self.enviadas:
+            await asyncio.sleep(0.001)
+
+    # ------------------------------------------------------------------ salida
+    def _recoger(self) -> None:
+        while True:
+            lote = self._salida.get()
+            if lote is None:
+                return
+            if isinstance(lote, dict):  # estadísticas de un worker al detenerse
+                self._sumar_etapas(lote)
+                continue
+            ahora = time.monotonic()
+            for symbol, senal, t0 in lote:
+                if t0 < 0:
+                    if t0 == _REENTREGA:
+                        self.reentregas += 1
+                    else:
+                        self.descartadas += 1
+                    continue
+                latencia = (ahora - t0) * 1000.0
+                self._latencias[self._n_latencias % len(self._latencias)] = latencia
+                self._n_latencias += 1
+                if senal is not None:
+                    senal["latencia_ms"] = latencia
+                    self.emitidas += 1
+                    self.senales.put(senal)
+                    if self.on_signal is not None:
+                        self.on_signal(senal)
+                self.evaluaciones += 1
+
+    def _sumar_etapas(self, etapas: Dict[str, Dict]) -> None:
+        for nombre, e in etapas.items():
+            total = self.etapas[nombre]
+            for k in ("evaluaciones", "rechazos", "tiempo_ms"):
+                total[k] += e[k]
+            total["medio_us"] = total["tiempo_ms"] * 1000.0 / total["evaluaciones"] if total["evaluaciones"] else 0.0
+
+    def metricas(self) -> Dict:
+        """Latencia cierre -> resultado en el proceso central (ms) y contadores.
+
+        `etapas` suma `EvaluadorSenal.estadisticas()` de todos los workers;
+        se completa al detenerlos (`stop`).
+        """
+        n = min(self._n_latencias, len(self._latencias))
+        lat = sorted(self._latencias[:n])
+
+        def pct(q: float) -> float:
+            return lat[min(n - 1, int(q * n))] if n else 0.0
+
+        return {
+            "workers": len(self.shards),
+            "evaluaciones": self.evaluaciones,
+            "emitidas": self.emitidas,
+            "descartadas": self.descartadas,
+            "reentregas": self.reentregas,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": lat[-1] if n else 0.0,
+            "etapas": {nombre: dict(e) for nombre, e in self.etapas.items()},
+        }
+
+
+__all__ = ["BufferVelas", "OrquestadorSharded", "particionar"]
@@ -0,0 +1,178 @@
+"""
+Tests unitarios para data/backfill.py
+"""
+
+import asyncio
+import io
+import json
+import zipfile
+
+import numpy as np
+
+from bot.data.backfill import BackfillHistorico, Checkpoint, importar_directorio, parsear_csv_klines
+from bot.data.binance_api import BinanceREST, klines_a_registros
+from bot.data.kline_store import KlineStore
+from bot.tests.test_binance_api import T0, StubBinance, _kline
+
+MIN = 60_000
+
+
+def _esperado(symbol, inicio, n):
+    return klines_a_registros([_kline(symbol, T0 + MIN * k) for k in range(inicio, inicio + n)])
+
+
+def test_gaps_y_plan(tmp_path):
+    store = KlineStore(str(tmp_path / "store"))
+    store.append("BTCUSDT", "1m", _esperado("BTCUSDT", 100, 50))
+    store.append("BTCUSDT", "1m", _esperado("BTCUSDT", 300, 10))
+    fin = T0 + 1_000 * MIN
+    assert store.gaps("BTCUSDT", "1m", T0, fin) == [
+        (T0, T0 + 100 * MIN), (T0 + 150 * MIN, T0 + 300 * MIN), (T0 + 310 * MIN, fin)]
+    assert store.gaps("BTCUSDT", "1m", T0 + 100 * MIN, T0 + 150 * MIN) == []
+    assert store.gaps("ETHUSDT", "1m", T0 + 1, T0 + 2 * MIN) == [(T0 + MIN, T0 + 2 * MIN)]
+
+    job = BackfillHistorico(store, rest=None, checkpoint_path=str(tmp_path / "ck.json"), limit=200)
+    job.checkpoint.marcar("BTCUSDT", "1m", [(T0 + 400 * MIN, T0 + 500 * MIN)])
+    assert job.planificar("BTCUSDT", "1m", T0, fin) == [
+        (T0, T0 + 100 * MIN),
+        (T0 + 150 * MIN, T0 + 300 * MIN),
+        (T0 + 310 * MIN, T0 + 400 * MIN),
+        (T0 + 500 * MIN, T0 + 700 * MIN),
+        (T0 + 700 * MIN, T0 + 900 * MIN),
+        (T0 + 900 * MIN, fin),
+    ]
+
+
+def test_backfill_rellena_huecos_y_no_repite(tmp_path):
+    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+    store = KlineStore(str(tmp_path / "store"))
+    store.append("ETHUSDT", "1m", _esperado("ETHUSDT", 2_000, 500))
+    ck = str(tmp_path / "ck.json")
+    # Desde antes del listado (T0): esos tramos vienen vacíos y se recuerdan en el checkpoint.
+    inicio, fin = T0 - 2_000 * MIN, T0 + 6_000 * MIN
+
+    async def caso():
+        async with StubBinance(velas=6_000) as stub:
+            async with BinanceREST(stub.url) as rest:
+                job = BackfillHistorico(store, rest, ck, limit=500, max_en_vuelo=4, lote_escritura=2_000)
+                plan = sum(len(job.planificar(s, "1m", inicio, fin)) for s in symbols)
+                r = await job.ejecutar(symbols, ["1m"], inicio, fin)
+                assert r["tramos_descargados"] == plan == stub.peticiones
+                assert stub.max_en_vuelo <= 4
+                assert r["errores"] == 0 and 1 < r["appends"] < plan
+
+                # Segunda ejecución: nada que descargar.
+                job = BackfillHistorico(store, rest, ck, limit=500)
+                antes = stub.peticiones
+                assert await job.ejecutar(symbols, ["1m"], inicio, fin) == {
+                    "tramos_descargados": 0, "velas_escritas": 0, "appends": 0, "errores": 0}
+                assert stub.peticiones == antes
+                return r
+
+    r = asyncio.run(caso())
+    assert r["velas_escritas"] == 3 * 6_000 - 500
+    for s in symbols:
+        recs = store.load_records(s, "1m")
+        np.testing.assert_array_equal(recs, _esperado(s, 0, 6_000))
+    assert Checkpoint(ck).rangos("BTCUSDT", "1m") == [(inicio, fin)]
+
+
+def test_backfill_por_lotes_anterior_a_lo_guardado_no_fragmenta(tmp_path):
+    store = KlineStore(str(tmp_path / "store"))
+    store.append("BTCUSDT", "1m", _esperado("BTCUSDT", 5_000, 1_000))
+
+    async def caso():
+        async with StubBinance(velas=6_000) as stub:
+            async with BinanceREST(stub.url) as rest:
+                job = BackfillHistorico(store, rest, str(tmp_path / "ck.json"), limit=500, lote_escritura=1_000)
+                return await job.ejecutar(["BTCUSDT"], ["1m"], T0, T0 + 6_000 * MIN)
+
+    r = asyncio.run(caso())
+    assert r["appends"] == 5 and r["velas_escritas"] == 5_000
+    # Cada lote continúa el anterior: un solo segmento nuevo, no uno por lote.
+    assert store.coverage("BTCUSDT", "1m") == [(T0, T0 + 4_999 * MIN), (T0 + 5_000 * MIN, T0 + 5_999 * MIN)]
+    np.testing.assert_array_equal(store.load_records("BTCUSDT", "1m"), _esperado("BTCUSDT", 0, 6_000))
+
+
+def test_interrupcion_y_reanudacion(tmp_path):
+    store = KlineStore(str(tmp_path / "store"))
+    ck = str(tmp_path / "ck.json")
+    fin = T0 + 20_000 * MIN
+
+    async def caso():
+        async with StubBinance(velas=20_000, delay=0.01) as stub:
+            async with BinanceREST(stub.url) as rest:
+                job = BackfillHistorico(store, rest, ck, limit=500, max_en_vuelo=2, lote_escritura=1_000)
+                total = len(job.planificar("BTCUSDT", "1m", T0, fin))
+                tarea = asyncio.ensure_future(job.ejecutar(["BTCUSDT"], ["1m"], T0, fin))
+                while job.tramos_descargados < 15:
+                    await asyncio.sleep(0.005)
+                tarea.cancel()
+                await asyncio.gather(tarea, return_exceptions=True)
+                primera = job.tramos_descargados
+                # Lo descargado antes de cancelar quedó escrito.
+                assert store.count("BTCUSDT", "1m") == 500 * primera
+
+                job = BackfillHistorico(store, rest, ck, limit=500, max_en_vuelo=4)
+                assert len(job.planificar("BTCUSDT", "1m", T0, fin)) == total - primera
+                await job.ejecutar(["BTCUSDT"], ["1m"], T0, fin)
+                assert primera + job.tramos_descargados == total
+                # Como mucho se repiten las peticiones que estaban en vuelo al cancelar.
+                assert stub.peticiones <= total + 2
+
+    asyncio.run(caso())
+    np.testing.assert_array_equal(store.load_records("BTCUSDT", "1m"), _esperado("BTCUSDT", 0, 20_000))
+
+
+def test_errores_dejan_hueco(tmp_path):
+    store = KlineStore(str(tmp_path / "store"))
+
+    async def caso():
+        async with StubBinance(velas=100) as stub:
+            async with BinanceREST(stub.url) as rest:
+                job = BackfillHistorico(store, rest, None, limit=50)
+                r = await job.ejecutar(["BADUSDT", "BTCUSDT"], ["1m"], T0, T0 + 100 * MIN)
+                assert r["errores"] == 2 and job.errores[0][0] == "BADUSDT"
+                assert job.planificar("BADUSDT", "1m", T0, T0 + 100 * MIN) == [
+                    (T0, T0 + 50 * MIN), (T0 + 50 * MIN, T0 + 100 * MIN)]
+
+    asyncio.run(caso())
+    assert store.count("BTCUSDT", "1m") == 100
+
+
+def _csv(filas, cabecera=False, micro=False):
+    lineas = ["open_time,open,high,low,close,volume,close_time,quote_volume,count,"
+              "taker_buy_volume,taker_buy_quote_volume,ignore"] if cabecera else []
+    for f in filas:
+        t = f[0] * 1000 if micro else f[0]
+        lineas.append(",".join(str(x) for x in [t, *f[1:6], f[6], *f[7:]]))
+    return ("\n".join(lineas) + "\n").encode()
+
+
+def test_importar_volcados_csv_zip(tmp_path):
+    filas = [_kline("BTCUSDT", T0 + MIN * k) for k in range(3_000)]
+    d = tmp_path / "dumps"
+    d.mkdir()
+    with zipfile.ZipFile(d / "BTCUSDT-1m-2023-11.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("BTCUSDT-1m-2023-11.csv", _csv(filas[:1_000]))
+    with zipfile.ZipFile(d / "BTCUSDT-1m-2023-12.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("BTCUSDT-1m-2023-12.csv", _csv(filas[1_000:2_000], cabecera=True))
+    # Volcado diario reciente: open_time en microsegundos.
+    (d / "BTCUSDT-1m-2024-01-01.csv").write_bytes(_csv(filas[2_000:], micro=True))
+    (d / "LEEME.txt").write_text("no es un volcado")
+
+    store = KlineStore(str(tmp_path / "store"))
+    assert importar_directorio(store, str(d)) == {("BTCUSDT", "1m"): 3_000}
+    np.testing.assert_array_equal(store.load_records("BTCUSDT", "1m"), klines_a_registros(filas))
+    # Reimportar no duplica.
+    assert importar_directorio(store, str(d)) == {("BTCUSDT", "1m"): 0}
+
+
+def test_parser_por_bloques():
+    filas = [_kline("ETHUSDT", T0 + MIN * k) for k in range(777)]
+    datos = _csv(filas, cabecera=True)
+    # Bloques pequeños: las líneas partidas entre lecturas se recomponen.
+    partes = list(parsear_csv_klines(io.BytesIO(datos), tamano_bloque=1_000))
+    assert len(partes) > 10
+    np.testing.assert_array_equal(np.concatenate(partes), klines_a_registros(filas))
+    assert json.dumps(partes[0]["timestamp"][:1].tolist()) == f"[{T0}]"
@@ -0,0 +1,86 @@
+"""
+Tests unitarios para backtest.py
+FASE 7 — Backtesting
+"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from bot.core.backtest import BacktestEngine, ejecutar_backtest, DAY_MS
+from bot.core.candle_frame import CandleFrame
+from bot.core.signal_engine import generar_senal_final
+from bot.core.whale_detector import analizar_ballenas
+
+CONFIGS = {
+    "symbol": "TESTUSDT",
+    "risk_per_trade": 0.01,
+    "max_daily_loss": 0.03,
+    "max_trades_per_day": 5,
+    "max_volatility_pct": 0.05,
+}
+
+
+def sintetico(n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    drift = 0.05 * np.sign(np.sin(t / 400.0))
+    close = 100 + np.cumsum(drift + rng.normal(0, 0.05, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.random(n) * 0.1
+    low = np.minimum(open_, close) - rng.random(n) * 0.1
+    vol = rng.uniform(10, 20, n)
+    vol[rng.random(n) < 0.05] *= 4
+    return CandleFrame(open_, high, low, close, vol, t * 60_000)
+
+
+def test_backtest_genera_operaciones_y_equity():
+    frame = sintetico(4000)
+    res = ejecutar_backtest(frame, CONFIGS, {"balance": 1000.0})
+    m = res["metricas"]
+    assert m["operaciones"] > 0
+    assert len(res["equity"]) == len(frame)
+    assert res["equity"][-1] == pytest.approx(m["balance_final"])
+    assert m["balance_final"] == pytest.approx(1000.0 + m["pnl_total"])
+    assert 0.0 <= m["max_drawdown"] < 1.0
+
+
+def test_entradas_coinciden_con_generar_senal_final():
+    frame = sintetico(1500, seed=3)
+    engine = BacktestEngine(CONFIGS, {"balance": 1000.0}, ventana=200)
+    res = engine.run(frame)
+    assert res["trades"]
+    candles = frame.to_dicts()
+    for trade in res["trades"][:5]:
+        i = trade["entry_time"] // 60_000
+        ventana = candles[max(0, i - 199): i + 1]
+        estado = {"balance": 1000.0, "perdidas_acumuladas": 0.0, "operaciones_hoy": 0}
+        esperado = generar_senal_final(ventana, estado, CONFIGS, analizar_ballenas(ventana))
+        assert esperado is not None
+        assert esperado["direction"] == trade["direction"]
+        assert esperado["entry"] == pytest.approx(trade["entry"])
+
+
+def test_limite_diario_y_reinicio():
+    frame = sintetico(3 * 1440, seed=1)
+    res = ejecutar_backtest(frame, dict(CONFIGS, max_trades_per_day=2))
+    por_dia = Counter(t["entry_time"] // DAY_MS for t in res["trades"])
+    assert por_dia
+    assert max(por_dia.values()) <= 2
+    assert len(por_dia) > 1
+
+
+def test_salida_por_sl_y_tp():
+    res = ejecutar_backtest(sintetico(4000), CONFIGS)
+    motivos = {t["motivo"] for t in res["trades"]}
+    assert motivos <= {"sl", "tp", "fin"}
+    for t in res["trades"]:
+        if t["motivo"] == "tp":
+            assert t["pnl"] > 0
+
+
+def test_sin_velas():
+    res = ejecutar_backtest([], CONFIGS)
+    assert res["trades"] == []
+    assert res["metricas"]["operaciones"] == 0
@@ -0,0 +1,234 @@
+"""
+Tests unitarios para data/binance_api.py (contra un servidor HTTP local).
+"""
+
+import asyncio
+import gzip
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+from bot.data.binance_api import BinanceAPIError, BinanceREST, TokenBucket, klines_a_registros
+
+T0 = 1_700_000_040_000 - 1_700_000_040_000 % 60_000
+
+
+def _kline(symbol, t):
+    base = 100.0 + (hash(symbol) % 50) + (t - T0) / 60_000 * 0.01
+    return [t, f"{base:.2f}", f"{base + 1:.2f}", f"{base - 1:.2f}", f"{base + 0.5:.2f}", "12.5",
+            t + 59_999, "1000.0", 10, "6.0", "600.0", "0"]
+
+
+class StubBinance:
+    """Servidor HTTP/1.1 keep-alive mínimo con los endpoints usados por el cliente."""
+
+    def __init__(self, velas=10_000, delay=0.0, modo="length"):
+        self.velas = velas
+        self.delay = delay
+        self.modo = modo  # "length" | "chunked" | "gzip"
+        self.conexiones = 0
+        self.peticiones = 0
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.respuestas_429 = 0
+        self.cortes = 0  # peticiones de CAIDAUSDT que se cortan sin respuesta
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._cliente, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def _cliente(self, reader, writer):
+        self.conexiones += 1
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    return
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                self.peticiones += 1
+                self.en_vuelo += 1
+                self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+                try:
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    respuesta = self._responder(linea.split()[1].decode())
+                finally:
+                    self.en_vuelo -= 1
+                if respuesta is None:
+                    return  # conexión cortada sin responder
+                status, body, extra = respuesta
+                self._escribir(writer, status, body, extra)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _responder(self, target):
+        url = urlsplit(target)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/api/v3/klines":
+            if q["symbol"] == "LIMITUSDT" and self.respuestas_429 == 0:
+                self.respuestas_429 += 1
+                return 429, {"code": -1003, "msg": "Too many requests"}, {"Retry-After": "0"}
+            if q["symbol"] == "CAIDAUSDT" and self.cortes:
+                self.cortes -= 1
+                return None
+            if q["symbol"] == "BADUSDT":
+                return 400, {"code": -1121, "msg": "Invalid symbol."}, {}
+            start = int(q.get("startTime", T0))
+            end = int(q.get("endTime", T0 + self.velas * 60_000))
+            t = max(start + (-start) % 60_000, T0)
+            filas = []
+            while t <= end and t < T0 + self.velas * 60_000 and len(filas) < int(q["limit"]):
+                filas.append(_kline(q["symbol"], t))
+                t += 60_000
+            return 200, filas, {}
+        if url.path == "/api/v3/ticker/price":
+            if "symbol" in q:
+                return 200, {"symbol": q["symbol"], "price": "123.45000000"}, {}
+            return 200, [{"symbol": "BTCUSDT", "price": "1.5"}, {"symbol": "ETHUSDT", "price": "2.5"}], {}
+        if url.path == "/api/v3/depth":
+            return 200, {"lastUpdateId": 42, "bids": [["99.0", "1.5"]], "asks": [["101.0", "2.0"], ["102.0", "3"]]}, {}
+        return 404, {"code": -1, "msg": "not found"}, {}
+
+    def _escribir(self, writer, status, data, extra):
+        body = json.dumps(data).encode()
+        headers = {"Content-Type": "application/json", "X-MBX-USED-WEIGHT-1M": str(self.peticiones * 2), **extra}
+        if self.modo == "gzip":
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        if self.modo == "chunked":
+            headers["Transfer-Encoding"] = "chunked"
+            mitad = len(body) // 2
+            payload = b"".join(b"%x\r\n%s\r\n" % (len(p), p) for p in (body[:mitad], body[mitad:]) if p) + b"0\r\n\r\n"
+        else:
+            headers["Content-Length"] = str(len(body))
+            payload = body
+        cabecera = f"HTTP/1.1 {status} X\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        writer.write(cabecera.encode() + payload)
+
+
+def test_klines_a_registros():
+    filas = [_kline("BTCUSDT", T0), _kline("BTCUSDT", T0 + 60_000)]
+    rec = klines_a_registros(filas)
+    assert rec["timestamp"].tolist() == [T0, T0 + 60_000]
+    assert rec["close"].tolist() == [float(filas[0][4]), float(filas[1][4])]
+    assert len(klines_a_registros([])) == 0
+
+
+@pytest.mark.parametrize("modo", ["length", "chunked", "gzip"])
+def test_endpoints_y_keep_alive(modo):
+    async def caso():
+        async with StubBinance(modo=modo) as stub:
+            async with BinanceREST(stub.url, max_conexiones=2) as api:
+                rec = await api.klines("BTCUSDT", "1m", limit=5)
+                assert rec["timestamp"].tolist() == [T0 + 60_000 * k for k in range(5)]
+                assert await api.ticker_price("BTCUSDT") == 123.45
+                assert await api.ticker_price() == {"BTCUSDT": 1.5, "ETHUSDT": 2.5}
+                depth = await api.depth("BTCUSDT", 5)
+                assert depth == {"lastUpdateId": 42, "bids": [(99.0, 1.5)], "asks": [(101.0, 2.0), (102.0, 3.0)]}
+                assert api.peso_usado == 8
+            # Peticiones secuenciales: una sola conexión persistente.
+            assert stub.conexiones == 1 and stub.peticiones == 4
+
+    asyncio.run(caso())
+
+
+def test_backfill_paginado_en_paralelo():
+    velas = 30 * 1440
+
+    async def caso():
+        async with StubBinance(velas=velas, delay=0.005) as stub:
+            async with BinanceREST(stub.url, max_conexiones=6) as api:
+                inicio, fin = T0 + 30 * 60_000 + 17, T0 + (velas - 5) * 60_000
+                res = await api.backfill_simbolos(["BTCUSDT", "ETHUSDT", "SOLUSDT"], "1m", inicio, fin)
+                n_paginas = len(api.paginas("1m", inicio, fin))
+                assert api.peticiones == 3 * n_paginas
+            for symbol, rec in res.items():
+                esperado = np.arange(T0 + 31 * 60_000, fin, 60_000)
+                assert np.array_equal(rec["timestamp"], esperado)
+                assert rec["close"][-1] == float(_kline(symbol, int(esperado[-1]))[4])
+            assert stub.max_en_vuelo == 6
+            assert stub.conexiones == 6
+
+    asyncio.run(caso())
+
+
+def test_reintento_429_y_errores_api():
+    async def caso():
+        async with StubBinance() as stub:
+            async with BinanceREST(stub.url) as api:
+                rec = await api.klines("LIMITUSDT", "1m", limit=3)
+                assert len(rec) == 3 and stub.respuestas_429 == 1
+                with pytest.raises(BinanceAPIError) as err:
+                    await api.klines("BADUSDT", "1m")
+                assert err.value.status == 400 and err.value.code == -1121
+
+    asyncio.run(caso())
+
+
+def test_reintenta_errores_de_red():
+    async def caso():
+        async with StubBinance() as stub:
+            stub.cortes = 1
+            async with BinanceREST(stub.url, reintentos=2) as api:
+                assert len(await api.klines("CAIDAUSDT", "1m", limit=3)) == 3
+                assert stub.cortes == 0 and stub.conexiones == 2
+            stub.cortes = 10
+            async with BinanceREST(stub.url, reintentos=1) as api:
+                with pytest.raises(ConnectionError):
+                    await api.klines("CAIDAUSDT", "1m", limit=3)
+                assert stub.cortes == 8
+
+    asyncio.run(caso())
+
+
+def test_backfill_cancela_las_paginas_restantes_al_fallar():
+    async def caso():
+        async with StubBinance(velas=200 * 1000, delay=0.01) as stub:
+            async with BinanceREST(stub.url, max_conexiones=2) as api:
+                inicio, fin = T0, T0 + 200 * 1000 * 60_000
+                with pytest.raises(BinanceAPIError):
+                    await api.backfill_simbolos(["BADUSDT", "BTCUSDT"], "1m", inicio, fin)
+                hechas = stub.peticiones
+                await asyncio.sleep(0.1)
+                # Nada siguió pidiendo páginas tras el fallo.
+                assert stub.peticiones == hechas < 2 * len(api.paginas("1m", inicio, fin))
+
+    asyncio.run(caso())
+
+
+def test_token_bucket_limita_el_ritmo():
+    reloj = [0.0]
+    bucket = TokenBucket(10, 5, reloj=lambda: reloj[0])
+    assert bucket.try_acquire(8)
+    assert not bucket.try_acquire(4)
+    reloj[0] += 0.4  # +2 tokens
+    assert bucket.try_acquire(4)
+    reloj[0] += 10
+    assert bucket.disponible() == 10
+    bucket.sincronizar(usado=3000, limite=6000)
+    assert bucket.disponible() == 5
+
+    async def espera():
+        b = TokenBucket(4, 200)
+        t = asyncio.get_running_loop().time()
+        for _ in range(5):
+            await b.acquire(4)
+        return asyncio.get_running_loop().time() - t
+
+    assert asyncio.run(espera()) >= 0.015
@@ -0,0 +1,70 @@
+"""
+Tests unitarios para candle_frame.py
+FASE 2 — Núcleo Cuantitativo
+"""
+
+import math
+from array import array
+
+import pytest
+
+from bot.core.candle_frame import CandleFrame, as_frame
+from bot.core.strategy import generar_pre_senal, detectar_tendencia
+from bot.core.whale_detector import analizar_ballenas
+from bot.core.signal_engine import generar_senal_final
+
+
+def _candles(n=59):
+    candles = []
+    for i, p in enumerate(range(1, n + 1)):
+        candles.append({"open": p - 1, "high": p, "low": p - 1, "close": p, "volume": 50, "timestamp": i})
+    candles[-1]["volume"] = 200
+    return candles
+
+
+def test_from_dicts_y_row():
+    candles = _candles()
+    frame = CandleFrame.from_dicts(candles)
+    assert len(frame) == len(candles)
+    assert isinstance(frame.close, array)
+    assert frame.row(-1) == {k: float(v) if k != "timestamp" else v for k, v in candles[-1].items()}
+
+
+def test_from_dicts_claves_ausentes():
+    frame = CandleFrame.from_dicts([{"volume": 10}, {"close": "x"}, {"close": None}])
+    assert list(frame.volume) == [10.0, 0.0, 0.0]
+    assert frame.close[0] == 0.0
+    assert math.isnan(frame.close[1]) and math.isnan(frame.close[2])
+
+
+def test_tail_es_vista_sin_copia():
+    frame = CandleFrame.from_dicts(_candles())
+    tail = frame.tail(5)
+    assert len(tail) == 5
+    frame.close[-1] = 999.0
+    assert tail.close[-1] == 999.0
+    assert len(frame.tail(500)) == len(frame)
+
+
+def test_longitudes_distintas():
+    with pytest.raises(ValueError):
+        CandleFrame([1.0], [1.0], [1.0], [1.0, 2.0], [1.0])
+
+
+def test_as_frame():
+    candles = _candles()
+    frame = CandleFrame.from_dicts(candles)
+    assert as_frame(frame) is frame
+    assert len(as_frame(candles, tail=10)) == 10
+    assert as_frame(candles, tail=10).row(0) == frame.row(-10)
+
+
+def test_core_acepta_candle_frame():
+    candles = _candles()
+    frame = CandleFrame.from_dicts(candles)
+    assert detectar_tendencia(frame) == detectar_tendencia(candles)
+    assert generar_pre_senal(frame) == generar_pre_senal(candles)
+    assert analizar_ballenas(frame) == analizar_ballenas(candles)
+    configs = {"symbol": "TESTUSDT", "max_daily_loss": 0.10, "max_volatility_pct": 0.05}
+    estado = {"balance": 1000, "perdidas_acumuladas": 0.0, "operaciones_hoy": 1}
+    assert generar_senal_final(frame, estado, configs) == generar_senal_final(candles, estado, configs)
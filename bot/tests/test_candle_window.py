@@ -0,0 +1,81 @@
+"""
+Tests unitarios para candle_window.py
+FASE 2 — Núcleo Cuantitativo
+"""
+
+import pytest
+
+from bot.core.candle_window import CandleWindow
+from bot.core.candle_frame import CandleFrame
+from bot.core.strategy import generar_pre_senal
+from bot.core.whale_detector import analizar_ballenas
+
+
+def _push(window, i, closed=True, close=None):
+    p = float(i) if close is None else close
+    window.update(p - 1, p + 0.5, p - 1.5, p, 50.0, 1000 + i, closed)
+
+
+def test_append_y_vista_ultimas_n():
+    w = CandleWindow(5)
+    for i in range(3):
+        _push(w, i)
+    assert len(w) == 3
+    assert list(w.frame().close) == [0.0, 1.0, 2.0]
+    for i in range(3, 12):
+        _push(w, i)
+    assert len(w) == 5
+    assert w.total == 12
+    assert list(w.frame().close) == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert list(w.frame(2).timestamp) == [1010, 1011]
+
+
+def test_vela_en_curso_se_sobrescribe():
+    w = CandleWindow(4)
+    for i in range(6):
+        _push(w, i)
+    _push(w, 6, closed=False, close=6.1)
+    _push(w, 6, closed=False, close=6.3)
+    assert w.has_partial
+    assert list(w.frame().close) == [2.0, 3.0, 4.0, 5.0]
+    assert list(w.frame(include_partial=True).close) == [3.0, 4.0, 5.0, 6.3]
+    _push(w, 6, closed=True, close=6.2)
+    assert not w.has_partial
+    assert list(w.frame().close) == [3.0, 4.0, 5.0, 6.2]
+
+
+def test_reentrega_de_vela_cerrada():
+    w = CandleWindow(4)
+    _push(w, 1)
+    _push(w, 1, close=9.0)
+    assert w.total == 1
+    assert w.last()["close"] == 9.0
+
+
+def test_vistas_sin_copia():
+    w = CandleWindow(3)
+    for i in range(3):
+        _push(w, i)
+    view = w.frame()
+    assert isinstance(view.close, memoryview)
+    _push(w, 3, closed=False, close=42.0)
+    assert list(w.frame(include_partial=True).close)[-1] == 42.0
+
+
+def test_ventana_alimenta_el_core():
+    candles = []
+    w = CandleWindow(200)
+    for i, p in enumerate(range(1, 260)):
+        c = {"open": p - 1, "high": p, "low": p - 1, "close": p, "volume": 50.0, "timestamp": i + 1}
+        if p == 259:
+            c["volume"] = 200.0
+        candles.append(c)
+        w.update_kline(c, closed=True)
+    assert generar_pre_senal(w.frame()) == generar_pre_senal(candles[-200:])
+    assert analizar_ballenas(w.frame()) == analizar_ballenas(candles)
+
+
+def test_capacidad_invalida():
+    with pytest.raises(ValueError):
+        CandleWindow(0)
+    assert len(CandleWindow(3).frame()) == 0
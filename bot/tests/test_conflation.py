@@ -0,0 +1,187 @@
+"""
+Tests unitarios para data/conflation.py
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from bot.data.conflation import BuzonConflacion
+from bot.data.order_book import OrderBook, SequenceGapError
+from bot.data.websocket_stream import ColaAcotada
+from bot.services.orchestrator import Orquestador
+from bot.tests.test_backtest import CONFIGS, sintetico
+from bot.tests.test_order_book import grabar_diffs, leer
+
+
+def vela(ts, close, closed):
+    return {"timestamp": ts, "open": 1.0, "high": 2.0, "low": 0.5, "close": close, "volume": 1.0, "closed": closed}
+
+
+def test_parciales_se_conflan_y_cerradas_se_entregan():
+    async def caso():
+        buzon = BuzonConflacion()
+        for i in range(100):
+            buzon.put_nowait(("BTCUSDT", vela(0, float(i), False)))
+        buzon.put_nowait(("BTCUSDT", vela(0, 100.0, True)))
+        for i in range(50):
+            buzon.put_nowait(("BTCUSDT", vela(60_000, float(i), False)))
+        buzon.put_nowait(("ETHUSDT", vela(0, 7.0, False)))
+        assert buzon.qsize() == 3
+        lote = await buzon.get_batch()
+        assert [(s, k["timestamp"], k["close"], k["closed"]) for s, k in lote] == [
+            ("BTCUSDT", 0, 100.0, True),
+            ("BTCUSDT", 60_000, 49.0, False),
+            ("ETHUSDT", 0, 7.0, False),
+        ]
+        assert buzon.empty()
+        m = buzon.metricas()
+        # 99 + 49 parciales pisadas y la parcial de la vela 0, sustituida por su cierre.
+        assert m["parciales_descartadas"] == 99 + 49 + 1 == buzon.descartes("BTCUSDT")["parciales_descartadas"]
+        assert m["cerradas"] == 1 and m["parciales"] == 151 and m["pendientes"] == 0
+
+        # Las cerradas nunca se conflan, aunque el consumidor vaya atrasado.
+        for k in range(500):
+            buzon.put_nowait(("BTCUSDT", vela(60_000 * k, float(k), True)))
+        cerradas = []
+        while not buzon.empty():
+            cerradas.extend(await buzon.get_batch(64))
+        assert [k["timestamp"] for _, k in cerradas] == [60_000 * k for k in range(500)]
+
+    asyncio.run(caso())
+
+
+def test_diffs_fusionados_dejan_el_mismo_libro(tmp_path):
+    path = tmp_path / "depth.jsonl"
+    bids, asks = grabar_diffs(path, 3_000)
+    snapshot, diffs = leer(path)
+
+    async def caso():
+        buzon = BuzonConflacion()
+        book = OrderBook("TESTUSDT")
+        book.load_snapshot(snapshot)
+        aplicados = 0
+        for i, msg in enumerate(diffs):
+            buzon.put_nowait(("TESTUSDT", msg))
+            if i % 97 == 0:  # el consumidor solo lee de vez en cuando
+                for _, diff in await buzon.get_batch():
+                    assert book.apply_diff(diff)
+                    aplicados += 1
+        for _, diff in await buzon.get_batch():
+            assert book.apply_diff(diff)
+            aplicados += 1
+        assert dict(book.bids) == bids and dict(book.asks) == asks
+        assert book.last_update_id == diffs[-1]["u"]
+        assert buzon.diffs_fusionados == len(diffs) - aplicados
+        assert buzon.descartados == buzon.diffs_fusionados
+
+    asyncio.run(caso())
+
+
+def test_diffs_futuros_conservan_pu():
+    async def caso():
+        buzon = BuzonConflacion()
+        book = OrderBook()
+        book.load_snapshot({"lastUpdateId": 10, "bids": [["1.0", "1"]], "asks": [["2.0", "1"]]})
+        assert book.apply_diff({"U": 5, "u": 12, "pu": 4, "b": [["1.5", "2"]], "a": []})
+        buzon.put_nowait(("X", {"U": 13, "u": 15, "pu": 12, "E": 1, "b": [["1.5", "3"]], "a": [["2.5", "1"]]}))
+        buzon.put_nowait(("X", {"U": 16, "u": 18, "pu": 15, "E": 2, "b": [["1.5", "0"]], "a": []}))
+        (_, diff), = await buzon.get_batch()
+        assert (diff["U"], diff["u"], diff["pu"], diff["E"]) == (13, 18, 12, 2)
+        assert book.apply_diff(diff)
+        assert dict(book.bids) == {1.0: 1.0} and dict(book.asks) == {2.0: 1.0, 2.5: 1.0}
+
+    asyncio.run(caso())
+
+
+def test_hueco_de_secuencia_no_se_fusiona():
+    async def caso():
+        buzon = BuzonConflacion()
+        book = OrderBook()
+        book.load_snapshot({"lastUpdateId": 10, "bids": [["1.0", "1"]], "asks": [["2.0", "1"]]})
+        buzon.put_nowait(("X", {"U": 11, "u": 12, "b": [["1.5", "2"]], "a": []}))
+        buzon.put_nowait(("X", {"U": 13, "u": 14, "b": [["1.5", "3"]], "a": []}))
+        # Se perdieron 15..19 (reconexión): no se funde con lo anterior.
+        buzon.put_nowait(("X", {"U": 20, "u": 21, "b": [["1.6", "1"]], "a": []}))
+        buzon.put_nowait(("X", {"U": 22, "u": 23, "b": [], "a": [["2.5", "1"]]}))
+        diffs = [d for _, d in await buzon.get_batch()]
+        assert [(d["U"], d["u"]) for d in diffs] == [(11, 14), (20, 23)]
+        assert buzon.diffs_fusionados == 2
+        assert book.apply_diff(diffs[0])
+        with pytest.raises(SequenceGapError):
+            book.apply_diff(diffs[1])
+
+    asyncio.run(caso())
+
+
+def _rafagas(historicos, cola, minutos, parciales, sellar=False):
+    """Por minuto: `parciales` actualizaciones en curso por símbolo y luego los cierres.
+
+    Con `sellar`, cada elemento lleva su instante de llegada (como `get_lote`).
+    """
+
+    async def productor():
+        for i in range(200, 200 + minutos):
+            for p in range(parciales):
+                for symbol, frame in historicos.items():
+                    k = vela(int(frame.timestamp[i]), float(frame.close[i]) * (1 + p * 1e-6), False)
+                    cola.put_nowait((symbol, k, time.perf_counter()) if sellar else (symbol, k))
+            for symbol, frame in historicos.items():
+                k = {
+                    "timestamp": int(frame.timestamp[i]), "open": float(frame.open[i]),
+                    "high": float(frame.high[i]), "low": float(frame.low[i]),
+                    "close": float(frame.close[i]), "volume": float(frame.volume[i]), "closed": True,
+                }
+                cola.put_nowait((symbol, k, time.perf_counter()) if sellar else (symbol, k))
+            await asyncio.sleep(0.03)
+
+    return productor
+
+
+def test_latencia_acotada_bajo_rafagas():
+    historicos = {f"S{k}USDT": sintetico(260, seed=k) for k in range(40)}
+
+    def orquestador():
+        orq = Orquestador(historicos, CONFIGS, {"balance": 1000.0}, capacity=200)
+        for symbol, frame in historicos.items():
+            orq.seed(symbol, frame.slice(0, 200))
+        return orq
+
+    async def con_buzon():
+        orq, buzon = orquestador(), BuzonConflacion()
+        consumidor = asyncio.ensure_future(orq.consumir(buzon))
+        await _rafagas(historicos, buzon, 30, 250)()
+        await asyncio.sleep(0.05)
+        await orq.drain()
+        consumidor.cancel()
+        orq.close()
+        return orq.metricas()
+
+    async def sin_buzon():
+        orq, cola = orquestador(), ColaAcotada(10_000_000)
+
+        async def consumidor():
+            while True:
+                for symbol, kline, t0 in await cola.get_batch():
+                    orq.on_kline(symbol, kline, t0)
+                await asyncio.sleep(0)
+
+        tarea = asyncio.ensure_future(consumidor())
+        await _rafagas(historicos, cola, 30, 250, sellar=True)()
+        while not cola.empty():
+            await asyncio.sleep(0.01)
+        await orq.drain()
+        tarea.cancel()
+        orq.close()
+        return orq.metricas()
+
+    m = asyncio.run(con_buzon())
+    assert m["evaluaciones"] + m["descartadas"] == 40 * 30
+    c = m["conflacion"]
+    assert c["cerradas"] == 40 * 30 and c["parciales"] == 40 * 30 * 250
+    assert c["parciales_descartadas"] >= 40 * 30 * 249
+    # Sin conflación el consumidor procesa todas las parciales antes de cada cierre.
+    fifo = asyncio.run(sin_buzon())
+    assert "conflacion" not in fifo
+    assert m["p99_ms"] < fifo["p99_ms"]
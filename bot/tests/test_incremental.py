@@ -0,0 +1,87 @@
+"""
+Tests unitarios para incremental.py
+FASE 2 — Núcleo Cuantitativo
+"""
+
+import math
+import pytest
+
+from bot.core import indicators as ind
+from bot.core.incremental import (
+    EmaState,
+    RsiState,
+    AtrState,
+    MacdState,
+    RollingVolatility,
+)
+
+
+def _serie(n=120):
+    return [100.0 + 5.0 * math.sin(i / 7.0) + 0.1 * i for i in range(n)]
+
+
+def test_ema_state_coincide_con_ema():
+    values = _serie()
+    st = EmaState(20)
+    for i, v in enumerate(values):
+        out = st.update(v)
+        if i + 1 < 20:
+            assert out is None
+        else:
+            assert out == pytest.approx(ind.ema(values[: i + 1], 20))
+
+
+def test_rsi_state_coincide_con_rsi():
+    values = _serie()
+    st = RsiState(14)
+    for i, v in enumerate(values):
+        out = st.update(v)
+        if i < 14:
+            assert out is None
+        else:
+            assert out == pytest.approx(ind.rsi(values[: i + 1], 14))
+
+
+def test_atr_state_coincide_con_atr():
+    closes = _serie()
+    highs = [c + 1.0 + (i % 3) for i, c in enumerate(closes)]
+    lows = [c - 1.0 - (i % 5) * 0.2 for i, c in enumerate(closes)]
+    st = AtrState(14)
+    st.seed(highs[:60], lows[:60], closes[:60])
+    assert st.value == pytest.approx(ind.atr(highs[:60], lows[:60], closes[:60], 14))
+    for i in range(60, len(closes)):
+        out = st.update(highs[i], lows[i], closes[i])
+        assert out == pytest.approx(ind.atr(highs[: i + 1], lows[: i + 1], closes[: i + 1], 14))
+
+
+def test_macd_state_coincide_con_macd():
+    values = _serie()
+    st = MacdState(12, 26, 9)
+    for i, v in enumerate(values):
+        out = st.update(v)
+        if i + 1 < 26 + 9:
+            assert out is None
+        else:
+            assert out == pytest.approx(ind.macd(values[: i + 1], 12, 26, 9))
+
+
+def test_rolling_volatility_coincide_con_volatility():
+    values = _serie()
+    st = RollingVolatility(20)
+    st.seed(values[:50])
+    for i in range(50, len(values)):
+        out = st.update(values[i])
+        assert out == pytest.approx(ind.volatility(values[: i + 1], 20), rel=1e-6)
+
+
+def test_parametros_invalidos():
+    with pytest.raises(ValueError):
+        EmaState(0)
+    with pytest.raises(ValueError):
+        RsiState(0)
+    with pytest.raises(ValueError):
+        AtrState(0)
+    with pytest.raises(ValueError):
+        MacdState(26, 12, 9)
+    with pytest.raises(ValueError):
+        RollingVolatility(0)
@@ -0,0 +1,98 @@
+"""
+Tests unitarios para kline_store.py
+FASE 4 — Datos y APIs
+"""
+
+import numpy as np
+import pytest
+
+from bot.core.candle_frame import CandleFrame
+from bot.data.kline_store import KlineStore, RECORD_DTYPE
+
+MIN = 60_000
+
+
+def _records(start_idx, n):
+    recs = np.zeros(n, dtype=RECORD_DTYPE)
+    idx = np.arange(start_idx, start_idx + n)
+    recs["timestamp"] = idx * MIN
+    recs["open"] = idx
+    recs["high"] = idx + 1.0
+    recs["low"] = idx - 1.0
+    recs["close"] = idx + 0.5
+    recs["volume"] = 10.0
+    return recs
+
+
+def test_append_y_load_rango(tmp_path):
+    store = KlineStore(str(tmp_path))
+    assert store.append("BTCUSDT", "1m", _records(0, 100)) == 100
+    assert store.append("btcusdt", "1m", _records(100, 50)) == 50
+    assert store.count("BTCUSDT", "1m") == 150
+    frame = store.load("BTCUSDT", "1m", 10 * MIN, 20 * MIN)
+    assert isinstance(frame, CandleFrame)
+    assert len(frame) == 10
+    assert frame.timestamp[0] == 10 * MIN
+    assert frame.close[-1] == 19.5
+    assert len(store.load("BTCUSDT", "1m")) == 150
+    assert store.last_timestamp("BTCUSDT", "1m") == 149 * MIN
+
+
+def test_append_idempotente(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("ETHUSDT", "1m", _records(0, 50))
+    assert store.append("ETHUSDT", "1m", _records(0, 60)) == 10
+    assert store.count("ETHUSDT", "1m") == 60
+
+
+def test_load_es_vista_mapeada(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", _records(0, 1000))
+    recs = store.load_records("BTCUSDT", "1m", 0, 500 * MIN)
+    assert isinstance(recs.base, np.memmap) or isinstance(recs, np.memmap)
+
+
+def test_huecos_entre_y_dentro_de_segmentos(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("SOLUSDT", "1m", _records(100, 50))
+    # Velas anteriores -> segmento nuevo
+    assert store.append("SOLUSDT", "1m", _records(0, 20)) == 20
+    assert store.coverage("SOLUSDT", "1m") == [(0, 19 * MIN), (100 * MIN, 149 * MIN)]
+    # Hueco interno dentro de un segmento
+    recs = _records(200, 10)
+    store.append("SOLUSDT", "1m", recs[::2])
+    assert store.append("SOLUSDT", "1m", recs) == 5
+    ts = store.load("SOLUSDT", "1m", 200 * MIN).timestamp
+    assert list(ts) == list(recs["timestamp"])
+    # Consulta que cruza segmentos
+    assert len(store.load("SOLUSDT", "1m", 10 * MIN, 110 * MIN)) == 20
+
+
+def test_persistencia_entre_instancias(tmp_path):
+    KlineStore(str(tmp_path)).append("BTCUSDT", "1m", CandleFrame.from_dicts(
+        [{"open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 3, "timestamp": i * MIN} for i in range(5)]
+    ))
+    store = KlineStore(str(tmp_path))
+    assert store.count("BTCUSDT", "1m") == 5
+    assert store.load("BTCUSDT", "1m").row(-1)["close"] == 1.5
+    assert len(store.load("XRPUSDT", "1m")) == 0
+
+
+def test_registro_a_medias_no_desalinea_el_append(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", _records(0, 10))
+    # Escritura interrumpida: solo llegó parte del registro 10.
+    (seg,) = (tmp_path / "BTCUSDT" / "1m").iterdir()
+    with open(seg, "ab") as fh:
+        fh.write(_records(10, 1).tobytes()[:20])
+    store = KlineStore(str(tmp_path))
+    assert store.count("BTCUSDT", "1m") == 10
+    assert store.append("BTCUSDT", "1m", _records(10, 5)) == 5
+    assert seg.stat().st_size == 15 * RECORD_DTYPE.itemsize
+    recs = store.load_records("BTCUSDT", "1m")
+    assert np.array_equal(recs, _records(0, 15))
+
+
+def test_tipo_invalido(tmp_path):
+    with pytest.raises(TypeError):
+        KlineStore(str(tmp_path)).append("BTCUSDT", "1m", [1, 2, 3])
@@ -0,0 +1,155 @@
+"""
+Tests unitarios para services/orchestrator.py
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from bot.core.signal_engine import generar_senal_final
+from bot.core.whale_detector import analizar_ballenas
+from bot.services.orchestrator import Orquestador
+from bot.tests.test_backtest import CONFIGS, sintetico
+
+VENTANA = 200
+
+
+async def feed_local(historicos, inicio, fin, parciales=0, entre_velas=None):
+    """Feed de prueba: en cada minuto cierran todos los símbolos a la vez.
+
+    `entre_velas` es una corutina que simula la espera hasta el minuto siguiente.
+    """
+    for i in range(inicio, fin):
+        for symbol, frame in historicos.items():
+            kline = {
+                "open": float(frame.open[i]),
+                "high": float(frame.high[i]),
+                "low": float(frame.low[i]),
+                "close": float(frame.close[i]),
+                "volume": float(frame.volume[i]),
+                "timestamp": int(frame.timestamp[i]),
+            }
+            for _ in range(parciales):
+                yield symbol, {**kline, "closed": False}
+            yield symbol, {**kline, "closed": True}
+        if entre_velas is not None:
+            await entre_velas()
+
+
+def _orquestador(historicos, **kwargs):
+    orq = Orquestador(historicos, CONFIGS, {"balance": 1000.0}, capacity=VENTANA, **kwargs)
+    for symbol, frame in historicos.items():
+        orq.seed(symbol, frame.slice(0, VENTANA))
+    return orq
+
+
+def test_senales_coinciden_con_generar_senal_final():
+    historicos = {f"S{k}USDT": sintetico(VENTANA + 400, seed=k) for k in range(4)}
+    emitidas = []
+    orq = _orquestador(historicos, on_signal=emitidas.append)
+    asyncio.run(orq.run(feed_local(historicos, VENTANA, VENTANA + 400, parciales=1, entre_velas=orq.drain)))
+    orq.close()
+
+    esperadas = []
+    for symbol, frame in historicos.items():
+        candles = frame.to_dicts()
+        estado = {"balance": 1000.0, "perdidas_acumuladas": 0.0, "operaciones_hoy": 0}
+        for i in range(VENTANA, VENTANA + 400):
+            if i % 1440 == 0:
+                estado["operaciones_hoy"] = 0
+            ventana = candles[i + 1 - VENTANA: i + 1]
+            senal = generar_senal_final(ventana, estado, {**CONFIGS, "symbol": symbol}, analizar_ballenas(ventana))
+            if senal is not None:
+                estado["operaciones_hoy"] += 1
+                esperadas.append(senal)
+
+    assert esperadas
+    clave = lambda s: (s["symbol"], s["timestamp"])
+    assert sorted(map(clave, emitidas)) == sorted(map(clave, esperadas))
+    por_clave = {clave(s): s for s in esperadas}
+    for s in emitidas:
+        assert s["latencia_ms"] >= 0.0
+        e = por_clave[clave(s)]
+        assert {k: s[k] for k in e} == e
+    m = orq.metricas()
+    assert m["evaluaciones"] == 4 * 400
+    assert m["emitidas"] == len(emitidas) == orq.senales.qsize()
+    assert m["descartadas"] == 0
+    assert m["etapas"]["limites_diarios"]["evaluaciones"] == 4 * 400
+    assert m["etapas"]["riesgo"]["evaluaciones"] - m["etapas"]["riesgo"]["rechazos"] == len(emitidas)
+
+
+def test_evaluacion_atrasada_se_descarta():
+    historicos = {"BTCUSDT": sintetico(VENTANA + 2)}
+    orq = _orquestador(historicos)
+
+    async def rafaga():
+        # Dos cierres del mismo símbolo antes de que el loop despache: el primero queda obsoleto.
+        async for symbol, kline in feed_local(historicos, VENTANA, VENTANA + 2):
+            orq.on_kline(symbol, kline)
+        await orq.drain()
+
+    asyncio.run(rafaga())
+    orq.close()
+    m = orq.metricas()
+    assert m["descartadas"] == 1
+    assert m["evaluaciones"] == 1
+
+
+def test_reentrega_de_vela_cerrada_no_se_reevalua():
+    historicos = {"BTCUSDT": sintetico(VENTANA + 60)}
+    orq = _orquestador(historicos)
+
+    async def con_reentregas():
+        # 6 de los 60 cierres se re-entregan (mismo timestamp), uno de ellos corregido.
+        k = 0
+        async for symbol, kline in feed_local(historicos, VENTANA, VENTANA + 60, entre_velas=orq.drain):
+            orq.on_kline(symbol, kline)
+            if k % 10 == 3:
+                orq.on_kline(symbol, {**kline, "close": kline["close"] * 1.01} if k == 53 else kline)
+            k += 1
+        await orq.drain()
+
+    asyncio.run(con_reentregas())
+    orq.close()
+    st = orq.simbolos["BTCUSDT"]
+    m = orq.metricas()
+    assert m["evaluaciones"] == 60
+    assert m["descartadas"] == 0
+    assert st.window.total == VENTANA + 60
+    assert st.radar.ultimo == analizar_ballenas(st.window.frame())
+
+
+def test_latencia_p99_300_simbolos():
+    base = sintetico(VENTANA + 30)
+    rng = np.random.default_rng(1)
+    historicos = {}
+    for k in range(300):
+        escala = 1.0 + rng.random()
+        historicos[f"S{k}USDT"] = type(base)(
+            base.open * escala, base.high * escala, base.low * escala,
+            base.close * escala, base.volume, base.timestamp,
+        )
+    orq = _orquestador(historicos)
+
+    rafagas_ms = []
+    inicio = [time.perf_counter()]
+
+    async def fin_de_minuto():
+        # En vivo hay 60 s entre cierres: la ráfaga termina antes del minuto siguiente.
+        await orq.drain()
+        ahora = time.perf_counter()
+        rafagas_ms.append((ahora - inicio[0]) * 1000.0)
+        inicio[0] = ahora
+
+    asyncio.run(orq.run(feed_local(historicos, VENTANA, VENTANA + 30, entre_velas=fin_de_minuto)))
+    orq.close()
+    m = orq.metricas()
+    assert m["evaluaciones"] == 300 * 30
+    assert m["descartadas"] == 0
+    # Sin cola entre ráfagas: ninguna señal espera más que la propia ráfaga
+    # (recepción de los 300 cierres + una evaluación en el executor).
+    assert m["max_ms"] <= max(rafagas_ms), (m, max(rafagas_ms))
+    assert m["p99_ms"] < 20.0, (m, [round(x, 1) for x in rafagas_ms])
@@ -0,0 +1,136 @@
+"""
+Tests unitarios para order_book.py
+"""
+
+import json
+import random
+
+import pytest
+
+from bot.core.whale_detector import analizar_ballenas
+from bot.data.order_book import OrderBook, SequenceGapError
+
+
+def grabar_diffs(path, n, seed=0, niveles=200):
+    """Graba un snapshot + `n` diffs estilo Binance en JSON lines; devuelve el libro esperado."""
+    rng = random.Random(seed)
+    bids = {round(100.0 - 0.01 * i, 2): round(rng.uniform(0.1, 50), 3) for i in range(1, niveles)}
+    asks = {round(100.0 + 0.01 * i, 2): round(rng.uniform(0.1, 50), 3) for i in range(1, niveles)}
+    snapshot = {"lastUpdateId": 1000, "bids": [[str(p), str(q)] for p, q in bids.items()],
+                "asks": [[str(p), str(q)] for p, q in asks.items()]}
+    with open(path, "w") as fh:
+        fh.write(json.dumps(snapshot) + "\n")
+        u = 1000
+        for i in range(n):
+            b, a = [], []
+            for _ in range(rng.randint(1, 10)):
+                lado, libro = (b, bids) if rng.random() < 0.5 else (a, asks)
+                base = 99.99 if libro is bids else 100.01
+                signo = -1 if libro is bids else 1
+                p = round(base + signo * 0.01 * rng.randint(0, niveles + 20), 2)
+                q = 0.0 if rng.random() < 0.3 else round(rng.uniform(0.1, 50), 3)
+                lado.append([f"{p:.2f}", f"{q:.3f}"])
+                if q:
+                    libro[p] = q
+                else:
+                    libro.pop(p, None)
+            first, u = u + 1, u + rng.randint(1, 3)
+            fh.write(json.dumps({"e": "depthUpdate", "E": 1_000 + i, "U": first, "u": u, "b": b, "a": a}) + "\n")
+    return bids, asks
+
+
+def leer(path):
+    with open(path) as fh:
+        lineas = [json.loads(line) for line in fh]
+    return lineas[0], lineas[1:]
+
+
+def test_replay_de_diffs_grabados(tmp_path):
+    path = tmp_path / "depth.jsonl"
+    bids, asks = grabar_diffs(path, 3000)
+    snapshot, diffs = leer(path)
+    book = OrderBook("TESTUSDT")
+    # Los primeros diffs llegan antes del snapshot y se bufferizan.
+    for msg in diffs[:50]:
+        assert book.apply_diff(msg) is False
+    book.load_snapshot(snapshot)
+    for msg in diffs[50:]:
+        assert book.apply_diff(msg) is True
+
+    assert dict(book.bids) == bids
+    assert dict(book.asks) == asks
+    assert book.best_bid == (max(bids), bids[max(bids)])
+    assert book.best_ask == (min(asks), asks[min(asks)])
+    assert [p for p, _ in book.depth("BUY", 5)] == sorted(bids, reverse=True)[:5]
+    assert book.spread == pytest.approx(min(asks) - max(bids))
+
+
+def test_hueco_de_secuencia(tmp_path):
+    path = tmp_path / "depth.jsonl"
+    grabar_diffs(path, 20)
+    snapshot, diffs = leer(path)
+    book = OrderBook("TESTUSDT")
+    book.load_snapshot(snapshot)
+    book.apply_diff(diffs[0])
+    # Diff ya aplicado: se ignora.
+    assert book.apply_diff(diffs[0]) is False
+    with pytest.raises(SequenceGapError):
+        book.apply_diff(diffs[2])
+    assert not book.synced
+    # Desincronizado: se bufferiza hasta el siguiente snapshot.
+    assert book.apply_diff(diffs[3]) is False
+
+
+def test_futuros_usa_pu():
+    book = OrderBook()
+    book.load_snapshot({"lastUpdateId": 10, "bids": [["1.0", "1"]], "asks": [["2.0", "1"]]})
+    assert book.apply_diff({"U": 5, "u": 12, "pu": 4, "b": [["1.5", "2"]], "a": []})
+    assert book.apply_diff({"U": 13, "u": 15, "pu": 12, "b": [], "a": []})
+    with pytest.raises(SequenceGapError):
+        book.apply_diff({"U": 16, "u": 18, "pu": 14, "b": [], "a": []})
+
+
+def test_muros_y_spoofing():
+    book = OrderBook("TESTUSDT", wall_threshold=10_000.0, spoof_max_ms=5_000)
+    book.load_snapshot({"lastUpdateId": 1, "bids": [["100", "1"], ["99", "1"]], "asks": [["101", "1"]]})
+    # Muro de compra detrás del mejor bid.
+    book.apply_diff({"E": 1_000, "U": 2, "u": 2, "b": [["98", "200"]], "a": []})
+    assert book.eventos()["orderbook_wall"]
+    assert book.muros()[0]["price"] == 98.0
+    # Se retira a los 2s sin haber llegado a la cabeza del libro -> spoof.
+    book.apply_diff({"E": 3_000, "U": 3, "u": 3, "b": [["98", "0"]], "a": []})
+    ev = book.eventos()
+    assert not ev["orderbook_wall"] and ev["spoofing"]
+    assert ev["retiros"][0]["duracion_ms"] == 2_000
+
+    # Un muro consumido en la cabeza del libro no es una retirada.
+    book.apply_diff({"E": 4_000, "U": 4, "u": 4, "b": [], "a": [["101", "500"]]})
+    book.apply_diff({"E": 4_500, "U": 5, "u": 5, "b": [], "a": [["101", "0"]]})
+    assert len(book.retiros) == 1
+
+    analisis = analizar_ballenas([], orderbook=book)
+    assert analisis["spoofing"] and "Muro retirado del orderbook (spoofing)" in analisis["razones"]
+    # Pasada la ventana, el spoof deja de contar.
+    book.apply_diff({"E": 20_000, "U": 6, "u": 6, "b": [], "a": []})
+    assert not book.eventos()["spoofing"]
+
+
+def test_muro_barrido_en_el_mismo_diff_no_es_spoof():
+    book = OrderBook("TESTUSDT", wall_threshold=10_000.0, spoof_max_ms=5_000)
+    book.load_snapshot({"lastUpdateId": 1, "bids": [["100", "1"], ["99", "1"], ["90", "1"]], "asks": [["101", "1"]]})
+    book.apply_diff({"E": 1_000, "U": 2, "u": 2, "b": [["98", "200"]], "a": []})
+    # Una venta agresiva se lleva 100, 99 y el muro de 98 en el mismo diff.
+    book.apply_diff({"E": 1_500, "U": 3, "u": 3, "b": [["100", "0"], ["99", "0"], ["98", "0"]], "a": []})
+    assert book.best_bid == (90.0, 1.0)
+    assert not book.retiros and not book.eventos()["spoofing"]
+
+
+def test_buffer_acotado_sin_snapshot():
+    book = OrderBook(max_buffer=3)
+    for u in range(1, 11):
+        assert not book.apply_diff({"U": u, "u": u, "b": [["1.5", str(u)]], "a": []})
+    assert [m["u"] for m in book._buffer] == [8, 9, 10]
+    assert book.buffer_descartados == 7
+    # Si faltan diffs necesarios tras descartar, el snapshot no engancha.
+    with pytest.raises(SequenceGapError):
+        book.load_snapshot({"lastUpdateId": 5, "bids": [], "asks": []})
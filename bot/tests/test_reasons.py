@@ -0,0 +1,23 @@
+"""
+Tests unitarios para reasons.py
+"""
+
+from bot.core.reasons import Razon, describir, texto_razones
+
+
+def test_texto_razones_en_orden_del_flujo():
+    razones = Razon.RR_BUENO | Razon.EMAS_SEPARADAS | Razon.VOLUMEN_FUERTE | Razon.TENDENCIA_ALCISTA | Razon.RIESGO_OK
+    assert texto_razones(razones, 2.345) == [
+        "tendencia alcista",
+        "volumen x2.35",
+        "EMA20/EMA50 separadas",
+        "ok",
+        "rr_good",
+    ]
+    assert texto_razones(Razon.NINGUNA) == []
+
+
+def test_describir_senal():
+    senal = {"razones": Razon.TENDENCIA_BAJISTA | Razon.VOLUMEN_FUERTE, "volume_factor": 1.5}
+    assert describir(senal) == ["tendencia bajista", "volumen x1.50"]
+    assert describir({}) == []
@@ -0,0 +1,108 @@
+"""
+Tests unitarios para resampler.py
+"""
+
+import numpy as np
+import pytest
+
+from bot.core.candle_frame import CandleFrame
+from bot.core.indicators import atr, ema
+from bot.core.resampler import Resampler, interval_ms
+from bot.core.strategy import detectar_tendencia
+
+MIN = 60_000
+
+
+def velas_1m(n, seed=0, inicio=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.random(n) * 0.05
+    low = np.minimum(open_, close) - rng.random(n) * 0.05
+    vol = rng.uniform(1, 5, n)
+    return CandleFrame(open_, high, low, close, vol, inicio + np.arange(n) * MIN)
+
+
+def agregado(frame, k):
+    n = len(frame) // k * k
+    o = np.asarray(frame.open)[:n].reshape(-1, k)[:, 0]
+    h = np.asarray(frame.high)[:n].reshape(-1, k).max(axis=1)
+    l = np.asarray(frame.low)[:n].reshape(-1, k).min(axis=1)
+    c = np.asarray(frame.close)[:n].reshape(-1, k)[:, -1]
+    v = np.asarray(frame.volume)[:n].reshape(-1, k).sum(axis=1)
+    ts = np.asarray(frame.timestamp)[:n].reshape(-1, k)[:, 0]
+    return CandleFrame(o, h, l, c, v, ts)
+
+
+def test_interval_ms():
+    assert interval_ms("1m") == MIN
+    assert interval_ms("1h") == 60 * MIN
+    with pytest.raises(ValueError):
+        interval_ms("3x")
+    with pytest.raises(ValueError):
+        Resampler(["90s"])
+
+
+def test_resample_coincide_con_agregacion_directa():
+    base = velas_1m(3000, seed=1)
+    r = Resampler(["5m", "15m", "1h"], capacity=500)
+    cerradas = {"5m": 0, "15m": 0, "1h": 0}
+    for i in range(len(base)):
+        for tf in r.update_kline(base.row(i)):
+            cerradas[tf] += 1
+    assert cerradas == {"5m": 600, "15m": 200, "1h": 50}
+
+    for tf, k in (("5m", 5), ("15m", 15), ("1h", 60)):
+        esperado = agregado(base, k)
+        got = r.frame(tf)
+        for col in ("open", "high", "low", "close", "volume", "timestamp"):
+            assert np.allclose(np.asarray(getattr(got, col)), np.asarray(getattr(esperado, col))[-len(got):])
+
+    cinco = agregado(base, 5)
+    closes = list(cinco.close)
+    ind = r.indicadores("5m")
+    assert ind["ema_fast"] == pytest.approx(ema(closes, 20))
+    assert ind["ema_slow"] == pytest.approx(ema(closes, 50))
+    assert ind["atr"] == pytest.approx(atr(list(cinco.high), list(cinco.low), closes, 14))
+    assert r.tendencia("5m") == detectar_tendencia(cinco.tail(500))
+
+
+def test_vela_en_curso_y_huecos():
+    r = Resampler(["5m"])
+    base = velas_1m(7, seed=2)
+    for i in range(3):
+        r.update_kline(base.row(i))
+    parcial = dict(base.row(3), closed=False, high=999.0)
+    r.update_kline(parcial)
+    vista = r.frame("5m", include_partial=True)
+    assert len(r.frame("5m")) == 0
+    assert vista.high[-1] == 999.0
+    assert vista.volume[-1] == pytest.approx(sum(base.volume[:4]))
+
+    # Falta el último minuto del bucket: se cierra con el primer minuto del siguiente.
+    assert r.update_kline(base.row(5)) == ["5m"]
+    frame = r.frame("5m")
+    assert len(frame) == 1
+    assert frame.close[-1] == base.close[2]
+    # Re-entregas de buckets cerrados se ignoran.
+    assert r.update_kline(base.row(1)) == []
+    assert len(r.frame("5m")) == 1
+
+
+def test_velas_semanales_abren_en_lunes():
+    from datetime import datetime, timezone
+
+    hora = 60 * MIN
+    # 1970-01-01 (jueves) + 3 semanas de velas de 1h.
+    base = velas_1m(21 * 24, seed=3)
+    base = CandleFrame(base.open, base.high, base.low, base.close, base.volume,
+                       np.arange(len(base)) * hora)
+    r = Resampler(["1w"], base="1h")
+    cierres = [i for i in range(len(base)) if r.update_kline(base.row(i))]
+    frame = r.frame("1w", include_partial=True)
+    aperturas = [datetime.fromtimestamp(int(ts) / 1000, tz=timezone.utc) for ts in frame.timestamp]
+    assert all(d.weekday() == 0 and (d.hour, d.minute) == (0, 0) for d in aperturas)
+    # La primera semana (parcial, desde el jueves) cierra con la última hora del domingo.
+    assert cierres[0] == 4 * 24 - 1
+    assert [int(ts) for ts in r.frame("1w").timestamp] == [-3 * 24 * hora, 4 * 24 * hora, 11 * 24 * hora]
+    assert np.asarray(r.frame("1w").volume)[1] == pytest.approx(sum(base.volume[4 * 24:11 * 24]))
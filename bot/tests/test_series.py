@@ -0,0 +1,94 @@
+"""
+Tests unitarios para series.py
+FASE 2 — Núcleo Cuantitativo
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from bot.core import indicators as ind
+from bot.core import series
+
+
+def _ohlc(n=150):
+    closes = [100.0 + 5.0 * math.sin(i / 9.0) + 0.05 * i for i in range(n)]
+    highs = [c + 0.8 + (i % 4) * 0.1 for i, c in enumerate(closes)]
+    lows = [c - 0.6 - (i % 3) * 0.2 for i, c in enumerate(closes)]
+    return highs, lows, closes
+
+
+def test_series_misma_longitud_y_nan_inicial():
+    _, _, closes = _ohlc()
+    out = series.ema_series(closes, 20)
+    assert out.shape == (len(closes),)
+    assert np.isnan(out[:19]).all()
+    assert not np.isnan(out[19:]).any()
+
+
+def test_sma_y_ema_coinciden_con_funciones_puras():
+    _, _, closes = _ohlc()
+    sma = series.sma_series(closes, 10)
+    ema = series.ema_series(closes, 20)
+    for i in (19, 50, len(closes) - 1):
+        assert sma[i] == pytest.approx(ind.sma(closes[: i + 1], 10))
+        assert ema[i] == pytest.approx(ind.ema(closes[: i + 1], 20))
+
+
+def test_rsi_atr_volatility_coinciden_con_funciones_puras():
+    highs, lows, closes = _ohlc()
+    rsi = series.rsi_series(closes, 14)
+    atr = series.atr_series(highs, lows, closes, 14)
+    vol = series.volatility_series(closes, 20)
+    assert np.isnan(rsi[13]) and not np.isnan(rsi[14])
+    assert np.isnan(atr[13]) and not np.isnan(atr[14])
+    for i in (30, 77, len(closes) - 1):
+        assert rsi[i] == pytest.approx(ind.rsi(closes[: i + 1], 14))
+        assert atr[i] == pytest.approx(ind.atr(highs[: i + 1], lows[: i + 1], closes[: i + 1], 14))
+        assert vol[i] == pytest.approx(ind.volatility(closes[: i + 1], 20))
+
+
+def test_macd_series_coincide_con_macd():
+    _, _, closes = _ohlc()
+    line, sig, hist = series.macd_series(closes, 12, 26, 9)
+    assert np.isnan(line[33]) and not np.isnan(line[34])
+    for i in (34, 90, len(closes) - 1):
+        assert (line[i], sig[i], hist[i]) == pytest.approx(ind.macd(closes[: i + 1], 12, 26, 9))
+
+
+def test_rsi_serie_plana():
+    out = series.rsi_series([100.0] * 30, 14)
+    assert out[-1] == 50.0
+
+
+def test_datos_insuficientes_y_errores():
+    assert np.isnan(series.ema_series([1.0, 2.0], 5)).all()
+    with pytest.raises(ValueError):
+        series.sma_series([1.0, 2.0, 3.0], 0)
+    with pytest.raises(ValueError):
+        series.atr_series([1.0, 2.0], [1.0], [1.0, 2.0], 2)
+    with pytest.raises(ValueError):
+        series.macd_series(list(range(40)), 26, 12, 9)
+
+
+def test_series_2d_por_fila():
+    highs, lows, closes = _ohlc()
+    c2 = np.array([closes, [x * 2.0 for x in closes]])
+    ema2 = series.ema_series(c2, 20)
+    rsi2 = series.rsi_series(c2, 14)
+    np.testing.assert_allclose(ema2[0], series.ema_series(closes, 20))
+    np.testing.assert_allclose(ema2[1], series.ema_series(c2[1], 20))
+    np.testing.assert_allclose(rsi2[1], series.rsi_series(c2[1], 14))
+
+
+def test_indicadores_batch():
+    highs, lows, closes = _ohlc()
+    vols = [10.0 + (i % 7) for i in range(len(closes))]
+    out = series.indicadores_batch([closes, closes], [highs, highs], [lows, lows], [vols, vols])
+    assert out["ema_fast"].shape == (2,)
+    assert out["ema_fast"][0] == pytest.approx(ind.ema(closes, 20))
+    assert out["ema_slow_prev"][1] == pytest.approx(ind.ema(closes[:-1], 50))
+    assert out["atr"][0] == pytest.approx(ind.atr(highs, lows, closes, 14))
+    assert out["rsi"][1] == pytest.approx(ind.rsi(closes, 14))
+    assert out["vol_mean"][0] == pytest.approx(sum(vols[-20:]) / 20)
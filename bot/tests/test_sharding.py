@@ -0,0 +1,172 @@
+"""
+Tests unitarios para services/sharding.py
+"""
+
+import asyncio
+import queue
+
+import pytest
+
+from bot.core.candle_window import CandleWindow
+from bot.services.orchestrator import Orquestador
+from bot.services import sharding
+from bot.services.sharding import BufferVelas, OrquestadorSharded, particionar
+from bot.tests.test_backtest import CONFIGS, sintetico
+from bot.tests.test_orchestrator import VENTANA, feed_local
+
+
+def test_particionar_reparte_todos_los_indices():
+    shards = particionar(10, 3)
+    assert shards == [[0, 3, 6, 9], [1, 4, 7], [2, 5, 8]]
+    assert particionar(2, 8) == [[0], [1]]
+
+
+def test_buffer_velas_coincide_con_candle_window():
+    frame = sintetico(50)
+    buf = BufferVelas(3, capacity=8)
+    try:
+        win = CandleWindow(8)
+        for k in range(50):
+            vela = (float(frame.open[k]), float(frame.high[k]), float(frame.low[k]),
+                    float(frame.close[k]), float(frame.volume[k]), int(frame.timestamp[k]))
+            buf.append(1, *vela)
+            win.append(*vela)
+            if k % 7 == 0:  # re-entrega de la misma vela con otro cierre
+                corregida = vela[:3] + (vela[3] + 1.0,) + vela[4:]
+                buf.append(1, *corregida)
+                win.append(*corregida)
+            assert buf.total(1) == win.total
+            for n in (None, 3):
+                a, b = buf.frame(1, n), win.frame(n)
+                for col in ("open", "high", "low", "close", "volume", "timestamp"):
+                    assert list(getattr(a, col)) == list(getattr(b, col))
+        assert buf.total(0) == buf.total(2) == 0
+        assert len(buf.frame(0)) == 0
+        ultima = win.frame(1)
+        ultimo = buf.total(1) - 1
+        assert buf.vela(1, ultimo) == (ultima.open[0], ultima.high[0], ultima.low[0],
+                                   ultima.close[0], ultima.volume[0], ultima.timestamp[0])
+        with pytest.raises(IndexError):
+            buf.vela(1, ultimo - 8)
+    finally:
+        del a, b
+        buf.close()
+
+
+def test_worker_descarta_lectura_a_medias(monkeypatch):
+    frame = sintetico(VENTANA + 1)
+    buf = BufferVelas(1, capacity=VENTANA)
+    evaluar = sharding.evaluar_simbolo
+    try:
+        for k in range(VENTANA + 1):
+            buf.append(0, float(frame.open[k]), float(frame.high[k]), float(frame.low[k]),
+                       float(frame.close[k]), float(frame.volume[k]), int(frame.timestamp[k]))
+        total, version = buf.total(0), buf.version(0)
+        assert version % 2 == 0
+
+        def reentrega_durante_la_evaluacion(st, evaluador=None):
+            senal = evaluar(st, evaluador=evaluador)
+            if buf.version(0) == version:
+                buf.append(0, 1.0, 1.0, 1.0, 1.0, 1.0, int(frame.timestamp[-1]))
+            return senal
+
+        monkeypatch.setattr(sharding, "evaluar_simbolo", reentrega_durante_la_evaluacion)
+        entrada, salida = queue.Queue(), queue.Queue()
+        # Evaluación original y la re-entrega (mismo total): como la original
+        # se descartó por lectura a medias, la re-entrega sí se evalúa.
+        entrada.put([(0, total, 1.0, False), (0, total, 2.0, True)])
+        entrada.put(None)
+        sharding._worker(buf.name, ["BTCUSDT"], VENTANA, [0], CONFIGS, {"balance": 1000.0},
+                         None, entrada, salida)
+        assert salida.get() is None
+        (_, _, t_a), (_, _, t_b) = salida.get()
+        assert buf.total(0) == total and buf.version(0) == version + 2
+        assert (t_a, t_b) == (-1.0, 2.0)
+    finally:
+        buf.close()
+
+
+def _historicos(n_simbolos, barras):
+    return {f"S{k}USDT": sintetico(VENTANA + barras, seed=k) for k in range(n_simbolos)}
+
+
+def test_sharded_emite_las_mismas_senales_que_el_orquestador():
+    historicos = _historicos(5, 300)
+
+    simple = Orquestador(historicos, CONFIGS, {"balance": 1000.0}, capacity=VENTANA)
+    for symbol, frame in historicos.items():
+        simple.seed(symbol, frame.slice(0, VENTANA))
+    asyncio.run(simple.run(feed_local(historicos, VENTANA, VENTANA + 300, entre_velas=simple.drain)))
+    simple.close()
+
+    sharded = OrquestadorSharded(historicos, CONFIGS, {"balance": 1000.0}, capacity=VENTANA, workers=2)
+    for symbol, frame in historicos.items():
+        sharded.seed(symbol, frame.slice(0, VENTANA))
+    with sharded:
+        asyncio.run(sharded.run(feed_local(historicos, VENTANA, VENTANA + 300, entre_velas=sharded.drain)))
+
+    esperadas = []
+    while not simple.senales.empty():
+        esperadas.append(simple.senales.get_nowait())
+    obtenidas = []
+    while not sharded.senales.empty():
+        obtenidas.append(sharded.senales.get_nowait())
+
+    assert esperadas
+    clave = lambda s: (s["symbol"], s["timestamp"])
+    sin_latencia = lambda s: {k: v for k, v in s.items() if k != "latencia_ms"}
+    assert sorted(map(clave, obtenidas)) == sorted(map(clave, esperadas))
+    por_clave = {clave(s): sin_latencia(s) for s in esperadas}
+    for s in obtenidas:
+        assert sin_latencia(s) == por_clave[clave(s)]
+    m = sharded.metricas()
+    assert m["workers"] == 2
+    assert m["etapas"]["limites_diarios"]["evaluaciones"] == 5 * 300
+    for nombre, e in simple.metricas()["etapas"].items():
+        assert (m["etapas"][nombre]["evaluaciones"], m["etapas"][nombre]["rechazos"]) == (e["evaluaciones"], e["rechazos"])
+    assert m["evaluaciones"] == 5 * 300
+    assert m["descartadas"] == 0
+
+
+async def con_reentregas(feed, cada=7):
+    """Re-entrega una de cada `cada` velas cerradas; una de cada dos, con el cierre corregido."""
+    k = 0
+    async for symbol, kline in feed:
+        yield symbol, kline
+        if k % cada == 3:
+            yield symbol, {**kline, "close": kline["close"] * 1.002} if k % (2 * cada) == 3 else kline
+        k += 1
+
+
+def test_reentregas_sharded_igual_que_el_orquestador():
+    historicos = _historicos(4, 200)
+    feed = lambda orq: con_reentregas(feed_local(historicos, VENTANA, VENTANA + 200, entre_velas=orq.drain))
+
+    simple = Orquestador(historicos, CONFIGS, {"balance": 1000.0}, capacity=VENTANA)
+    for symbol, frame in historicos.items():
+        simple.seed(symbol, frame.slice(0, VENTANA))
+    asyncio.run(simple.run(feed(simple)))
+    simple.close()
+
+    sharded = OrquestadorSharded(historicos, CONFIGS, {"balance": 1000.0}, capacity=VENTANA, workers=2)
+    for symbol, frame in historicos.items():
+        sharded.seed(symbol, frame.slice(0, VENTANA))
+    with sharded:
+        asyncio.run(sharded.run(feed(sharded)))
+
+    esperadas = []
+    while not simple.senales.empty():
+        esperadas.append(simple.senales.get_nowait())
+    obtenidas = []
+    while not sharded.senales.empty():
+        obtenidas.append(sharded.senales.get_nowait())
+
+    sin_latencia = lambda s: {k: v for k, v in s.items() if k != "latencia_ms"}
+    clave = lambda s: (s["symbol"], s["timestamp"])
+    assert esperadas
+    assert sorted(map(sin_latencia, obtenidas), key=clave) == sorted(map(sin_latencia, esperadas), key=clave)
+    # Cada vela cerrada se evalúa una vez: las re-entregas no añaden evaluaciones.
+    m, e = sharded.metricas(), simple.metricas()
+    assert m["evaluaciones"] == e["evaluaciones"] == 4 * 200
+    assert m["reentregas"] == e["reentregas"] == len(range(3, 4 * 200, 7))
+    assert m["descartadas"] == e["descartadas"] == 0
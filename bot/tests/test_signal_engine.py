@@ -3,9 +3,11 @@ import pytest
 
 from bot.core.signal_engine import (
     analizar_ballenas,
+    generar_senal_desde_pre,
     generar_senal_final,
 )
 from bot.core.strategy import generar_pre_senal
+from bot.core.reasons import Razon
 from bot.core.risk_manager import aplicar_filtros_riesgo
 
 
@@ -200,7 +202,9 @@ def test_estructura_completa_de_senal():
     assert "sl" in s
     assert "tp" in s
     assert "position_size" in s
-    assert isinstance(s["reasons"], list)
+    assert isinstance(s["razones"], Razon)
+    assert s["razones"] & Razon.RIESGO_OK
+    assert s["volume_factor"] > 0
     assert isinstance(s["ballena_flags"], dict)
 
 
@@ -223,3 +227,64 @@ def test_integracion_modulos():
         filtered = aplicar_filtros_riesgo(pre, estado, configs)
         # filtered puede ser dict con position_size o None
         assert filtered is None or isinstance(filtered, dict)
+
+
+def test_confianza_usa_volume_factor_sin_redondeo():
+    # 1.496 se mostraba como "volumen x1.50" y sumaba confianza con el umbral 1.5.
+    configs = {"symbol": "TESTUSDT", "max_volatility_pct": 0.05, "volume_factor_confirm": 1.5}
+    estado = {"balance": 1000.0, "perdidas_acumuladas": 0.0, "operaciones_hoy": 0}
+    ballenas = analizar_ballenas({})
+    pre = {
+        "direction": "LONG",
+        "entry_price": 100.0,
+        "atr": 1.0,
+        "timestamp": 1,
+        "razones": Razon.TENDENCIA_ALCISTA | Razon.VOLUMEN_FUERTE | Razon.EMAS_ALINEADAS,
+        "volume_factor": 1.496,
+    }
+    bajo = generar_senal_desde_pre(pre, estado, configs, ballenas)
+    alto = generar_senal_desde_pre({**pre, "volume_factor": 1.5}, estado, configs, ballenas)
+    assert bajo["volume_factor"] == 1.496
+    assert alto["confidence"] == pytest.approx(bajo["confidence"] + 0.2)
+
+
+def test_evaluador_por_etapas_coincide_con_generar_senal_final():
+    from bot.core.signal_engine import ETAPAS, EvaluadorSenal
+    from bot.tests.test_backtest import CONFIGS, sintetico
+
+    candles = sintetico(1200, seed=5).to_dicts()
+    evaluador = EvaluadorSenal()
+    estado = {"balance": 1000.0, "perdidas_acumuladas": 0.0, "operaciones_hoy": 0}
+    eventos = [None, {"volume_spike": True, "whale_trade": True, "severity": "high"}]
+    senales = 0
+    for i in range(199, 1200, 3):
+        ventana = candles[i - 199: i + 1]
+        ev = eventos[i % 2 == 0 and i % 7 == 0]
+        esperado = generar_senal_final(ventana, estado, CONFIGS, ev)
+        assert evaluador.evaluar(ventana, estado, CONFIGS, ev) == esperado
+        senales += esperado is not None
+
+    stats = evaluador.estadisticas()
+    assert list(stats) == list(ETAPAS)
+    assert senales > 0 and evaluador.senales == senales
+    assert stats["ballenas"]["rechazos"] > 0
+    # Cada etapa solo ve lo que no rechazó la anterior.
+    for previa, siguiente in zip(ETAPAS, ETAPAS[1:]):
+        assert stats[siguiente]["evaluaciones"] == stats[previa]["evaluaciones"] - stats[previa]["rechazos"]
+    assert stats["riesgo"]["evaluaciones"] - stats["riesgo"]["rechazos"] == senales
+
+
+def test_evaluador_limite_diario_corta_antes_de_indicadores():
+    from bot.core.signal_engine import EvaluadorSenal
+    from bot.tests.test_backtest import CONFIGS
+
+    candles = _make_increasing_candles()
+    evaluador = EvaluadorSenal()
+    lleno = {"balance": 1000.0, "perdidas_acumuladas": 0.0, "operaciones_hoy": CONFIGS["max_trades_per_day"]}
+    for _ in range(10):
+        assert evaluador.evaluar(candles, lleno, CONFIGS) is None
+    stats = evaluador.estadisticas()
+    assert stats["limites_diarios"] == {**stats["limites_diarios"], "evaluaciones": 10, "rechazos": 10}
+    assert stats["pre_senal"]["evaluaciones"] == 0
+    evaluador.reset()
+    assert evaluador.estadisticas()["limites_diarios"]["evaluaciones"] == 0
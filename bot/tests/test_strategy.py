@@ -12,6 +12,10 @@ from bot.core.strategy import (
     validar_volumen,
     validar_volatilidad,
     generar_pre_senal,
+    calcular_features,
+    generar_pre_senal_desde_features,
+    detectar_tendencia_batch,
+    generar_pre_senal_batch,
 )
 
 
@@ -137,3 +141,85 @@ def test_rechazo_por_datos_insuficientes():
     candles = [make_candle(1.0, 10.0, i) for i in range(10)]
     assert detectar_tendencia(candles) == "neutral"
     assert generar_pre_senal(candles) is None
+
+
+def _universo(n_symbols=12, n=120, seed=7):
+    import random
+    rnd = random.Random(seed)
+    universo = []
+    for s in range(n_symbols):
+        price = 100.0 + s
+        drift = rnd.choice([-0.6, -0.2, 0.0, 0.2, 0.6])
+        candles = []
+        for i in range(n):
+            price = max(1.0, price + drift + rnd.uniform(-0.5, 0.5))
+            candles.append({
+                "open": price - 0.1,
+                "high": price + rnd.uniform(0.1, 1.0),
+                "low": price - rnd.uniform(0.1, 1.0),
+                "close": price,
+                "volume": rnd.uniform(10.0, 30.0),
+                "timestamp": i,
+            })
+        if s % 2 == 0:
+            candles[-1]["volume"] = 200.0
+        universo.append(candles)
+    return universo
+
+
+def _matrices(universo):
+    cols = {k: [[c[k] for c in cs] for cs in universo] for k in ("high", "low", "close", "volume")}
+    return cols["high"], cols["low"], cols["close"], cols["volume"]
+
+
+def test_detectar_tendencia_batch_coincide():
+    universo = _universo()
+    _, _, closes, _ = _matrices(universo)
+    assert detectar_tendencia_batch(closes) == [detectar_tendencia(cs) for cs in universo]
+
+
+def test_generar_pre_senal_batch_coincide():
+    universo = _universo()
+    highs, lows, closes, volumes = _matrices(universo)
+    ts = [cs[-1]["timestamp"] for cs in universo]
+    batch = generar_pre_senal_batch(highs, lows, closes, volumes, ts)
+    esperado = [generar_pre_senal(cs) for cs in universo]
+    assert any(e is not None for e in esperado)
+    for b, e in zip(batch, esperado):
+        if e is None:
+            assert b is None
+        else:
+            assert b["direction"] == e["direction"]
+            assert b["entry_price"] == pytest.approx(e["entry_price"])
+            assert b["atr"] == pytest.approx(e["atr"])
+            assert b["razones"] == e["razones"]
+            assert b["volume_factor"] == pytest.approx(e["volume_factor"])
+
+
+def test_batch_datos_insuficientes():
+    closes = [[1.0] * 10, [2.0] * 10]
+    assert detectar_tendencia_batch(closes) == ["neutral", "neutral"]
+    assert generar_pre_senal_batch(closes, closes, closes, closes) == [None, None]
+
+
+def test_calcular_features_coincide_con_indicadores():
+    from bot.core import indicators
+    candles = _universo(n_symbols=1, n=200)[0]
+    f = calcular_features(candles)
+    closes = [c["close"] for c in candles]
+    highs = [c["high"] for c in candles]
+    lows = [c["low"] for c in candles]
+    assert f["ema_fast"] == indicators.ema(closes, 20)
+    assert f["ema_slow"] == indicators.ema(closes, 50)
+    assert f["ema_fast_prev"] == indicators.ema(closes[:-1], 20)
+    assert f["ema_slow_prev"] == indicators.ema(closes[:-1], 50)
+    assert f["atr"] == indicators.atr(highs, lows, closes, 14)
+    assert f["vol_mean"] == sum(c["volume"] for c in candles[-20:]) / 20
+    assert generar_pre_senal_desde_features(f) == generar_pre_senal(candles)
+
+
+def test_calcular_features_limites():
+    candles = [make_candle(1.0 + i, 10.0, i) for i in range(50)]
+    assert calcular_features(candles[:49]) is None
+    f = calcular_features(candles)
+    assert f["ema_slow_prev"] is None and f["ema_fast_prev"] is None
@@ -0,0 +1,193 @@
+"""
+Tests unitarios para data/stream_decoder.py
+"""
+
+import json
+import random
+
+import pytest
+
+from bot.core.candle_window import CandleWindow
+from bot.core.trade_radar import TradeRadar
+from bot.data.order_book import OrderBook, SequenceGapError
+from bot.data import stream_decoder
+from bot.data.stream_decoder import BufferDiffs, BufferTrades, DecodificadorStreams, cargar_json
+from bot.data.websocket_stream import decodificar_kline
+from bot.tests.test_order_book import grabar_diffs, leer
+
+T0 = 1_700_000_000_000
+
+
+def compacto(obj):
+    """JSON como lo envía Binance (sin espacios)."""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def kline_msg(symbol, t, o, h, l, c, v, closed):
+    return {"stream": f"{symbol.lower()}@kline_1m", "data": {
+        "e": "kline", "E": t + 1, "s": symbol,
+        "k": {"t": t, "T": t + 59_999, "s": symbol, "i": "1m", "f": 1, "L": 2, "o": f"{o}", "c": f"{c}",
+              "h": f"{h}", "l": f"{l}", "v": f"{v}", "n": 2, "x": closed, "q": "0", "V": "0", "Q": "0", "B": "0"},
+    }}
+
+
+def trade_msg(symbol, i, p, q, t, m):
+    return {"stream": f"{symbol.lower()}@aggTrade", "data": {
+        "e": "aggTrade", "E": t + 1, "s": symbol, "a": i, "p": f"{p:.2f}", "q": f"{q:.5f}", "f": i, "l": i,
+        "T": t, "m": m, "M": True,
+    }}
+
+
+def velas(n, seed=0):
+    rng = random.Random(seed)
+    precio = 100.0
+    for k in range(n):
+        o = precio
+        c = round(o * (1 + rng.gauss(0, 0.002)), 2)
+        h, l = round(max(o, c) * 1.001, 2), round(min(o, c) * 0.999, 2)
+        yield T0 + 60_000 * k, o, h, l, c, round(rng.uniform(1, 50), 3)
+        precio = c
+
+
+def test_klines_a_la_ventana_sin_dicts():
+    cierres = []
+    ventana, esperada = CandleWindow(50), CandleWindow(50)
+    dec = DecodificadorStreams(ventanas={"BTCUSDT": ventana}, on_cierre=cierres.append)
+    for t, o, h, l, c, v in velas(80):
+        # Una actualización en curso y luego el cierre, como en el stream.
+        for closed in (False, True):
+            msg = kline_msg("BTCUSDT", t, o, h, l, c, v, closed)
+            assert dec.feed(compacto(msg).encode()) == "kline"
+            esperada.update_kline(decodificar_kline(msg["data"]))
+    assert ventana.frame().to_dicts() == esperada.frame().to_dicts()
+    assert cierres == ["BTCUSDT"] * 80
+    assert dec.klines == 160 and dec.lentos == 0
+
+
+@pytest.mark.parametrize("via_json", [True, False])
+def test_trades_a_columnas_y_radar(via_json, monkeypatch):
+    # Con orjson los aggTrade van por el backend JSON; sin él, por el patrón.
+    monkeypatch.setattr(stream_decoder, "_TRADES_VIA_JSON", via_json)
+    rng = random.Random(1)
+    msgs = [trade_msg("ETHUSDT", i, 2000 + rng.uniform(-5, 5), rng.expovariate(2), T0 + 7 * i, rng.random() < 0.5)
+            for i in range(5_000)]
+    buf = BufferTrades(1_024)
+    radar, esperado = TradeRadar(), TradeRadar()
+    buf.on_lleno = lambda b: b.aplicar(radar)
+    dec = DecodificadorStreams(trades={"ETHUSDT": buf})
+    for msg in msgs:
+        dec.feed(compacto(msg))
+    assert len(buf) == 5_000 % 1_024
+    ids, precios, _, ts, _ = buf.columnas()
+    assert list(ids) == [m["data"]["a"] for m in msgs[-len(buf):]]
+    assert precios[0] == float(msgs[-len(buf)]["data"]["p"]) and ts[-1] == msgs[-1]["data"]["T"]
+    buf.aplicar(radar)
+    esperado.replay(m["data"] for m in msgs)
+    assert radar.eventos() == esperado.eventos()
+    assert buf.descartados == 0 and dec.agg_trades == 5_000 and dec.lentos == 0
+
+
+def test_buffer_trades_lleno_sin_consumidor():
+    buf = BufferTrades(2)
+    assert buf.append(1, 1.0, 1.0, 1, True) and buf.append(2, 1.0, 1.0, 2, False)
+    assert not buf.append(3, 1.0, 1.0, 3, True)
+    assert buf.descartados == 1 and list(buf.columnas()[0]) == [1, 2]
+    with pytest.raises(ValueError):
+        BufferTrades(0)
+
+
+def test_diffs_a_columnas_y_libro(tmp_path):
+    path = tmp_path / "depth.jsonl"
+    bids, asks = grabar_diffs(path, 2_000)
+    snapshot, diffs = leer(path)
+    book = OrderBook("TESTUSDT")
+    book.load_snapshot(snapshot)
+    buf = BufferDiffs(max_diffs=64, max_niveles=256, on_lleno=lambda b: b.aplicar(book))
+    dec = DecodificadorStreams(diffs={"TESTUSDT": buf})
+    for msg in diffs:
+        data = {"e": "depthUpdate", "E": msg["E"], "s": "TESTUSDT", "U": msg["U"], "u": msg["u"],
+                "b": msg["b"], "a": msg["a"]}
+        assert dec.feed(compacto({"stream": "testusdt@depth@100ms", "data": data})) == "depthUpdate"
+    buf.aplicar(book)
+    assert dict(book.bids) == bids and dict(book.asks) == asks
+    assert book.last_update_id == diffs[-1]["u"] and book.timestamp == diffs[-1]["E"]
+    assert dec.lentos == 0 and buf.descartados == 0
+
+
+def test_diffs_futuros_y_hueco():
+    book = OrderBook()
+    book.load_snapshot({"lastUpdateId": 10, "bids": [["1.0", "1"]], "asks": [["2.0", "1"]]})
+    buf = BufferDiffs()
+    dec = DecodificadorStreams(diffs={"BTCUSDT": buf})
+    for U, u, pu in ((5, 12, 4), (13, 15, 12), (16, 18, 14), (19, 20, 18)):
+        dec.feed(compacto({"e": "depthUpdate", "E": U, "T": U, "s": "BTCUSDT", "U": U, "u": u, "pu": pu,
+                           "b": [["1.5", "2"]], "a": []}))
+    assert list(buf.prev_id[:4]) == [4, 12, 14, 18]
+    with pytest.raises(SequenceGapError):
+        buf.aplicar(book)
+    assert book.last_update_id == 15 and not book.synced
+    # El diff posterior al hueco queda en el buffer del libro para después del snapshot.
+    assert [m["u"] for m in book._buffer] == [20]
+    assert len(buf) == 0
+
+
+def test_camino_lento_y_desconocidos():
+    ventana, trades = CandleWindow(10), BufferTrades(8)
+    dec = DecodificadorStreams(ventanas={"BTCUSDT": ventana}, trades={"BTCUSDT": trades})
+    # Con espacios y otro orden de campos no encaja el patrón: se usa el backend JSON.
+    msg = kline_msg("BTCUSDT", T0, 1.0, 2.0, 0.5, 1.5, 10.0, True)
+    assert dec.feed(json.dumps(msg)) == "kline"
+    assert dec.feed(json.dumps(trade_msg("BTCUSDT", 7, 1.5, 2.0, T0, False)["data"])) == "aggTrade"
+    assert dec.lentos == 2
+    assert ventana.last() == {"timestamp": T0, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10.0}
+    assert list(trades.columnas()[0]) == [7]
+
+    assert dec.feed(compacto(trade_msg("XRPUSDT", 1, 0.5, 1.0, T0, True))) == "aggTrade"
+    assert dec.ignorados == 1
+    assert dec.feed(b'{"result":null,"id":1}') is None
+    assert dec.feed(b"no json") is None
+    assert dec.desconocidos == 2
+    assert cargar_json(b'{"a":1}') == {"a": 1}
+
+
+@pytest.mark.parametrize("via_json", [True, False])
+def test_tipos_ajenos_y_mensajes_mal_formados(via_json, monkeypatch):
+    monkeypatch.setattr(stream_decoder, "_TRADES_VIA_JSON", via_json)
+    ventana, trades, diffs = CandleWindow(10), BufferTrades(8), BufferDiffs(max_diffs=4, max_niveles=8)
+    dec = DecodificadorStreams(ventanas={"BTCUSDT": ventana}, trades={"BTCUSDT": trades},
+                               diffs={"BTCUSDT": diffs})
+    # Tipos que empiezan por "a" o "k" sin ser aggTrade ni kline.
+    ajenos = [
+        {"stream": "btcusdt@avgPrice", "data": {"e": "avgPrice", "E": T0, "s": "BTCUSDT", "i": "5m",
+                                                 "w": "1.5", "T": T0}},
+        {"e": "aggTradeX", "s": "BTCUSDT"},
+        {"e": "kline_3s", "s": "BTCUSDT"},
+    ]
+    for msg in ajenos:
+        assert dec.feed(compacto(msg)) is None
+    assert dec.desconocidos == 3
+
+    # Tipos conocidos con campos ausentes o mal formados.
+    trade = trade_msg("BTCUSDT", 1, 1.5, 2.0, T0, False)
+    sin_precio = {**trade, "data": {k: v for k, v in trade["data"].items() if k != "p"}}
+    precio_roto = {**trade, "data": {**trade["data"], "p": "abc"}}
+    kline = kline_msg("BTCUSDT", T0, 1.0, 2.0, 0.5, 1.5, 10.0, True)
+    sin_k = {**kline, "data": {k: v for k, v in kline["data"].items() if k != "k"}}
+    depth = {"e": "depthUpdate", "E": T0, "s": "BTCUSDT", "U": 1, "u": 2, "b": [["1.0", "1"]], "a": []}
+    invalidos = [
+        sin_precio, precio_roto, sin_k,
+        {"data": {"e": "aggTrade"}},
+        {k: v for k, v in depth.items() if k != "u"},
+        {**depth, "a": [["2.0"]]},
+        {**depth, "b": [["1.0", "x"]]},
+    ]
+    for msg in invalidos:
+        assert dec.feed(compacto(msg)) is None
+    assert dec.invalidos == len(invalidos) and dec.desconocidos == 3
+    assert dec.agg_trades == dec.klines == dec.depth_updates == 0
+    assert len(trades) == len(ventana) == len(diffs) == diffs.n_niveles == 0
+
+    # Los mensajes válidos siguen entrando.
+    assert dec.feed(compacto(trade)) == "aggTrade"
+    assert dec.feed(compacto(depth)) == "depthUpdate"
+    assert len(trades) == len(diffs) == 1 and diffs.n_niveles == 1
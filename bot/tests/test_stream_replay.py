@@ -0,0 +1,117 @@
+"""
+Tests unitarios para data/stream_replay.py
+"""
+
+import asyncio
+import gzip
+import os
+import time
+
+import pytest
+
+from bot.data.stream_replay import GrabadorStreams, ServidorReplay, leer_grabacion, nombre_stream
+from bot.data.websocket_stream import ColaAcotada, MultiplexorStreams
+from bot.tests.test_binance_api import T0
+from bot.tests.test_websocket_stream import StubStreams, _agg_trade, _kline_ws
+
+NS = 1_000_000_000
+
+
+def grabar_sintetico(path, symbols, n, duracion_s=1.0):
+    """Grabación con n mensajes (kline + aggTrade) por símbolo repartidos en `duracion_s`."""
+    t0 = time.time_ns()
+    mensajes = []
+    for i in range(n):
+        for symbol in symbols:
+            raw = _kline_ws(symbol, T0 + 60_000 * (i // 10), closed=i % 10 == 9) if i % 2 else _agg_trade(symbol, i)
+            mensajes.append(raw)
+    with GrabadorStreams(path) as g:
+        for k, raw in enumerate(mensajes):
+            g.escribir(raw, ts_ns=t0 + int(duracion_s * NS * k / len(mensajes)))
+    return mensajes
+
+
+def test_grabacion_ida_y_vuelta(tmp_path):
+    path = str(tmp_path / "streams.bstr.gz")
+    mensajes = grabar_sintetico(path, ["BTCUSDT", "ETHUSDT"], 2_000)
+    registros = list(leer_grabacion(path))
+    assert [raw.decode() for _, raw in registros] == mensajes
+    ts = [t for t, _ in registros]
+    assert ts == sorted(ts)
+    assert os.path.getsize(path) < sum(map(len, mensajes)) / 5  # comprimida
+    assert nombre_stream(registros[0][1]) == b"btcusdt@aggTrade"
+    assert nombre_stream(b'{"e":"kline"}') is None
+
+    # Un registro final cortado (proceso interrumpido) se ignora.
+    with gzip.open(path, "rb") as fh:
+        datos = fh.read()
+    cortado = str(tmp_path / "cortado.bstr.gz")
+    with gzip.open(cortado, "wb") as fh:
+        fh.write(datos[:-7])
+    assert [raw.decode() for _, raw in leer_grabacion(cortado)] == mensajes[:-1]
+
+    with gzip.open(str(tmp_path / "otro.gz"), "wb") as fh:
+        fh.write(b"nada")
+    with pytest.raises(ValueError):
+        list(leer_grabacion(str(tmp_path / "otro.gz")))
+
+
+def test_multiplexor_graba_lo_que_recibe(tmp_path):
+    path = str(tmp_path / "vivo.bstr.gz")
+    mensajes = [_agg_trade("BTCUSDT", i) for i in range(500)]
+
+    async def caso():
+        async with StubStreams(lambda _: mensajes) as stub:
+            with GrabadorStreams(path) as g:
+                mux = MultiplexorStreams(["BTCUSDT"], base_url=stub.url, grabador=g)
+                recibidos = []
+                async with mux:
+                    while len(recibidos) < len(mensajes):
+                        recibidos.extend(await asyncio.wait_for(mux.trades.get_batch(), 5))
+
+    asyncio.run(caso())
+    assert [raw.decode() for _, raw in leer_grabacion(path)] == mensajes
+
+
+def test_replay_maxima_velocidad_filtra_streams(tmp_path):
+    a, b = str(tmp_path / "a.bstr.gz"), str(tmp_path / "b.bstr.gz")
+    grabar_sintetico(a, ["BTCUSDT"], 20_000)
+    grabar_sintetico(b, ["ETHUSDT"], 20_000)
+
+    async def caso():
+        async with ServidorReplay([a, b], velocidad=None) as srv:
+            mux = MultiplexorStreams(["BTCUSDT"], base_url=srv.url, depth=False,
+                                     cola_trades=ColaAcotada(50_000, "block"))
+            klines, trades = [], []
+            async with mux:
+                await srv.esperar_fin(30)
+                while len(trades) < 10_000 or len(klines) < 10_000 - mux.duplicadas:
+                    if not mux.trades.empty():
+                        trades.extend(mux.trades.get_nowait() for _ in range(mux.trades.qsize()))
+                    if not mux.klines.empty():
+                        klines.extend(mux.klines.get_nowait() for _ in range(mux.klines.qsize()))
+                    await asyncio.sleep(0.001)
+        assert {s for s, _ in trades + klines} == {"BTCUSDT"}
+        assert [t["a"] for _, t in trades] == list(range(0, 20_000, 2))
+        assert srv.ultimos_enviados == 20_000 and srv.conexiones == 1
+        assert srv.tasa() > 0
+
+    asyncio.run(caso())
+
+
+def test_replay_acelerado_respeta_los_intervalos(tmp_path):
+    path = str(tmp_path / "lento.bstr.gz")
+    grabar_sintetico(path, ["BTCUSDT"], 200, duracion_s=2.0)
+
+    async def caso():
+        async with ServidorReplay([path], velocidad=10) as srv:
+            mux = MultiplexorStreams(["BTCUSDT"], base_url=srv.url, depth=False)
+            async with mux:
+                await srv.esperar_fin(10)
+        return srv.segundos
+
+    segundos = asyncio.run(caso())
+    # 2s grabados a 10x: ~0.2s.
+    assert 0.18 <= segundos < 1.0
+    with pytest.raises(ValueError):
+        ServidorReplay([path], velocidad=0)
@@ -0,0 +1,62 @@
+"""
+Tests unitarios para params.py y sweep.py
+FASE 7 — Backtesting
+"""
+
+import pytest
+
+from bot.core.backtest import ejecutar_backtest
+from bot.core.params import PARAMETROS_DEFAULT, ParametrosEstrategia
+from bot.core.strategy import generar_pre_senal
+from bot.core.sweep import FuenteKlines, busqueda_aleatoria, ejecutar_sweep, grid
+from bot.data.kline_store import KlineStore
+from bot.tests.test_backtest import CONFIGS, sintetico
+
+
+def test_parametros_validacion_y_serializacion():
+    with pytest.raises(ValueError):
+        ParametrosEstrategia(ema_rapida=50, ema_lenta=20)
+    p = PARAMETROS_DEFAULT.con(sl_atr_mult=2.0)
+    assert p.sl_atr_mult == 2.0 and PARAMETROS_DEFAULT.sl_atr_mult == 1.5
+    assert ParametrosEstrategia.from_dict({**p.to_dict(), "extra": 1}) == p
+
+
+def test_parametros_default_equivalen_a_sin_parametros():
+    frame = sintetico(600, seed=2)
+    for end in range(60, 600, 37):
+        ventana = frame.slice(max(0, end - 200), end)
+        assert generar_pre_senal(ventana, PARAMETROS_DEFAULT) == generar_pre_senal(ventana)
+
+
+def test_grid_descarta_combinaciones_invalidas():
+    cands = grid(ema_rapida=[10, 30], ema_lenta=[20, 50])
+    assert {(c.ema_rapida, c.ema_lenta) for c in cands} == {(10, 20), (10, 50), (30, 50)}
+    with pytest.raises(ValueError):
+        grid(desconocido=[1])
+
+
+def test_busqueda_aleatoria_reproducible():
+    espacio = {"ema_rapida": (5, 30), "ema_lenta": [50, 100], "sl_atr_mult": (1.0, 2.5)}
+    a = busqueda_aleatoria(espacio, 8, seed=1)
+    assert a == busqueda_aleatoria(espacio, 8, seed=1)
+    assert len(a) == 8 and len(set(a)) == 8
+
+
+def test_sweep_paralelo_igual_a_secuencial(tmp_path):
+    frame = sintetico(1500, seed=5)
+    cands = grid(ema_rapida=[10, 20], sl_atr_mult=[1.0, 1.5], rr_objetivo=[1.5, 2.0])
+    secuencial = ejecutar_sweep(frame, cands, CONFIGS, {"balance": 1000.0}, max_workers=1)
+    paralelo = ejecutar_sweep(frame, cands, CONFIGS, {"balance": 1000.0}, max_workers=2)
+    assert [r["params"] for r in paralelo] == [r["params"] for r in secuencial]
+    assert [r["metricas"] for r in paralelo] == [r["metricas"] for r in secuencial]
+
+    store = KlineStore(str(tmp_path))
+    store.append("TESTUSDT", "1m", frame)
+    desde_store = ejecutar_sweep(FuenteKlines(str(tmp_path), "TESTUSDT", "1m"), cands, CONFIGS,
+                                 {"balance": 1000.0}, max_workers=2)
+    assert [r["metricas"] for r in desde_store] == [r["metricas"] for r in secuencial]
+
+    ref = ejecutar_backtest(frame, CONFIGS, {"balance": 1000.0}, params=cands[0])["metricas"]
+    assert next(r["metricas"] for r in secuencial if r["params"] == cands[0]) == ref
+    metricas = [r["metricas"]["retorno_pct"] for r in secuencial]
+    assert metricas == sorted(metricas, reverse=True)
@@ -0,0 +1,90 @@
+"""
+Tests unitarios para trade_radar.py
+"""
+
+import json
+import os
+import random
+
+import pytest
+
+from bot.core.signal_engine import analizar_ballenas
+from bot.core.trade_radar import TradeRadar
+
+WHALES = json.load(open(os.path.join(os.path.dirname(__file__), "..", "configs", "whales.json")))
+
+
+def flujo(n, inicio=0, seed=0, precio=100.0, paso_ms=20):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        precio *= 1 + rng.gauss(0, 0.00002)
+        out.append({"p": f"{precio:.4f}", "q": f"{rng.uniform(0.1, 5):.3f}", "m": rng.random() < 0.5,
+                    "T": inicio + i * paso_ms})
+    return out
+
+
+def test_desde_config_y_validacion():
+    radar = TradeRadar.desde_config(WHALES)
+    assert radar.whale_min_usdt == WHALES["whale_trade_min_usdt"]
+    assert radar.fast_move_pct == WHALES["fast_move_threshold_pct"]
+    with pytest.raises(ValueError):
+        TradeRadar(ventana_corta_ms=60_000, ventana_larga_ms=5_000)
+
+
+def test_flujo_normal_sin_eventos():
+    radar = TradeRadar.desde_config(WHALES)
+    ev = radar.replay(flujo(5000))
+    assert not any(ev[k] for k in ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze"))
+    assert ev["severity"] == "low"
+    assert analizar_ballenas(ev) == {"alerta_ballenas": False, "razon_ballenas": []}
+
+
+def test_sumas_moviles_coinciden_con_recalculo():
+    radar = TradeRadar()
+    trades = flujo(20000, seed=3, paso_ms=7)
+    radar.replay(trades)
+    fin = trades[-1]["T"]
+    corto = [t for t in trades if t["T"] // 100 > fin // 100 - 50]
+    largo = [t for t in trades if t["T"] // 100 > fin // 100 - 600]
+    nocional = lambda ts, m: sum(float(t["p"]) * float(t["q"]) for t in ts if t["m"] == m)
+    assert radar.corto_buy == pytest.approx(nocional(corto, False))
+    assert radar.corto_sell == pytest.approx(nocional(corto, True))
+    assert radar.largo_buy == pytest.approx(nocional(largo, False))
+    assert radar.largo_sell == pytest.approx(nocional(largo, True))
+
+
+def test_whale_trade_y_squeeze():
+    radar = TradeRadar.desde_config(WHALES)
+    trades = flujo(4000)
+    fin = trades[-1]["T"]
+    radar.replay(trades)
+    # Compras agresivas grandes que empujan el precio +1% en 2s.
+    precio = float(trades[-1]["p"])
+    for i in range(100):
+        precio *= 1.0001
+        radar.on_trade(precio, 30.0, False, fin + 20 * (i + 1))
+    radar.on_trade(precio, 3000.0, False, fin + 2100)
+    ev = radar.eventos()
+    assert ev["whale_trade"] and ev["side"] == "BUY"
+    assert ev["large_trade_value"] == pytest.approx(precio * 3000.0)
+    assert ev["fast_move"] and ev["volume_spike"] and ev["squeeze"]
+    assert ev["imbalance_corto"] > 0.5
+    assert ev["severity"] == "high"
+    assert analizar_ballenas(ev)["alerta_ballenas"] is True
+
+    # Pasada la ventana corta sin actividad, los flags se apagan.
+    ev = radar.eventos(fin + 10_000)
+    assert not ev["whale_trade"] and not ev["fast_move"]
+
+
+def test_stop_hunt():
+    radar = TradeRadar.desde_config(WHALES)
+    trades = flujo(4000)
+    fin = trades[-1]["T"]
+    radar.replay(trades)
+    precio = float(trades[-1]["p"])
+    radar.on_trade(precio * 0.99, 1.0, True, fin + 500)   # barrido por debajo
+    radar.on_trade(precio, 1.0, False, fin + 1000)         # vuelta al rango
+    ev = radar.eventos()
+    assert ev["stop_hunt"] and not ev["fast_move"]
@@ -0,0 +1,72 @@
+"""
+Tests unitarios para walk_forward.py
+FASE 7 — Backtesting
+"""
+
+import pytest
+
+from bot.core.backtest import ejecutar_backtest
+from bot.core.params import PARAMETROS_DEFAULT
+from bot.core.sweep import grid
+from bot.core.walk_forward import FeatureCache, backtest_rango, walk_forward, walk_forward_simbolos
+from bot.tests.test_backtest import CONFIGS, sintetico
+
+
+@pytest.mark.parametrize("params", [PARAMETROS_DEFAULT, PARAMETROS_DEFAULT.con(ema_rapida=10, rr_objetivo=1.5)])
+def test_backtest_cacheado_igual_a_backtest(params):
+    frame = sintetico(3000, seed=4)
+    esperado = ejecutar_backtest(frame, CONFIGS, {"balance": 1000.0}, params=params)
+    cache = FeatureCache(frame)
+    res = backtest_rango(cache, params, CONFIGS, {"balance": 1000.0})
+    assert res["trades"] == esperado["trades"]
+    assert list(res["equity"]) == list(esperado["equity"])
+    assert res["metricas"] == esperado["metricas"]
+
+
+def test_walk_forward_reutiliza_indicadores():
+    frame = sintetico(4000, seed=6)
+    cands = grid(ema_rapida=[10, 20], sl_atr_mult=[1.0, 1.5], factor_volumen=[1.2, 1.5])
+    cache = FeatureCache(frame)
+    res = walk_forward(frame, cands, CONFIGS, in_sample=1000, out_of_sample=500,
+                       estado_inicial={"balance": 1000.0}, cache=cache)
+
+    # Dos combinaciones de periodos -> dos pasadas, sin importar folds ni candidatos.
+    assert cache.pasadas == 2
+    assert [f["inicio"] for f in res["folds"]] == list(range(0, 3000, 500))
+    assert res["folds"][-1]["fin_oos"] == 4000
+    assert len(res["equity"]) == 3000
+    for fold in res["folds"]:
+        assert fold["params"] in cands
+        assert all(
+            fold["metricas_is"]["retorno_pct"] >= backtest_rango(cache, p, CONFIGS, {"balance": 1000.0},
+                                                                 fold["inicio"], fold["fin_is"])["metricas"]["retorno_pct"]
+            for p in cands
+        )
+    for trade in res["trades"]:
+        assert trade["entry_time"] >= 1000 * 60_000
+    m = res["metricas"]
+    assert m["balance_final"] == pytest.approx(1000.0 + m["pnl_total"])
+
+
+def test_walk_forward_oos_contiguos_igual_a_reproduccion_continua():
+    # Folds de 50 velas: cortan días y posiciones abiertas; el estado de riesgo
+    # y la posición deben atravesar los límites como en una pasada continua.
+    frame = sintetico(3000, seed=4)
+    cache = FeatureCache(frame)
+    res = walk_forward(frame, [PARAMETROS_DEFAULT], CONFIGS, in_sample=600, out_of_sample=50,
+                       estado_inicial={"balance": 1000.0}, cache=cache)
+    continuo = backtest_rango(cache, PARAMETROS_DEFAULT, CONFIGS, {"balance": 1000.0}, 600, 3000)
+    assert res["trades"] == continuo["trades"]
+    assert list(res["equity"]) == list(continuo["equity"])
+    assert res["metricas"] == continuo["metricas"]
+    limites = [f["fin_oos"] * 60_000 for f in res["folds"][:-1]]
+    assert any(t["entry_time"] < b <= t["exit_time"] for t in res["trades"] for b in limites)
+
+
+def test_walk_forward_simbolos_y_validacion():
+    frame = sintetico(1500, seed=1)
+    res = walk_forward_simbolos({"AAAUSDT": frame}, [PARAMETROS_DEFAULT], CONFIGS,
+                                in_sample=600, out_of_sample=300)
+    assert all(t["symbol"] == "AAAUSDT" for t in res["AAAUSDT"]["trades"])
+    with pytest.raises(ValueError):
+        walk_forward(frame, [], CONFIGS, in_sample=600, out_of_sample=300)
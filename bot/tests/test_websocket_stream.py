@@ -0,0 +1,222 @@
+"""
+Tests unitarios para data/websocket_stream.py (contra un servidor WebSocket local).
+"""
+
+import asyncio
+import json
+import struct
+import time
+
+import pytest
+import websockets
+
+from bot.data.binance_api import BinanceREST
+from bot.data.websocket_stream import ColaAcotada, MultiplexorStreams, agrupar, streams_simbolo
+from bot.tests.test_binance_api import T0, StubBinance, _kline
+
+
+class StubStreams:
+    """Servidor de stream combinado: cada conexión recibe los mensajes de `guion(n_conexion)`.
+
+    Si el guion devuelve `bytes` (frames ya serializados, ver `_frames`), se
+    escriben de una vez en el socket: así el servidor empuja muy por encima
+    de 100k msgs/s y la medida es la del cliente. Sin compresión, como el
+    cliente no la necesita para medir.
+    """
+
+    def __init__(self, guion):
+        self.guion = guion
+        self.conexiones = 0
+        self.paths = []
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await websockets.serve(self._handler, "127.0.0.1", 0, max_queue=None, compression=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def url(self):
+        host, port = list(self.server.sockets)[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def _handler(self, ws):
+        n = self.conexiones
+        self.conexiones += 1
+        self.paths.append(ws.request.path)
+        guion = self.guion(n)
+        if isinstance(guion, bytes):
+            t = time.perf_counter()
+            ws.transport.write(guion)
+            self.empuje_s = time.perf_counter() - t
+        else:
+            for msg in guion:
+                await ws.send(msg)
+        if n == 0 and self.cerrar_primera:
+            await ws.close()
+            return
+        await ws.wait_closed()
+
+    cerrar_primera = False
+    empuje_s = None
+
+
+def _frames(mensajes):
+    """Frames WebSocket de texto sin máscara (servidor -> cliente), concatenados."""
+    out = bytearray()
+    for msg in mensajes:
+        b = msg.encode()
+        n = len(b)
+        if n < 126:
+            out += struct.pack("!BB", 0x81, n)
+        elif n < 65536:
+            out += struct.pack("!BBH", 0x81, 126, n)
+        else:
+            out += struct.pack("!BBQ", 0x81, 127, n)
+        out += b
+    return bytes(out)
+
+
+def _kline_ws(symbol, t, closed=True):
+    k = _kline(symbol, t)
+    return json.dumps({"stream": f"{symbol.lower()}@kline_1m", "data": {
+        "e": "kline", "E": t + 60_000, "s": symbol,
+        "k": {"t": t, "T": t + 59_999, "s": symbol, "i": "1m", "o": k[1], "h": k[2], "l": k[3],
+              "c": k[4], "v": k[5], "x": closed},
+    }})
+
+
+def _agg_trade(symbol, i):
+    return json.dumps({"stream": f"{symbol.lower()}@aggTrade", "data": {
+        "e": "aggTrade", "E": T0 + i, "s": symbol, "a": i, "p": "100.5", "q": "0.25", "T": T0 + i, "m": i % 2 == 0,
+    }})
+
+
+def test_streams_y_lotes_por_conexion():
+    assert streams_simbolo("BTCUSDT") == ["btcusdt@kline_1m", "btcusdt@aggTrade", "btcusdt@depth@100ms"]
+    por_simbolo = [streams_simbolo(f"S{k}USDT") for k in range(700)]
+    lotes = agrupar(por_simbolo, 1024)
+    assert [len(l) for l in lotes] == [1023, 1023, 54]
+    assert sum(lotes, []) == sum(por_simbolo, [])
+    mux = MultiplexorStreams([f"S{k}USDT" for k in range(700)])
+    assert len(mux.conexiones) == 3
+
+
+def test_cola_acotada_politicas():
+    async def caso():
+        vieja = ColaAcotada(3, "drop_oldest")
+        nueva = ColaAcotada(3, "drop_newest")
+        for i in range(5):
+            vieja.put_nowait(i)
+            nueva.put_nowait(i)
+        assert await vieja.get_batch() == [2, 3, 4] and vieja.descartados == 2
+        assert await nueva.get_batch() == [0, 1, 2] and nueva.descartados == 2
+
+        bloqueante = ColaAcotada(2, "block")
+        await bloqueante.put(1)
+        await bloqueante.put(2)
+        pendiente = asyncio.ensure_future(bloqueante.put(3))
+        await asyncio.sleep(0.01)
+        assert not pendiente.done()  # contrapresión: espera a que el consumidor saque
+        assert await bloqueante.get() == 1
+        await asyncio.wait_for(pendiente, 1)
+        assert await bloqueante.get_batch(10) == [2, 3] and bloqueante.descartados == 0
+
+    asyncio.run(caso())
+    with pytest.raises(ValueError):
+        ColaAcotada(1, "nope")
+
+
+def test_throughput_100k_mensajes_sin_perdidas():
+    n = 100_000
+    frames = _frames(_agg_trade("BTCUSDT", i) for i in range(n))
+
+    async def caso():
+        async with StubStreams(lambda _: frames) as stub:
+            mux = MultiplexorStreams(["BTCUSDT"], base_url=stub.url, cola_trades=ColaAcotada(5_000, "block"))
+            recibidos = []
+            t0 = time.perf_counter()
+            async with mux:
+                while len(recibidos) < n:
+                    recibidos.extend(await asyncio.wait_for(mux.trades.get_batch(4096), 10))
+            seg = time.perf_counter() - t0
+        assert [m["a"] for _, m in recibidos] == list(range(n))
+        assert mux.trades.descartados == 0
+        assert stub.paths[0] == "/stream?streams=btcusdt@kline_1m/btcusdt@aggTrade/btcusdt@depth@100ms"
+        return n / stub.empuje_s, n / seg
+
+    empuje, tasa = asyncio.run(caso())
+    # El servidor ofrece los 100k mensajes a más de 100k msgs/s...
+    assert empuje > 100_000
+    # ...y el cliente los consume sin pérdidas al ritmo que permite el parseo de
+    # frames de `websockets` (~60k msgs/s en un núcleo; suelo conservador).
+    assert tasa > 20_000, tasa
+
+
+def test_reconexion_rellena_klines_perdidas_por_rest():
+    symbol = "BTCUSDT"
+    minuto = lambda k: T0 + 60_000 * k
+
+    def guion(n):
+        if n == 0:
+            return [_kline_ws(symbol, minuto(k)) for k in range(5)]
+        # Tras reconectar: la vela 9 llega repetida (ya rellenada) y luego la 10.
+        return [_kline_ws(symbol, minuto(9)), _kline_ws(symbol, minuto(10), closed=False), _kline_ws(symbol, minuto(10))]
+
+    async def caso():
+        async with StubBinance() as rest_stub, StubStreams(guion) as ws_stub:
+            ws_stub.cerrar_primera = True
+            async with BinanceREST(rest_stub.url) as rest:
+                mux = MultiplexorStreams(
+                    [symbol], base_url=ws_stub.url, agg_trade=False, depth=False, rest=rest,
+                    reconnect_delay=0.01, reloj=lambda: (minuto(10) + 30_000) / 1000,
+                )
+                velas = []
+                async with mux:
+                    while len(velas) < 12:
+                        velas.extend(await asyncio.wait_for(mux.klines.get_batch(), 5))
+        cerradas = [v["timestamp"] for _, v in velas if v["closed"]]
+        assert cerradas == [minuto(k) for k in range(11)]
+        assert [v["closed"] for _, v in velas].count(False) == 1
+        assert mux.rellenadas == 5 and mux.duplicadas == 1
+        assert mux.conexiones[0].reconexiones == 1
+        rellenada = next(v for _, v in velas if v["timestamp"] == minuto(7))
+        assert rellenada["close"] == float(_kline(symbol, minuto(7))[4])
+
+    asyncio.run(caso())
+
+
+def test_mensajes_malformados_se_saltan_sin_reconectar():
+    malos = [
+        "{no es json",
+        "[1, 2]",
+        json.dumps({"data": {"e": "aggTrade", "a": 0}}),  # sin "s"
+        json.dumps({"data": {"e": "kline", "s": "BTCUSDT", "k": {"t": T0}}}),  # kline incompleta
+    ]
+
+    async def caso():
+        async with StubStreams(lambda _: malos + [_agg_trade("BTCUSDT", i) for i in range(3)]) as stub:
+            mux = MultiplexorStreams(["BTCUSDT"], base_url=stub.url, reconnect_delay=0.01)
+            recibidos = []
+            async with mux:
+                while len(recibidos) < 3:
+                    recibidos.extend(await asyncio.wait_for(mux.trades.get_batch(), 5))
+                await asyncio.sleep(0.05)
+                assert not any(t.done() for t in mux._tareas)
+        assert [m["a"] for _, m in recibidos] == [0, 1, 2]
+        assert mux.invalidos == len(malos)
+        assert stub.conexiones == 1 and mux.conexiones[0].reconexiones == 0
+
+    asyncio.run(caso())
+
+
+def test_backoff_con_jitter():
+    mux = MultiplexorStreams(["BTCUSDT"], reconnect_delay=3, max_reconnect_delay=60)
+    for intentos, tope in ((0, 3), (1, 6), (3, 24), (10, 60)):
+        for _ in range(20):
+            assert tope / 2 <= mux.backoff(intentos) <= tope
+    mux = MultiplexorStreams.desde_config({"symbols": ["BTCUSDT"], "kline_interval": "5m", "websocket_reconnect_delay": 3})
+    assert mux.interval == "5m" and mux.reconnect_delay == 3.0
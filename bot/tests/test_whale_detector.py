@@ -121,3 +121,102 @@ def test_analizar_ballenas_integration():
     assert "razones" in resultado
     assert resultado["severity"] in ("low", "medium", "high")
     assert all(isinstance(r, str) for r in resultado["razones"])
+
+
+def _velas_aleatorias(n, seed):
+    import random
+
+    rng = random.Random(seed)
+    candles = []
+    price = 100.0
+    for i in range(n):
+        o = price
+        c = o * (1 + rng.gauss(0, 0.006))
+        h = max(o, c) + abs(rng.gauss(0, 0.3))
+        l = min(o, c) - abs(rng.gauss(0, 0.3))
+        v = rng.uniform(1, 10) * (5 if rng.random() < 0.05 else 1)
+        if rng.random() < 0.1:
+            # Valores repetidos: medias exactas en el umbral.
+            o, h, l, c, v = 10.0, 10.5, 10.0, 10.5, 2.0
+        candles.append({"open": o, "high": h, "low": l, "close": c, "volume": v, "timestamp": i})
+        price = c
+    return candles
+
+
+def test_whale_radar_coincide_con_analizar_ballenas():
+    from bot.core.whale_detector import WhaleRadar
+
+    candles = _velas_aleatorias(3000, seed=7)
+    radar = WhaleRadar()
+    vistos = set()
+    for i, c in enumerate(candles):
+        got = radar.update_kline(c)
+        esperado = analizar_ballenas(candles[max(0, i - 40): i + 1])
+        assert got == esperado, i
+        vistos.update(k for k in ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze") if got[k])
+    assert vistos == {"volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze"}
+
+
+def test_whale_radar_umbral_exacto():
+    from bot.core.whale_detector import WhaleRadar
+
+    radar = WhaleRadar()
+    candles = [{"open": 1.0, "high": 1.1, "low": 0.9, "close": 1.0, "volume": 0.1} for _ in range(19)]
+    # Volumen = 2 * media exacta de la ventana -> no es spike (comparación estricta).
+    candles.append({"open": 1.0, "high": 1.1, "low": 0.9, "close": 1.0, "volume": 0.1 * 2 * 20 / 21 * 1.05})
+    for c in candles:
+        got = radar.update_kline(c)
+    assert got == analizar_ballenas(candles)
+    assert radar.seed(candles) == analizar_ballenas(candles)
+
+
+def test_analizar_ballenas_batch_coincide_por_vela():
+    from bot.core.whale_detector import analizar_ballenas_batch
+
+    candles = _velas_aleatorias(1500, seed=11)
+    batch = analizar_ballenas_batch(candles)
+    flags = ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze")
+    for i in range(len(candles)):
+        esperado = analizar_ballenas(candles[: i + 1])
+        assert {k: bool(batch[k][i]) for k in flags} == {k: esperado[k] for k in flags}, i
+        assert batch["severity"][i] == esperado["severity"]
+    assert all(batch[k].any() for k in flags)
+
+
+def test_analizar_ballenas_batch_historico_corto():
+    from bot.core.whale_detector import analizar_ballenas_batch
+
+    batch = analizar_ballenas_batch(_velas_aleatorias(5, seed=1))
+    assert len(batch["squeeze"]) == 5 and not batch["volume_spike"].any()
+    assert len(analizar_ballenas_batch([])["severity"]) == 0
+
+
+def test_valores_no_numericos_no_disparan_detectores():
+    # Como el `float()` fallido original: la vela evaluada con un valor
+    # malo no dispara nada y, dentro de una ventana, cuenta como 0.
+    for malo in ("x", None):
+        assert detectar_fast_move([{"close": 100}, {"close": malo}]) is False
+        assert detectar_fast_move([{"close": malo}, {"close": 100}]) is False
+        assert detectar_stop_hunt([{"high": 110, "low": 100, "close": malo}]) is False
+        assert detectar_volumen_extremo([{"volume": 10}] * 20 + [{"volume": malo}]) is False
+        vols = [{"volume": 10}] * 18 + [{"volume": malo}, {"volume": 35}]
+        assert detectar_volumen_extremo(vols) is True  # media (180 + 0 + 35) / 20
+        cuerpos = [{"open": 1, "close": 2}] * 18 + [{"open": 1, "close": malo}, {"open": 1, "close": 5}]
+        assert detectar_whale_trade(cuerpos, trade_factor=3.0) is True
+        rangos = [{"high": 1.5, "low": 1.0}] * 29 + [{"high": malo, "low": 1.0}, {"high": 2.0, "low": 1.0}]
+        assert detectar_squeeze(rangos) is True
+
+
+def test_valores_no_numericos_radar_y_batch_coinciden():
+    from bot.core.whale_detector import WhaleRadar, analizar_ballenas_batch
+
+    candles = _velas_aleatorias(400, seed=3)
+    for i in range(5, len(candles), 37):
+        candles[i] = dict(candles[i], **{("close", "volume", "high", "open")[i % 4]: None if i % 2 else "x"})
+    batch = analizar_ballenas_batch(candles)
+    radar = WhaleRadar()
+    flags = ("volume_spike", "whale_trade", "fast_move", "stop_hunt", "squeeze")
+    for i in range(len(candles)):
+        esperado = analizar_ballenas(candles[max(0, i - 40): i + 1])
+        assert radar.seed(candles[i:i + 1]) == esperado, i
+        assert {k: bool(batch[k][i]) for k in flags} == {k: esperado[k] for k in flags}, i